@@ -0,0 +1,145 @@
+"""
+Availability analytics benchmark
+
+Seeds DeviceSessions in a SQLite file with --devices devices reconnecting
+--sessions-per-day times a day for --days days, then computes per-device
+availability, mean session length and flaps over the whole window two ways:
+network_monitor.analytics (NumPy) and a row-by-row Python loop over
+DeviceSession objects. Load time is reported separately from compute time,
+and the two results are checked against each other.
+
+Usage:
+    python benchmarks/bench_analytics.py --devices 2000 --days 30
+    python benchmarks/bench_analytics.py --devices 5000 --days 30 --json analytics.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from localdb import LocalConnection  # noqa: E402
+from network_monitor.analytics import device_metrics, connected_timeline, load_intervals  # noqa: E402
+from network_monitor.sessions import DeviceSession, uptime_seconds  # noqa: E402
+
+
+def seed(path: str, devices: int, days: int, sessions_per_day: int, seed_value: int = 1):
+    """Fill DeviceSessions with randomly spaced sessions; the last one is left open"""
+    rng = random.Random(seed_value)
+    connection = LocalConnection(path)
+    cursor = connection.cursor()
+    start = datetime(2026, 1, 1)
+    span = days * 86400
+    batch = []
+    for i in range(devices):
+        mac = "02:00:00:%02X:%02X:%02X" % tuple(i.to_bytes(3, "big"))
+        count = days * sessions_per_day
+        cuts = sorted(rng.uniform(0, span) for _ in range(count * 2))
+        for n in range(count):
+            session_start = start + timedelta(seconds=cuts[2 * n])
+            session_end = None if n == count - 1 else start + timedelta(seconds=cuts[2 * n + 1])
+            batch.append((mac, "10.0.0.1", session_start, session_end))
+        if len(batch) >= 50000:
+            cursor.executemany("INSERT INTO DeviceSessions (MACAddress, IPAddress, StartTime, "
+                               "EndTime) VALUES (?, ?, ?, ?)", batch)
+            batch.clear()
+    if batch:
+        cursor.executemany("INSERT INTO DeviceSessions (MACAddress, IPAddress, StartTime, "
+                           "EndTime) VALUES (?, ?, ?, ?)", batch)
+    connection.commit()
+    connection.close()
+    return start, start + timedelta(days=days)
+
+
+def load_sessions(path: str, since: datetime, until: datetime) -> dict:
+    """Row-by-row load: DeviceSession objects grouped by device"""
+    connection = LocalConnection(path)
+    cursor = connection.cursor()
+    cursor.execute("SELECT MACAddress, IPAddress, StartTime, EndTime FROM DeviceSessions "
+                   "WHERE StartTime < ? AND (EndTime IS NULL OR EndTime >= ?)", until, since)
+    sessions = defaultdict(list)
+    for mac, ip_address, start, end in cursor.fetchall():
+        sessions[mac].append(DeviceSession(mac, ip_address, start, end))
+    connection.close()
+    return sessions
+
+
+def row_by_row(sessions: dict, since: datetime, until: datetime, flap_seconds: float) -> dict:
+    """The same metrics computed one session at a time"""
+    window = (until - since).total_seconds()
+    result = {}
+    for mac, device_sessions in sessions.items():
+        device_sessions.sort(key=lambda session: session.start_time)
+        uptime = uptime_seconds(device_sessions, since, until)
+        lengths = [(min(s.end_time or until, until) - s.start_time).total_seconds()
+                   for s in device_sessions]
+        flaps = 0
+        for previous, session in zip(device_sessions, device_sessions[1:]):
+            gap = (session.start_time - min(previous.end_time or until, until)).total_seconds()
+            if 0 <= gap <= flap_seconds and session.start_time >= since:
+                flaps += 1
+        result[mac] = (uptime / window, sum(lengths) / len(lengths), flaps)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--devices", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--sessions-per-day", type=int, default=6)
+    parser.add_argument("--flap-seconds", type=float, default=300)
+    parser.add_argument("--repeat", type=int, default=3, help="compute passes per method")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "analytics.sqlite")
+        since, until = seed(path, args.devices, args.days, args.sessions_per_day)
+
+        started = time.perf_counter()
+        intervals = load_intervals(lambda: LocalConnection(path), since, until)
+        vector_load = time.perf_counter() - started
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            metrics = device_metrics(intervals, since, until, args.flap_seconds)
+            connected_timeline(intervals, since, until, 3600)
+        vector_compute = (time.perf_counter() - started) / args.repeat
+
+        started = time.perf_counter()
+        sessions = load_sessions(path, since, until)
+        loop_load = time.perf_counter() - started
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            expected = row_by_row(sessions, since, until, args.flap_seconds)
+        loop_compute = (time.perf_counter() - started) / args.repeat
+
+    for code, mac in enumerate(intervals.macs):
+        availability, mean_session, flaps = expected[mac]
+        assert abs(metrics["availability"][code] - availability) < 1e-6, mac
+        assert abs(metrics["mean_session_seconds"][code] - mean_session) < 1e-3, mac
+        assert metrics["flaps"][code] == flaps, mac
+
+    result = {
+        "devices": args.devices, "days": args.days, "sessions": len(intervals),
+        "vectorized_load_seconds": vector_load, "vectorized_compute_seconds": vector_compute,
+        "row_load_seconds": loop_load, "row_compute_seconds": loop_compute,
+        "compute_speedup": loop_compute / max(vector_compute, 1e-9),
+    }
+    print(f"{len(intervals):,} sessions, {args.devices:,} devices, {args.days} days")
+    print(f"  vectorized  load {vector_load:7.3f} s  compute {vector_compute * 1000:9.1f} ms")
+    print(f"  row-by-row  load {loop_load:7.3f} s  compute {loop_compute * 1000:9.1f} ms")
+    print(f"  compute speedup {result['compute_speedup']:.0f}x (results match)")
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(result, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Streaming export benchmark
+
+Seeds ConnectionLog in a SQLite file at several sizes and runs
+network_monitor.export over each, reporting rows/sec, time to first chunk
+and peak Python memory per format. Flat memory across sizes is the point.
+
+Usage:
+    python benchmarks/bench_export.py --rows 100000 --rows 1000000
+    python benchmarks/bench_export.py --format csv --format parquet --json export.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from localdb import LocalConnection  # noqa: E402
+from network_monitor.export import FORMATS, export  # noqa: E402
+
+
+def seed(path: str, rows: int, devices: int = 5000):
+    """Fill ConnectionLog with ``rows`` alternating connect/disconnect events"""
+    connection = LocalConnection(path)
+    start = datetime(2026, 1, 1)
+    macs = ["02:00:00:%02X:%02X:%02X" % tuple(i.to_bytes(3, "big")) for i in range(devices)]
+    cursor = connection.cursor()
+    cursor.executemany(
+        "INSERT INTO DeviceConnections (MACAddress, IPAddress, FirstSeen, LastSeen) "
+        "VALUES (?, ?, ?, ?)",
+        [(mac, f"10.0.{i >> 8 & 255}.{i & 255}", start, start) for i, mac in enumerate(macs)]
+    )
+    batch = []
+    for i in range(rows):
+        batch.append((macs[i % devices], "10.0.0.1", "CONNECTED" if i // devices % 2 == 0
+                      else "DISCONNECTED", start + timedelta(seconds=i)))
+        if len(batch) == 50000:
+            cursor.executemany("INSERT INTO ConnectionLog (MACAddress, IPAddress, EventType, "
+                               "EventTime) VALUES (?, ?, ?, ?)", batch)
+            batch.clear()
+    if batch:
+        cursor.executemany("INSERT INTO ConnectionLog (MACAddress, IPAddress, EventType, "
+                           "EventTime) VALUES (?, ?, ?, ?)", batch)
+    connection.commit()
+    connection.close()
+
+
+def run_export(path: str, fmt: str, page_size: int) -> dict:
+    tracemalloc.start()
+    started = time.perf_counter()
+    first_chunk = None
+    size = 0
+    for chunk in export(lambda: LocalConnection(path), "events", fmt, page_size=page_size):
+        if chunk and first_chunk is None:
+            first_chunk = time.perf_counter() - started
+        size += len(chunk)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": elapsed, "first_chunk_ms": (first_chunk or 0) * 1000,
+            "bytes": size, "peak_mb": peak / 1e6}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, action="append",
+                        help="ConnectionLog sizes to test (default: 50000 and 500000)")
+    parser.add_argument("--format", action="append", choices=sorted(FORMATS),
+                        help="formats to test (default: ndjson and csv)")
+    parser.add_argument("--page-size", type=int, default=10000)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.rows or [50000, 500000]:
+            path = os.path.join(directory, f"export-{rows}.sqlite")
+            seed(path, rows)
+            for fmt in args.format or ["ndjson", "csv"]:
+                result = run_export(path, fmt, args.page_size)
+                result.update(rows=rows, format=fmt, rows_per_sec=rows / result["seconds"])
+                results.append(result)
+                print(f"{fmt:8} {rows:>9} rows  {result['rows_per_sec']:>10,.0f} rows/s  "
+                      f"first chunk {result['first_chunk_ms']:6.1f} ms  "
+                      f"peak {result['peak_mb']:6.2f} MB  {result['bytes'] / 1e6:8.1f} MB out")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
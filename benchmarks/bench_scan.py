@@ -0,0 +1,154 @@
+"""
+Scan throughput benchmark
+
+Drives NetworkScanner (or NetworkMonitor end to end against the local SQLite
+stand-in) over a simulated subnet and reports scans/sec, p50/p99 scan latency
+and peak memory.
+
+Usage:
+    python benchmarks/bench_scan.py --subnet 10.0.0.0/16 --occupancy 0.05
+    python benchmarks/bench_scan.py --mode monitor --churn 0.01 --json out.json
+"""
+import argparse
+import atexit
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from localdb import LocalConnection  # noqa: E402
+from simulator import SimulatedNetwork  # noqa: E402
+from network_monitor.config import Config  # noqa: E402
+from network_monitor.database import DatabaseManager  # noqa: E402
+from network_monitor.monitor import NetworkMonitor  # noqa: E402
+from network_monitor.scanner import NetworkScanner  # noqa: E402
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile of a list of values"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def build_target(args, network: SimulatedNetwork):
+    """Create the callable that performs one scan"""
+    scanner = NetworkScanner(
+        subnet=str(network.network),
+        timeout=args.timeout,
+        hostname_cache_ttl=args.hostname_cache_ttl,
+        resolve_hostnames=not args.async_enrich
+    )
+    if args.mode == "scanner":
+        return scanner.scan, None
+
+    config = Config()
+    config.network.subnet = str(network.network)
+    # Warm-start snapshots and presence segments go to a throwaway directory
+    state_dir = tempfile.mkdtemp(prefix="bench_scan_")
+    atexit.register(shutil.rmtree, state_dir, True)
+    config.state.directory = state_dir
+    config.presence.directory = os.path.join(state_dir, "presence")
+    config.enrichment.asynchronous = args.async_enrich
+    connection = LocalConnection(args.db)
+    database = DatabaseManager(config.database, connection=connection)
+    monitor = NetworkMonitor(config, scanner=scanner, database=database)
+    return monitor.scan_once, connection
+
+
+def run(args) -> dict:
+    """Run the benchmark and return the results"""
+    network = SimulatedNetwork(
+        subnet=args.subnet,
+        occupancy=args.occupancy,
+        reply_latency=args.latency_ms / 1000,
+        loss=args.loss,
+        dns_delay=args.dns_ms / 1000,
+        churn=args.churn,
+        time_scale=args.time_scale,
+        seed=args.seed,
+    )
+
+    with network.installed():
+        tracemalloc.start()
+        scan, connection = build_target(args, network)
+
+        for _ in range(args.warmup):
+            scan()
+            network.step()
+
+        tracemalloc.reset_peak()
+        durations = []
+        started = time.perf_counter()
+        for _ in range(args.scans):
+            scan_started = time.perf_counter()
+            scan()
+            durations.append(time.perf_counter() - scan_started)
+            network.step()
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    results = {
+        "mode": args.mode,
+        "subnet": args.subnet,
+        "addresses": network.address_count,
+        "online": len(network.online),
+        "scans": args.scans,
+        "scans_per_sec": args.scans / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(durations, 50) * 1000,
+        "p99_ms": percentile(durations, 99) * 1000,
+        "peak_memory_mb": peak / (1024 * 1024),
+    }
+    if connection is not None:
+        results["connection_log_rows"] = connection.count("ConnectionLog")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mode", choices=("scanner", "monitor"), default="scanner")
+    parser.add_argument("--subnet", default="10.0.0.0/24")
+    parser.add_argument("--occupancy", type=float, default=0.5)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--loss", type=float, default=0.0)
+    parser.add_argument("--dns-ms", type=float, default=0.0)
+    parser.add_argument("--churn", type=float, default=0.0)
+    parser.add_argument("--time-scale", type=float, default=0.0,
+                        help="fraction of the srp timeout to actually sleep")
+    parser.add_argument("--timeout", type=int, default=3)
+    parser.add_argument("--hostname-cache-ttl", type=int, default=300)
+    parser.add_argument("--async-enrich", action="store_true",
+                        help="resolve hostnames in the background enrichment pipeline")
+    parser.add_argument("--scans", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", default=":memory:", help="SQLite path for --mode monitor")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--max-p99-ms", type=float,
+                        help="exit non-zero if p99 scan latency exceeds this")
+    args = parser.parse_args()
+
+    results = run(args)
+    for key, value in results.items():
+        print(f"{key:>20}: {value:.2f}" if isinstance(value, float) else f"{key:>20}: {value}")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+    if args.max_p99_ms is not None and results["p99_ms"] > args.max_p99_ms:
+        print(f"FAIL: p99 {results['p99_ms']:.2f}ms exceeds {args.max_p99_ms}ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Storage write-path benchmark
+
+Replays a synthetic scan sequence through DatabaseManager.update_device_status
+(and any alternative write strategies registered in STRATEGIES) against the
+local SQLite stand-in, and reports statements per scan, round trips per scan,
+commit latency and ConnectionLog rows written.
+
+Only the tables every strategy writes are compared: DeviceConnections and
+ConnectionLog. The history tables (DeviceSessions, IPLeases,
+DeviceAddresses) are switched off for the production path, so it does no
+extra work that the alternatives skip.
+
+Usage:
+    python benchmarks/bench_storage.py --devices 10000 --churn 0.01
+    python benchmarks/bench_storage.py --devices 50000 --churn 0.05 \
+        --strategy row --strategy batched --json storage.json
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from localdb import LocalConnection  # noqa: E402
+from network_monitor.config import DatabaseConfig  # noqa: E402
+from network_monitor.database import DatabaseManager  # noqa: E402
+from network_monitor.scanner import Device  # noqa: E402
+
+
+def generate_scans(devices: int, scans: int, occupancy: float, churn: float,
+                   ip_changes: float, seed: int) -> List[Dict[str, Device]]:
+    """
+    Build a reproducible sequence of scan results
+
+    Args:
+        devices: Size of the device population
+        scans: Number of scans to generate
+        occupancy: Fraction of the population online in the first scan
+        churn: Fraction of the population that connects or disconnects per scan
+        ip_changes: Fraction of online devices that change IP per scan
+        seed: Random seed
+
+    Returns:
+        One MAC -> Device mapping per scan
+    """
+    rng = random.Random(seed)
+    macs = ["02:%02X:%02X:%02X:%02X:%02X" % tuple(i.to_bytes(5, "big")) for i in range(devices)]
+    ips = {mac: f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i, mac in enumerate(macs)}
+    online = {mac for mac in macs if rng.random() < occupancy}
+
+    sequence = []
+    for _ in range(scans):
+        sequence.append({
+            mac: Device(mac, ips[mac], f"host-{mac[-5:].replace(':', '')}")
+            for mac in online
+        })
+        for mac in rng.sample(macs, int(devices * churn)):
+            if mac in online:
+                online.discard(mac)
+            else:
+                online.add(mac)
+        for mac in rng.sample(sorted(online), int(len(online) * ip_changes)):
+            ips[mac] = f"172.16.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+    return sequence
+
+
+def row_strategy(database: DatabaseManager, devices: Dict[str, Device]):
+    """The production write path: one statement per device per step"""
+    database.update_device_status(devices)
+
+
+def batched_strategy(database: DatabaseManager, devices: Dict[str, Device]):
+    """Candidate write path: set difference in Python, executemany per step"""
+    connection = database.connection
+    cursor = connection.cursor()
+    now = datetime.now()
+
+    current = set(devices)
+    previous = database.get_connected_devices()
+    new = current - previous
+    gone = previous - current
+
+    if new:
+        if database.vendor_lookup is not None:
+            for mac in new:
+                if devices[mac].vendor is None:
+                    devices[mac].vendor = database.vendor_lookup(mac)
+        cursor.execute("SELECT MACAddress FROM DeviceConnections WHERE IsConnected = 0")
+        known = {row[0] for row in cursor.fetchall()} & new
+        reconnected = [devices[mac] for mac in known]
+        inserted = [devices[mac] for mac in new - known]
+        if reconnected:
+            cursor.executemany("""
+                UPDATE DeviceConnections
+                SET IPAddress = ?, Hostname = COALESCE(?, Hostname), LastSeen = ?,
+                    IsConnected = 1, Vendor = COALESCE(Vendor, ?)
+                WHERE MACAddress = ?
+            """, [(d.ip_address, d.hostname, now, d.vendor, d.mac_address) for d in reconnected])
+        if inserted:
+            cursor.executemany("""
+                INSERT INTO DeviceConnections
+                (MACAddress, IPAddress, Hostname, FirstSeen, LastSeen, IsConnected, Vendor)
+                VALUES (?, ?, ?, ?, ?, 1, ?)
+            """, [(d.mac_address, d.ip_address, d.hostname, now, now, d.vendor) for d in inserted])
+        cursor.executemany("""
+            INSERT INTO ConnectionLog (MACAddress, IPAddress, EventType, EventTime)
+            VALUES (?, ?, 'CONNECTED', ?)
+        """, [(devices[mac].mac_address, devices[mac].ip_address, now) for mac in new])
+
+    if gone:
+        cursor.executemany("""
+            UPDATE DeviceConnections SET IsConnected = 0 WHERE MACAddress = ?
+        """, [(mac,) for mac in gone])
+        cursor.executemany("""
+            INSERT INTO ConnectionLog (MACAddress, IPAddress, EventType, EventTime)
+            VALUES (?, NULL, 'DISCONNECTED', ?)
+        """, [(mac, now) for mac in gone])
+
+    if current:
+        cursor.executemany("""
+            UPDATE DeviceConnections
+            SET LastSeen = ?, IPAddress = ?, Hostname = COALESCE(?, Hostname)
+            WHERE MACAddress = ?
+        """, [(now, d.ip_address, d.hostname, d.mac_address) for d in devices.values()])
+
+    connection.commit()
+
+
+# Register alternative write paths here to compare them side by side
+STRATEGIES: Dict[str, Callable[[DatabaseManager, Dict[str, Device]], None]] = {
+    "row": row_strategy,
+    "batched": batched_strategy,
+}
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile of a list of values"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def device_state(connection: LocalConnection) -> str:
+    """Digest of the DeviceConnections columns every strategy writes (timestamps aside)"""
+    rows = connection._conn.execute("""
+        SELECT MACAddress, IPAddress, Hostname, IsConnected, Vendor
+        FROM DeviceConnections ORDER BY MACAddress
+    """).fetchall()
+    return hashlib.sha1(repr([tuple(row) for row in rows]).encode()).hexdigest()[:12]
+
+
+def run_strategy(name: str, sequence: List[Dict[str, Device]], db_path: str) -> dict:
+    """Replay the scan sequence through one strategy"""
+    strategy = STRATEGIES[name]
+    connection = LocalConnection(db_path)
+    database = DatabaseManager(DatabaseConfig("local", "bench", None, None, True),
+                               connection=connection)
+    # Like for like: no strategy writes the history tables
+    database.track_sessions = False
+    database.track_ip_leases = False
+    database.track_addresses = False
+
+    # The first scan seeds the inventory and is reported separately
+    started = time.perf_counter()
+    strategy(database, sequence[0])
+    seed_seconds = time.perf_counter() - started
+    seed_log_rows = connection.count("ConnectionLog")
+
+    connection.stats.reset()
+    durations = []
+    for devices in sequence[1:]:
+        scan_started = time.perf_counter()
+        strategy(database, devices)
+        durations.append(time.perf_counter() - scan_started)
+
+    stats = connection.stats
+    scans = max(1, len(sequence) - 1)
+    results = {
+        "strategy": name,
+        "seed_seconds": seed_seconds,
+        "statements_per_scan": stats.statements / scans,
+        "round_trips_per_scan": stats.round_trips / scans,
+        "scan_p50_ms": percentile(durations, 50) * 1000,
+        "scan_p99_ms": percentile(durations, 99) * 1000,
+        "commit_p50_ms": percentile(stats.commit_seconds, 50) * 1000,
+        "commit_p99_ms": percentile(stats.commit_seconds, 99) * 1000,
+        "log_rows_per_scan": (connection.count("ConnectionLog") - seed_log_rows) / scans,
+        "devices": connection.count("DeviceConnections"),
+        "connected": len(database.get_connected_devices()),
+        "device_state": device_state(connection),
+    }
+    connection.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--devices", type=int, default=10000)
+    parser.add_argument("--scans", type=int, default=20)
+    parser.add_argument("--occupancy", type=float, default=0.6)
+    parser.add_argument("--churn", type=float, default=0.01,
+                        help="fraction of devices connecting/disconnecting per scan")
+    parser.add_argument("--ip-changes", type=float, default=0.0,
+                        help="fraction of online devices changing IP per scan")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--strategy", action="append", choices=sorted(STRATEGIES),
+                        help="strategy to run (repeatable, default: all)")
+    parser.add_argument("--db", default=":memory:",
+                        help="SQLite path; use a file to include fsync cost")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    sequence = generate_scans(args.devices, args.scans + 1, args.occupancy,
+                              args.churn, args.ip_changes, args.seed)
+
+    results = []
+    for name in args.strategy or sorted(STRATEGIES):
+        if args.db != ":memory:" and os.path.exists(args.db):
+            os.remove(args.db)
+        results.append(run_strategy(name, sequence, args.db))
+
+    keys = [k for k in results[0] if k != "strategy"]
+    print(f"{'':>22}" + "".join(f"{r['strategy']:>14}" for r in results))
+    for key in keys:
+        cells = "".join(
+            f"{r[key]:>14.2f}" if isinstance(r[key], float) else f"{r[key]:>14}"
+            for r in results
+        )
+        print(f"{key:>22}{cells}")
+
+    print("(DeviceSessions, IPLeases and DeviceAddresses writes are off for every strategy)")
+    if len({r["device_state"] for r in results}) > 1:
+        print("WARNING: strategies ended with different device state")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
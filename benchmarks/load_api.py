@@ -0,0 +1,271 @@
+"""
+HTTP API load test
+
+Seeds a local SQLite stand-in with a device inventory and months of
+ConnectionLog history, serves the dashboard app in-process (or in a
+subprocess), drives the /api/* endpoints with concurrent clients and reports
+throughput, latency percentiles and error rates per endpoint.
+
+Usage:
+    python benchmarks/load_api.py --devices 500 --days 90 --concurrency 16
+    python benchmarks/load_api.py --subprocess --duration 30 \
+        --max-p99-ms 250 --max-error-rate 0.01
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from localdb import LocalConnection  # noqa: E402
+
+ENDPOINTS = {
+    # name: (path template, weight)
+    "status": ("/api/status", 4),
+    "devices": ("/api/devices", 2),
+    "devices_connected": ("/api/devices/connected", 2),
+    "events": ("/api/events?limit=50", 3),
+    "statistics": ("/api/statistics", 2),
+    "device_details": ("/api/device/{mac}", 1),
+}
+
+
+def seed_database(path: str, devices: int, days: int, events_per_day: float,
+                  seed: int) -> list:
+    """
+    Populate a SQLite database with a realistic inventory and event history
+
+    Args:
+        path: SQLite database path
+        devices: Number of devices in the inventory
+        days: Days of ConnectionLog history
+        events_per_day: Mean connect/disconnect pairs per device per day
+        seed: Random seed
+
+    Returns:
+        MAC addresses of the seeded devices
+    """
+    rng = random.Random(seed)
+    connection = LocalConnection(path)
+    cursor = connection.cursor()
+    now = datetime.now()
+    start = now - timedelta(days=days)
+
+    macs = []
+    device_rows = []
+    log_rows = []
+    for i in range(devices):
+        mac = "02:%02X:%02X:%02X:%02X:%02X" % tuple(i.to_bytes(5, "big"))
+        ip = f"10.0.{i >> 8 & 255}.{i & 255}"
+        macs.append(mac)
+
+        t = start + timedelta(seconds=rng.uniform(0, 86400))
+        first_seen = t
+        connected = False
+        while t < now:
+            log_rows.append((mac, ip if not connected else None,
+                             "DISCONNECTED" if connected else "CONNECTED", t))
+            connected = not connected
+            t += timedelta(seconds=rng.expovariate(2 * events_per_day / 86400))
+
+        device_rows.append((mac, ip, f"host-{i}.lan", first_seen, now if connected else t,
+                            1 if connected else 0, rng.choice([None, "Laptop", "Phone"])))
+
+    cursor.executemany("""
+        INSERT INTO DeviceConnections
+        (MACAddress, IPAddress, Hostname, FirstSeen, LastSeen, IsConnected, DeviceType)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """, device_rows)
+    cursor.executemany("""
+        INSERT INTO ConnectionLog (MACAddress, IPAddress, EventType, EventTime)
+        VALUES (?, ?, ?, ?)
+    """, log_rows)
+    connection.commit()
+    connection.close()
+    print(f"Seeded {devices} devices and {len(log_rows)} ConnectionLog rows")
+    return macs
+
+
+def serve(db_path: str, host: str, port: int):
+    """Serve the dashboard app over the seeded database (blocks)"""
+    from werkzeug.serving import make_server
+    server = make_server(host, port, build_app(db_path), threaded=True)
+    server.serve_forever()
+
+
+def build_app(db_path: str):
+    """Initialize the Flask app against the SQLite stand-in"""
+    from network_monitor import web
+    from network_monitor.config import Config
+    from network_monitor.database import DatabaseManager
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    config = Config()
+    database = DatabaseManager(config.database, connection=LocalConnection(db_path))
+    web.init_app(config, database=database)
+    return web.app
+
+
+def start_server(args):
+    """Start the server in-process or as a subprocess"""
+    if args.subprocess:
+        process = subprocess.Popen([
+            sys.executable, __file__, "--serve", "--db", args.db,
+            "--host", args.host, "--port", str(args.port),
+        ])
+        return process.terminate
+
+    from werkzeug.serving import make_server
+    server = make_server(args.host, args.port, build_app(args.db), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.shutdown
+
+
+def wait_for_server(base_url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(base_url + "/api/status", timeout=1).read()
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not come up")
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile of a list of values"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def drive(base_url: str, macs: list, concurrency: int, duration: float, seed: int) -> dict:
+    """
+    Issue weighted requests from concurrent clients for a fixed duration
+
+    Returns:
+        Endpoint name -> list of (latency seconds, ok) samples
+    """
+    names = list(ENDPOINTS)
+    weights = [ENDPOINTS[name][1] for name in names]
+    samples = defaultdict(list)
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(worker: int):
+        rng = random.Random(seed + worker)
+        local = defaultdict(list)
+        while time.monotonic() < deadline:
+            name = rng.choices(names, weights)[0]
+            url = base_url + ENDPOINTS[name][0].format(mac=rng.choice(macs))
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(url, timeout=30) as response:
+                    response.read()
+                    ok = response.status < 500
+            except urllib.error.HTTPError as e:
+                ok = e.code < 500
+            except Exception:
+                ok = False
+            local[name].append((time.perf_counter() - started, ok))
+        with lock:
+            for name, values in local.items():
+                samples[name].extend(values)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(client, range(concurrency)))
+    return samples
+
+
+def summarize(samples: dict, duration: float) -> dict:
+    results = {}
+    for name in ENDPOINTS:
+        values = samples.get(name, [])
+        latencies = [latency for latency, _ in values]
+        errors = sum(1 for _, ok in values if not ok)
+        results[name] = {
+            "requests": len(values),
+            "rps": len(values) / duration,
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p95_ms": percentile(latencies, 95) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "error_rate": errors / len(values) if values else 0.0,
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--devices", type=int, default=500)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--events-per-day", type=float, default=2.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", default="loadtest.sqlite")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--subprocess", action="store_true",
+                        help="run the server in a separate process")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--max-p99-ms", type=float,
+                        help="exit non-zero if any endpoint's p99 exceeds this")
+    parser.add_argument("--max-error-rate", type=float,
+                        help="exit non-zero if any endpoint's error rate exceeds this")
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.db, args.host, args.port)
+        return
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    macs = seed_database(args.db, args.devices, args.days, args.events_per_day, args.seed)
+
+    base_url = f"http://{args.host}:{args.port}"
+    shutdown = start_server(args)
+    try:
+        wait_for_server(base_url)
+        samples = drive(base_url, macs, args.concurrency, args.duration, args.seed)
+    finally:
+        shutdown()
+
+    results = summarize(samples, args.duration)
+    print(f"{'endpoint':>18}{'requests':>10}{'rps':>10}{'p50 ms':>10}"
+          f"{'p95 ms':>10}{'p99 ms':>10}{'errors':>10}")
+    for name, r in results.items():
+        print(f"{name:>18}{r['requests']:>10}{r['rps']:>10.1f}{r['p50_ms']:>10.1f}"
+              f"{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['error_rate']:>10.2%}")
+
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+    failed = False
+    for name, r in results.items():
+        if args.max_p99_ms is not None and r["p99_ms"] > args.max_p99_ms:
+            print(f"FAIL: {name} p99 {r['p99_ms']:.1f}ms exceeds {args.max_p99_ms}ms")
+            failed = True
+        if args.max_error_rate is not None and r["error_rate"] > args.max_error_rate:
+            print(f"FAIL: {name} error rate {r['error_rate']:.2%} exceeds {args.max_error_rate:.2%}")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+Local SQLite stand-in for the SQL Server database
+
+Provides a pyodbc-compatible connection over an SQLite database with the
+Network Monitor schema, so benchmarks can drive DatabaseManager without a
+SQL Server instance. The T-SQL constructs used by the application (TOP,
+GETDATE, DATEADD, DATEPART) are rewritten to SQLite equivalents. The
+connection counts statements, round trips and commit latency for reporting.
+"""
+import re
+import sqlite3
+import time
+from datetime import datetime
+from functools import lru_cache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS DeviceConnections (
+    ConnectionID INTEGER PRIMARY KEY AUTOINCREMENT,
+    MACAddress VARCHAR(17) NOT NULL UNIQUE,
+    IPAddress VARCHAR(45),
+    Hostname VARCHAR(255),
+    FirstSeen DATETIME NOT NULL,
+    LastSeen DATETIME NOT NULL,
+    IsConnected BIT DEFAULT 1,
+    DeviceName VARCHAR(255),
+    DeviceType VARCHAR(50),
+    Vendor VARCHAR(255),
+    SiteID VARCHAR(64)
+);
+
+CREATE TABLE IF NOT EXISTS ConnectionLog (
+    LogID INTEGER PRIMARY KEY AUTOINCREMENT,
+    MACAddress VARCHAR(17) NOT NULL REFERENCES DeviceConnections(MACAddress),
+    IPAddress VARCHAR(45),
+    EventType VARCHAR(20) NOT NULL,
+    EventTime DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    SiteID VARCHAR(64)
+);
+
+CREATE TABLE IF NOT EXISTS DeviceSessions (
+    SessionID INTEGER PRIMARY KEY AUTOINCREMENT,
+    MACAddress VARCHAR(17) NOT NULL REFERENCES DeviceConnections(MACAddress),
+    IPAddress VARCHAR(45),
+    StartTime DATETIME NOT NULL,
+    EndTime DATETIME
+);
+
+CREATE TABLE IF NOT EXISTS MonitorDowntime (
+    DowntimeID INTEGER PRIMARY KEY AUTOINCREMENT,
+    StartTime DATETIME NOT NULL,
+    EndTime DATETIME NOT NULL,
+    Reason VARCHAR(50) NOT NULL DEFAULT 'restart'
+);
+
+CREATE TABLE IF NOT EXISTS IPLeases (
+    LeaseID INTEGER PRIMARY KEY AUTOINCREMENT,
+    IPAddress VARCHAR(45) NOT NULL,
+    MACAddress VARCHAR(17) NOT NULL REFERENCES DeviceConnections(MACAddress),
+    SiteID VARCHAR(64),
+    StartTime DATETIME NOT NULL,
+    EndTime DATETIME
+);
+
+CREATE TABLE IF NOT EXISTS DeviceAddresses (
+    MACAddress VARCHAR(17) NOT NULL REFERENCES DeviceConnections(MACAddress),
+    IPAddress VARCHAR(45) NOT NULL,
+    Family TINYINT NOT NULL,
+    FirstSeen DATETIME NOT NULL,
+    LastSeen DATETIME NOT NULL,
+    PRIMARY KEY (MACAddress, IPAddress)
+);
+
+CREATE INDEX IF NOT EXISTS IX_DeviceConnections_LastSeen ON DeviceConnections(LastSeen);
+CREATE INDEX IF NOT EXISTS IX_DeviceConnections_IsConnected ON DeviceConnections(IsConnected);
+CREATE INDEX IF NOT EXISTS IX_ConnectionLog_EventTime ON ConnectionLog(EventTime);
+CREATE INDEX IF NOT EXISTS IX_ConnectionLog_MACAddress ON ConnectionLog(MACAddress);
+CREATE INDEX IF NOT EXISTS IX_ConnectionLog_EventType ON ConnectionLog(EventType);
+CREATE INDEX IF NOT EXISTS IX_DeviceConnections_SiteID ON DeviceConnections(SiteID, IsConnected);
+CREATE INDEX IF NOT EXISTS IX_DeviceSessions_Device ON DeviceSessions(MACAddress, StartTime DESC);
+CREATE UNIQUE INDEX IF NOT EXISTS UX_DeviceSessions_Open ON DeviceSessions(MACAddress) WHERE EndTime IS NULL;
+CREATE INDEX IF NOT EXISTS IX_IPLeases_Address ON IPLeases(IPAddress, StartTime DESC);
+CREATE UNIQUE INDEX IF NOT EXISTS UX_IPLeases_Open ON IPLeases(MACAddress) WHERE EndTime IS NULL;
+CREATE INDEX IF NOT EXISTS IX_DeviceAddresses_Address ON DeviceAddresses(IPAddress);
+"""
+
+
+def _adapt_datetime(value: datetime) -> str:
+    return value.isoformat(" ")
+
+
+def _convert_datetime(value: bytes) -> datetime:
+    return datetime.fromisoformat(value.decode())
+
+
+sqlite3.register_adapter(datetime, _adapt_datetime)
+sqlite3.register_converter("DATETIME", _convert_datetime)
+
+
+_TOP = re.compile(r"\bSELECT\s+TOP\s*\(?\s*(\d+)\s*\)?", re.IGNORECASE)
+_GETDATE = re.compile(r"\bGETDATE\(\)", re.IGNORECASE)
+_DATEADD = re.compile(r"\bDATEADD\(\s*(\w+)\s*,\s*(-?\d+)\s*,\s*([^()]+(?:\([^()]*\))?)\s*\)",
+                      re.IGNORECASE)
+_DATEPART = re.compile(r"\bDATEPART\(\s*HOUR\s*,\s*([\w.]+)\s*\)", re.IGNORECASE)
+_UNITS = {"minute": "minutes", "hour": "hours", "day": "days", "second": "seconds"}
+
+
+@lru_cache(maxsize=512)
+def tsql_to_sqlite(sql: str) -> str:
+    """
+    Rewrite the T-SQL subset used by the application for SQLite
+
+    Args:
+        sql: Statement as sent to SQL Server
+
+    Returns:
+        Equivalent SQLite statement
+    """
+    limit = None
+    match = _TOP.search(sql)
+    if match:
+        limit = match.group(1)
+        sql = sql[:match.start()] + "SELECT " + sql[match.end():]
+    sql = _GETDATE.sub("datetime('now', 'localtime')", sql)
+    sql = _DATEADD.sub(
+        lambda m: f"datetime({m.group(3)}, '{m.group(2)} {_UNITS[m.group(1).lower()]}')", sql
+    )
+    sql = _DATEPART.sub(r"CAST(strftime('%H', \1) AS INTEGER)", sql)
+    if limit is not None:
+        sql = sql.rstrip().rstrip(";") + f" LIMIT {limit}"
+    return sql
+
+
+_COLUMNS = {}
+
+
+class Row(tuple):
+    """Result row with pyodbc-style attribute access"""
+
+    def __new__(cls, cursor, values):
+        row = super().__new__(cls, values)
+        description = cursor.description
+        columns = _COLUMNS.get(description)
+        if columns is None:
+            columns = _COLUMNS[description] = {d[0]: i for i, d in enumerate(description)}
+        row._columns = columns
+        return row
+
+    def __getattr__(self, name):
+        try:
+            return self[self._columns[name]]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+class Stats:
+    """Round-trip accounting for a LocalConnection"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.statements = 0
+        self.round_trips = 0
+        self.commits = 0
+        self.commit_seconds = []
+
+    def snapshot(self) -> dict:
+        return {
+            "statements": self.statements,
+            "round_trips": self.round_trips,
+            "commits": self.commits,
+            "commit_seconds": sum(self.commit_seconds),
+        }
+
+
+class LocalCursor:
+    """pyodbc-style cursor: parameters may be passed positionally"""
+
+    def __init__(self, cursor: sqlite3.Cursor, stats: Stats, translate):
+        self._cursor = cursor
+        self._stats = stats
+        self._translate = translate
+
+    @staticmethod
+    def _params(params):
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            return tuple(params[0])
+        return params
+
+    def execute(self, sql: str, *params):
+        self._stats.statements += 1
+        self._stats.round_trips += 1
+        self._cursor.execute(self._translate(sql), self._params(params))
+        return self
+
+    def executemany(self, sql: str, seq_of_params):
+        rows = [tuple(p) for p in seq_of_params]
+        self._stats.statements += len(rows)
+        self._stats.round_trips += 1
+        self._cursor.executemany(self._translate(sql), rows)
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size: int = 1):
+        return self._cursor.fetchmany(size)
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+class LocalConnection:
+    """pyodbc-style connection over SQLite"""
+
+    def __init__(self, path: str = ":memory:", translate=None):
+        self._conn = sqlite3.connect(
+            path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False
+        )
+        self._conn.row_factory = Row
+        self._conn.executescript(SCHEMA)
+        self._translate = translate or tsql_to_sqlite
+        self.stats = Stats()
+
+    def cursor(self) -> LocalCursor:
+        return LocalCursor(self._conn.cursor(), self.stats, self._translate)
+
+    def commit(self):
+        started = time.perf_counter()
+        self._conn.commit()
+        self.stats.commits += 1
+        self.stats.round_trips += 1
+        self.stats.commit_seconds.append(time.perf_counter() - started)
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+    def count(self, table: str) -> int:
+        """Row count of a table, not included in the stats"""
+        return self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
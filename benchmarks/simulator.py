@@ -0,0 +1,114 @@
+"""
+Synthetic network for scan benchmarks
+
+SimulatedNetwork stands in for scapy's ``srp`` and ``socket.gethostbyaddr``
+so NetworkScanner and NetworkMonitor can be driven without a LAN or root.
+"""
+import ipaddress
+import random
+import socket
+import time
+from contextlib import contextmanager
+from typing import Dict
+from unittest.mock import patch
+
+
+class _Reply:
+    """The fields of an ARP reply NetworkScanner reads"""
+
+    __slots__ = ("hwsrc", "psrc")
+
+    def __init__(self, hwsrc: str, psrc: str):
+        self.hwsrc = hwsrc
+        self.psrc = psrc
+
+
+class SimulatedNetwork:
+    """A subnet of hosts answering ARP and reverse DNS"""
+
+    def __init__(self, subnet: str = "10.0.0.0/24", occupancy: float = 0.5,
+                 reply_latency: float = 0.0, loss: float = 0.0,
+                 dns_delay: float = 0.0, dns_names: float = 0.8,
+                 churn: float = 0.0, time_scale: float = 0.0, seed: int = 0):
+        """
+        Initialize simulated network
+
+        Args:
+            subnet: Subnet to populate (/24 to /16 are practical)
+            occupancy: Fraction of addresses with a live host
+            reply_latency: Mean ARP reply latency in seconds
+            loss: Probability that a live host's reply is lost
+            dns_delay: Seconds each reverse DNS lookup takes
+            dns_names: Fraction of hosts with a PTR record
+            churn: Fraction of hosts that toggle presence per scan
+            time_scale: Fraction of the srp timeout actually slept when some
+                addresses stay silent (0 keeps benchmarks CPU-bound)
+            seed: Random seed for reproducible runs
+        """
+        self.network = ipaddress.ip_network(subnet, strict=False)
+        self.reply_latency = reply_latency
+        self.loss = loss
+        self.dns_delay = dns_delay
+        self.churn = churn
+        self.time_scale = time_scale
+        self._random = random.Random(seed)
+
+        self.hosts: Dict[str, str] = {}
+        self.online = set()
+        self.names: Dict[str, str] = {}
+        for index, address in enumerate(self.network.hosts()):
+            ip = str(address)
+            mac = "02:00:%02X:%02X:%02X:%02X" % tuple((index + 1).to_bytes(4, "big"))
+            self.hosts[ip] = mac
+            if self._random.random() < occupancy:
+                self.online.add(ip)
+            if self._random.random() < dns_names:
+                self.names[ip] = f"host-{index + 1}.lan"
+
+    @property
+    def address_count(self) -> int:
+        return len(self.hosts)
+
+    def step(self):
+        """Advance one scan: toggle presence of a churn fraction of hosts"""
+        if not self.churn:
+            return
+        for ip in self._random.sample(list(self.hosts), int(len(self.hosts) * self.churn)):
+            if ip in self.online:
+                self.online.discard(ip)
+            else:
+                self.online.add(ip)
+
+    def srp(self, packet, timeout=3, verbose=0, **kwargs):
+        """Answer an ARP sweep like scapy.srp"""
+        answered = []
+        slowest = 0.0
+        for ip in self.online:
+            if self.loss and self._random.random() < self.loss:
+                continue
+            if self.reply_latency:
+                slowest = max(slowest, self._random.expovariate(1 / self.reply_latency))
+            answered.append((None, _Reply(self.hosts[ip].lower(), ip)))
+
+        if len(answered) < self.address_count:
+            # Silent addresses make srp wait out the full timeout
+            slowest = max(slowest, timeout * self.time_scale)
+        if slowest:
+            time.sleep(min(slowest, timeout))
+        return answered, []
+
+    def gethostbyaddr(self, ip_address: str):
+        """Answer reverse DNS like socket.gethostbyaddr"""
+        if self.dns_delay:
+            time.sleep(self.dns_delay)
+        name = self.names.get(ip_address)
+        if name is None:
+            raise socket.herror(1, "Unknown host")
+        return name, [], [ip_address]
+
+    @contextmanager
+    def installed(self):
+        """Route NetworkScanner's srp and DNS calls to this network"""
+        with patch("network_monitor.scanner.srp", self.srp), \
+                patch("network_monitor.scanner.socket.gethostbyaddr", self.gethostbyaddr):
+            yield self
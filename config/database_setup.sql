@@ -12,34 +12,89 @@ GO
 CREATE TABLE DeviceConnections (
     ConnectionID INT IDENTITY(1,1) PRIMARY KEY,
     MACAddress VARCHAR(17) NOT NULL UNIQUE,
-    IPAddress VARCHAR(15),
+    IPAddress VARCHAR(45),
     Hostname VARCHAR(255),
     FirstSeen DATETIME NOT NULL,
     LastSeen DATETIME NOT NULL,
     IsConnected BIT DEFAULT 1,
     DeviceName VARCHAR(255), -- Friendly name you can manually assign
     DeviceType VARCHAR(50),   -- Will be populated automatically where possible
-    Vendor VARCHAR(255)       -- MAC address vendor lookup
+    Vendor VARCHAR(255),      -- MAC address vendor lookup
+    SiteID VARCHAR(64)        -- Site whose scan agent last saw the device (NULL = local scan)
 );
 
 -- Table to log all connection/disconnection events
 CREATE TABLE ConnectionLog (
     LogID INT IDENTITY(1,1) PRIMARY KEY,
     MACAddress VARCHAR(17) NOT NULL,
-    IPAddress VARCHAR(15),
+    IPAddress VARCHAR(45),
     EventType VARCHAR(20) NOT NULL, -- 'CONNECTED' or 'DISCONNECTED'
     EventTime DATETIME NOT NULL DEFAULT GETDATE(),
+    SiteID VARCHAR(64),             -- Site that reported the event (NULL = local scan)
     CONSTRAINT FK_ConnectionLog_Device 
         FOREIGN KEY (MACAddress) 
         REFERENCES DeviceConnections(MACAddress)
 );
 
+-- Table of connected periods, maintained with ConnectionLog
+CREATE TABLE DeviceSessions (
+    SessionID INT IDENTITY(1,1) PRIMARY KEY,
+    MACAddress VARCHAR(17) NOT NULL,
+    IPAddress VARCHAR(45),          -- IP when the session started
+    StartTime DATETIME NOT NULL,    -- CONNECTED event
+    EndTime DATETIME NULL,          -- DISCONNECTED event; NULL while connected
+    CONSTRAINT FK_DeviceSessions_Device
+        FOREIGN KEY (MACAddress)
+        REFERENCES DeviceConnections(MACAddress)
+);
+
+-- Periods the monitor was not scanning (restart after a long gap)
+CREATE TABLE MonitorDowntime (
+    DowntimeID INT IDENTITY(1,1) PRIMARY KEY,
+    StartTime DATETIME NOT NULL,    -- last scan before the gap
+    EndTime DATETIME NOT NULL,      -- first scan after it
+    Reason VARCHAR(50) NOT NULL DEFAULT 'restart'
+);
+
+-- Which device held each IP when (written only when an IP changes hands)
+CREATE TABLE IPLeases (
+    LeaseID INT IDENTITY(1,1) PRIMARY KEY,
+    IPAddress VARCHAR(45) NOT NULL,
+    MACAddress VARCHAR(17) NOT NULL,
+    SiteID VARCHAR(64) NULL,        -- site that saw it; NULL for local scans
+    StartTime DATETIME NOT NULL,    -- first scan with this IP
+    EndTime DATETIME NULL,          -- the IP changed hands; NULL while held
+    CONSTRAINT FK_IPLeases_Device
+        FOREIGN KEY (MACAddress)
+        REFERENCES DeviceConnections(MACAddress)
+);
+
+-- Every address each device has used, IPv4 and IPv6
+CREATE TABLE DeviceAddresses (
+    MACAddress VARCHAR(17) NOT NULL,
+    IPAddress VARCHAR(45) NOT NULL,
+    Family TINYINT NOT NULL,        -- 4 or 6
+    FirstSeen DATETIME NOT NULL,
+    LastSeen DATETIME NOT NULL,     -- refreshed at most every few minutes
+    CONSTRAINT PK_DeviceAddresses PRIMARY KEY (MACAddress, IPAddress),
+    CONSTRAINT FK_DeviceAddresses_Device
+        FOREIGN KEY (MACAddress)
+        REFERENCES DeviceConnections(MACAddress)
+);
+
 -- Indexes for better query performance
 CREATE INDEX IX_DeviceConnections_LastSeen ON DeviceConnections(LastSeen);
 CREATE INDEX IX_DeviceConnections_IsConnected ON DeviceConnections(IsConnected);
 CREATE INDEX IX_ConnectionLog_EventTime ON ConnectionLog(EventTime);
 CREATE INDEX IX_ConnectionLog_MACAddress ON ConnectionLog(MACAddress);
 CREATE INDEX IX_ConnectionLog_EventType ON ConnectionLog(EventType);
+CREATE INDEX IX_DeviceConnections_SiteID ON DeviceConnections(SiteID, IsConnected);
+CREATE INDEX IX_DeviceSessions_Device ON DeviceSessions(MACAddress, StartTime DESC) INCLUDE (EndTime, IPAddress);
+CREATE UNIQUE INDEX UX_DeviceSessions_Open ON DeviceSessions(MACAddress) WHERE EndTime IS NULL;
+CREATE INDEX IX_MonitorDowntime_StartTime ON MonitorDowntime(StartTime);
+CREATE INDEX IX_IPLeases_Address ON IPLeases(IPAddress, StartTime DESC) INCLUDE (MACAddress, SiteID, EndTime);
+CREATE UNIQUE INDEX UX_IPLeases_Open ON IPLeases(MACAddress) WHERE EndTime IS NULL;
+CREATE INDEX IX_DeviceAddresses_Address ON DeviceAddresses(IPAddress) INCLUDE (LastSeen);
 
 -- Create some useful views for Power BI
 
@@ -0,0 +1,15 @@
+-- Per-site tagging for scan agents (network_monitor.agent / collector)
+-- Run once against an existing NetworkMonitor database before starting a
+-- collector. Single-site deployments that only scan locally do not need it.
+
+USE NetworkMonitor;
+GO
+
+ALTER TABLE DeviceConnections ADD SiteID VARCHAR(64) NULL;
+ALTER TABLE ConnectionLog ADD SiteID VARCHAR(64) NULL;
+GO
+
+CREATE INDEX IX_DeviceConnections_SiteID ON DeviceConnections(SiteID, IsConnected);
+GO
+
+PRINT 'SiteID columns added.';
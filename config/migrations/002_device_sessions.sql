@@ -0,0 +1,26 @@
+-- Precomputed device sessions (network_monitor.sessions)
+-- Run once against an existing NetworkMonitor database, then rebuild the
+-- sessions from ConnectionLog:
+--     python -m network_monitor.sessions backfill
+-- The monitor starts maintaining the table the next time it connects.
+
+USE NetworkMonitor;
+GO
+
+CREATE TABLE DeviceSessions (
+    SessionID INT IDENTITY(1,1) PRIMARY KEY,
+    MACAddress VARCHAR(17) NOT NULL,
+    IPAddress VARCHAR(15),          -- IP when the session started
+    StartTime DATETIME NOT NULL,    -- CONNECTED event
+    EndTime DATETIME NULL,          -- DISCONNECTED event; NULL while connected
+    CONSTRAINT FK_DeviceSessions_Device
+        FOREIGN KEY (MACAddress)
+        REFERENCES DeviceConnections(MACAddress)
+);
+GO
+
+CREATE INDEX IX_DeviceSessions_Device ON DeviceSessions(MACAddress, StartTime DESC) INCLUDE (EndTime, IPAddress);
+CREATE UNIQUE INDEX UX_DeviceSessions_Open ON DeviceSessions(MACAddress) WHERE EndTime IS NULL;
+GO
+
+PRINT 'DeviceSessions table created. Run: python -m network_monitor.sessions backfill';
@@ -0,0 +1,19 @@
+-- Monitor downtime intervals (warm start, see network_monitor.warmstart)
+-- Run once against an existing NetworkMonitor database. The monitor starts
+-- recording gaps between scans the next time it connects.
+
+USE NetworkMonitor;
+GO
+
+CREATE TABLE MonitorDowntime (
+    DowntimeID INT IDENTITY(1,1) PRIMARY KEY,
+    StartTime DATETIME NOT NULL,    -- last scan before the gap
+    EndTime DATETIME NOT NULL,      -- first scan after it
+    Reason VARCHAR(50) NOT NULL DEFAULT 'restart'
+);
+GO
+
+CREATE INDEX IX_MonitorDowntime_StartTime ON MonitorDowntime(StartTime);
+GO
+
+PRINT 'MonitorDowntime table created';
@@ -0,0 +1,55 @@
+-- IP lease history (reverse lookup by IP, /api/ip/<ip>?at=)
+-- Run once against an existing NetworkMonitor database. It seeds the history
+-- from the IPs logged with CONNECTED events; IP changes while connected were
+-- not logged before, so seeded leases start at a connection. The monitor
+-- starts maintaining the table the next time it connects.
+
+USE NetworkMonitor;
+GO
+
+CREATE TABLE IPLeases (
+    LeaseID INT IDENTITY(1,1) PRIMARY KEY,
+    IPAddress VARCHAR(15) NOT NULL,
+    MACAddress VARCHAR(17) NOT NULL,
+    SiteID VARCHAR(64) NULL,        -- site that saw it; NULL for local scans
+    StartTime DATETIME NOT NULL,    -- first scan with this IP
+    EndTime DATETIME NULL,          -- disconnect or IP change; NULL while held
+    CONSTRAINT FK_IPLeases_Device
+        FOREIGN KEY (MACAddress)
+        REFERENCES DeviceConnections(MACAddress)
+);
+GO
+
+-- One lease per CONNECTED event, ending at the device's next event (its
+-- disconnect) or where the IP's next holder connects. ConnectionLog.SiteID
+-- only exists after 001_site_id.sql; without it every lease is local, and
+-- the statement is built dynamically so it compiles either way.
+DECLARE @SiteID NVARCHAR(20) =
+    CASE WHEN COL_LENGTH('ConnectionLog', 'SiteID') IS NULL
+         THEN N'NULL AS SiteID' ELSE N'SiteID' END;
+DECLARE @Seed NVARCHAR(MAX) = N'
+WITH Events AS (
+    SELECT MACAddress, IPAddress, ' + @SiteID + N', EventType, EventTime, LogID,
+           LEAD(EventTime) OVER (PARTITION BY MACAddress ORDER BY EventTime, LogID) AS NextForDevice
+    FROM ConnectionLog
+    WHERE EventType IN (''CONNECTED'', ''DISCONNECTED'')
+), Connects AS (
+    SELECT MACAddress, IPAddress, SiteID, EventTime, NextForDevice,
+           LEAD(EventTime) OVER (PARTITION BY SiteID, IPAddress ORDER BY EventTime, LogID) AS NextForAddress
+    FROM Events
+    WHERE EventType = ''CONNECTED'' AND IPAddress IS NOT NULL
+)
+INSERT INTO IPLeases (IPAddress, MACAddress, SiteID, StartTime, EndTime)
+SELECT c.IPAddress, c.MACAddress, c.SiteID, c.EventTime,
+       CASE WHEN c.NextForAddress IS NULL OR c.NextForAddress > c.NextForDevice
+            THEN c.NextForDevice ELSE c.NextForAddress END
+FROM Connects c
+WHERE EXISTS (SELECT 1 FROM DeviceConnections d WHERE d.MACAddress = c.MACAddress);';
+EXEC sp_executesql @Seed;
+GO
+
+CREATE INDEX IX_IPLeases_Address ON IPLeases(IPAddress, StartTime DESC) INCLUDE (MACAddress, SiteID, EndTime);
+CREATE UNIQUE INDEX UX_IPLeases_Open ON IPLeases(MACAddress) WHERE EndTime IS NULL;
+GO
+
+PRINT 'IPLeases table created';
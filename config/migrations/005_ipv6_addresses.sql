@@ -0,0 +1,53 @@
+-- IPv6 support (IPV6_DISCOVERY)
+-- Run once against an existing NetworkMonitor database, before enabling IPv6
+-- discovery: widens every IPAddress column to hold an IPv6 address and adds
+-- DeviceAddresses, seeded with each device's current address. The monitor
+-- starts maintaining DeviceAddresses the next time it connects.
+
+USE NetworkMonitor;
+GO
+
+ALTER TABLE DeviceConnections ALTER COLUMN IPAddress VARCHAR(45) NULL;
+ALTER TABLE ConnectionLog ALTER COLUMN IPAddress VARCHAR(45) NULL;
+GO
+
+-- Indexes covering the column are rebuilt around the change
+IF OBJECT_ID('DeviceSessions') IS NOT NULL
+BEGIN
+    DROP INDEX IX_DeviceSessions_Device ON DeviceSessions;
+    ALTER TABLE DeviceSessions ALTER COLUMN IPAddress VARCHAR(45) NULL;
+    CREATE INDEX IX_DeviceSessions_Device ON DeviceSessions(MACAddress, StartTime DESC) INCLUDE (EndTime, IPAddress);
+END
+GO
+
+IF OBJECT_ID('IPLeases') IS NOT NULL
+BEGIN
+    DROP INDEX IX_IPLeases_Address ON IPLeases;
+    ALTER TABLE IPLeases ALTER COLUMN IPAddress VARCHAR(45) NOT NULL;
+    CREATE INDEX IX_IPLeases_Address ON IPLeases(IPAddress, StartTime DESC) INCLUDE (MACAddress, SiteID, EndTime);
+END
+GO
+
+CREATE TABLE DeviceAddresses (
+    MACAddress VARCHAR(17) NOT NULL,
+    IPAddress VARCHAR(45) NOT NULL,
+    Family TINYINT NOT NULL,        -- 4 or 6
+    FirstSeen DATETIME NOT NULL,
+    LastSeen DATETIME NOT NULL,     -- refreshed at most every few minutes
+    CONSTRAINT PK_DeviceAddresses PRIMARY KEY (MACAddress, IPAddress),
+    CONSTRAINT FK_DeviceAddresses_Device
+        FOREIGN KEY (MACAddress)
+        REFERENCES DeviceConnections(MACAddress)
+);
+GO
+
+INSERT INTO DeviceAddresses (MACAddress, IPAddress, Family, FirstSeen, LastSeen)
+SELECT MACAddress, IPAddress, 4, LastSeen, LastSeen
+FROM DeviceConnections
+WHERE IPAddress IS NOT NULL;
+GO
+
+CREATE INDEX IX_DeviceAddresses_Address ON DeviceAddresses(IPAddress) INCLUDE (LastSeen);
+GO
+
+PRINT 'IP address columns widened and DeviceAddresses table created';
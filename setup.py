@@ -38,6 +38,15 @@ setup(
         "python-dotenv>=1.0.0",
     ],
     extras_require={
+        "asgi": [
+            "uvicorn>=0.23.0",
+        ],
+        "parquet": [
+            "pyarrow>=14.0.0",
+        ],
+        "analytics": [
+            "numpy>=1.22.0",
+        ],
         "dev": [
             "pytest>=7.0.0",
             "pytest-cov>=4.0.0",
@@ -0,0 +1,413 @@
+"""
+Remote scan agent
+
+An agent scans one site and pushes the results to a central collector
+(network_monitor.collector) over HTTP instead of writing to SQL Server. Each
+scan becomes an entry numbered within the agent's session: the first entry of
+a session, and every ``full_sync_scans``-th after it, lists all devices; the
+rest only list devices that appeared or changed and MACs that went missing.
+Pending entries are sent in gzip-compressed batches. While the collector is
+unreachable they are spooled to disk, and sent in order once it is back.
+
+If the collector cannot apply an entry (it restarted, or entries were dropped
+from a full spool) it answers 409 and the agent resynchronizes with a full
+entry for its latest scan.
+
+    python -m network_monitor.agent
+"""
+import gzip
+import json
+import logging
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from .config import AgentConfig, Config
+from .metrics import REGISTRY, Counter, Gauge, SCANS_TOTAL, DEVICES_CONNECTED, ERRORS_TOTAL
+from .scanner import Device, NetworkScanner
+from .ndp import build_discovery
+from .probe import build_prober
+from .scheduler import ScanScheduler
+
+logger = logging.getLogger(__name__)
+
+AGENT_PENDING = REGISTRY.register(Gauge(
+    "network_monitor_agent_pending_scans",
+    "Scan entries waiting to be accepted by the collector",
+))
+AGENT_PUSHES_TOTAL = REGISTRY.register(Counter(
+    "network_monitor_agent_pushes_total",
+    "Batches sent to the collector by result",
+    ("result",),
+))
+AGENT_DROPPED_TOTAL = REGISTRY.register(Counter(
+    "network_monitor_agent_dropped_total",
+    "Scan entries discarded because the spool was full",
+))
+
+
+def device_row(device: Device) -> list:
+    """Wire form of a device: [mac, ip, hostname, vendor] plus [IPv6 addresses] if any"""
+    row = [device.mac_address, device.ip_address, device.hostname, device.vendor]
+    if device.ipv6_addresses:
+        # Omitted otherwise, so IPv4-only agents stay readable by older collectors
+        row.append(sorted(device.ipv6_addresses))
+    return row
+
+
+def scan_entry(session: str, seq: int, scanned_at: datetime, devices: Dict[str, Device],
+               previous: Optional[Dict[str, Device]] = None) -> dict:
+    """
+    Build the entry sent for one scan
+
+    Args:
+        session: Agent session the sequence number belongs to
+        seq: Sequence number within the session
+        scanned_at: Scan time
+        devices: Devices found by the scan
+        previous: Devices found by the previous scan; None for a full entry
+
+    Returns:
+        JSON-serializable entry
+    """
+    entry = {"session": session, "seq": seq, "scanned_at": scanned_at.isoformat()}
+    if previous is None:
+        entry["full"] = True
+        entry["devices"] = [device_row(device) for device in devices.values()]
+        return entry
+    entry["full"] = False
+    entry["devices"] = [
+        device_row(device) for mac, device in devices.items()
+        if mac not in previous or device_row(previous[mac]) != device_row(device)
+    ]
+    entry["removed"] = [mac for mac in previous if mac not in devices]
+    return entry
+
+
+class CollectorClient:
+    """Posts batches of scan entries to a collector"""
+
+    def __init__(self, url: str, site_id: str, token: Optional[str] = None,
+                 timeout: float = 10.0):
+        """
+        Initialize collector client
+
+        Args:
+            url: Collector ingest endpoint
+            site_id: Site the entries belong to
+            token: Shared secret sent as a bearer token
+            timeout: Seconds to wait for the collector
+        """
+        self.url = url
+        self.site_id = site_id
+        self.token = token
+        self.timeout = timeout
+
+    def push(self, entries: List[dict]) -> Tuple[int, dict]:
+        """
+        Send a batch of entries
+
+        Args:
+            entries: Entries in sequence order
+
+        Returns:
+            HTTP status and decoded reply body
+
+        Raises:
+            OSError: If the collector could not be reached
+        """
+        body = gzip.compress(json.dumps(
+            {"site_id": self.site_id, "scans": entries}, separators=(",", ":")
+        ).encode("utf-8"))
+        request = urllib.request.Request(self.url, data=body, method="POST", headers={
+            "Content-Type": "application/json",
+            "Content-Encoding": "gzip",
+        })
+        if self.token:
+            request.add_header("Authorization", f"Bearer {self.token}")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, json.loads(response.read() or b"{}")
+        except urllib.error.HTTPError as e:
+            try:
+                reply = json.loads(e.read() or b"{}")
+            except ValueError:
+                reply = {}
+            return e.code, reply
+
+
+class EntrySpool:
+    """Scan entries waiting for the collector, kept on disk while it is down"""
+
+    def __init__(self, directory: str, max_entries: int = 10000):
+        """
+        Initialize entry spool
+
+        Args:
+            directory: Directory holding one file per spooled entry
+            max_entries: Entries kept before the oldest are dropped
+        """
+        self.directory = directory
+        self.max_entries = max(1, max_entries)
+        # (spool file or None while only in memory, entry), oldest first
+        self._entries: List[Tuple[Optional[str], dict]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def load(self):
+        """Pick up entries spooled by a previous run"""
+        if not os.path.isdir(self.directory):
+            return
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".json.gz"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as fh:
+                    self._entries.append((path, json.load(fh)))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Discarding unreadable spool file {path}: {e}")
+                self._remove(path)
+        if self._entries:
+            logger.info(f"Loaded {len(self._entries)} spooled scans")
+        AGENT_PENDING.set(len(self._entries))
+
+    def append(self, entry: dict):
+        """Queue an entry, dropping the oldest if the spool is full"""
+        self._entries.append((None, entry))
+        overflow = len(self._entries) - self.max_entries
+        if overflow > 0:
+            for path, _ in self._entries[:overflow]:
+                self._remove(path)
+            del self._entries[:overflow]
+            AGENT_DROPPED_TOTAL.inc(overflow)
+            logger.warning(f"Spool full, dropped {overflow} oldest scans")
+        AGENT_PENDING.set(len(self._entries))
+
+    def peek(self, count: int) -> List[dict]:
+        """Oldest ``count`` entries"""
+        return [entry for _, entry in self._entries[:count]]
+
+    def ack(self, count: int):
+        """Forget the oldest ``count`` entries"""
+        for path, _ in self._entries[:count]:
+            self._remove(path)
+        del self._entries[:count]
+        AGENT_PENDING.set(len(self._entries))
+
+    def clear(self):
+        """Forget every entry"""
+        self.ack(len(self._entries))
+
+    def persist(self):
+        """Write entries that are only held in memory to disk"""
+        if not any(path is None for path, _ in self._entries):
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        for index, (path, entry) in enumerate(self._entries):
+            if path is not None:
+                continue
+            # Names sort in the order entries were created
+            path = os.path.join(self.directory, f"{time.time_ns():020d}-{entry['seq']:010d}.json.gz")
+            try:
+                with gzip.open(path, "wt", encoding="utf-8") as fh:
+                    json.dump(entry, fh, separators=(",", ":"))
+            except OSError as e:
+                ERRORS_TOTAL.labels(component="agent").inc()
+                logger.error(f"Could not spool scan {entry['seq']}: {e}")
+                return
+            self._entries[index] = (path, entry)
+
+    @staticmethod
+    def _remove(path: Optional[str]):
+        if path is None:
+            return
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove spool file {path}: {e}")
+
+
+class ScanAgent:
+    """Scans a site and pushes the results to a collector"""
+
+    def __init__(self, config: Optional[Config] = None,
+                 scanner: Optional[NetworkScanner] = None,
+                 client: Optional[CollectorClient] = None):
+        """
+        Initialize the scan agent
+
+        Args:
+            config: Configuration object (loads from environment if None)
+            scanner: Scanner to use (built from config if None)
+            client: Collector client to use (built from config if None)
+        """
+        self.config = config or Config.load()
+        agent: AgentConfig = self.config.agent
+        self.site_id = agent.site_id
+        self.full_sync_scans = max(1, agent.full_sync_scans)
+        self.batch_scans = max(1, agent.batch_scans)
+
+        self.scanner = scanner or NetworkScanner(
+            subnet=self.config.network.subnet,
+            timeout=self.config.network.timeout,
+            hostname_cache_ttl=self.config.network.hostname_cache_ttl,
+            retries=self.config.network.retries,
+            retry_timeout=self.config.network.retry_timeout,
+            retry_window=self.config.network.disconnect_window,
+            prober=build_prober(self.config.probe),
+            ipv6=build_discovery(self.config.network),
+        )
+        self.client = client or CollectorClient(
+            agent.collector_url, agent.site_id, token=agent.token, timeout=agent.push_timeout
+        )
+        self.spool = EntrySpool(agent.spool_dir, agent.spool_max)
+        self.spool.load()
+        self.scheduler = ScanScheduler(
+            interval=self.config.network.scan_interval,
+            jitter=self.config.network.scan_jitter,
+            overrun_policy=self.config.network.overrun_policy
+        )
+
+        self.session = uuid.uuid4().hex
+        self._seq = 0
+        self._last_scan: Optional[Tuple[datetime, Dict[str, Device]]] = None
+        self._since_full = 0
+
+        logger.info(f"Scan agent for site {self.site_id} initialized")
+        logger.info(f"Monitoring network: {self.config.network.subnet}")
+        logger.info(f"Collector: {agent.collector_url}")
+
+    @property
+    def pending(self) -> int:
+        """Scan entries not yet accepted by the collector"""
+        return len(self.spool)
+
+    def scan_once(self) -> bool:
+        """
+        Scan, queue the result and push pending entries
+
+        Returns:
+            True if the scan found devices
+        """
+        try:
+            devices = self.scanner.scan()
+        except Exception as e:
+            ERRORS_TOTAL.labels(component="agent").inc()
+            SCANS_TOTAL.labels(result="error").inc()
+            logger.error(f"Error during scan: {e}", exc_info=True)
+            return False
+
+        DEVICES_CONNECTED.set(len(devices))
+        if not devices:
+            # Same as the monitor: an empty scan is treated as a failed scan
+            logger.warning("No devices found in scan")
+            SCANS_TOTAL.labels(result="empty").inc()
+            return False
+
+        self.record_scan(devices)
+        SCANS_TOTAL.labels(result="success").inc()
+        self.flush()
+        return True
+
+    def record_scan(self, devices: Dict[str, Device], scanned_at: Optional[datetime] = None):
+        """
+        Queue the entry for a scan
+
+        Args:
+            devices: Devices found by the scan
+            scanned_at: Scan time (now if None)
+        """
+        scanned_at = scanned_at or datetime.now()
+        previous = None
+        if self._last_scan is not None and self._since_full < self.full_sync_scans:
+            previous = self._last_scan[1]
+        self._seq += 1
+        self.spool.append(scan_entry(self.session, self._seq, scanned_at, devices, previous))
+        self._since_full = 1 if previous is None else self._since_full + 1
+        self._last_scan = (scanned_at, dict(devices))
+
+    def flush(self) -> bool:
+        """
+        Push pending entries in batches until none are left or a push fails
+
+        Returns:
+            True if the collector accepted every pending entry
+        """
+        while len(self.spool):
+            batch = self.spool.peek(self.batch_scans)
+            try:
+                status, reply = self.client.push(batch)
+            except OSError as e:
+                return self._push_failed(f"collector unreachable: {e}")
+
+            if status == 200:
+                AGENT_PUSHES_TOTAL.labels(result="accepted").inc()
+                self.spool.ack(len(batch))
+            elif status == 409:
+                # The collector lost track of this session; start over from the latest scan
+                AGENT_PUSHES_TOTAL.labels(result="resync").inc()
+                logger.warning(f"Collector requested a resync: {reply.get('error')}")
+                self.spool.clear()
+                if self._last_scan is not None:
+                    self._seq += 1
+                    scanned_at, devices = self._last_scan
+                    self.spool.append(scan_entry(self.session, self._seq, scanned_at, devices))
+                    self._since_full = 1
+            else:
+                return self._push_failed(f"collector returned {status}: {reply.get('error')}")
+        return True
+
+    def _push_failed(self, reason: str) -> bool:
+        AGENT_PUSHES_TOTAL.labels(result="failed").inc()
+        ERRORS_TOTAL.labels(component="agent").inc()
+        logger.warning(f"Push failed ({reason}); {len(self.spool)} scans spooled")
+        self.spool.persist()
+        return False
+
+    def run(self):
+        """
+        Main agent loop - runs continuously until interrupted
+        """
+        logger.info("Starting scan agent...")
+        try:
+            self.scheduler.run(self.scan_once)
+        except KeyboardInterrupt:
+            logger.info("Agent stopped by user")
+        finally:
+            # Keep whatever the collector has not accepted for the next run
+            self.spool.persist()
+
+    def stop(self):
+        """Stop the agent loop without waiting for the next scan"""
+        self.scheduler.stop()
+
+
+def main():
+    """Entry point for a remote scan agent"""
+    from .main import setup_logging
+    from .metrics import start_http_server
+
+    config = Config.load()
+    setup_logging(config)
+    if config.metrics.port:
+        start_http_server(config.metrics.port)
+
+    try:
+        agent = ScanAgent(config)
+    except PermissionError:
+        print("Network scanning requires administrator/root privileges.")
+        sys.exit(1)
+    print(f"Scan agent for site {agent.site_id} -> {config.agent.collector_url}")
+    agent.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+Availability analytics
+
+Sessions overlapping a window are loaded from DeviceSessions into NumPy
+arrays (device code, start, end as epoch seconds) and every metric is
+computed with array operations: intervals are clipped to the window and
+summed per device with ``bincount``, reconnects are found by differencing
+consecutive sessions of each device, and the fleet timeline spreads each
+interval over its time buckets with a difference array. Per-device Python
+work is limited to building the JSON response.
+
+Metrics, for a window [since, until):
+
+    availability      fraction of the window the device was connected
+    uptime_seconds    connected seconds within the window
+    sessions          sessions overlapping the window
+    mean_session_seconds  mean length of those sessions (open ones up to until)
+    disconnects       sessions that ended within the window
+    flaps             reconnects within ``flap_seconds`` of a disconnect
+
+Needs NumPy (``pip install numpy``).
+"""
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency
+    np = None
+
+logger = logging.getLogger(__name__)
+
+
+class AnalyticsError(Exception):
+    """Analytics cannot be computed"""
+
+
+def _require_numpy():
+    if np is None:
+        raise AnalyticsError("Analytics needs NumPy: pip install numpy")
+
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_seconds(value: datetime) -> float:
+    """Naive datetime as epoch seconds (no time zone conversion)"""
+    return (value - EPOCH).total_seconds()
+
+
+def from_seconds(seconds: float) -> datetime:
+    """Inverse of ``to_seconds``"""
+    return EPOCH + timedelta(seconds=float(seconds))
+
+
+@dataclass
+class Intervals:
+    """Device connected intervals as parallel arrays"""
+    macs: "np.ndarray"     # device MACs, indexed by code
+    codes: "np.ndarray"    # int64 device code per interval
+    start: "np.ndarray"    # float64 epoch seconds
+    end: "np.ndarray"      # float64 epoch seconds; NaN while still connected
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[str, datetime, Optional[datetime]]]) -> "Intervals":
+        """
+        Build from (MAC, start, end) rows
+
+        Args:
+            rows: Session rows; end is None for an open session
+        """
+        _require_numpy()
+        index: Dict[str, int] = {}
+        return cls.from_columns(index, [_columns(list(rows), index)])
+
+    @classmethod
+    def from_columns(cls, index: Dict[str, int], batches: list) -> "Intervals":
+        """Concatenate ``_columns`` batches that share one MAC index"""
+        if not batches:
+            batches = [_columns([], index)]
+        codes, starts, ends = zip(*batches)
+        return cls(np.array(list(index), dtype=object), np.concatenate(codes),
+                   np.concatenate(starts), np.concatenate(ends))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
+def _columns(rows: list, index: Dict[str, int]) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+    """
+    (MAC, start, end) rows as code, start and end arrays
+
+    Codes are assigned in first-seen order through ``index`` (MAC -> code),
+    which is shared across batches.
+    """
+    count = len(rows)
+    codes = np.fromiter((index.setdefault(row[0], len(index)) for row in rows), np.int64, count)
+    start = np.fromiter(((row[1] - EPOCH).total_seconds() for row in rows), np.float64, count)
+    end = np.fromiter(((row[2] - EPOCH).total_seconds() if row[2] is not None else np.nan
+                       for row in rows), np.float64, count)
+    return codes, start, end
+
+
+SESSIONS_SQL = """
+    SELECT MACAddress, StartTime, EndTime
+    FROM DeviceSessions
+    WHERE StartTime < ? AND (EndTime IS NULL OR EndTime >= ?){device}
+    ORDER BY MACAddress, StartTime
+"""
+
+
+def load_intervals(connect: Callable[[], object], since: datetime, until: datetime,
+                   mac_address: Optional[str] = None, fetch_size: int = 50000) -> Intervals:
+    """
+    Load the sessions overlapping a window
+
+    Reads on its own connection, ``fetch_size`` rows at a time, converting
+    each batch to arrays before fetching the next. Rows arrive in
+    IX_DeviceSessions_Device order, so the result is already sorted by
+    (device, start).
+
+    Args:
+        connect: Opens a DB-API connection (e.g. DatabaseManager.open_connection)
+        since: Window start
+        until: Window end
+        mac_address: Only this device
+        fetch_size: Rows per fetch
+
+    Returns:
+        Intervals for every device with a session in the window
+    """
+    _require_numpy()
+    params = [until, since]
+    device = ""
+    if mac_address:
+        device = " AND MACAddress = ?"
+        params.append(mac_address.upper())
+
+    index: Dict[str, int] = {}
+    batches = []
+    connection = connect()
+    try:
+        cursor = connection.cursor()
+        cursor.execute(SESSIONS_SQL.format(device=device), *params)
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            batches.append(_columns(rows, index))
+        cursor.close()
+    finally:
+        connection.close()
+
+    intervals = Intervals.from_columns(index, batches)
+    logger.debug(f"Loaded {len(intervals)} session(s) for {len(intervals.macs)} device(s)")
+    return intervals
+
+
+def device_metrics(intervals: Intervals, since: datetime, until: datetime,
+                   flap_seconds: float = 300.0) -> dict:
+    """
+    Per-device availability metrics
+
+    Args:
+        intervals: Sessions overlapping the window
+        since: Window start
+        until: Window end
+        flap_seconds: A reconnect this soon after a disconnect is a flap
+
+    Returns:
+        Dict of arrays indexed like ``intervals.macs``
+    """
+    _require_numpy()
+    lo, hi = to_seconds(since), to_seconds(until)
+    window = max(hi - lo, 1e-9)
+    count = len(intervals.macs)
+    end = np.where(np.isnan(intervals.end), hi, intervals.end)
+    start = intervals.start
+
+    clipped = np.clip(np.minimum(end, hi) - np.maximum(start, lo), 0, None)
+    uptime = np.bincount(intervals.codes, weights=clipped, minlength=count)
+    sessions = np.bincount(intervals.codes, minlength=count)
+    lengths = np.bincount(intervals.codes, weights=np.minimum(end, hi) - start, minlength=count)
+    ended = (~np.isnan(intervals.end)) & (intervals.end >= lo) & (intervals.end < hi)
+    disconnects = np.bincount(intervals.codes, weights=ended, minlength=count)
+
+    # Reconnects: consecutive sessions of the same device, gap <= flap_seconds
+    codes_sorted, start_sorted, end_sorted = intervals.codes, start, end
+    if not _is_sorted(intervals):
+        order = np.lexsort((start, intervals.codes))
+        codes_sorted, start_sorted, end_sorted = intervals.codes[order], start[order], end[order]
+    same_device = codes_sorted[1:] == codes_sorted[:-1]
+    gap = start_sorted[1:] - end_sorted[:-1]
+    flap = same_device & (gap >= 0) & (gap <= flap_seconds) & (start_sorted[1:] >= lo)
+    flaps = np.bincount(codes_sorted[1:][flap], minlength=count)
+
+    mean_session = lengths / np.maximum(sessions, 1)
+    return {
+        "availability": np.clip(uptime / window, 0, 1),
+        "uptime_seconds": uptime,
+        "sessions": sessions,
+        "mean_session_seconds": mean_session,
+        "disconnects": disconnects.astype(np.int64),
+        "flaps": flaps,
+    }
+
+
+def _is_sorted(intervals: Intervals) -> bool:
+    """Whether intervals are ordered by (device code, start)"""
+    codes, start = intervals.codes, intervals.start
+    step = np.diff(codes)
+    return bool(np.all((step > 0) | ((step == 0) & (np.diff(start) >= 0))))
+
+
+def connected_timeline(intervals: Intervals, since: datetime, until: datetime,
+                       bucket_seconds: float) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Mean number of connected devices per time bucket
+
+    Each interval adds the full width to every bucket from the one it starts
+    in to the one it ends in (a difference array), minus the parts of the
+    first and last bucket it does not cover, so no sorting is needed.
+
+    Args:
+        intervals: Sessions overlapping the window
+        since: Window start
+        until: Window end
+        bucket_seconds: Bucket width; the last bucket is cut off at ``until``
+
+    Returns:
+        Bucket start times (epoch seconds) and mean connected devices per bucket
+    """
+    _require_numpy()
+    lo, hi = to_seconds(since), to_seconds(until)
+    width = float(bucket_seconds)
+    count = max(int(np.ceil((hi - lo) / width)), 1)
+    edges = np.minimum(lo + np.arange(count + 1) * width, hi)
+
+    start = np.clip(intervals.start, lo, hi)
+    end = np.clip(np.where(np.isnan(intervals.end), hi, intervals.end), lo, hi)
+    keep = end > start
+    start, end = start[keep], end[keep]
+    first = np.minimum(((start - lo) // width).astype(np.int64), count - 1)
+    last = np.minimum(((end - lo) // width).astype(np.int64), count - 1)
+
+    covered = np.cumsum(np.bincount(first, minlength=count + 1)
+                        - np.bincount(last + 1, minlength=count + 1))[:count] * width
+    area = (covered
+            - np.bincount(first, weights=start - (lo + first * width), minlength=count)
+            - np.bincount(last, weights=(lo + (last + 1) * width) - end, minlength=count))
+    return edges[:-1], area / np.maximum(np.diff(edges), 1e-9)
+
+
+def fleet_summary(metrics: dict,
+                  timeline: Optional[Tuple["np.ndarray", "np.ndarray"]] = None) -> dict:
+    """
+    Fleet-wide figures from per-device metrics
+
+    Args:
+        metrics: Output of ``device_metrics``
+        timeline: Output of ``connected_timeline``
+
+    Returns:
+        JSON-serializable summary
+    """
+    devices = len(metrics["uptime_seconds"])
+    sessions = int(metrics["sessions"].sum())
+    summary = {
+        "devices": devices,
+        "availability": float(metrics["availability"].mean()) if devices else None,
+        "median_availability": float(np.median(metrics["availability"])) if devices else None,
+        "uptime_seconds": float(metrics["uptime_seconds"].sum()),
+        "sessions": sessions,
+        "mean_session_seconds": (float((metrics["mean_session_seconds"] * metrics["sessions"]).sum()
+                                       / sessions) if sessions else None),
+        "disconnects": int(metrics["disconnects"].sum()),
+        "flaps": int(metrics["flaps"].sum()),
+    }
+    if timeline is not None:
+        starts, connected = timeline
+        summary["timeline"] = [
+            {"start": from_seconds(start).isoformat(), "mean_connected": round(float(value), 3)}
+            for start, value in zip(starts, connected)
+        ]
+    return summary
+
+
+def device_rows(intervals: Intervals, metrics: dict) -> List[dict]:
+    """Per-device metrics as JSON-serializable rows"""
+    return [
+        {
+            "mac_address": mac,
+            "availability": round(float(availability), 6),
+            "uptime_seconds": round(float(uptime), 3),
+            "sessions": int(sessions),
+            "mean_session_seconds": round(float(mean), 3),
+            "disconnects": int(disconnects),
+            "flaps": int(flaps),
+        }
+        for mac, availability, uptime, sessions, mean, disconnects, flaps in zip(
+            intervals.macs, metrics["availability"], metrics["uptime_seconds"],
+            metrics["sessions"], metrics["mean_session_seconds"],
+            metrics["disconnects"], metrics["flaps"]
+        )
+    ]
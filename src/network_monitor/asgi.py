@@ -0,0 +1,383 @@
+"""
+ASGI server mode
+
+Serves the dashboard API from one asyncio event loop. Regular routes are the
+Flask views from web.py, run on a bounded thread pool so at most
+``max_workers`` requests touch the database at once while any number of
+connections wait on the loop. Two server-sent event streams push changes as
+the device state is published instead of being polled:
+
+    /api/stream/status   status summary after every state change
+    /api/stream/events   CONNECTED / DISCONNECTED events
+
+Run with uvicorn (``pip install uvicorn``):
+
+    python -m network_monitor.asgi
+    uvicorn --factory network_monitor.asgi:from_env --workers 4
+
+With more than one worker set SCANNER_MODE=leader (or process).
+"""
+import asyncio
+import io
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+from .state import DeviceStateStore, StateSnapshot
+
+logger = logging.getLogger(__name__)
+
+STREAM_PATHS = {
+    "/api/stream/status": "status",
+    "/api/stream/events": "events",
+}
+
+
+def status_payload(snapshot: StateSnapshot) -> dict:
+    """Status summary sent on the status stream"""
+    return {
+        "connected_devices": snapshot.connected_count,
+        "total_devices": snapshot.total_count,
+        "state_version": snapshot.version,
+        "last_update": snapshot.updated_at.isoformat() if snapshot.updated_at else None,
+    }
+
+
+def connection_events(previous: StateSnapshot, current: StateSnapshot) -> List[dict]:
+    """
+    Connect/disconnect transitions between two snapshots
+
+    Unchanged records are shared between copy-on-write snapshots, so only
+    records that were replaced are compared.
+    """
+    event_time = current.updated_at.isoformat() if current.updated_at else None
+    events = []
+    for mac, record in current.devices.items():
+        before = previous.devices.get(mac)
+        if before is record:
+            continue
+        was_connected = before is not None and before.is_connected
+        if record.is_connected == was_connected:
+            continue
+        events.append({
+            "mac_address": mac,
+            "ip_address": record.ip_address if record.is_connected else None,
+            "event_type": "CONNECTED" if record.is_connected else "DISCONNECTED",
+            "event_time": event_time,
+            "hostname": record.hostname,
+            "device_name": record.device_name,
+            "device_type": record.device_type,
+        })
+    return events
+
+
+def format_sse(event: str, data: dict) -> bytes:
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n".encode("utf-8")
+
+
+class StateStreams:
+    """Fans device state changes out to open event streams"""
+
+    def __init__(self, store: DeviceStateStore, max_pending: int = 100):
+        """
+        Initialize state streams
+
+        Args:
+            store: State whose changes are streamed
+            max_pending: Messages buffered per client before it is disconnected
+        """
+        self.store = store
+        self.max_pending = max_pending
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._last = store.snapshot()
+        self._clients: Dict[asyncio.Queue, str] = {}
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    def attach(self, loop: asyncio.AbstractEventLoop):
+        """Start receiving state changes on an event loop"""
+        if self._loop is not None:
+            return
+        self._loop = loop
+        self._last = self.store.snapshot()
+        self.store.subscribe(self._on_change)
+
+    def detach(self):
+        """Stop receiving state changes"""
+        if self._loop is None:
+            return
+        self.store.unsubscribe(self._on_change)
+        self._loop = None
+        for client in list(self._clients):
+            self._close(client)
+
+    def open(self, kind: str) -> asyncio.Queue:
+        """Register a client of the given stream kind"""
+        client: asyncio.Queue = asyncio.Queue(maxsize=self.max_pending)
+        self._clients[client] = kind
+        return client
+
+    def close(self, client: asyncio.Queue):
+        """Unregister a client"""
+        self._clients.pop(client, None)
+
+    def _on_change(self, snapshot: StateSnapshot):
+        # Called on the publishing thread; hand over to the loop
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._dispatch, snapshot)
+
+    def _dispatch(self, snapshot: StateSnapshot):
+        previous, self._last = self._last, snapshot
+        wants_events = any(kind == "events" for kind in self._clients.values())
+        messages = {
+            "status": [format_sse("status", status_payload(snapshot))],
+            "events": [format_sse("connection", event)
+                       for event in connection_events(previous, snapshot)] if wants_events else [],
+        }
+        for client, kind in list(self._clients.items()):
+            for message in messages[kind]:
+                try:
+                    client.put_nowait(message)
+                except asyncio.QueueFull:
+                    self._close(client)
+                    break
+
+    def _close(self, client: asyncio.Queue):
+        self._clients.pop(client, None)
+        # Wake the client so it ends its response
+        while True:
+            try:
+                client.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+        client.put_nowait(None)
+
+
+class AsgiApp:
+    """ASGI application serving a WSGI app and the state event streams"""
+
+    def __init__(self, wsgi_app, store: DeviceStateStore, max_workers: int = 32,
+                 keepalive: float = 15.0,
+                 on_startup: Optional[Callable[[], None]] = None,
+                 on_shutdown: Optional[Callable[[], None]] = None):
+        """
+        Initialize ASGI application
+
+        Args:
+            wsgi_app: WSGI application serving all other routes
+            store: Device state behind the event streams
+            max_workers: Threads available to WSGI requests (bounds DB concurrency)
+            keepalive: Seconds between keep-alive comments on idle streams
+            on_startup: Called from a worker thread on lifespan startup
+            on_shutdown: Called from a worker thread on lifespan shutdown
+        """
+        self.wsgi_app = wsgi_app
+        self.streams = StateStreams(store)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="asgi-wsgi")
+        self.keepalive = keepalive
+        self.on_startup = on_startup
+        self.on_shutdown = on_shutdown
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            self.streams.attach(asyncio.get_running_loop())
+            kind = STREAM_PATHS.get(scope["path"])
+            if kind is not None and scope["method"] == "GET":
+                await self._stream(kind, receive, send)
+            else:
+                await self._call_wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    self.streams.attach(loop)
+                    if self.on_startup is not None:
+                        await loop.run_in_executor(self.executor, self.on_startup)
+                except Exception as e:
+                    logger.error(f"ASGI startup failed: {e}", exc_info=True)
+                    await send({"type": "lifespan.startup.failed", "message": str(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.streams.detach()
+                if self.on_shutdown is not None:
+                    await loop.run_in_executor(self.executor, self.on_shutdown)
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _stream(self, kind: str, receive, send):
+        client = self.streams.open(kind)
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+            ],
+        })
+        disconnected = asyncio.ensure_future(self._wait_disconnect(receive))
+        try:
+            if kind == "status":
+                await send({"type": "http.response.body", "more_body": True,
+                            "body": format_sse("status", status_payload(self.streams.store.snapshot()))})
+            while True:
+                message = asyncio.ensure_future(client.get())
+                done, _ = await asyncio.wait(
+                    {message, disconnected}, timeout=self.keepalive,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if disconnected in done:
+                    message.cancel()
+                    return
+                if message not in done:
+                    message.cancel()
+                    await send({"type": "http.response.body", "body": b": keepalive\n\n",
+                                "more_body": True})
+                    continue
+                data = message.result()
+                if data is None:
+                    break
+                await send({"type": "http.response.body", "body": data, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            disconnected.cancel()
+            self.streams.close(client)
+
+    @staticmethod
+    async def _wait_disconnect(receive):
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    async def _call_wsgi(self, scope, receive, send):
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        environ = self._environ(scope, bytes(body))
+        loop = asyncio.get_running_loop()
+        response: Dict[str, object] = {}
+        result = await loop.run_in_executor(self.executor, self._start_wsgi, environ, response)
+        disconnected = asyncio.ensure_future(self._wait_disconnect(receive))
+        try:
+            # Each chunk is produced on the executor and sent as soon as it is
+            # ready, so streamed responses (exports) are never held in memory
+            chunks = iter(result)
+            # start_response may be deferred until the first chunk
+            chunk = await loop.run_in_executor(self.executor, next, chunks, None)
+            await send({"type": "http.response.start", "status": response["status"],
+                        "headers": response["headers"]})
+            while chunk is not None:
+                if disconnected.done():
+                    return
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                chunk = await loop.run_in_executor(self.executor, next, chunks, None)
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            disconnected.cancel()
+            if hasattr(result, "close"):
+                await loop.run_in_executor(self.executor, result.close)
+
+    def _start_wsgi(self, environ: dict, response: Dict[str, object]) -> Iterable[bytes]:
+        def start_response(status, headers, exc_info=None):
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [
+                (name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers
+            ]
+
+        return self.wsgi_app(environ, start_response)
+
+    @staticmethod
+    def _environ(scope, body: bytes) -> dict:
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+            "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": client[0],
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for name, value in scope.get("headers", []):
+            key = name.decode("latin-1").upper().replace("-", "_")
+            value = value.decode("latin-1")
+            if key == "CONTENT_TYPE":
+                environ["CONTENT_TYPE"] = value
+            elif key != "CONTENT_LENGTH":
+                key = "HTTP_" + key
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+
+def from_env() -> AsgiApp:
+    """Build the dashboard ASGI app from environment configuration (uvicorn --factory)"""
+    from .config import Config
+    from . import web
+    from .web_main import setup_logging
+
+    config = Config.load()
+    setup_logging(config)
+    auto_start = os.getenv('AUTO_START_MONITORING', 'yes').lower() == 'yes'
+    web.init_app(config)
+
+    def shutdown():
+        if web.election is not None:
+            web.election.stop()
+        if web.publisher is not None:
+            web.publisher.stop()
+        web.stop_monitoring()
+
+    return AsgiApp(
+        web.app,
+        web.device_state,
+        max_workers=int(os.getenv('ASGI_WORKERS', '32')),
+        keepalive=float(os.getenv('STREAM_KEEPALIVE', '15')),
+        on_startup=lambda: web.start_scanning(auto_start),
+        on_shutdown=shutdown
+    )
+
+
+def main():
+    """Run the dashboard under uvicorn"""
+    try:
+        import uvicorn
+    except ImportError:
+        print("ASGI mode needs uvicorn: pip install uvicorn")
+        sys.exit(1)
+
+    host = os.getenv('WEB_HOST', '0.0.0.0')
+    port = int(os.getenv('WEB_PORT', '5000'))
+    uvicorn.run(from_env(), host=host, port=port, lifespan="on", log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Central collector for remote scan agents
+
+Receives the batches pushed by network_monitor.agent and writes them to one
+database, tagging devices and events with the site that saw them. Each site
+is diffed only against its own devices, so one site's scan never disconnects
+another's. The database needs the SiteID columns
+(config/migrations/001_site_id.sql). A local monitor diffs against every
+device, so do not scan into the same database directly; run an agent for the
+collector's own network too.
+
+    python -m network_monitor.collector
+
+It listens on 127.0.0.1 unless COLLECTOR_HOST says otherwise, and refuses a
+non-loopback address without COLLECTOR_TOKEN: whoever can post to the ingest
+endpoint can connect and disconnect devices.
+
+The collector keeps the latest device set and sequence number of every site
+in memory. Entries are applied in order; when one cannot be (the collector
+restarted, or the agent dropped entries) it replies 409 and the agent sends
+a full scan.
+"""
+import gzip
+import hmac
+import ipaddress
+import json
+import logging
+import re
+import sys
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from flask import Flask, jsonify, request
+from .config import Config
+from .database import DatabaseManager
+from .debounce import DisconnectDebouncer
+from .metrics import REGISTRY, Counter, CONTENT_TYPE, ERRORS_TOTAL
+from .scanner import Device
+
+logger = logging.getLogger(__name__)
+
+# Fits SiteID VARCHAR(64) and is safe in file names
+SITE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+COLLECTOR_SCANS_TOTAL = REGISTRY.register(Counter(
+    "network_monitor_collector_scans_total",
+    "Agent scan entries by site and result (applied, duplicate, rejected)",
+    ("site", "result"),
+))
+
+
+class ResyncRequired(Exception):
+    """An entry does not follow on from what the collector has applied"""
+
+
+class SiteState:
+    """What the collector has applied for one site"""
+
+    def __init__(self, debouncer: DisconnectDebouncer):
+        self.session: Optional[str] = None
+        self.seq = 0
+        self.devices: Dict[str, Device] = {}
+        self.debouncer = debouncer
+        self.last_scan: Optional[datetime] = None
+        self.lock = threading.Lock()
+
+
+class Collector:
+    """Applies agent scan entries to the database"""
+
+    def __init__(self, database: DatabaseManager,
+                 debouncer_factory: Optional[Callable[[str], DisconnectDebouncer]] = None):
+        """
+        Initialize collector
+
+        Args:
+            database: Database all sites are written to
+            debouncer_factory: Builds the disconnect debouncer of a site
+        """
+        self.database = database
+        self.debouncer_factory = debouncer_factory or (lambda site_id: DisconnectDebouncer())
+        self._sites: Dict[str, SiteState] = {}
+        self._sites_lock = threading.Lock()
+
+    def site(self, site_id: str) -> SiteState:
+        """State of a site, created on first contact"""
+        with self._sites_lock:
+            state = self._sites.get(site_id)
+            if state is None:
+                state = self._sites[site_id] = SiteState(self.debouncer_factory(site_id))
+                logger.info(f"New agent site: {site_id}")
+            return state
+
+    def ingest(self, site_id: str, entries: List[dict]) -> int:
+        """
+        Apply a batch of entries from one site, in order
+
+        Entries already applied are skipped, so an agent can safely resend a
+        batch whose reply it did not receive.
+
+        Args:
+            site_id: Site that sent the batch
+            entries: Scan entries in sequence order
+
+        Returns:
+            Sequence number of the last applied entry
+
+        Raises:
+            ResyncRequired: If an entry cannot be applied; earlier entries stay applied
+            ValueError: If the site ID or an entry is malformed
+        """
+        if not isinstance(site_id, str) or not SITE_ID_PATTERN.match(site_id):
+            raise ValueError(f"Invalid site ID: {site_id!r}")
+        state = self.site(site_id)
+        with state.lock:
+            for entry in entries:
+                self._apply(site_id, state, entry)
+            return state.seq
+
+    def _apply(self, site_id: str, state: SiteState, entry: dict):
+        session, seq, full = entry["session"], int(entry["seq"]), bool(entry.get("full"))
+        same_session = session == state.session
+        if same_session and seq <= state.seq:
+            COLLECTOR_SCANS_TOTAL.labels(site=site_id, result="duplicate").inc()
+            return
+        if not full and not (same_session and seq == state.seq + 1):
+            COLLECTOR_SCANS_TOTAL.labels(site=site_id, result="rejected").inc()
+            raise ResyncRequired(f"expected full scan or seq {state.seq + 1}, got {seq}")
+
+        devices = {} if full else dict(state.devices)
+        for mac in entry.get("removed", ()):
+            devices.pop(mac.upper(), None)
+        for mac, ip_address, hostname, vendor, *ipv6 in entry["devices"]:
+            device = Device(mac, ip_address, hostname, vendor, ipv6[0] if ipv6 else ())
+            devices[device.mac_address] = device
+
+        scanned_at = datetime.fromisoformat(entry["scanned_at"])
+        # Same rule as a local scan: an empty scan does not disconnect everything
+        if devices:
+            self.database.update_device_status(
+                dict(devices), state.debouncer, timestamp=scanned_at, site_id=site_id
+            )
+            state.debouncer.save()
+        state.session, state.seq, state.devices = session, seq, devices
+        state.last_scan = scanned_at
+        COLLECTOR_SCANS_TOTAL.labels(site=site_id, result="applied").inc()
+
+    def get_sites(self) -> Dict[str, dict]:
+        """
+        Get what has been received from each site
+
+        Returns:
+            Site ID -> sequence number, device count and last scan time
+        """
+        with self._sites_lock:
+            sites = dict(self._sites)
+        return {
+            site_id: {
+                "seq": state.seq,
+                "connected_devices": len(state.devices),
+                "last_scan": state.last_scan.isoformat() if state.last_scan else None,
+            }
+            for site_id, state in sites.items()
+        }
+
+
+def check_exposure(host: str, token: Optional[str]):
+    """
+    Refuse to accept unauthenticated scans from other hosts
+
+    Args:
+        host: Address the collector listens on
+        token: Shared secret agents must send
+
+    Raises:
+        ValueError: If host is reachable from other machines and token is empty
+    """
+    if token:
+        return
+    try:
+        loopback = host == "localhost" or ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        loopback = False
+    if not loopback:
+        raise ValueError(f"COLLECTOR_TOKEN must be set to listen on {host}; without it "
+                         f"anyone who can reach the port can write device events")
+
+
+def create_app(collector: Collector, token: Optional[str] = None) -> Flask:
+    """
+    Build the collector's HTTP API
+
+    Args:
+        collector: Collector the ingest endpoint feeds
+        token: Shared secret agents must send as a bearer token
+
+    Returns:
+        Flask application
+    """
+    app = Flask(__name__)
+
+    @app.route('/api/ingest', methods=['POST'])
+    def ingest():
+        """Apply a batch of scans from one agent"""
+        if token and not hmac.compare_digest(
+                request.headers.get('Authorization', '').encode(), f"Bearer {token}".encode()):
+            return jsonify({'error': 'Unauthorized'}), 401
+        try:
+            body = request.get_data()
+            if request.headers.get('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+            payload = json.loads(body)
+            site_id = payload['site_id']
+            entries = payload['scans']
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            return jsonify({'error': f'Malformed batch: {e}'}), 400
+
+        try:
+            seq = collector.ingest(site_id, entries)
+        except ResyncRequired as e:
+            return jsonify({'error': str(e), 'seq': collector.site(site_id).seq}), 409
+        except (ValueError, KeyError, TypeError) as e:
+            return jsonify({'error': f'Malformed scan: {e}'}), 400
+        except Exception as e:
+            ERRORS_TOTAL.labels(component="collector").inc()
+            logger.error(f"Error ingesting scans from {site_id}: {e}", exc_info=True)
+            return jsonify({'error': str(e)}), 503
+        return jsonify({'site_id': site_id, 'seq': seq})
+
+    @app.route('/api/sites')
+    def sites():
+        """Sites that have reported to this collector"""
+        return jsonify({'sites': collector.get_sites()})
+
+    @app.route('/metrics')
+    def metrics():
+        """Prometheus metrics in the text exposition format"""
+        return REGISTRY.render(), 200, {'Content-Type': CONTENT_TYPE}
+
+    return app
+
+
+def main():
+    """Entry point for the central collector"""
+    from .main import setup_logging
+    from .notify import build_dispatcher
+    from .oui import open_index
+
+    config = Config.load()
+    setup_logging(config)
+    host, port = config.agent.collector_host, config.agent.collector_port
+    try:
+        check_exposure(host, config.agent.token)
+    except ValueError as e:
+        print(f"\n❌ ERROR: {e}")
+        sys.exit(1)
+
+    database = DatabaseManager(config.database)
+    oui_index = open_index(config.enrichment.oui_index)
+    if oui_index is not None:
+        database.vendor_lookup = oui_index.lookup
+
+    def site_debouncer(site_id: str) -> DisconnectDebouncer:
+        debouncer = DisconnectDebouncer(
+            miss_threshold=config.network.disconnect_after_misses,
+            grace_seconds=config.network.disconnect_after_seconds,
+            state_file=config.state.path(f"disconnect_debounce.{site_id}.json")
+        )
+        debouncer.load()
+        return debouncer
+
+    events = build_dispatcher(config.notify)
+    if events is not None:
+        events.start()
+        database.scan_listeners.append(events.submit)
+
+    collector = Collector(database, site_debouncer)
+    app = create_app(collector, token=config.agent.token)
+    print(f"Collector listening on http://{host}:{port}/api/ingest")
+    try:
+        app.run(host=host, port=port, threaded=True)
+    finally:
+        if events is not None:
+            events.stop()
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
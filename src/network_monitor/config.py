@@ -1,9 +1,11 @@
 """
 Configuration management for Network Monitor
 """
+import math
 import os
-from dataclasses import dataclass
-from typing import Optional
+import socket
+from dataclasses import dataclass, field
+from typing import List, Optional
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -16,6 +18,16 @@ class NetworkConfig:
     subnet: str
     scan_interval: int
     timeout: int = 3
+    scan_jitter: float = 0.0
+    overrun_policy: str = "skip"
+    hostname_cache_ttl: int = 0
+    disconnect_after_misses: int = 0
+    disconnect_after_seconds: float = 0.0
+    retries: int = 1
+    retry_timeout: float = 0.5
+    ipv6_discovery: bool = False
+    ipv6_interface: Optional[str] = None
+    ipv6_timeout: float = 2.0
 
     @classmethod
     def from_env(cls) -> "NetworkConfig":
@@ -24,8 +36,28 @@ class NetworkConfig:
             subnet=os.getenv("NETWORK_SUBNET", "192.168.1.0/24"),
             scan_interval=int(os.getenv("SCAN_INTERVAL", "60")),
             timeout=int(os.getenv("SCAN_TIMEOUT", "3")),
+            scan_jitter=float(os.getenv("SCAN_JITTER", "0")),
+            overrun_policy=os.getenv("SCAN_OVERRUN_POLICY", "skip").lower(),
+            hostname_cache_ttl=int(os.getenv("HOSTNAME_CACHE_TTL", "0")),
+            disconnect_after_misses=int(os.getenv("DISCONNECT_AFTER_MISSES", "0")),
+            disconnect_after_seconds=float(os.getenv("DISCONNECT_AFTER_SECONDS", "0")),
+            retries=int(os.getenv("SCAN_RETRIES", "1")),
+            retry_timeout=float(os.getenv("SCAN_RETRY_TIMEOUT", "0.5")),
+            ipv6_discovery=os.getenv("IPV6_DISCOVERY", "no").lower() == "yes",
+            ipv6_interface=os.getenv("IPV6_INTERFACE") or None,
+            ipv6_timeout=float(os.getenv("IPV6_TIMEOUT", "2")),
         )
 
+    @property
+    def disconnect_window(self) -> int:
+        """Missed scans after which a device is disconnected at the latest"""
+        scans = []
+        if self.disconnect_after_misses > 0:
+            scans.append(self.disconnect_after_misses)
+        if self.disconnect_after_seconds > 0:
+            scans.append(math.ceil(self.disconnect_after_seconds / max(1, self.scan_interval)) + 1)
+        return max(1, min(scans, default=1))
+
 
 @dataclass
 class DatabaseConfig:
@@ -81,6 +113,228 @@ class LoggingConfig:
         )
 
 
+@dataclass
+class MetricsConfig:
+    """Metrics endpoint configuration"""
+    port: Optional[int] = None
+
+    @classmethod
+    def from_env(cls) -> "MetricsConfig":
+        """Load metrics configuration from environment variables"""
+        port = os.getenv("METRICS_PORT")
+        return cls(port=int(port) if port else None)
+
+
+@dataclass
+class TraceConfig:
+    """Scan tracing and profiling configuration"""
+    enabled: bool = False
+    profile_scans: int = 0
+    profile_dir: str = "profiles"
+    profile_interval: float = 0.005
+
+    @classmethod
+    def from_env(cls) -> "TraceConfig":
+        """Load tracing configuration from environment variables"""
+        return cls(
+            enabled=os.getenv("TRACE_SCANS", "no").lower() == "yes",
+            profile_scans=int(os.getenv("PROFILE_SCANS", "0")),
+            profile_dir=os.getenv("PROFILE_DIR", "profiles"),
+            profile_interval=float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000,
+        )
+
+
+@dataclass
+class StateConfig:
+    """Local state persisted between restarts"""
+    directory: str = "state"
+    warm_start: bool = True
+    # Seconds without a scan recorded as monitor downtime (0: three scan intervals)
+    downtime_after: float = 0.0
+
+    @classmethod
+    def from_env(cls) -> "StateConfig":
+        """Load state configuration from environment variables"""
+        return cls(
+            directory=os.getenv("STATE_DIR", "state"),
+            warm_start=os.getenv("WARM_START", "yes").lower() == "yes",
+            downtime_after=float(os.getenv("DOWNTIME_AFTER_SECONDS", "0")),
+        )
+
+    def path(self, name: str) -> str:
+        """Path of a file inside the state directory"""
+        return os.path.join(self.directory, name)
+
+
+@dataclass
+class EnrichmentConfig:
+    """Device enrichment configuration"""
+    oui_index: Optional[str] = None
+    asynchronous: bool = True
+    workers: int = 8
+    dns_concurrency: int = 8
+    queue_size: int = 1000
+    batch_size: int = 100
+    flush_interval: float = 2.0
+
+    @classmethod
+    def from_env(cls) -> "EnrichmentConfig":
+        """Load enrichment configuration from environment variables"""
+        return cls(
+            oui_index=os.getenv("OUI_INDEX") or None,
+            asynchronous=os.getenv("ENRICH_ASYNC", "yes").lower() == "yes",
+            workers=int(os.getenv("ENRICH_WORKERS", "8")),
+            dns_concurrency=int(os.getenv("ENRICH_DNS_CONCURRENCY", "8")),
+            queue_size=int(os.getenv("ENRICH_QUEUE_SIZE", "1000")),
+            batch_size=int(os.getenv("ENRICH_BATCH_SIZE", "100")),
+            flush_interval=float(os.getenv("ENRICH_FLUSH_SECONDS", "2")),
+        )
+
+
+@dataclass
+class ProcessConfig:
+    """How scanning and the web dashboard are split across processes"""
+    # thread: the dashboard scans in a background thread
+    # process: a separate monitor process scans and publishes over IPC
+    # leader: web workers elect one of themselves to scan and publish
+    scanner_mode: str = "thread"
+    ipc_address: str = "state/monitor.sock"
+    heartbeat: float = 5.0
+    leader_lock: str = "state/scanner.lock"
+
+    @classmethod
+    def from_env(cls) -> "ProcessConfig":
+        """Load process configuration from environment variables"""
+        state_dir = os.getenv("STATE_DIR", "state")
+        if hasattr(socket, "AF_UNIX"):
+            default_address = os.path.join(state_dir, "monitor.sock")
+        else:
+            default_address = "tcp://127.0.0.1:5056"
+        return cls(
+            scanner_mode=os.getenv("SCANNER_MODE", "thread").lower(),
+            ipc_address=os.getenv("IPC_ADDRESS", default_address),
+            heartbeat=float(os.getenv("IPC_HEARTBEAT", "5")),
+            leader_lock=os.getenv("LEADER_LOCK", os.path.join(state_dir, "scanner.lock")),
+        )
+
+
+@dataclass
+class AgentConfig:
+    """Remote scan agent and central collector configuration"""
+    site_id: str = "default"
+    collector_url: str = "http://127.0.0.1:5080/api/ingest"
+    token: Optional[str] = None
+    spool_dir: str = "state/spool"
+    spool_max: int = 10000
+    batch_scans: int = 50
+    full_sync_scans: int = 60
+    push_timeout: float = 10.0
+    collector_host: str = "127.0.0.1"
+    collector_port: int = 5080
+
+    @classmethod
+    def from_env(cls) -> "AgentConfig":
+        """Load agent and collector configuration from environment variables"""
+        state_dir = os.getenv("STATE_DIR", "state")
+        return cls(
+            site_id=os.getenv("AGENT_SITE_ID") or socket.gethostname(),
+            collector_url=os.getenv("COLLECTOR_URL", "http://127.0.0.1:5080/api/ingest"),
+            token=os.getenv("COLLECTOR_TOKEN") or None,
+            spool_dir=os.getenv("AGENT_SPOOL_DIR", os.path.join(state_dir, "spool")),
+            spool_max=int(os.getenv("AGENT_SPOOL_MAX", "10000")),
+            batch_scans=int(os.getenv("AGENT_BATCH_SCANS", "50")),
+            full_sync_scans=int(os.getenv("AGENT_FULL_SYNC_SCANS", "60")),
+            push_timeout=float(os.getenv("AGENT_PUSH_TIMEOUT", "10")),
+            collector_host=os.getenv("COLLECTOR_HOST", "127.0.0.1"),
+            collector_port=int(os.getenv("COLLECTOR_PORT", "5080")),
+        )
+
+
+@dataclass
+class NotifyConfig:
+    """Webhook notification configuration"""
+    webhook_urls: List[str] = field(default_factory=list)
+    token: Optional[str] = None
+    queue_size: int = 10000
+    overflow: str = "drop_oldest"
+    spill_dir: str = "state/webhooks"
+    batch_size: int = 100
+    flush_interval: float = 1.0
+    max_retries: int = 5
+    backoff: float = 1.0
+    backoff_max: float = 60.0
+    timeout: float = 10.0
+
+    @classmethod
+    def from_env(cls) -> "NotifyConfig":
+        """Load notification configuration from environment variables"""
+        state_dir = os.getenv("STATE_DIR", "state")
+        return cls(
+            webhook_urls=[url.strip() for url in os.getenv("WEBHOOK_URLS", "").split(",")
+                          if url.strip()],
+            token=os.getenv("WEBHOOK_TOKEN") or None,
+            queue_size=int(os.getenv("WEBHOOK_QUEUE_SIZE", "10000")),
+            overflow=os.getenv("WEBHOOK_OVERFLOW", "drop_oldest").lower(),
+            spill_dir=os.getenv("WEBHOOK_SPILL_DIR", os.path.join(state_dir, "webhooks")),
+            batch_size=int(os.getenv("WEBHOOK_BATCH_SIZE", "100")),
+            flush_interval=float(os.getenv("WEBHOOK_FLUSH_SECONDS", "1")),
+            max_retries=int(os.getenv("WEBHOOK_MAX_RETRIES", "5")),
+            backoff=float(os.getenv("WEBHOOK_BACKOFF_SECONDS", "1")),
+            backoff_max=float(os.getenv("WEBHOOK_BACKOFF_MAX_SECONDS", "60")),
+            timeout=float(os.getenv("WEBHOOK_TIMEOUT", "10")),
+        )
+
+
+@dataclass
+class PresenceConfig:
+    """Per-device presence bitmap configuration"""
+    enabled: bool = True
+    directory: str = "state/presence"
+    slot_seconds: int = 60
+    flush_scans: int = 10
+    retention_days: int = 90
+
+    @classmethod
+    def from_env(cls) -> "PresenceConfig":
+        """Load presence configuration from environment variables"""
+        state_dir = os.getenv("STATE_DIR", "state")
+        return cls(
+            enabled=os.getenv("PRESENCE_ENABLED", "yes").lower() == "yes",
+            directory=os.getenv("PRESENCE_DIR", os.path.join(state_dir, "presence")),
+            # One slot per scan unless set
+            slot_seconds=int(os.getenv("PRESENCE_SLOT_SECONDS")
+                             or os.getenv("SCAN_INTERVAL", "60")),
+            flush_scans=int(os.getenv("PRESENCE_FLUSH_SCANS", "10")),
+            retention_days=int(os.getenv("PRESENCE_RETENTION_DAYS", "90")),
+        )
+
+
+@dataclass
+class ProbeConfig:
+    """ICMP/TCP liveness probes for hosts that do not answer ARP"""
+    targets: List[str] = field(default_factory=list)
+    methods: List[str] = field(default_factory=lambda: ["icmp", "tcp"])
+    ports: List[int] = field(default_factory=lambda: [22, 80, 443, 445, 3389])
+    concurrency: int = 256
+    rate: float = 1000.0
+    timeout: float = 1.0
+
+    @classmethod
+    def from_env(cls) -> "ProbeConfig":
+        """Load probe configuration from environment variables"""
+        def items(name: str, default: str) -> List[str]:
+            return [item.strip() for item in os.getenv(name, default).split(",") if item.strip()]
+
+        return cls(
+            targets=items("PROBE_TARGETS", ""),
+            methods=[method.lower() for method in items("PROBE_METHODS", "icmp,tcp")],
+            ports=[int(port) for port in items("PROBE_PORTS", "22,80,443,445,3389")],
+            concurrency=int(os.getenv("PROBE_CONCURRENCY", "256")),
+            rate=float(os.getenv("PROBE_RATE", "1000")),
+            timeout=float(os.getenv("PROBE_TIMEOUT", "1")),
+        )
+
+
 class Config:
     """Main configuration class combining all configs"""
     
@@ -88,6 +342,15 @@ class Config:
         self.network = NetworkConfig.from_env()
         self.database = DatabaseConfig.from_env()
         self.logging = LoggingConfig.from_env()
+        self.metrics = MetricsConfig.from_env()
+        self.trace = TraceConfig.from_env()
+        self.state = StateConfig.from_env()
+        self.enrichment = EnrichmentConfig.from_env()
+        self.process = ProcessConfig.from_env()
+        self.agent = AgentConfig.from_env()
+        self.notify = NotifyConfig.from_env()
+        self.presence = PresenceConfig.from_env()
+        self.probe = ProbeConfig.from_env()
 
     @classmethod
     def load(cls) -> "Config":
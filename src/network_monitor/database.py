@@ -1,29 +1,85 @@
 """
 Database management and operations
 """
+import ipaddress
 import logging
-from datetime import datetime
-from typing import Set, Dict
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Callable, Set, Dict, List, Optional, Tuple
 import pyodbc
 from .scanner import Device
 from .config import DatabaseConfig
+from .state import DeviceRecord
+from .sessions import DeviceSession, pair_events
+from .debounce import DisconnectDebouncer
+from .metrics import SCAN_PHASE_SECONDS, DEVICE_EVENTS_TOTAL, ERRORS_TOTAL
+from .tracing import span, traced_cursor
+
+if TYPE_CHECKING:
+    from .enrichment import EnrichmentJob
 
 logger = logging.getLogger(__name__)
 
+# DeviceAddresses.LastSeen is refreshed at most this often per address
+ADDRESS_REFRESH = timedelta(minutes=5)
+# Devices whose stored addresses are read per query
+ADDRESS_LOOKUP_BATCH = 500
+
+
+@dataclass
+class ScanDelta:
+    """Outcome of one committed scan"""
+    timestamp: datetime
+    devices: Dict[str, Device]
+    connected: Set[str] = field(default_factory=set)
+    disconnected: Set[str] = field(default_factory=set)
+    site_id: Optional[str] = None
+    # Set on the first scan after the monitor was down: disconnects are dated
+    # to the last scan before the gap
+    downtime_since: Optional[datetime] = None
+    # Disconnected MAC -> time it was first missed
+    disconnect_times: Dict[str, datetime] = field(default_factory=dict)
+
+    def disconnected_at(self, mac_address: str) -> datetime:
+        """When a disconnected device left"""
+        return self.disconnect_times.get(mac_address, self.downtime_since or self.timestamp)
+
 
 class DatabaseManager:
     """Manages database connections and operations"""
 
-    def __init__(self, config: DatabaseConfig):
+    def __init__(self, config: DatabaseConfig, connection=None):
         """
         Initialize database manager
         
         Args:
             config: Database configuration
+            connection: Existing DB-API connection to use instead of connecting
         """
         self.config = config
-        self.connection = None
-        self._connect()
+        self.connection = connection
+        # MAC -> vendor name, used when a device is first seen
+        self.vendor_lookup: Optional[Callable[[str], Optional[str]]] = None
+        # Called with every committed scan, e.g. to notify webhooks; must not block
+        self.scan_listeners: List[Callable[[ScanDelta], None]] = []
+        # Opens extra connections for long reads (default: from config)
+        self.connection_factory: Optional[Callable[[], object]] = None
+        # Serializes write transactions from the scan loop and enrichment writer
+        self._write_lock = threading.RLock()
+        if self.connection is None:
+            self._connect()
+        # DeviceSessions is maintained once the table has been created
+        self.track_sessions = self._has_table("DeviceSessions")
+        self.track_downtime = self._has_table("MonitorDowntime")
+        self.track_ip_leases = self._has_table("IPLeases")
+        # Open leases, loaded on first use: MAC -> (site, IP) and (site, IP) -> MAC
+        self._lease_by_mac: Optional[Dict[str, Tuple[Optional[str], str]]] = None
+        self._lease_by_ip: Dict[Tuple[Optional[str], str], str] = {}
+        self.track_addresses = self._has_table("DeviceAddresses")
+        # (MAC, address) -> LastSeen as last written, for the addresses written
+        # within ADDRESS_REFRESH
+        self._address_seen: Dict[Tuple[str, str], datetime] = {}
 
     def _connect(self):
         """Establish connection to SQL Server database"""
@@ -35,75 +91,264 @@ class DatabaseManager:
             logger.error(f"Failed to connect to database: {e}")
             raise
 
+    def _has_table(self, table: str) -> bool:
+        """Check whether an optional table exists"""
+        try:
+            cursor = self._cursor()
+            cursor.execute(f"SELECT TOP 1 1 FROM {table}")
+            cursor.fetchall()
+            return True
+        except pyodbc.Error:
+            self.connection.rollback()
+            logger.info(f"{table} table not found; see config/migrations")
+            return False
+
+    def open_connection(self):
+        """
+        Open a separate connection for long-running reads
+        
+        A result streamed on the shared connection would keep it busy, and
+        scan writes waiting, until the reader finishes.
+        
+        Returns:
+            New DB-API connection; the caller closes it
+        """
+        if self.connection_factory is not None:
+            return self.connection_factory()
+        return pyodbc.connect(self.config.get_connection_string())
+
     def close(self):
         """Close database connection"""
         if self.connection:
             self.connection.close()
             logger.info("Database connection closed")
 
-    def get_connected_devices(self) -> Set[str]:
+    def _cursor(self):
+        """Create a cursor, timed per statement while tracing is enabled"""
+        return traced_cursor(self.connection.cursor())
+
+    def get_connected_devices(self, site_id: Optional[str] = None) -> Set[str]:
         """
         Get MAC addresses of currently connected devices
         
+        Args:
+            site_id: Only devices last seen by this site's agent
+        
         Returns:
             Set of MAC addresses
         """
         try:
-            cursor = self.connection.cursor()
-            cursor.execute("""
-                SELECT MACAddress FROM DeviceConnections 
-                WHERE IsConnected = 1
-            """)
+            cursor = self._cursor()
+            if site_id is None:
+                cursor.execute("""
+                    SELECT MACAddress FROM DeviceConnections 
+                    WHERE IsConnected = 1
+                """)
+            else:
+                cursor.execute("""
+                    SELECT MACAddress FROM DeviceConnections 
+                    WHERE IsConnected = 1 AND SiteID = ?
+                """, site_id)
             return {row[0] for row in cursor.fetchall()}
         except pyodbc.Error as e:
             logger.error(f"Error retrieving connected devices: {e}")
             return set()
 
-    def update_device_status(self, devices: Dict[str, Device]):
+    def get_last_scan_time(self) -> Optional[datetime]:
+        """
+        Time of the last scan that saw any device
+        
+        Returns:
+            Latest LastSeen, or None for an empty database
+        """
+        cursor = self._cursor()
+        cursor.execute("SELECT TOP 1 LastSeen FROM DeviceConnections ORDER BY LastSeen DESC")
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def get_downtime(self, since: Optional[datetime] = None,
+                     until: Optional[datetime] = None) -> List[dict]:
+        """
+        Get periods the monitor was down, newest first
+        
+        Args:
+            since: Only periods ending at or after this time
+            until: Only periods starting before this time
+            
+        Returns:
+            Downtime periods overlapping the range
+        """
+        filters, params = [], []
+        if until is not None:
+            filters.append("StartTime < ?")
+            params.append(until)
+        if since is not None:
+            filters.append("EndTime >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(filters)}" if filters else ""
+        cursor = self._cursor()
+        cursor.execute(f"""
+            SELECT StartTime, EndTime, Reason
+            FROM MonitorDowntime
+            {where}
+            ORDER BY StartTime DESC
+        """, *params)
+        return [
+            {
+                'start_time': row.StartTime.isoformat(),
+                'end_time': row.EndTime.isoformat(),
+                'duration_seconds': (row.EndTime - row.StartTime).total_seconds(),
+                'reason': row.Reason,
+            }
+            for row in cursor.fetchall()
+        ]
+
+    def get_device_records(self) -> List[DeviceRecord]:
+        """
+        Get the current state of every known device
+        
+        Returns:
+            List of device records
+        """
+        cursor = self._cursor()
+        cursor.execute("""
+            SELECT 
+                MACAddress,
+                IPAddress,
+                Hostname,
+                DeviceName,
+                DeviceType,
+                Vendor,
+                FirstSeen,
+                LastSeen,
+                IsConnected
+            FROM DeviceConnections
+        """)
+        return [
+            DeviceRecord(
+                mac_address=row.MACAddress,
+                ip_address=row.IPAddress,
+                hostname=row.Hostname,
+                first_seen=row.FirstSeen,
+                last_seen=row.LastSeen,
+                is_connected=bool(row.IsConnected),
+                device_name=row.DeviceName,
+                device_type=row.DeviceType,
+                vendor=row.Vendor,
+            )
+            for row in cursor.fetchall()
+        ]
+
+    def update_device_status(self, devices: Dict[str, Device],
+                             debouncer: Optional[DisconnectDebouncer] = None,
+                             timestamp: Optional[datetime] = None,
+                             site_id: Optional[str] = None,
+                             downtime_since: Optional[datetime] = None) -> ScanDelta:
         """
         Update database with current device status
         
         Args:
             devices: Dictionary of currently detected devices (MAC -> Device)
+            debouncer: Delays disconnects until a device has been missing long enough
+            timestamp: Scan time (now if None); set when replaying an agent's scans
+            site_id: Site that ran the scan; only that site's devices can be
+                disconnected by it. None for a local scan, which needs no
+                SiteID column
+            downtime_since: Last scan before the monitor was down, for the
+                first scan after it. Devices gone since are disconnected at
+                that time without debouncing, and the gap is recorded in
+                MonitorDowntime
+            
+        Returns:
+            The committed changes
         """
+        with self._write_lock:
+            return self._update_device_status(devices, debouncer, timestamp, site_id,
+                                              downtime_since)
+
+    def _update_device_status(self, devices, debouncer, timestamp=None, site_id=None,
+                              downtime_since=None):
         try:
-            cursor = self.connection.cursor()
-            current_time = datetime.now()
-            current_macs = set(devices.keys())
-            
-            # Get previously known connected devices
-            previous_macs = self.get_connected_devices()
-            
-            # Find newly connected and disconnected devices
-            new_devices = current_macs - previous_macs
-            disconnected_devices = previous_macs - current_macs
-            
-            # Process newly connected devices
-            for mac in new_devices:
-                self._handle_device_connection(cursor, devices[mac], current_time)
-            
-            # Process disconnected devices
-            for mac in disconnected_devices:
-                self._handle_device_disconnection(cursor, mac, current_time)
+            with span("scan.db_diff", SCAN_PHASE_SECONDS.labels(phase="db_diff")) as attrs:
+                cursor = self._cursor()
+                current_time = timestamp or datetime.now()
+                current_macs = set(devices.keys())
+                
+                # Get previously known connected devices
+                previous_macs = self.get_connected_devices(site_id)
+                
+                # Find newly connected and disconnected devices
+                new_devices = current_macs - previous_macs
+                disconnected_devices = previous_macs - current_macs
+                # After a gap, departures are dated to the last scan before it
+                disconnect_times = {mac: downtime_since or current_time
+                                    for mac in disconnected_devices}
+                if downtime_since is not None:
+                    # Missed scans during the gap are not evidence of anything
+                    if debouncer is not None:
+                        debouncer.clear()
+                    if self.track_downtime:
+                        cursor.execute("""
+                            INSERT INTO MonitorDowntime (StartTime, EndTime, Reason)
+                            VALUES (?, ?, 'restart')
+                        """, downtime_since, current_time)
+                elif debouncer is not None:
+                    # Dated to the first missed scan, not the one confirming it
+                    disconnect_times = debouncer.confirm(disconnected_devices, current_time)
+                    disconnected_devices = set(disconnect_times)
+                
+                # Process newly connected devices
+                for mac in new_devices:
+                    self._handle_device_connection(cursor, devices[mac], current_time, site_id)
+                
+                # Process disconnected devices
+                for mac, disconnect_time in disconnect_times.items():
+                    self._handle_device_disconnection(cursor, mac, disconnect_time, site_id)
+                
+                # Update LastSeen for all currently connected devices
+                for mac in current_macs:
+                    self._update_device_last_seen(cursor, devices[mac], current_time)
+                
+                if self.track_ip_leases:
+                    self._record_ip_changes(cursor, devices, current_time, site_id)
+                
+                if self.track_addresses:
+                    self._record_addresses(cursor, devices, current_time)
+                
+                attrs.update(connected=len(new_devices), disconnected=len(disconnected_devices))
             
-            # Update LastSeen for all currently connected devices
-            for mac in current_macs:
-                self._update_device_last_seen(cursor, devices[mac], current_time)
+            with span("scan.commit", SCAN_PHASE_SECONDS.labels(phase="commit")):
+                self.connection.commit()
             
-            self.connection.commit()
+            DEVICE_EVENTS_TOTAL.labels(event_type="CONNECTED").inc(len(new_devices))
+            DEVICE_EVENTS_TOTAL.labels(event_type="DISCONNECTED").inc(len(disconnected_devices))
             
             if new_devices or disconnected_devices:
                 logger.info(
                     f"Database updated: {len(new_devices)} connected, "
                     f"{len(disconnected_devices)} disconnected"
                 )
-                
+            
         except pyodbc.Error as e:
+            ERRORS_TOTAL.labels(component="database").inc()
             logger.error(f"Error updating database: {e}", exc_info=True)
             self.connection.rollback()
+            # The lease and address caches may hold changes that were rolled back
+            self._lease_by_mac = None
+            self._address_seen = {}
             raise
+        
+        delta = ScanDelta(current_time, devices, new_devices, disconnected_devices, site_id,
+                          downtime_since, disconnect_times)
+        for listener in self.scan_listeners:
+            try:
+                listener(delta)
+            except Exception as e:
+                logger.error(f"Scan listener failed: {e}", exc_info=True)
+        return delta
 
-    def _handle_device_connection(self, cursor, device: Device, timestamp: datetime):
+    def _handle_device_connection(self, cursor, device: Device, timestamp: datetime,
+                                  site_id: Optional[str] = None):
         """
         Handle a device connection event
         
@@ -111,9 +356,16 @@ class DatabaseManager:
             cursor: Database cursor
             device: Device that connected
             timestamp: Connection timestamp
+            site_id: Site that saw the device
         """
         logger.info(f"New device connected: {device.mac_address} ({device.ip_address})")
         
+        if device.vendor is None and self.vendor_lookup is not None:
+            device.vendor = self.vendor_lookup(device.mac_address)
+        
+        # SiteID is only written for agent scans; local scans need no SiteID column
+        site_column, site_value, site_params = self._site_sql(site_id)
+        
         # Check if device exists in database
         cursor.execute("""
             SELECT ConnectionID FROM DeviceConnections 
@@ -121,31 +373,47 @@ class DatabaseManager:
         """, device.mac_address)
         
         if cursor.fetchone():
-            # Update existing device
-            cursor.execute("""
+            # Update existing device; one that moved between sites now belongs to this one
+            site_set = ", SiteID = ?" if site_id is not None else ""
+            cursor.execute(f"""
                 UPDATE DeviceConnections 
                 SET IPAddress = ?, 
-                    Hostname = ?,
+                    Hostname = COALESCE(?, Hostname),
                     LastSeen = ?, 
-                    IsConnected = 1
+                    IsConnected = 1,
+                    Vendor = COALESCE(Vendor, ?){site_set}
                 WHERE MACAddress = ?
-            """, device.ip_address, device.hostname, timestamp, device.mac_address)
+            """, device.ip_address, device.hostname, timestamp, device.vendor, *site_params,
+                device.mac_address)
         else:
             # Insert new device
-            cursor.execute("""
+            cursor.execute(f"""
                 INSERT INTO DeviceConnections 
-                (MACAddress, IPAddress, Hostname, FirstSeen, LastSeen, IsConnected)
-                VALUES (?, ?, ?, ?, ?, 1)
-            """, device.mac_address, device.ip_address, device.hostname, timestamp, timestamp)
+                (MACAddress, IPAddress, Hostname, FirstSeen, LastSeen, IsConnected, Vendor{site_column})
+                VALUES (?, ?, ?, ?, ?, 1, ?{site_value})
+            """, device.mac_address, device.ip_address, device.hostname, timestamp, timestamp,
+                device.vendor, *site_params)
         
         # Log connection event
-        cursor.execute("""
+        cursor.execute(f"""
             INSERT INTO ConnectionLog 
-            (MACAddress, IPAddress, EventType, EventTime)
-            VALUES (?, ?, 'CONNECTED', ?)
-        """, device.mac_address, device.ip_address, timestamp)
+            (MACAddress, IPAddress, EventType, EventTime{site_column})
+            VALUES (?, ?, 'CONNECTED', ?{site_value})
+        """, device.mac_address, device.ip_address, timestamp, *site_params)
+        
+        if self.track_sessions:
+            # Close a session left open by an interrupted writer before opening one
+            cursor.execute("""
+                UPDATE DeviceSessions SET EndTime = ?
+                WHERE MACAddress = ? AND EndTime IS NULL
+            """, timestamp, device.mac_address)
+            cursor.execute("""
+                INSERT INTO DeviceSessions (MACAddress, IPAddress, StartTime)
+                VALUES (?, ?, ?)
+            """, device.mac_address, device.ip_address, timestamp)
 
-    def _handle_device_disconnection(self, cursor, mac_address: str, timestamp: datetime):
+    def _handle_device_disconnection(self, cursor, mac_address: str, timestamp: datetime,
+                                     site_id: Optional[str] = None):
         """
         Handle a device disconnection event
         
@@ -153,6 +421,7 @@ class DatabaseManager:
             cursor: Database cursor
             mac_address: MAC address of disconnected device
             timestamp: Disconnection timestamp
+            site_id: Site that reported the disconnect
         """
         logger.info(f"Device disconnected: {mac_address}")
         
@@ -164,11 +433,28 @@ class DatabaseManager:
         """, mac_address)
         
         # Log disconnection event
-        cursor.execute("""
+        site_column, site_value, site_params = self._site_sql(site_id)
+        cursor.execute(f"""
             INSERT INTO ConnectionLog 
-            (MACAddress, IPAddress, EventType, EventTime)
-            VALUES (?, NULL, 'DISCONNECTED', ?)
-        """, mac_address, timestamp)
+            (MACAddress, IPAddress, EventType, EventTime{site_column})
+            VALUES (?, NULL, 'DISCONNECTED', ?{site_value})
+        """, mac_address, timestamp, *site_params)
+        
+        if self.track_sessions:
+            cursor.execute("""
+                UPDATE DeviceSessions SET EndTime = ?
+                WHERE MACAddress = ? AND EndTime IS NULL
+            """, timestamp, mac_address)
+        
+        if self.track_ip_leases:
+            self._end_lease(cursor, mac_address, timestamp)
+
+    @staticmethod
+    def _site_sql(site_id: Optional[str]) -> Tuple[str, str, tuple]:
+        """SiteID column list, placeholder and parameters for an INSERT, or nothing for local scans"""
+        if site_id is None:
+            return "", "", ()
+        return ", SiteID", ", ?", (site_id,)
 
     def _update_device_last_seen(self, cursor, device: Device, timestamp: datetime):
         """
@@ -179,14 +465,370 @@ class DatabaseManager:
             device: Device to update
             timestamp: Current timestamp
         """
+        # Hostname is None when it is resolved asynchronously; keep the stored one
         cursor.execute("""
             UPDATE DeviceConnections 
             SET LastSeen = ?,
                 IPAddress = ?,
-                Hostname = ?
+                Hostname = COALESCE(?, Hostname)
             WHERE MACAddress = ?
         """, timestamp, device.ip_address, device.hostname, device.mac_address)
 
+    def _load_open_leases(self, cursor):
+        """Cache the open IP leases"""
+        cursor.execute("SELECT MACAddress, IPAddress, SiteID FROM IPLeases WHERE EndTime IS NULL")
+        self._lease_by_mac = {}
+        self._lease_by_ip = {}
+        for row in cursor.fetchall():
+            self._lease_by_mac[row.MACAddress] = (row.SiteID, row.IPAddress)
+            self._lease_by_ip[(row.SiteID, row.IPAddress)] = row.MACAddress
+
+    def _end_lease(self, cursor, mac_address: str, timestamp: datetime):
+        """End a device's open lease, if it holds one"""
+        if self._lease_by_mac is not None:
+            if mac_address not in self._lease_by_mac:
+                return
+            self._lease_by_ip.pop(self._lease_by_mac.pop(mac_address), None)
+        cursor.execute("""
+            UPDATE IPLeases SET EndTime = ?
+            WHERE MACAddress = ? AND EndTime IS NULL
+        """, timestamp, mac_address)
+
+    def _record_ip_changes(self, cursor, devices: Dict[str, Device], timestamp: datetime,
+                           site_id: Optional[str] = None):
+        """
+        Start a lease for every device seen with a different IP than before
+        
+        Only changes are written: a device keeps its lease while it reports
+        the same IP. A lease ends when its device disconnects, is seen with
+        another IP, or another device at the same site is seen with its IP.
+        
+        Args:
+            cursor: Database cursor
+            devices: Devices in the scan
+            timestamp: Scan time
+            site_id: Site that ran the scan
+        """
+        if self._lease_by_mac is None:
+            self._load_open_leases(cursor)
+        for mac, device in devices.items():
+            if not device.ip_address:
+                continue
+            key = (site_id, device.ip_address)
+            if self._lease_by_mac.get(mac) == key:
+                continue
+            previous_holder = self._lease_by_ip.get(key)
+            for holder in (mac, previous_holder):
+                if holder is not None:
+                    self._end_lease(cursor, holder, timestamp)
+            cursor.execute("""
+                INSERT INTO IPLeases (IPAddress, MACAddress, SiteID, StartTime)
+                VALUES (?, ?, ?, ?)
+            """, device.ip_address, mac, site_id, timestamp)
+            self._lease_by_mac[mac] = key
+            self._lease_by_ip[key] = mac
+
+    def _record_addresses(self, cursor, devices: Dict[str, Device], timestamp: datetime):
+        """
+        Record every address of the devices in the scan
+        
+        New addresses are inserted in one batch; known ones only have
+        LastSeen moved forward once it is ADDRESS_REFRESH old, so a scan of
+        unchanged devices writes nothing. Only addresses written within
+        ADDRESS_REFRESH are cached; for the others, the stored addresses of
+        their devices are read.
+        
+        Args:
+            cursor: Database cursor
+            devices: Devices in the scan
+            timestamp: Scan time
+        """
+        seen = {key: last_seen for key, last_seen in self._address_seen.items()
+                if timestamp - last_seen < ADDRESS_REFRESH}
+        missing = sorted({mac for mac, device in devices.items()
+                          if any((mac, address) not in seen for address in device.addresses)})
+        stored: Dict[Tuple[str, str], datetime] = {}
+        for start in range(0, len(missing), ADDRESS_LOOKUP_BATCH):
+            batch = missing[start:start + ADDRESS_LOOKUP_BATCH]
+            cursor.execute(f"""
+                SELECT MACAddress, IPAddress, LastSeen FROM DeviceAddresses
+                WHERE MACAddress IN ({", ".join("?" * len(batch))})
+            """, *batch)
+            stored.update(((row.MACAddress, row.IPAddress), row.LastSeen)
+                          for row in cursor.fetchall())
+        inserts, refreshes = [], []
+        for mac, device in devices.items():
+            for address in device.addresses:
+                key = (mac, address)
+                if key in seen:
+                    continue
+                last_seen = stored.get(key)
+                if last_seen is None:
+                    try:
+                        family = ipaddress.ip_address(address).version
+                    except ValueError:
+                        continue
+                    inserts.append((mac, address, family, timestamp, timestamp))
+                elif timestamp - last_seen >= ADDRESS_REFRESH:
+                    refreshes.append((timestamp, mac, address))
+                else:
+                    seen[key] = last_seen
+                    continue
+                seen[key] = timestamp
+        self._address_seen = seen
+        if inserts:
+            cursor.executemany("""
+                INSERT INTO DeviceAddresses (MACAddress, IPAddress, Family, FirstSeen, LastSeen)
+                VALUES (?, ?, ?, ?, ?)
+            """, inserts)
+        if refreshes:
+            cursor.executemany("""
+                UPDATE DeviceAddresses SET LastSeen = ?
+                WHERE MACAddress = ? AND IPAddress = ?
+            """, refreshes)
+
+    def get_device_addresses(self, mac_address: str) -> List[dict]:
+        """
+        Get every address a device has used
+        
+        Args:
+            mac_address: Device MAC address
+            
+        Returns:
+            Addresses (address, family, first_seen, last_seen), most recently
+            seen first
+        """
+        cursor = self._cursor()
+        cursor.execute("""
+            SELECT IPAddress, Family, FirstSeen, LastSeen
+            FROM DeviceAddresses
+            WHERE MACAddress = ?
+            ORDER BY LastSeen DESC, IPAddress
+        """, mac_address.upper())
+        return [
+            {
+                'address': row.IPAddress,
+                'family': row.Family,
+                'first_seen': row.FirstSeen.isoformat(),
+                'last_seen': row.LastSeen.isoformat(),
+            }
+            for row in cursor.fetchall()
+        ]
+
+    def get_ip_holder(self, ip_address: str, at: Optional[datetime] = None,
+                      site_id: Optional[str] = None) -> Optional[dict]:
+        """
+        Find the device that held an IP at a point in time
+        
+        One seek on IX_IPLeases_Address: the latest lease of the IP that
+        started at or before ``at``.
+        
+        Args:
+            ip_address: IP address
+            at: Point in time (now if None)
+            site_id: Only leases seen by this site
+            
+        Returns:
+            The lease (mac_address, site_id, start_time, end_time), or None
+            if no device held the IP then
+        """
+        at = at or datetime.now()
+        site_filter = "AND SiteID = ? " if site_id is not None else ""
+        params = [ip_address] + ([site_id] if site_id is not None else []) + [at]
+        cursor = self._cursor()
+        cursor.execute(f"""
+            SELECT TOP 1 MACAddress, SiteID, StartTime, EndTime
+            FROM IPLeases
+            WHERE IPAddress = ? {site_filter}AND StartTime <= ?
+            ORDER BY StartTime DESC
+        """, *params)
+        row = cursor.fetchone()
+        if row is None or (row.EndTime is not None and row.EndTime <= at):
+            return None
+        return {
+            'mac_address': row.MACAddress,
+            'site_id': row.SiteID,
+            'start_time': row.StartTime.isoformat(),
+            'end_time': row.EndTime.isoformat() if row.EndTime else None,
+        }
+
+    def update_device_enrichment(self, results: List["EnrichmentJob"]) -> int:
+        """
+        Write enrichment results in one transaction
+        
+        Hostname and vendor replace stored values when found; DeviceType is
+        only filled in if not already set, so manual classifications win.
+        
+        Args:
+            results: Enriched devices
+            
+        Returns:
+            Number of rows written
+        """
+        rows = [
+            (job.hostname, job.vendor, job.device_type, job.mac_address)
+            for job in results
+        ]
+        if not rows:
+            return 0
+        with self._write_lock:
+            try:
+                cursor = self._cursor()
+                cursor.executemany("""
+                    UPDATE DeviceConnections
+                    SET Hostname = COALESCE(?, Hostname),
+                        Vendor = COALESCE(?, Vendor),
+                        DeviceType = COALESCE(DeviceType, ?)
+                    WHERE MACAddress = ?
+                """, rows)
+                self.connection.commit()
+                logger.debug(f"Enrichment written for {len(rows)} devices")
+                return len(rows)
+            except pyodbc.Error as e:
+                ERRORS_TOTAL.labels(component="database").inc()
+                logger.error(f"Error writing enrichment results: {e}", exc_info=True)
+                self.connection.rollback()
+                raise
+
+    def backfill_vendors(self, lookup: Callable[[str], Optional[str]],
+                         batch_size: int = 500) -> int:
+        """
+        Fill in Vendor for devices that do not have one
+        
+        Args:
+            lookup: MAC -> vendor name function
+            batch_size: Rows updated per round trip
+            
+        Returns:
+            Number of devices updated
+        """
+        with self._write_lock:
+            return self._backfill_vendors(lookup, batch_size)
+
+    def _backfill_vendors(self, lookup, batch_size):
+        try:
+            cursor = self._cursor()
+            cursor.execute("SELECT MACAddress FROM DeviceConnections WHERE Vendor IS NULL")
+            updates = []
+            for (mac_address,) in cursor.fetchall():
+                vendor = lookup(mac_address)
+                if vendor:
+                    updates.append((vendor, mac_address))
+            
+            for start in range(0, len(updates), batch_size):
+                cursor.executemany(
+                    "UPDATE DeviceConnections SET Vendor = ? WHERE MACAddress = ?",
+                    updates[start:start + batch_size]
+                )
+            self.connection.commit()
+            logger.info(f"Vendor backfilled for {len(updates)} devices")
+            return len(updates)
+        except pyodbc.Error as e:
+            logger.error(f"Error backfilling vendors: {e}", exc_info=True)
+            self.connection.rollback()
+            raise
+
+    def get_device_sessions(self, mac_address: str, since: Optional[datetime] = None,
+                            until: Optional[datetime] = None,
+                            limit: Optional[int] = 100) -> List[DeviceSession]:
+        """
+        Get a device's sessions, newest first
+        
+        Args:
+            mac_address: Device MAC address
+            since: Only sessions still connected at or after this time
+            until: Only sessions started before this time
+            limit: Most sessions returned (None for all in range)
+            
+        Returns:
+            Sessions overlapping the range
+        """
+        filters, params = ["MACAddress = ?"], [mac_address.upper()]
+        if until is not None:
+            filters.append("StartTime < ?")
+            params.append(until)
+        if since is not None:
+            filters.append("(EndTime IS NULL OR EndTime >= ?)")
+            params.append(since)
+        top = f"TOP {int(limit)} " if limit is not None else ""
+        cursor = self._cursor()
+        cursor.execute(f"""
+            SELECT {top}IPAddress, StartTime, EndTime
+            FROM DeviceSessions
+            WHERE {' AND '.join(filters)}
+            ORDER BY StartTime DESC
+        """, *params)
+        return [
+            DeviceSession(mac_address.upper(), row.IPAddress, row.StartTime, row.EndTime)
+            for row in cursor.fetchall()
+        ]
+
+    def backfill_sessions(self, batch_size: int = 1000) -> int:
+        """
+        Rebuild DeviceSessions from ConnectionLog
+        
+        Runs as one transaction, so readers see either the old or the
+        rebuilt sessions.
+        
+        Args:
+            batch_size: Sessions inserted per round trip
+            
+        Returns:
+            Number of sessions written
+        """
+        with self._write_lock:
+            return self._backfill_sessions(batch_size)
+
+    def _backfill_sessions(self, batch_size):
+        # Events are streamed on a second connection while this one writes
+        reader = self.open_connection()
+        try:
+            cursor = self._cursor()
+            cursor.execute("SELECT MACAddress, IsConnected, LastSeen FROM DeviceConnections")
+            devices = {row[0]: (bool(row[1]), row[2]) for row in cursor.fetchall()}
+            cursor.execute("DELETE FROM DeviceSessions")
+
+            events = reader.cursor()
+            events.execute("""
+                SELECT MACAddress, IPAddress, EventType, EventTime
+                FROM ConnectionLog
+                ORDER BY MACAddress, EventTime, LogID
+            """)
+
+            def rows():
+                while True:
+                    chunk = events.fetchmany(batch_size)
+                    if not chunk:
+                        return
+                    yield from chunk
+
+            insert = """
+                INSERT INTO DeviceSessions (MACAddress, IPAddress, StartTime, EndTime)
+                VALUES (?, ?, ?, ?)
+            """
+            written = 0
+            batch = []
+            for session in pair_events(rows(), devices):
+                batch.append((session.mac_address, session.ip_address,
+                              session.start_time, session.end_time))
+                if len(batch) >= batch_size:
+                    cursor.executemany(insert, batch)
+                    written += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany(insert, batch)
+                written += len(batch)
+            self.connection.commit()
+            self.track_sessions = True
+            logger.info(f"Backfilled {written} device sessions")
+            return written
+        except pyodbc.Error as e:
+            logger.error(f"Error backfilling sessions: {e}", exc_info=True)
+            self.connection.rollback()
+            raise
+        finally:
+            reader.close()
+
     def get_device_count(self) -> Dict[str, int]:
         """
         Get count of connected and total devices
@@ -195,7 +837,7 @@ class DatabaseManager:
             Dictionary with 'connected' and 'total' counts
         """
         try:
-            cursor = self.connection.cursor()
+            cursor = self._cursor()
             
             cursor.execute("SELECT COUNT(*) FROM DeviceConnections WHERE IsConnected = 1")
             connected = cursor.fetchone()[0]
@@ -0,0 +1,124 @@
+"""
+Disconnect debouncing
+
+A connected device that misses a scan is only reported as disconnected once
+it has been missing for N consecutive scans or for T seconds, whichever comes
+first, and the disconnect is dated to its first missed scan. Only devices
+with an in-flight miss are tracked, and the counters are persisted so a
+restart does not reset them.
+"""
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class DisconnectDebouncer:
+    """Tracks consecutive misses of connected devices"""
+
+    def __init__(self, miss_threshold: int = 0, grace_seconds: float = 0.0,
+                 state_file: Optional[str] = None):
+        """
+        Initialize disconnect debouncer
+
+        Args:
+            miss_threshold: Consecutive missed scans that make a disconnect
+                (0: no scan limit)
+            grace_seconds: Seconds missing that make a disconnect (0: no
+                time limit). With neither limit, one miss is a disconnect
+            state_file: JSON file the miss counters are persisted to
+        """
+        self.miss_threshold = max(0, miss_threshold)
+        self.grace_seconds = max(0.0, grace_seconds)
+        self.state_file = state_file
+        # MAC -> (consecutive misses, timestamp of first miss)
+        self.misses: Dict[str, Tuple[int, float]] = {}
+        self._dirty = False
+
+    @property
+    def enabled(self) -> bool:
+        """True if disconnects are delayed at all"""
+        # With N = 1, the first miss always reaches the scan limit
+        return self.miss_threshold > 1 or (self.miss_threshold == 0 and self.grace_seconds > 0)
+
+    def confirm(self, missing: Set[str], timestamp: datetime) -> Dict[str, datetime]:
+        """
+        Record a scan and decide which missing devices are disconnected
+
+        Args:
+            missing: MACs marked connected that did not answer this scan
+            timestamp: Scan time
+
+        Returns:
+            MAC -> time of the first missed scan, for the devices whose
+            disconnection is confirmed
+        """
+        if not self.enabled:
+            return {mac: timestamp for mac in missing}
+
+        now = timestamp.timestamp()
+        confirmed: Dict[str, datetime] = {}
+        pending: Dict[str, Tuple[int, float]] = {}
+
+        for mac in missing:
+            count, first_missed = self.misses.get(mac, (0, now))
+            count += 1
+            if ((self.miss_threshold and count >= self.miss_threshold) or
+                    (self.grace_seconds and now - first_missed >= self.grace_seconds)):
+                confirmed[mac] = datetime.fromtimestamp(first_missed)
+            else:
+                pending[mac] = (count, first_missed)
+
+        # Devices that answered again (or were confirmed) drop out here
+        if pending != self.misses:
+            self.misses = pending
+            self._dirty = True
+
+        if pending:
+            logger.debug(f"{len(pending)} device(s) missing, disconnect pending")
+        return confirmed
+
+    def clear(self):
+        """Forget all in-flight misses"""
+        if self.misses:
+            self.misses = {}
+            self._dirty = True
+
+    def to_dict(self) -> dict:
+        """Serialize the miss counters"""
+        return {mac: [count, first] for mac, (count, first) in self.misses.items()}
+
+    def restore(self, data: dict):
+        """Restore miss counters serialized by to_dict()"""
+        self.misses = {mac: (int(count), float(first)) for mac, (count, first) in data.items()}
+        self._dirty = False
+
+    def load(self):
+        """Load persisted miss counters, if any"""
+        if not self.state_file or not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, "r", encoding="utf-8") as fh:
+                self.restore(json.load(fh))
+            logger.info(f"Restored {len(self.misses)} pending disconnect(s)")
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load disconnect state from {self.state_file}: {e}")
+
+    def save(self):
+        """Persist the miss counters if they changed"""
+        if not self.state_file or not self._dirty:
+            return
+        try:
+            directory = os.path.dirname(self.state_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = self.state_file + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                json.dump(self.to_dict(), fh)
+            os.replace(tmp_path, self.state_file)
+            self._dirty = False
+        except OSError as e:
+            logger.warning(f"Could not save disconnect state to {self.state_file}: {e}")
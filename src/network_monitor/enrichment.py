@@ -0,0 +1,380 @@
+"""
+Asynchronous device enrichment
+
+Reverse DNS, vendor lookup and device type detection run off the scan path.
+Devices that are new or whose IP changed are queued after each scan; worker
+threads run them through the stages, each with its own cache and concurrency
+limit, and a writer thread batches the results back to the database.
+"""
+import logging
+import queue
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from .metrics import (
+    REGISTRY, Counter, Gauge, CACHE_HITS_TOTAL, CACHE_MISSES_TOTAL, DNS_LOOKUP_SECONDS,
+    ERRORS_TOTAL,
+)
+from .scanner import Device, NetworkScanner
+
+logger = logging.getLogger(__name__)
+
+ENRICHMENT_QUEUE = REGISTRY.register(Gauge(
+    "network_monitor_enrichment_queue_depth",
+    "Devices waiting for enrichment",
+))
+ENRICHMENT_DROPPED = REGISTRY.register(Counter(
+    "network_monitor_enrichment_dropped_total",
+    "Devices not enriched because the queue was full",
+))
+ENRICHMENT_WRITTEN = REGISTRY.register(Counter(
+    "network_monitor_enrichment_written_total",
+    "Enrichment results written to the database",
+))
+
+
+@dataclass
+class EnrichmentJob:
+    """A device moving through the enrichment stages"""
+    mac_address: str
+    ip_address: str
+    hostname: Optional[str] = None
+    vendor: Optional[str] = None
+    device_type: Optional[str] = None
+
+
+class Stage:
+    """
+    One enrichment step with a TTL cache and a concurrency limit
+
+    Subclasses implement ``key`` (cache key for a job, or None to skip the
+    stage) and ``compute`` (the uncached work), and ``apply`` to store the
+    value on the job.
+    """
+
+    name = "stage"
+    max_cache_entries = 65536
+
+    def __init__(self, cache_ttl: float = 3600, concurrency: int = 4):
+        self.cache_ttl = cache_ttl
+        self._cache: Dict[object, Tuple[object, float]] = {}
+        self._slots = threading.BoundedSemaphore(max(1, concurrency))
+
+    def run(self, job: EnrichmentJob):
+        key = self.key(job)
+        if key is None:
+            return
+        now = time.monotonic()
+        cached = self._cache.get(key)
+        if cached is not None and cached[1] > now:
+            CACHE_HITS_TOTAL.labels(cache=self.name).inc()
+            self.apply(job, cached[0])
+            return
+
+        CACHE_MISSES_TOTAL.labels(cache=self.name).inc()
+        with self._slots:
+            value = self.compute(job)
+        if len(self._cache) >= self.max_cache_entries:
+            self._cache = {k: v for k, v in list(self._cache.items()) if v[1] > now}
+        if self.cache_ttl > 0:
+            self._cache[key] = (value, now + self.cache_ttl)
+        self.apply(job, value)
+
+    def cached_items(self) -> Dict[object, object]:
+        """Unexpired cache entries"""
+        now = time.monotonic()
+        return {key: value for key, (value, expires) in list(self._cache.items()) if expires > now}
+
+    def export_cache(self) -> Dict[object, Tuple[object, float]]:
+        """Unexpired cache entries with wall-clock (time.time) expiry, for persisting"""
+        offset = time.time() - time.monotonic()
+        now = time.monotonic()
+        return {key: (value, expires + offset)
+                for key, (value, expires) in list(self._cache.items()) if expires > now}
+
+    def restore_cache(self, entries: Dict[object, Tuple[object, float]]):
+        """Load entries produced by export_cache(), dropping expired ones"""
+        offset = time.monotonic() - time.time()
+        now = time.monotonic()
+        for key, (value, expires) in entries.items():
+            if expires + offset > now:
+                self._cache[key] = (value, expires + offset)
+
+    def key(self, job: EnrichmentJob):
+        raise NotImplementedError
+
+    def compute(self, job: EnrichmentJob):
+        raise NotImplementedError
+
+    def apply(self, job: EnrichmentJob, value):
+        raise NotImplementedError
+
+
+class ReverseDnsStage(Stage):
+    """Hostname from a PTR lookup"""
+
+    name = "hostname"
+
+    def __init__(self, cache_ttl: float = 300, concurrency: int = 8,
+                 resolver: Callable[[str], Optional[str]] = NetworkScanner._resolve_hostname):
+        super().__init__(cache_ttl, concurrency)
+        self.resolver = resolver
+
+    def key(self, job):
+        return job.ip_address
+
+    def compute(self, job):
+        with DNS_LOOKUP_SECONDS.time():
+            return self.resolver(job.ip_address)
+
+    def apply(self, job, value):
+        job.hostname = value
+
+
+class VendorStage(Stage):
+    """Vendor from the OUI index"""
+
+    name = "vendor"
+
+    def __init__(self, lookup: Callable[[str], Optional[str]], cache_ttl: float = 86400):
+        super().__init__(cache_ttl, concurrency=64)
+        self.lookup = lookup
+
+    def key(self, job):
+        return None if job.vendor else job.mac_address[:13]
+
+    def compute(self, job):
+        return self.lookup(job.mac_address)
+
+    def apply(self, job, value):
+        job.vendor = job.vendor or value
+
+
+# (device type, pattern matched against the hostname, pattern matched against the vendor)
+DEVICE_TYPE_RULES: Sequence[Tuple[str, Optional[str], Optional[str]]] = (
+    ("Phone", r"iphone|android|pixel|galaxy|oneplus|xiaomi|redmi|huawei-p", None),
+    ("Tablet", r"ipad|tablet|kindle|galaxy-tab", None),
+    ("Laptop", r"macbook|laptop|thinkpad|notebook|surface|chromebook", None),
+    ("Desktop", r"desktop|imac|workstation|\bpc\b|-pc\b", None),
+    ("Printer", r"printer|\bprn|laserjet|officejet|deskjet", r"epson|brother|canon|lexmark|xerox|kyocera"),
+    ("Media", r"\btv\b|-tv\b|roku|chromecast|firetv|appletv|apple-tv|sonos|shield",
+     r"roku|sonos|vizio"),
+    ("Network", r"router|gateway|switch|\bap\b|-ap\b|access-point|firewall",
+     r"ubiquiti|cisco|juniper|aruba|mikrotik|netgear|tp-link|fortinet"),
+    ("Storage", r"\bnas\b|-nas\b|synology|qnap|diskstation", r"synology|qnap"),
+    ("Camera", r"camera|\bcam\b|-cam\b|doorbell|nvr", r"hikvision|dahua|axis|reolink"),
+    ("IoT", r"raspberry|esp32|esp8266|tasmota|shelly|hue|nest|echo|alexa",
+     r"raspberry|espressif|tuya|shelly|signify"),
+    ("Game Console", r"xbox|playstation|\bps[45]\b|nintendo|switch-", r"nintendo"),
+)
+
+
+class DeviceTypeStage(Stage):
+    """Device type guessed from hostname and vendor"""
+
+    name = "device_type"
+
+    def __init__(self, rules=DEVICE_TYPE_RULES, cache_ttl: float = 86400):
+        super().__init__(cache_ttl, concurrency=64)
+        self.rules = [
+            (device_type,
+             re.compile(hostname, re.IGNORECASE) if hostname else None,
+             re.compile(vendor, re.IGNORECASE) if vendor else None)
+            for device_type, hostname, vendor in rules
+        ]
+
+    def key(self, job):
+        if not job.hostname and not job.vendor:
+            return None
+        return job.hostname, job.vendor
+
+    def compute(self, job):
+        for device_type, hostname, vendor in self.rules:
+            if hostname and job.hostname and hostname.search(job.hostname):
+                return device_type
+        for device_type, hostname, vendor in self.rules:
+            if vendor and job.vendor and vendor.search(job.vendor):
+                return device_type
+        return None
+
+    def apply(self, job, value):
+        job.device_type = value
+
+
+class EnrichmentPipeline:
+    """Queue, workers and batched writer for device enrichment"""
+
+    def __init__(self, stages: List[Stage],
+                 writer: Callable[[List[EnrichmentJob]], None],
+                 workers: int = 4, queue_size: int = 1000,
+                 batch_size: int = 100, flush_interval: float = 2.0,
+                 refresh_after: float = 3600,
+                 on_results: Optional[Callable[[List[EnrichmentJob]], None]] = None):
+        """
+        Initialize enrichment pipeline
+
+        Args:
+            stages: Stages run in order for each device
+            writer: Persists a batch of results
+            workers: Worker threads running the stages
+            queue_size: Maximum queued devices; further submissions are dropped
+            batch_size: Maximum results per write
+            flush_interval: Maximum seconds a result waits to be written
+            refresh_after: Seconds before an unchanged device is enriched again
+            on_results: Optional callback invoked with each written batch
+        """
+        self.stages = stages
+        self.writer = writer
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.refresh_after = refresh_after
+        self.on_results = on_results
+
+        self._jobs: "queue.Queue[Optional[EnrichmentJob]]" = queue.Queue(maxsize=queue_size)
+        # None wakes the writer to notice a stop
+        self._results: "queue.Queue[Optional[EnrichmentJob]]" = queue.Queue()
+        # MAC -> (IP, monotonic time) of the last queued enrichment
+        self._submitted: Dict[str, Tuple[str, float]] = {}
+        self._submitted_lock = threading.Lock()
+        self._workers: List[threading.Thread] = []
+        self._writer: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        """Start worker and writer threads"""
+        self._stop_event.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"enrichment-{i}", daemon=True)
+            thread.start()
+            self._workers.append(thread)
+        self._writer = threading.Thread(target=self._write_loop, name="enrichment-writer",
+                                        daemon=True)
+        self._writer.start()
+        logger.info(f"Enrichment pipeline started with {self.workers} workers")
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Stop the threads, flushing results that are already computed
+
+        Jobs no worker has started are dropped (the next scan queues them
+        again); jobs in progress finish and are written before the writer
+        stops.
+
+        Args:
+            timeout: Seconds to wait for the workers, and then for the writer
+        """
+        self._discard_pending()
+        deadline = time.monotonic() + timeout
+        for _ in self._workers:
+            try:
+                self._jobs.put(None, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                break
+        for thread in self._workers:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        # Only now can no more results arrive
+        self._stop_event.set()
+        self._results.put(None)
+        if self._writer is not None:
+            self._writer.join(timeout)
+        self._workers, self._writer = [], None
+
+    def _discard_pending(self):
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                with self._submitted_lock:
+                    self._submitted.pop(job.mac_address, None)
+        ENRICHMENT_QUEUE.set(0)
+
+    def submit_scan(self, devices: Iterable[Device]) -> int:
+        """
+        Queue devices that are new, changed IP or are due for a refresh
+
+        Args:
+            devices: Devices from a committed scan
+
+        Returns:
+            Number of devices queued
+        """
+        queued = 0
+        now = time.monotonic()
+        for device in devices:
+            with self._submitted_lock:
+                previous = self._submitted.get(device.mac_address)
+                if (previous is not None and previous[0] == device.ip_address
+                        and now - previous[1] < self.refresh_after):
+                    continue
+                self._submitted[device.mac_address] = (device.ip_address, now)
+            job = EnrichmentJob(device.mac_address, device.ip_address,
+                                device.hostname, device.vendor)
+            try:
+                self._jobs.put_nowait(job)
+                queued += 1
+            except queue.Full:
+                ENRICHMENT_DROPPED.inc()
+                with self._submitted_lock:
+                    self._submitted.pop(device.mac_address, None)
+        ENRICHMENT_QUEUE.set(self._jobs.qsize())
+        return queued
+
+    def _work(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            try:
+                for stage in self.stages:
+                    stage.run(job)
+                self._results.put(job)
+            except Exception as e:
+                ERRORS_TOTAL.labels(component="enrichment").inc()
+                logger.error(f"Enrichment failed for {job.mac_address}: {e}", exc_info=True)
+                with self._submitted_lock:
+                    self._submitted.pop(job.mac_address, None)
+            finally:
+                ENRICHMENT_QUEUE.set(self._jobs.qsize())
+
+    def _write_loop(self):
+        batch: List[EnrichmentJob] = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            stopping = self._stop_event.is_set()
+            try:
+                # Once stopping, only drain what is already queued
+                result = self._results.get(
+                    timeout=0.0 if stopping else max(0.0, deadline - time.monotonic()))
+                if result is not None:
+                    batch.append(result)
+            except queue.Empty:
+                pass
+
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline or stopping):
+                self._flush(batch)
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+            if stopping and self._results.empty():
+                if batch:
+                    self._flush(batch)
+                return
+
+    def _flush(self, batch: List[EnrichmentJob]):
+        try:
+            self.writer(batch)
+            ENRICHMENT_WRITTEN.inc(len(batch))
+            if self.on_results is not None:
+                self.on_results(batch)
+        except Exception as e:
+            ERRORS_TOTAL.labels(component="enrichment").inc()
+            logger.error(f"Failed to write {len(batch)} enrichment results: {e}", exc_info=True)
+            # Let the next scan queue these devices again
+            with self._submitted_lock:
+                for job in batch:
+                    self._submitted.pop(job.mac_address, None)
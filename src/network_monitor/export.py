@@ -0,0 +1,323 @@
+"""
+Streaming bulk export of ConnectionLog and DeviceConnections
+
+Rows are read in keyset pages (``WHERE LogID > ? ORDER BY LogID``), each
+fetched with ``fetchmany``, and passed through generators that encode them
+as NDJSON, CSV or Parquet. Only one chunk is held in memory at a time, so
+time per row and memory stay flat however large the table is, and HTTP
+responses start as soon as the first chunk is encoded. Exports run on their
+own connection so a long download does not hold up scan writes.
+
+    python -m network_monitor.export events --format csv --since 2026-01-01 -o events.csv
+    python -m network_monitor.export devices --format parquet -o devices.parquet
+
+Parquet needs pyarrow (``pip install pyarrow``).
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import sys
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class ExportError(Exception):
+    """An export could not be produced"""
+
+
+@dataclass(frozen=True)
+class ExportTable:
+    """A table that can be exported"""
+    table: str
+    key: str
+    time_column: str
+    # (column, output name, type: int, str, bool or datetime)
+    columns: Tuple[Tuple[str, str, str], ...]
+
+
+TABLES = {
+    "events": ExportTable(
+        table="ConnectionLog",
+        key="LogID",
+        time_column="EventTime",
+        columns=(
+            ("LogID", "log_id", "int"),
+            ("MACAddress", "mac_address", "str"),
+            ("IPAddress", "ip_address", "str"),
+            ("EventType", "event_type", "str"),
+            ("EventTime", "event_time", "datetime"),
+        ),
+    ),
+    "devices": ExportTable(
+        table="DeviceConnections",
+        key="ConnectionID",
+        time_column="LastSeen",
+        columns=(
+            ("ConnectionID", "connection_id", "int"),
+            ("MACAddress", "mac_address", "str"),
+            ("IPAddress", "ip_address", "str"),
+            ("Hostname", "hostname", "str"),
+            ("DeviceName", "device_name", "str"),
+            ("DeviceType", "device_type", "str"),
+            ("Vendor", "vendor", "str"),
+            ("FirstSeen", "first_seen", "datetime"),
+            ("LastSeen", "last_seen", "datetime"),
+            ("IsConnected", "is_connected", "bool"),
+        ),
+    ),
+}
+
+
+def iter_rows(connection, table: ExportTable, since: Optional[datetime] = None,
+              until: Optional[datetime] = None, mac_address: Optional[str] = None,
+              page_size: int = 10000, chunk_size: int = 1000) -> Iterator[List[tuple]]:
+    """
+    Read a table in key order, one chunk at a time
+
+    Each page is a separate short query, so no locks or server resources are
+    held between pages while the consumer is slow.
+
+    Args:
+        connection: DB-API connection to read from
+        table: Table to read
+        since: Only rows with ``time_column`` at or after this time
+        until: Only rows with ``time_column`` before this time
+        mac_address: Only rows for this device
+        page_size: Rows per query
+        chunk_size: Rows per fetchmany call, and per yielded chunk
+
+    Yields:
+        Lists of at most ``chunk_size`` row tuples
+    """
+    columns = ", ".join(column for column, _, _ in table.columns)
+    filters, params = [f"{table.key} > ?"], []
+    if since is not None:
+        filters.append(f"{table.time_column} >= ?")
+        params.append(since)
+    if until is not None:
+        filters.append(f"{table.time_column} < ?")
+        params.append(until)
+    if mac_address is not None:
+        filters.append("MACAddress = ?")
+        params.append(mac_address.upper())
+    sql = (f"SELECT TOP {int(page_size)} {columns} FROM {table.table} "
+           f"WHERE {' AND '.join(filters)} ORDER BY {table.key}")
+
+    key_index = [column for column, _, _ in table.columns].index(table.key)
+    last_key = -1
+    cursor = connection.cursor()
+    try:
+        while True:
+            cursor.execute(sql, last_key, *params)
+            fetched = 0
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                fetched += len(rows)
+                last_key = rows[-1][key_index]
+                yield [tuple(row) for row in rows]
+            if fetched < page_size:
+                return
+    finally:
+        cursor.close()
+
+
+def _text(value) -> Optional[str]:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def ndjson_chunks(chunks: Iterator[List[tuple]], table: ExportTable) -> Iterator[bytes]:
+    """Encode row chunks as newline-delimited JSON"""
+    names = [name for _, name, _ in table.columns]
+    bools = [kind == "bool" for _, _, kind in table.columns]
+    for rows in chunks:
+        lines = []
+        for row in rows:
+            values = [bool(v) if b and v is not None else _text(v) for v, b in zip(row, bools)]
+            lines.append(json.dumps(dict(zip(names, values)), separators=(",", ":")))
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def csv_chunks(chunks: Iterator[List[tuple]], table: ExportTable) -> Iterator[bytes]:
+    """Encode row chunks as CSV with a header line"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow([name for _, name, _ in table.columns])
+    yield buffer.getvalue().encode("utf-8")
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_text(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands out what was written since the last take()"""
+
+    def __init__(self):
+        super().__init__()
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def parquet_chunks(chunks: Iterator[List[tuple]], table: ExportTable) -> Iterator[bytes]:
+    """Encode row chunks as Parquet, one row group per chunk"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {"int": pa.int64(), "str": pa.string(), "bool": pa.bool_(),
+             "datetime": pa.timestamp("us")}
+    schema = pa.schema([(name, types[kind]) for _, name, kind in table.columns])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        for rows in chunks:
+            columns = list(zip(*rows))
+            arrays = []
+            for values, (_, _, kind), field in zip(columns, table.columns, schema):
+                if kind == "bool":
+                    # BIT columns arrive as 0/1 from some drivers
+                    values = [None if v is None else bool(v) for v in values]
+                arrays.append(pa.array(values, type=field.type))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+ENCODERS = {
+    "ndjson": ndjson_chunks,
+    "csv": csv_chunks,
+    "parquet": parquet_chunks,
+}
+
+
+def export(connect: Callable[[], object], kind: str, fmt: str = "ndjson",
+           since: Optional[datetime] = None, until: Optional[datetime] = None,
+           mac_address: Optional[str] = None, page_size: int = 10000,
+           chunk_size: int = 1000) -> Iterator[bytes]:
+    """
+    Stream a table export
+
+    The connection is opened when the first chunk is requested, which is
+    empty, and closed when the stream ends or is abandoned.
+
+    Args:
+        connect: Opens the connection to read from
+        kind: events or devices
+        fmt: ndjson, csv or parquet
+        since: Only rows at or after this time
+        until: Only rows before this time
+        mac_address: Only rows for this device
+        page_size: Rows per query
+        chunk_size: Rows per fetchmany call and per encoded chunk
+
+    Returns:
+        Iterator of encoded chunks
+
+    Raises:
+        ExportError: If the table or format is unknown
+    """
+    table = TABLES.get(kind)
+    if table is None:
+        raise ExportError(f"Unknown export: {kind} (choose from {', '.join(TABLES)})")
+    encoder = ENCODERS.get(fmt)
+    if encoder is None:
+        raise ExportError(f"Unknown format: {fmt} (choose from {', '.join(FORMATS)})")
+
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ExportError("Parquet export needs pyarrow: pip install pyarrow") from None
+
+    def stream():
+        connection = connect()
+        try:
+            # Lets a caller start its response as soon as the connection is open
+            yield b""
+            rows = iter_rows(connection, table, since, until, mac_address, page_size, chunk_size)
+            for chunk in encoder(rows, table):
+                if chunk:
+                    yield chunk
+        finally:
+            connection.close()
+
+    return stream()
+
+
+def parse_time(value: Optional[str]) -> Optional[datetime]:
+    """
+    Parse an ISO 8601 date or date-time argument
+
+    Raises:
+        ValueError: If the value is not ISO 8601
+    """
+    return datetime.fromisoformat(value) if value else None
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    """Command-line export"""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("kind", choices=sorted(TABLES))
+    parser.add_argument("--format", choices=sorted(FORMATS), default="ndjson")
+    parser.add_argument("--since", type=parse_time, help="ISO date/time, inclusive")
+    parser.add_argument("--until", type=parse_time, help="ISO date/time, exclusive")
+    parser.add_argument("--mac", help="Only this device")
+    parser.add_argument("--page-size", type=int, default=10000)
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    from .config import Config
+    import pyodbc
+
+    config = Config.load()
+    try:
+        chunks = export(
+            lambda: pyodbc.connect(config.database.get_connection_string()),
+            args.kind, args.format, args.since, args.until, args.mac, args.page_size
+        )
+    except ExportError as e:
+        parser.exit(1, f"{e}\n")
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
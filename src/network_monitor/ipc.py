@@ -0,0 +1,434 @@
+"""
+Local IPC between the scanning process and web processes
+
+The process that scans publishes its device state over a Unix domain socket
+(or ``tcp://host:port`` where Unix sockets are unavailable). Messages are
+newline-delimited JSON.
+
+Connections are not authenticated, so the channel stays on the host: the
+Unix socket is only accessible to its owner and TCP addresses must be
+loopback addresses.
+
+A connection opens with one request line:
+    {"type": "subscribe"}
+        The server replies with a full snapshot, then a delta for every
+        published state change and a status heartbeat when idle.
+    {"type": "command", "command": "scan", "args": {...}}
+        The server runs the command and replies with one line:
+        {"type": "reply", "ok": true, "result": ...} or
+        {"type": "reply", "ok": false, "error": "..."}.
+"""
+import ipaddress
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from .state import DeviceRecord, DeviceStateStore, StateSnapshot
+
+logger = logging.getLogger(__name__)
+
+Address = Union[str, Tuple[str, int]]
+CommandHandler = Callable[[dict], object]
+
+
+class IpcError(Exception):
+    """A command could not be delivered or was rejected"""
+
+
+def parse_address(address: str) -> Tuple[int, Address]:
+    """
+    Parse an IPC address
+
+    Args:
+        address: Socket path, or tcp://host:port
+
+    Returns:
+        (socket family, address)
+
+    Raises:
+        ValueError: If a TCP address is not a loopback address
+    """
+    if address.startswith("tcp://"):
+        host, _, port = address[len("tcp://"):].rpartition(":")
+        host = host or "127.0.0.1"
+        if host != "localhost":
+            try:
+                loopback = ipaddress.ip_address(host).is_loopback
+            except ValueError:
+                loopback = False
+            if not loopback:
+                raise ValueError(f"IPC commands are not authenticated; {address} must use "
+                                 f"a loopback address such as 127.0.0.1")
+        return socket.AF_INET, (host, int(port))
+    if not hasattr(socket, "AF_UNIX"):
+        raise ValueError(f"Unix sockets are not available; use tcp://host:port instead of {address}")
+    return socket.AF_UNIX, address
+
+
+def connect(address: str, timeout: Optional[float] = None) -> socket.socket:
+    """Open a client connection to an IPC address"""
+    family, target = parse_address(address)
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(target)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def encode(message: dict) -> bytes:
+    """Encode one message as a JSON line"""
+    return (json.dumps(message, separators=(",", ":"), default=str) + "\n").encode("utf-8")
+
+
+def _updated_at(snapshot: StateSnapshot) -> Optional[str]:
+    return snapshot.updated_at.isoformat() if snapshot.updated_at else None
+
+
+def snapshot_message(snapshot: StateSnapshot, status: dict) -> dict:
+    """Full state message sent to a new subscriber"""
+    return {
+        "type": "snapshot",
+        "version": snapshot.version,
+        "updated_at": _updated_at(snapshot),
+        "records": [record.to_dict() for record in snapshot.devices.values()],
+        "status": status,
+    }
+
+
+def delta_message(previous: StateSnapshot, current: StateSnapshot, status: dict) -> dict:
+    """
+    Changes between two snapshots
+
+    Snapshots are copy-on-write, so unchanged records are the same objects and
+    the comparison is an identity check per device.
+    """
+    records = [
+        record.to_dict() for mac, record in current.devices.items()
+        if previous.devices.get(mac) is not record
+    ]
+    removed = [mac for mac in previous.devices if mac not in current.devices]
+    return {
+        "type": "delta",
+        "version": current.version,
+        "updated_at": _updated_at(current),
+        "records": records,
+        "removed": removed,
+        "status": status,
+    }
+
+
+class _TcpServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+class _Subscriber:
+    """Outgoing message queue of one subscribed connection"""
+
+    def __init__(self, max_pending: int):
+        self.queue: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=max_pending)
+        self.overflowed = False
+
+    def send(self, data: bytes):
+        try:
+            self.queue.put_nowait(data)
+        except queue.Full:
+            # A slow reader is disconnected; it resubscribes and gets a snapshot
+            self.overflowed = True
+
+
+class StatePublisher:
+    """Serves a DeviceStateStore and control commands to other processes"""
+
+    def __init__(self, store: DeviceStateStore, address: str,
+                 commands: Optional[Dict[str, CommandHandler]] = None,
+                 status: Optional[Callable[[], dict]] = None,
+                 heartbeat: float = 5.0, max_pending: int = 256):
+        """
+        Initialize state publisher
+
+        Args:
+            store: State to publish
+            address: Socket path, or tcp://host:port
+            commands: Command name -> handler taking the command arguments
+            status: Returns the status sent with every message
+            heartbeat: Seconds between status messages on an idle connection
+            max_pending: Messages buffered per subscriber before it is dropped
+        """
+        self.store = store
+        self.address = address
+        self.commands = dict(commands or {})
+        self.status = status or dict
+        self.heartbeat = heartbeat
+        self.max_pending = max_pending
+
+        self._server: Optional[socketserver.BaseServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._broadcaster: Optional[threading.Thread] = None
+        self._changes: "queue.Queue[Optional[StateSnapshot]]" = queue.Queue()
+        self._subscribers: List[_Subscriber] = []
+        self._subscribers_lock = threading.Lock()
+        self._last = store.snapshot()
+
+    def start(self):
+        """Bind the socket and start serving"""
+        family, target = parse_address(self.address)
+        handler = self._make_handler()
+        if family == socket.AF_UNIX:
+            directory = os.path.dirname(target)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            if os.path.exists(target):
+                # Left over from a process that did not shut down cleanly
+                os.unlink(target)
+            self._server = _UnixServer(target, handler)
+            os.chmod(target, 0o600)
+        else:
+            self._server = _TcpServer(target, handler)
+
+        self._last = self.store.snapshot()
+        self.store.subscribe(self._changes.put)
+        self._broadcaster = threading.Thread(target=self._broadcast, name="ipc-broadcast", daemon=True)
+        self._broadcaster.start()
+        self._thread = threading.Thread(target=self._server.serve_forever, name="ipc-server", daemon=True)
+        self._thread.start()
+        logger.info(f"Publishing device state on {self.address}")
+
+    def stop(self):
+        """Stop serving and disconnect subscribers"""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self.store.unsubscribe(self._changes.put)
+        self._changes.put(None)
+        with self._subscribers_lock:
+            for subscriber in self._subscribers:
+                subscriber.send(None)
+            self._subscribers = []
+        family, target = parse_address(self.address)
+        if family == socket.AF_UNIX and os.path.exists(target):
+            os.unlink(target)
+        self._server = None
+        logger.info("State publisher stopped")
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def _broadcast(self):
+        while True:
+            snapshot = self._changes.get()
+            if snapshot is None:
+                return
+            # Collapse a backlog into one delta
+            while not self._changes.empty():
+                newer = self._changes.get()
+                if newer is None:
+                    return
+                snapshot = newer
+            try:
+                with self._subscribers_lock:
+                    data = encode(delta_message(self._last, snapshot, self.status()))
+                    self._last = snapshot
+                    for subscriber in self._subscribers:
+                        subscriber.send(data)
+            except Exception as e:
+                logger.error(f"Failed to publish state change: {e}", exc_info=True)
+
+    def _register(self) -> _Subscriber:
+        subscriber = _Subscriber(self.max_pending)
+        with self._subscribers_lock:
+            subscriber.send(encode(snapshot_message(self._last, self.status())))
+            self._subscribers.append(subscriber)
+        return subscriber
+
+    def _unregister(self, subscriber: _Subscriber):
+        with self._subscribers_lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def _run_command(self, request: dict) -> dict:
+        name = request.get("command")
+        handler = self.commands.get(name)
+        if handler is None:
+            return {"type": "reply", "ok": False, "error": f"Unsupported command: {name}"}
+        try:
+            return {"type": "reply", "ok": True, "result": handler(request.get("args") or {})}
+        except Exception as e:
+            logger.error(f"IPC command {name} failed: {e}", exc_info=True)
+            return {"type": "reply", "ok": False, "error": str(e)}
+
+    def _make_handler(self):
+        publisher = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                try:
+                    request = json.loads(self.rfile.readline() or b"{}")
+                except ValueError:
+                    return
+                if request.get("type") == "command":
+                    self.wfile.write(encode(publisher._run_command(request)))
+                elif request.get("type") == "subscribe":
+                    self._stream(publisher._register())
+
+            def _stream(self, subscriber):
+                try:
+                    while not subscriber.overflowed:
+                        try:
+                            data = subscriber.queue.get(timeout=publisher.heartbeat)
+                        except queue.Empty:
+                            data = encode({"type": "status", "status": publisher.status()})
+                        if data is None:
+                            return
+                        self.wfile.write(data)
+                        self.wfile.flush()
+                except OSError:
+                    pass
+                finally:
+                    publisher._unregister(subscriber)
+
+        return Handler
+
+
+class StateSubscriber:
+    """Keeps a local DeviceStateStore in sync with a StatePublisher"""
+
+    def __init__(self, address: str, store: DeviceStateStore, heartbeat: float = 5.0,
+                 retry_interval: float = 2.0):
+        """
+        Initialize state subscriber
+
+        Args:
+            address: Publisher socket path, or tcp://host:port
+            store: Local state to update
+            heartbeat: Publisher heartbeat; three missed heartbeats drop the connection
+            retry_interval: Seconds between reconnection attempts
+        """
+        self.address = address
+        self.store = store
+        self.heartbeat = heartbeat
+        self.retry_interval = retry_interval
+        self.connected = False
+        self.status: dict = {}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._sock: Optional[socket.socket] = None
+
+    def start(self):
+        """Start following the publisher in a background thread"""
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="ipc-subscriber", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Disconnect and stop the background thread"""
+        self._stop_event.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.retry_interval + 1)
+
+    def wait_connected(self, timeout: float) -> bool:
+        """Wait until the first snapshot has been received"""
+        deadline = time.monotonic() + timeout
+        while not self.connected and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return self.connected
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self._follow()
+            except (OSError, ValueError) as e:
+                if self.connected:
+                    logger.warning(f"Lost connection to scanner at {self.address}: {e}")
+                else:
+                    logger.debug(f"Scanner at {self.address} not available: {e}")
+            finally:
+                self.connected = False
+                self._sock = None
+            self._stop_event.wait(self.retry_interval)
+
+    def _follow(self):
+        sock = connect(self.address, timeout=self.heartbeat * 3)
+        self._sock = sock
+        with sock, sock.makefile("rb") as reader:
+            sock.sendall(encode({"type": "subscribe"}))
+            for line in reader:
+                if self._stop_event.is_set():
+                    return
+                self.apply(json.loads(line))
+
+    def apply(self, message: dict):
+        """Apply one message from the publisher"""
+        kind = message.get("type")
+        if "status" in message:
+            self.status = message["status"]
+        if kind == "snapshot":
+            self.store.load(
+                [DeviceRecord.from_dict(record) for record in message["records"]],
+                updated_at=_parse_time(message.get("updated_at"))
+            )
+            if not self.connected:
+                logger.info(f"Following device state from {self.address}")
+            self.connected = True
+        elif kind == "delta":
+            self.store.merge(
+                [DeviceRecord.from_dict(record) for record in message["records"]],
+                removed=message.get("removed", ()),
+                updated_at=_parse_time(message.get("updated_at"))
+            )
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+def send_command(address: str, command: str, timeout: float = 60.0, **args) -> object:
+    """
+    Run a command in the publishing process
+
+    Args:
+        address: Publisher socket path, or tcp://host:port
+        command: Command name
+        timeout: Seconds to wait for the reply
+        **args: Command arguments
+
+    Returns:
+        The command's result
+
+    Raises:
+        IpcError: If the publisher is unreachable or the command failed
+    """
+    try:
+        with connect(address, timeout=timeout) as sock, sock.makefile("rb") as reader:
+            sock.sendall(encode({"type": "command", "command": command, "args": args}))
+            line = reader.readline()
+    except OSError as e:
+        raise IpcError(f"Scanner process at {address} is not reachable: {e}") from e
+    if not line:
+        raise IpcError(f"Scanner process at {address} closed the connection")
+    reply = json.loads(line)
+    if not reply.get("ok"):
+        raise IpcError(reply.get("error", "Command failed"))
+    return reply.get("result")
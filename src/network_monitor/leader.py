@@ -0,0 +1,150 @@
+"""
+Leader election between processes on one host
+
+Web workers started by a multi-process WSGI server compete for an exclusive
+lock on a file. The holder scans and publishes its state; the others follow
+it over IPC. The operating system releases the lock when the holder exits,
+so a follower takes over after a crash without any lease expiry.
+"""
+import logging
+import os
+import threading
+from typing import Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:  # POSIX
+    msvcrt = None
+
+logger = logging.getLogger(__name__)
+
+
+class FileLease:
+    """Exclusive, non-blocking lock on a file"""
+
+    def __init__(self, path: str):
+        """
+        Initialize file lease
+
+        Args:
+            path: Lock file; created if missing
+        """
+        self.path = path
+        self._fh = None
+
+    @property
+    def held(self) -> bool:
+        return self._fh is not None
+
+    def try_acquire(self) -> bool:
+        """
+        Take the lock if no other process holds it
+
+        Returns:
+            True if this process now holds the lock
+        """
+        if self._fh is not None:
+            return True
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        fh = open(self.path, "a+")
+        try:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            fh.close()
+            return False
+
+        # Record the holder for diagnostics
+        fh.seek(0)
+        fh.truncate()
+        fh.write(f"{os.getpid()}\n")
+        fh.flush()
+        self._fh = fh
+        return True
+
+    def release(self):
+        """Give up the lock"""
+        if self._fh is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+            else:
+                self._fh.seek(0)
+                msvcrt.locking(self._fh.fileno(), msvcrt.LK_UNLCK, 1)
+        except OSError as e:
+            logger.warning(f"Could not unlock {self.path}: {e}")
+        finally:
+            self._fh.close()
+            self._fh = None
+
+    def holder(self) -> Optional[int]:
+        """PID recorded by the current holder, if readable"""
+        try:
+            with open(self.path, "r") as fh:
+                return int(fh.read().strip() or 0) or None
+        except (OSError, ValueError):
+            return None
+
+
+class LeaderElection:
+    """Keeps trying to take a lease and runs a callback once it is won"""
+
+    def __init__(self, lease: FileLease, on_elected: Callable[[], None],
+                 retry_interval: float = 5.0):
+        """
+        Initialize leader election
+
+        Args:
+            lease: Lease that identifies the leader
+            on_elected: Called once, from the election thread, when this
+                process becomes leader
+            retry_interval: Seconds between attempts while another process leads
+        """
+        self.lease = lease
+        self.on_elected = on_elected
+        self.retry_interval = retry_interval
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self.lease.held
+
+    def start(self):
+        """Start competing for the lease in a background thread"""
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="leader-election", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop competing and release the lease if held"""
+        self._stop_event.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.retry_interval + 1)
+        self.lease.release()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            if self.lease.try_acquire():
+                logger.info(f"Elected scan leader (pid {os.getpid()})")
+                try:
+                    self.on_elected()
+                except Exception as e:
+                    logger.error(f"Failed to take over as leader: {e}", exc_info=True)
+                    self.lease.release()
+                    self._stop_event.wait(self.retry_interval)
+                    continue
+                return
+            self._stop_event.wait(self.retry_interval)
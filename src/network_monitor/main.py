@@ -5,6 +5,9 @@ import logging
 import sys
 from .config import Config
 from .monitor import NetworkMonitor
+from .metrics import start_http_server
+from .state import DeviceStateStore
+from .ipc import StatePublisher
 
 
 def setup_logging(config: Config):
@@ -39,9 +42,30 @@ def main():
         setup_logging(config)
         logger = logging.getLogger(__name__)
         
+        # Expose /metrics when a port is configured
+        if config.metrics.port:
+            start_http_server(config.metrics.port)
+        
         # Create and run monitor
-        monitor = NetworkMonitor(config)
-        monitor.run()
+        if config.process.scanner_mode == "process":
+            # Web dashboards follow this process's state over IPC
+            monitor = NetworkMonitor(config, state=DeviceStateStore())
+            monitor.state.load(monitor.database.get_device_records())
+            publisher = StatePublisher(
+                monitor.state,
+                config.process.ipc_address,
+                commands=monitor.control_commands(),
+                status=monitor.runtime_status,
+                heartbeat=config.process.heartbeat
+            )
+            publisher.start()
+            try:
+                monitor.run()
+            finally:
+                publisher.stop()
+        else:
+            monitor = NetworkMonitor(config)
+            monitor.run()
         
     except PermissionError:
         print("\n❌ ERROR: Permission Denied")
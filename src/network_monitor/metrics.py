@@ -0,0 +1,343 @@
+"""
+Lightweight Prometheus-style metrics
+
+Counters, gauges and histograms rendered in the Prometheus text exposition
+format. Everything is in-process and lock-protected, so the CLI monitor and
+the web dashboard can both expose the same metrics without extra dependencies.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the exposition format"""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Format a label set as {name="value",...}"""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value"""
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class for labelled metrics"""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values, **kwargs):
+        """
+        Get the child metric for a label set
+
+        Args:
+            values: Label values in declaration order
+            kwargs: Label values by name
+
+        Returns:
+            Child metric for the label set
+        """
+        if kwargs:
+            values = tuple(str(kwargs[name]) for name in self.labelnames)
+        else:
+            values = tuple(str(v) for v in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _default(self):
+        """Child for metrics declared without labels"""
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def collect(self) -> List[str]:
+        """Render this metric as exposition lines"""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        for values, child in sorted(self._children.items()):
+            lines.extend(child.samples(self.name, self.labelnames, values))
+        return lines
+
+
+class _ValueChild:
+    """A single float value"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = float(value)
+
+    def samples(self, name, labelnames, values) -> List[str]:
+        return [f"{name}{_format_labels(labelnames, values)} {_format_value(self.value)}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter"""
+
+    metric_type = "counter"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def inc(self, amount: float = 1.0):
+        """Increment the unlabelled counter"""
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+
+    metric_type = "gauge"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def set(self, value: float):
+        """Set the unlabelled gauge"""
+        self._default().set(value)
+
+
+class _HistogramChild:
+    """Bucketed observations for one label set"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        # Linear scan is faster than bisect for a dozen buckets
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        """Observe the duration of the enclosed block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def samples(self, name, labelnames, values) -> List[str]:
+        with self._lock:
+            counts = list(self.counts)
+            total = self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(list(self.buckets) + [float("inf")], counts):
+            cumulative += count
+            le = 'le="' + _format_value(bound) + '"'
+            lines.append(
+                f"{name}_bucket{_format_labels(labelnames, values, le)} {cumulative}"
+            )
+        lines.append(f"{name}_sum{_format_labels(labelnames, values)} {_format_value(total)}")
+        lines.append(f"{name}_count{_format_labels(labelnames, values)} {cumulative}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Distribution of observed values"""
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        """Observe a value on the unlabelled histogram"""
+        self._default().observe(value)
+
+    def time(self):
+        """Time a block on the unlabelled histogram"""
+        return self._default().time()
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """
+        Register a metric
+
+        Args:
+            metric: Metric to register
+
+        Returns:
+            The registered metric
+        """
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """
+        Render all metrics in the text exposition format
+
+        Returns:
+            Exposition text
+        """
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+SCAN_PHASE_SECONDS = REGISTRY.register(Histogram(
+    "network_monitor_scan_phase_seconds",
+    "Duration of each scan_once phase (arp, retry, probe, ipv6, resolve, db_diff, commit, total)",
+    ("phase",),
+))
+SCAN_REPLIES = REGISTRY.register(Histogram(
+    "network_monitor_scan_replies",
+    "ARP replies received per scan",
+    buckets=(0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000),
+))
+SCAN_RETRY_RECOVERED = REGISTRY.register(Counter(
+    "network_monitor_scan_retry_recovered_total",
+    "Known devices missed by the ARP sweep that answered a unicast retry",
+))
+DNS_LOOKUP_SECONDS = REGISTRY.register(Histogram(
+    "network_monitor_dns_lookup_seconds",
+    "Duration of reverse DNS lookups that missed the cache",
+))
+SCANS_TOTAL = REGISTRY.register(Counter(
+    "network_monitor_scans_total",
+    "Completed scans by result",
+    ("result",),
+))
+DEVICES_CONNECTED = REGISTRY.register(Gauge(
+    "network_monitor_devices_connected",
+    "Devices present in the most recent scan",
+))
+DEVICE_EVENTS_TOTAL = REGISTRY.register(Counter(
+    "network_monitor_device_events_total",
+    "Connection events written to ConnectionLog",
+    ("event_type",),
+))
+ERRORS_TOTAL = REGISTRY.register(Counter(
+    "network_monitor_errors_total",
+    "Errors by component",
+    ("component",),
+))
+CACHE_HITS_TOTAL = REGISTRY.register(Counter(
+    "network_monitor_cache_hits_total",
+    "Cache hits by cache",
+    ("cache",),
+))
+CACHE_MISSES_TOTAL = REGISTRY.register(Counter(
+    "network_monitor_cache_misses_total",
+    "Cache misses by cache",
+    ("cache",),
+))
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "network_monitor_http_request_duration_seconds",
+    "Web API request latency",
+    ("endpoint", "method", "status"),
+))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Serves the registry on /metrics"""
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("metrics: " + format, *args)
+
+
+def start_http_server(port: int, host: str = "0.0.0.0") -> Optional[ThreadingHTTPServer]:
+    """
+    Serve /metrics from a background thread
+
+    Args:
+        port: Port to listen on
+        host: Address to bind to
+
+    Returns:
+        The running server, or None if it could not be started
+    """
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        logger.error(f"Could not start metrics server on {host}:{port}: {e}")
+        return None
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    logger.info(f"Metrics available on http://{host}:{port}/metrics")
+    return server
@@ -2,11 +2,23 @@
 Main network monitoring orchestration
 """
 import logging
-import time
-from typing import Optional
+from datetime import datetime
+from typing import Callable, Dict, Optional, Set
 from .config import Config
 from .scanner import NetworkScanner
+from .ndp import build_discovery
+from .probe import build_prober
 from .database import DatabaseManager
+from .state import DeviceStateStore
+from .debounce import DisconnectDebouncer
+from .oui import open_index
+from .enrichment import EnrichmentPipeline, ReverseDnsStage, VendorStage, DeviceTypeStage
+from .scheduler import ScanScheduler
+from .notify import EventDispatcher, build_dispatcher
+from .presence import PresenceStore
+from .warmstart import MonitorSnapshot, SnapshotFile, plan_resume
+from .metrics import SCAN_PHASE_SECONDS, SCANS_TOTAL, DEVICES_CONNECTED, ERRORS_TOTAL
+from . import tracing
 
 logger = logging.getLogger(__name__)
 
@@ -14,26 +26,171 @@ logger = logging.getLogger(__name__)
 class NetworkMonitor:
     """Main network monitoring class that orchestrates scanning and database updates"""
 
-    def __init__(self, config: Optional[Config] = None):
+    def __init__(self, config: Optional[Config] = None,
+                 scanner: Optional[NetworkScanner] = None,
+                 database: Optional[DatabaseManager] = None,
+                 state: Optional[DeviceStateStore] = None):
         """
         Initialize the network monitor
         
         Args:
             config: Configuration object (loads from environment if None)
+            scanner: Scanner to use (built from config if None)
+            database: Database manager to use (connects from config if None)
+            state: Shared device state to publish committed scans to
         """
         self.config = config or Config.load()
+        enrichment = self.config.enrichment
         
         # Initialize components
-        self.scanner = NetworkScanner(
+        self.scanner = scanner or NetworkScanner(
             subnet=self.config.network.subnet,
-            timeout=self.config.network.timeout
+            timeout=self.config.network.timeout,
+            hostname_cache_ttl=self.config.network.hostname_cache_ttl,
+            resolve_hostnames=not enrichment.asynchronous,
+            retries=self.config.network.retries,
+            retry_timeout=self.config.network.retry_timeout,
+            # Retry missing devices for as long as the debouncer keeps them connected
+            retry_window=self.config.network.disconnect_window,
+            prober=build_prober(self.config.probe),
+            ipv6=build_discovery(self.config.network),
         )
-        self.database = DatabaseManager(self.config.database)
+        self.database = database or DatabaseManager(self.config.database)
+        self.state = state
+        warm_start = self.config.state.warm_start
+        self.debouncer = DisconnectDebouncer(
+            miss_threshold=self.config.network.disconnect_after_misses,
+            grace_seconds=self.config.network.disconnect_after_seconds,
+            # With warm start the counters are saved in the monitor snapshot
+            state_file=None if warm_start else self.config.state.path("disconnect_debounce.json")
+        )
+        self.debouncer.load()
+        
+        # Vendor lookup for newly seen devices
+        self.oui_index = open_index(enrichment.oui_index)
+        if self.oui_index is not None:
+            self.database.vendor_lookup = self.oui_index.lookup
+        
+        # Hostname, vendor and device type are filled in after the scan commits
+        self.enrichment: Optional[EnrichmentPipeline] = None
+        self.hostname_stage: Optional[ReverseDnsStage] = None
+        if enrichment.asynchronous:
+            self.hostname_stage = ReverseDnsStage(
+                cache_ttl=self.config.network.hostname_cache_ttl,
+                concurrency=enrichment.dns_concurrency
+            )
+            stages = [self.hostname_stage]
+            if self.oui_index is not None:
+                stages.append(VendorStage(self.oui_index.lookup))
+            stages.append(DeviceTypeStage())
+            self.enrichment = EnrichmentPipeline(
+                stages,
+                writer=self.database.update_device_enrichment,
+                workers=enrichment.workers,
+                queue_size=enrichment.queue_size,
+                batch_size=enrichment.batch_size,
+                flush_interval=enrichment.flush_interval,
+                on_results=self.state.apply_enrichment if self.state is not None else None
+            )
+            self.enrichment.start()
+        
+        # Connection events are pushed to webhooks from their own threads
+        self.events: Optional[EventDispatcher] = build_dispatcher(self.config.notify)
+        if self.events is not None:
+            self.events.start()
+            self.database.scan_listeners.append(self.events.submit)
+        
+        # Which devices answered each scan, for presence heatmaps
+        self.presence: Optional[PresenceStore] = None
+        if self.config.presence.enabled:
+            self.presence = PresenceStore(
+                self.config.presence.directory,
+                slot_seconds=self.config.presence.slot_seconds,
+                flush_scans=self.config.presence.flush_scans,
+                retention_days=self.config.presence.retention_days
+            )
+            self.database.scan_listeners.append(self.presence.on_scan)
+        
+        self.scheduler = ScanScheduler(
+            interval=self.config.network.scan_interval,
+            jitter=self.config.network.scan_jitter,
+            overrun_policy=self.config.network.overrun_policy
+        )
+        
+        # Tracing and on-demand profiling
+        tracing.set_enabled(self.config.trace.enabled)
+        self.profiler = tracing.ScanProfiler(
+            output_dir=self.config.trace.profile_dir,
+            interval=self.config.trace.profile_interval
+        )
+        if self.config.trace.profile_scans:
+            self.profiler.request(self.config.trace.profile_scans)
+        
+        # Scan generation and downtime carry over restarts through the snapshot
+        self.generation = 0
+        self.last_scan_at: Optional[datetime] = None
+        self.downtime_since: Optional[datetime] = None
+        self._connected: Set[str] = set()
+        self.snapshot_file: Optional[SnapshotFile] = None
+        if warm_start:
+            self.snapshot_file = SnapshotFile(self.config.state.path("monitor_snapshot.json"))
+            self._resume()
         
         logger.info("Network Monitor initialized")
         logger.info(f"Monitoring network: {self.config.network.subnet}")
         logger.info(f"Scan interval: {self.config.network.scan_interval} seconds")
 
+    def _resume(self):
+        """Restore the last run's snapshot and detect downtime since its last scan"""
+        snapshot = self.snapshot_file.load()
+        if snapshot is not None:
+            # Lookups are keyed by IP, so they stay usable even if the snapshot is stale
+            self.scanner.restore_hostname_cache(snapshot.hostnames)
+            if self.hostname_stage is not None:
+                self.hostname_stage.restore_cache(snapshot.hostnames)
+        try:
+            connected = self.database.get_connected_devices()
+            last_seen = self.database.get_last_scan_time()
+            # The first scan retries connected devices it misses, as later scans do
+            self.scanner.expect({record.mac_address: record.ip_address
+                                 for record in self.database.get_device_records()
+                                 if record.is_connected})
+        except Exception as e:
+            logger.warning(f"Could not read the database for a warm start: {e}")
+            return
+        
+        downtime_after = (self.config.state.downtime_after
+                          or 3 * self.config.network.scan_interval)
+        plan = plan_resume(snapshot, connected, last_seen, datetime.now(), downtime_after)
+        self._connected = connected
+        self.last_scan_at = plan.last_scan
+        self.downtime_since = plan.downtime_since
+        if plan.snapshot is not None:
+            self.generation = plan.snapshot.generation
+            self.debouncer.restore(plan.snapshot.misses)
+            logger.info(f"Resuming after scan {self.generation} ({plan.last_scan})")
+        if plan.downtime_since is not None:
+            logger.info(f"No scans since {plan.downtime_since}; recording monitor downtime")
+
+    def _save_snapshot(self, delta):
+        """Record a committed scan in the warm-start snapshot"""
+        self.generation += 1
+        self.last_scan_at = delta.timestamp
+        if self.snapshot_file is None:
+            return
+        self._connected = (self._connected | delta.connected) - delta.disconnected
+        hostnames = self.scanner.export_hostname_cache()
+        if self.hostname_stage is not None:
+            hostnames.update(self.hostname_stage.export_cache())
+        self.snapshot_file.save(MonitorSnapshot(
+            generation=self.generation,
+            scanned_at=delta.timestamp,
+            connected=sorted(self._connected),
+            missing=sorted(self._connected - set(delta.devices)),
+            misses=self.debouncer.to_dict(),
+            hostnames=hostnames,
+        ))
+
     def scan_once(self) -> bool:
         """
         Perform a single network scan and update database
@@ -42,18 +199,34 @@ class NetworkMonitor:
             True if scan was successful, False otherwise
         """
         try:
-            # Scan network
-            devices = self.scanner.scan()
-            
-            # Update database
-            if devices:
-                self.database.update_device_status(devices)
-                return True
-            else:
-                logger.warning("No devices found in scan")
-                return False
+            with self.profiler.profile_scan(), \
+                    tracing.span("scan", SCAN_PHASE_SECONDS.labels(phase="total")):
+                # Scan network
+                devices = self.scanner.scan()
+                DEVICES_CONNECTED.set(len(devices))
+                
+                # Update database
+                if devices:
+                    delta = self.database.update_device_status(
+                        devices, self.debouncer, downtime_since=self.downtime_since
+                    )
+                    self.downtime_since = None
+                    self.debouncer.save()
+                    self._save_snapshot(delta)
+                    if self.state is not None:
+                        self.state.publish(delta)
+                    if self.enrichment is not None:
+                        self.enrichment.submit_scan(devices.values())
+                    SCANS_TOTAL.labels(result="success").inc()
+                    return True
+                else:
+                    logger.warning("No devices found in scan")
+                    SCANS_TOTAL.labels(result="empty").inc()
+                    return False
                 
         except Exception as e:
+            ERRORS_TOTAL.labels(component="monitor").inc()
+            SCANS_TOTAL.labels(result="error").inc()
             logger.error(f"Error during scan: {e}", exc_info=True)
             return False
 
@@ -65,15 +238,8 @@ class NetworkMonitor:
         logger.info("Press Ctrl+C to stop")
         
         try:
-            while True:
-                # Perform scan
-                self.scan_once()
-                
-                # Wait for next scan
-                logger.info(
-                    f"Waiting {self.config.network.scan_interval} seconds until next scan..."
-                )
-                time.sleep(self.config.network.scan_interval)
+            # Scans start on a fixed cadence until stop() or Ctrl+C
+            self.scheduler.run(self.scan_once)
                 
         except KeyboardInterrupt:
             logger.info("Monitoring stopped by user")
@@ -83,12 +249,70 @@ class NetworkMonitor:
         finally:
             self.cleanup()
 
+    def stop(self):
+        """
+        Stop the monitoring loop without waiting for the next scan
+        
+        A scan in progress still finishes and hands its events on;
+        ``cleanup()`` stops the workers once the loop has exited.
+        """
+        self.scheduler.stop()
+
     def cleanup(self):
-        """Clean up resources"""
+        """Clean up resources; call from the loop thread after the last scan"""
+        if self.enrichment is not None:
+            # Flush pending results before the connection goes away
+            self.enrichment.stop()
+        if self.events is not None:
+            self.events.stop()
+        if self.presence is not None:
+            self.presence.flush()
         if self.database:
             self.database.close()
         logger.info("Cleanup complete")
 
+    def runtime_status(self) -> dict:
+        """
+        Get scheduler and profiler state without querying the database
+        
+        Returns:
+            Dictionary published to other processes with each state update
+        """
+        return {
+            "monitoring_active": self.scheduler.running,
+            "scheduler": self.scheduler.get_stats(),
+            "scan_generation": self.generation,
+            "last_scan": self.last_scan_at.isoformat() if self.last_scan_at else None,
+            "profile": {
+                "pending_scans": self.profiler.pending,
+                "last_output": self.profiler.last_output,
+            },
+        }
+
+    def control_commands(self) -> Dict[str, Callable[[dict], object]]:
+        """
+        Commands other processes may send to this monitor over IPC
+        
+        Returns:
+            Command name -> handler taking the command arguments
+        """
+        def scan(args):
+            return {"completed": self.scheduler.run_now(self.scan_once)}
+
+        def profile(args):
+            scans = args.get("scans")
+            if scans is not None:
+                if not isinstance(scans, int) or scans < 0:
+                    raise ValueError("scans must be a non-negative integer")
+                self.profiler.request(scans)
+            return self.runtime_status()["profile"]
+
+        return {
+            "scan": scan,
+            "profile": profile,
+            "status": lambda args: self.runtime_status(),
+        }
+
     def get_status(self) -> dict:
         """
         Get current monitoring status
@@ -102,6 +326,7 @@ class NetworkMonitor:
                 "status": "running",
                 "network": self.config.network.subnet,
                 "scan_interval": self.config.network.scan_interval,
+                "scheduler": self.scheduler.get_stats(),
                 "connected_devices": device_counts["connected"],
                 "total_devices": device_counts["total"],
             }
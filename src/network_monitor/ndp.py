@@ -0,0 +1,248 @@
+"""
+IPv6 neighbor discovery
+
+A /64 cannot be swept like an IPv4 subnet, so IPv6 addresses are collected
+from traffic the hosts send themselves:
+
+    - active: one ICMPv6 echo request to the all-nodes group (ff02::1).
+      Hosts that answer reveal an address, and before answering they
+      usually solicit the scanner's own address, which reveals another
+    - passive: every Neighbor Discovery message (solicitations,
+      advertisements, router messages) seen while waiting for the replies,
+      plus the OS neighbor table (``ip -6 neigh`` or ``netsh``), which holds
+      hosts that ignore multicast echo but have talked to the scanner host
+
+Only replies and table entries confirmed within the reachable time are
+live. STALE entries can be hours old, so they add addresses to devices that
+answered the scan but never show a device as connected. The scanner merges
+the results into the ARP scan, so dual-stack devices keep one record with
+all their addresses.
+"""
+import ipaddress
+import logging
+import re
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Set
+from scapy.all import (
+    AsyncSniffer, Ether, IPv6, ICMPv6EchoRequest, ICMPv6EchoReply,
+    ICMPv6ND_NA, ICMPv6ND_NS, ICMPv6ND_RA, ICMPv6ND_RS, conf, get_if_hwaddr, sendp,
+)
+from .config import NetworkConfig
+
+logger = logging.getLogger(__name__)
+
+ALL_NODES_MAC = "33:33:00:00:00:01"
+# Neighbor table states without a usable link-layer address
+_UNUSABLE_STATES = {"FAILED", "INCOMPLETE", "NOARP", "UNREACHABLE"}
+# States confirmed within the reachable time; STALE and PERMANENT are not
+_LIVE_STATES = {"REACHABLE", "DELAY", "PROBE"}
+_NETSH_ROW = re.compile(r"^(\S+)\s+([0-9A-Fa-f]{2}(?:-[0-9A-Fa-f]{2}){5})\s+(\S+)")
+
+
+@dataclass
+class Neighbors:
+    """IPv6 neighbors by MAC: live ones count as present, stale ones only add addresses"""
+    live: Dict[str, Set[str]] = field(default_factory=dict)
+    stale: Dict[str, Set[str]] = field(default_factory=dict)
+
+    def add(self, mac: str, address: str, live: bool):
+        (self.live if live else self.stale).setdefault(mac, set()).add(address)
+
+    def update(self, other: "Neighbors"):
+        for mac, addresses in other.live.items():
+            self.live.setdefault(mac, set()).update(addresses)
+        for mac, addresses in other.stale.items():
+            self.stale.setdefault(mac, set()).update(addresses)
+
+    def addresses(self, mac: str) -> Set[str]:
+        """Every address known for a MAC, live or stale"""
+        return self.live.get(mac, set()) | self.stale.get(mac, set())
+
+
+def usable_address(address: str) -> Optional[str]:
+    """
+    Normalize a neighbor's IPv6 address
+
+    Args:
+        address: IPv6 address, optionally with a %zone suffix
+
+    Returns:
+        Compressed address, or None for multicast, unspecified and loopback
+    """
+    try:
+        ip = ipaddress.IPv6Address(address.split("%", 1)[0])
+    except ValueError:
+        return None
+    if ip.is_multicast or ip.is_unspecified or ip.is_loopback:
+        return None
+    return ip.compressed
+
+
+def usable_mac(mac_address: str) -> Optional[str]:
+    """Upper-case colon MAC, or None for multicast and empty addresses"""
+    mac = mac_address.replace("-", ":").upper()
+    if int(mac[:2], 16) & 0x01 or mac == "00:00:00:00:00:00":
+        return None
+    return mac
+
+
+def preferred_address(addresses: Iterable[str]) -> str:
+    """The address to report for an IPv6-only device: global before link-local"""
+    return min(addresses, key=lambda a: (ipaddress.IPv6Address(a).is_link_local, a))
+
+
+def parse_ip_neigh(text: str) -> Neighbors:
+    """
+    Parse ``ip -6 neigh show`` output
+
+    Lines look like ``fe80::1 dev eth0 lladdr 00:11:22:33:44:55 router REACHABLE``.
+    """
+    found = Neighbors()
+    for line in text.splitlines():
+        fields = line.split()
+        if "lladdr" not in fields or fields[-1] in _UNUSABLE_STATES:
+            continue
+        mac = usable_mac(fields[fields.index("lladdr") + 1])
+        address = usable_address(fields[0])
+        if mac and address:
+            found.add(mac, address, live=fields[-1] in _LIVE_STATES)
+    return found
+
+
+def parse_netsh_neighbors(text: str) -> Neighbors:
+    """
+    Parse ``netsh interface ipv6 show neighbors`` output
+
+    Rows look like ``fe80::1   00-11-22-33-44-55   Reachable (Router)``.
+    """
+    found = Neighbors()
+    for line in text.splitlines():
+        match = _NETSH_ROW.match(line.strip())
+        if not match or match.group(3).upper() in _UNUSABLE_STATES:
+            continue
+        mac = usable_mac(match.group(2))
+        address = usable_address(match.group(1))
+        if mac and address:
+            found.add(mac, address, live=match.group(3).upper() in _LIVE_STATES)
+    return found
+
+
+def read_neighbor_table(interface: Optional[str] = None) -> Neighbors:
+    """
+    Read the OS IPv6 neighbor table
+
+    Args:
+        interface: Only this interface (all if None)
+
+    Returns:
+        Neighbors by table state; empty if the table cannot be read
+    """
+    if sys.platform == "win32":
+        command = ["netsh", "interface", "ipv6", "show", "neighbors"]
+        if interface:
+            command.append(f"interface={interface}")
+        parse = parse_netsh_neighbors
+    else:
+        command = ["ip", "-6", "neigh", "show"] + (["dev", interface] if interface else [])
+        parse = parse_ip_neigh
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=10,
+                                check=True)
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.debug(f"Could not read the IPv6 neighbor table: {e}")
+        return Neighbors()
+    return parse(result.stdout)
+
+
+def harvest_packet(packet, found: Dict[str, Set[str]], own_mac: Optional[str] = None):
+    """
+    Record the sender of an echo reply or Neighbor Discovery message
+
+    Args:
+        packet: Captured scapy packet
+        found: MAC -> addresses to add to
+        own_mac: The scanner's MAC, whose packets are ignored
+    """
+    if Ether not in packet or IPv6 not in packet:
+        return
+    mac = usable_mac(packet[Ether].src)
+    if mac is None or mac == own_mac:
+        return
+    addresses = []
+    if any(layer in packet for layer in (ICMPv6EchoReply, ICMPv6ND_NS, ICMPv6ND_NA,
+                                         ICMPv6ND_RS, ICMPv6ND_RA)):
+        # The source of a duplicate address check is "::" and is dropped
+        addresses.append(packet[IPv6].src)
+    if ICMPv6ND_NA in packet:
+        addresses.append(packet[ICMPv6ND_NA].tgt)
+    for address in filter(None, map(usable_address, addresses)):
+        found.setdefault(mac, set()).add(address)
+
+
+class NeighborDiscovery:
+    """Collects IPv6 neighbors by multicast echo, NDP capture and the neighbor table"""
+
+    def __init__(self, interface: Optional[str] = None, timeout: float = 2.0,
+                 active: bool = True, neighbor_table: bool = True):
+        """
+        Initialize IPv6 discovery
+
+        Args:
+            interface: Interface to ping and listen on (scapy's default if None)
+            timeout: Seconds to collect replies after the multicast echo
+            active: Send the all-nodes echo and capture; needs the same
+                privileges as the ARP scan
+            neighbor_table: Read the OS neighbor table
+        """
+        self.interface = interface
+        self.timeout = timeout
+        self.active = active
+        self.neighbor_table = neighbor_table
+
+    def discover(self) -> Neighbors:
+        """
+        Collect IPv6 neighbors
+
+        Returns:
+            Live neighbors (replies and recently confirmed table entries)
+            and stale table entries
+        """
+        found = Neighbors()
+        if self.active:
+            self._multicast_echo(found.live)
+        if self.neighbor_table:
+            found.update(read_neighbor_table(self.interface))
+        return found
+
+    def _multicast_echo(self, found: Dict[str, Set[str]]):
+        interface = self.interface or conf.iface
+        own_mac = usable_mac(get_if_hwaddr(interface))
+        # Filtered in Python: a BPF filter would need tcpdump on some systems
+        sniffer = AsyncSniffer(iface=interface, store=True, lfilter=lambda p: IPv6 in p)
+        sniffer.start()
+        try:
+            sendp(Ether(dst=ALL_NODES_MAC) / IPv6(dst="ff02::1") /
+                  ICMPv6EchoRequest(data=b"network-monitor"), iface=interface, verbose=0)
+            time.sleep(self.timeout)
+        finally:
+            packets = sniffer.stop() or []
+        for packet in packets:
+            harvest_packet(packet, found, own_mac)
+
+
+def build_discovery(config: NetworkConfig) -> Optional[NeighborDiscovery]:
+    """
+    Build IPv6 discovery if enabled
+
+    Args:
+        config: Network configuration
+
+    Returns:
+        Discovery, or None if IPv6 discovery is disabled
+    """
+    if not config.ipv6_discovery:
+        return None
+    return NeighborDiscovery(interface=config.ipv6_interface, timeout=config.ipv6_timeout)
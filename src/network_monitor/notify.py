@@ -0,0 +1,408 @@
+"""
+Webhook notifications for connection events
+
+The database reports each committed scan; the dispatcher turns it into
+CONNECTED / DISCONNECTED events and hands them to one delivery worker per
+webhook. Workers post JSON batches ({"events": [...]}) and retry failed
+posts with exponential backoff. Every target has a bounded queue, so a slow
+or unreachable receiver only ever delays its own events: when the queue is
+full the oldest or newest events are dropped, or spilled to disk and
+delivered once the receiver catches up.
+"""
+import glob
+import json
+import logging
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from typing import Deque, Dict, List, Optional, Sequence
+from .config import NotifyConfig
+from .database import ScanDelta
+from .metrics import REGISTRY, Counter, Gauge, Histogram, ERRORS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "spill")
+
+WEBHOOK_EVENTS_TOTAL = REGISTRY.register(Counter(
+    "network_monitor_webhook_events_total",
+    "Events by webhook and outcome (delivered, dropped, spilled)",
+    ("target", "result"),
+))
+WEBHOOK_QUEUE = REGISTRY.register(Gauge(
+    "network_monitor_webhook_queue_depth",
+    "Events waiting in memory for delivery",
+    ("target",),
+))
+WEBHOOK_RETRIES_TOTAL = REGISTRY.register(Counter(
+    "network_monitor_webhook_retries_total",
+    "Failed webhook posts that were retried",
+    ("target",),
+))
+WEBHOOK_POST_SECONDS = REGISTRY.register(Histogram(
+    "network_monitor_webhook_post_seconds",
+    "Duration of successful webhook posts",
+    ("target",),
+))
+
+
+class DeliveryError(Exception):
+    """A webhook post failed"""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def delta_events(delta: ScanDelta) -> List[dict]:
+    """
+    Connection events of a committed scan
+
+    Args:
+        delta: Committed scan
+
+    Returns:
+        One event per connected or disconnected device
+    """
+    event_time = delta.timestamp.isoformat()
+    events = []
+    for mac in sorted(delta.connected):
+        device = delta.devices.get(mac)
+        events.append({
+            "event_type": "CONNECTED",
+            "mac_address": mac,
+            "ip_address": device.ip_address if device else None,
+            "hostname": device.hostname if device else None,
+            "vendor": device.vendor if device else None,
+            "event_time": event_time,
+            "site_id": delta.site_id,
+        })
+    for mac in sorted(delta.disconnected):
+        events.append({
+            "event_type": "DISCONNECTED",
+            "mac_address": mac,
+            "ip_address": None,
+            "hostname": None,
+            "vendor": None,
+            "event_time": delta.disconnected_at(mac).isoformat(),
+            "site_id": delta.site_id,
+        })
+    return events
+
+
+class WebhookTarget:
+    """One webhook receiver with its own queue and delivery thread"""
+
+    def __init__(self, name: str, url: str, token: Optional[str] = None,
+                 queue_size: int = 10000, overflow: str = "drop_oldest",
+                 spill_dir: Optional[str] = None, batch_size: int = 100,
+                 flush_interval: float = 1.0, max_retries: int = 5,
+                 backoff: float = 1.0, backoff_max: float = 60.0, timeout: float = 10.0):
+        """
+        Initialize webhook target
+
+        Args:
+            name: Label used in logs, metrics and spill file names
+            url: URL events are posted to
+            token: Sent as a bearer token if set
+            queue_size: Events held in memory before the overflow policy applies
+            overflow: drop_oldest, drop_newest or spill
+            spill_dir: Directory for spilled events (required for spill)
+            batch_size: Most events per post
+            flush_interval: Seconds to wait for a batch to fill up
+            max_retries: Retries of a failed post before it is given up
+            backoff: Delay before the first retry; doubles on each retry
+            backoff_max: Longest delay between retries
+            timeout: Seconds to wait for the receiver
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        if overflow == "spill" and not spill_dir:
+            raise ValueError("The spill overflow policy needs a spill directory")
+        self.name = name
+        self.url = url
+        self.token = token
+        self.queue_size = max(1, queue_size)
+        self.overflow = overflow
+        self.spill_dir = spill_dir
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_retries = max(0, max_retries)
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+
+        self._queue: Deque[dict] = deque()
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def pending(self) -> int:
+        """Events waiting in memory"""
+        return len(self._queue)
+
+    def start(self):
+        """Start the delivery thread"""
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"webhook-{self.name}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop delivering; undelivered events are spilled or dropped"""
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        with self._cond:
+            leftover = list(self._queue)
+            self._queue.clear()
+        self._give_up(leftover)
+        WEBHOOK_QUEUE.labels(target=self.name).set(0)
+
+    def submit(self, events: Sequence[dict]):
+        """
+        Queue events without blocking
+
+        Args:
+            events: Events to deliver
+        """
+        if not events:
+            return
+        overflow: List[dict] = []
+        with self._cond:
+            for event in events:
+                if len(self._queue) < self.queue_size:
+                    self._queue.append(event)
+                elif self.overflow == "drop_oldest":
+                    overflow.append(self._queue.popleft())
+                    self._queue.append(event)
+                else:
+                    overflow.append(event)
+            depth = len(self._queue)
+            self._cond.notify()
+        WEBHOOK_QUEUE.labels(target=self.name).set(depth)
+        if overflow:
+            self._give_up(overflow)
+
+    def _give_up(self, events: List[dict]):
+        """Spill or drop events that cannot be delivered now"""
+        if not events:
+            return
+        if self.overflow == "spill" and self._spill(events):
+            WEBHOOK_EVENTS_TOTAL.labels(target=self.name, result="spilled").inc(len(events))
+            return
+        WEBHOOK_EVENTS_TOTAL.labels(target=self.name, result="dropped").inc(len(events))
+        logger.warning(f"Webhook {self.name}: dropped {len(events)} events")
+
+    def _spill(self, events: List[dict]) -> bool:
+        path = os.path.join(self.spill_dir, f"{self.name}-{time.time_ns():020d}.ndjson")
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as fh:
+                for event in events:
+                    fh.write(json.dumps(event, default=str) + "\n")
+            return True
+        except OSError as e:
+            ERRORS_TOTAL.labels(component="notify").inc()
+            logger.error(f"Webhook {self.name}: could not spill events: {e}")
+            return False
+
+    def _spill_files(self) -> List[str]:
+        if self.overflow != "spill":
+            return []
+        return sorted(glob.glob(os.path.join(self.spill_dir, f"{self.name}-*.ndjson")))
+
+    def _next_batch(self) -> List[dict]:
+        """Wait for events and collect up to batch_size of them"""
+        with self._cond:
+            if not self._queue:
+                self._cond.wait(self.flush_interval)
+            deadline = time.monotonic() + self.flush_interval
+            while self._queue and len(self._queue) < self.batch_size \
+                    and not self._stop_event.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            depth = len(self._queue)
+        WEBHOOK_QUEUE.labels(target=self.name).set(depth)
+        return batch
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            batch = self._next_batch()
+            if batch:
+                if not self._deliver(batch):
+                    self._give_up(batch)
+                continue
+            # Caught up: replay spilled events, oldest first
+            for path in self._spill_files()[:1]:
+                self._replay(path)
+
+    def _replay(self, path: str):
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                events = [json.loads(line) for line in fh if line.strip()]
+        except (OSError, ValueError) as e:
+            logger.error(f"Webhook {self.name}: discarding unreadable spill file {path}: {e}")
+            events = []
+        for start in range(0, len(events), self.batch_size):
+            if self._stop_event.is_set() or not self._deliver(events[start:start + self.batch_size]):
+                # Keep the rest for the next attempt
+                self._rewrite(path, events[start:])
+                return
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _rewrite(path: str, events: List[dict]):
+        try:
+            with open(path, "w", encoding="utf-8") as fh:
+                for event in events:
+                    fh.write(json.dumps(event, default=str) + "\n")
+        except OSError as e:
+            logger.error(f"Could not rewrite spill file {path}: {e}")
+
+    def _deliver(self, batch: List[dict]) -> bool:
+        """
+        Post a batch, retrying with exponential backoff
+
+        Returns:
+            True if the receiver accepted it
+        """
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                self.post(batch)
+            except DeliveryError as e:
+                if not e.retryable or attempt == self.max_retries:
+                    ERRORS_TOTAL.labels(component="notify").inc()
+                    logger.error(f"Webhook {self.name}: giving up on {len(batch)} events: {e}")
+                    return False
+                # Full jitter keeps many agents from retrying in lockstep
+                delay = min(self.backoff_max, self.backoff * 2 ** attempt)
+                delay = random.uniform(delay / 2, delay)
+                WEBHOOK_RETRIES_TOTAL.labels(target=self.name).inc()
+                logger.warning(f"Webhook {self.name}: {e}; retrying in {delay:.1f}s")
+                if self._stop_event.wait(delay):
+                    return False
+                continue
+            WEBHOOK_POST_SECONDS.labels(target=self.name).observe(time.perf_counter() - started)
+            WEBHOOK_EVENTS_TOTAL.labels(target=self.name, result="delivered").inc(len(batch))
+            return True
+        return False
+
+    def post(self, batch: List[dict]):
+        """
+        Send one batch
+
+        Raises:
+            DeliveryError: If the receiver could not be reached or refused the batch
+        """
+        body = json.dumps({"events": batch}, default=str).encode("utf-8")
+        request = urllib.request.Request(self.url, data=body, method="POST", headers={
+            "Content-Type": "application/json",
+        })
+        if self.token:
+            request.add_header("Authorization", f"Bearer {self.token}")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            # Client errors other than rate limiting will not succeed on retry
+            retryable = e.code >= 500 or e.code in (408, 429)
+            raise DeliveryError(f"HTTP {e.code}", retryable=retryable) from e
+        except OSError as e:
+            raise DeliveryError(str(e)) from e
+
+
+class EventDispatcher:
+    """Fans connection events out to webhook targets"""
+
+    def __init__(self, targets: Sequence[WebhookTarget]):
+        """
+        Initialize event dispatcher
+
+        Args:
+            targets: Webhook receivers
+        """
+        self.targets = list(targets)
+
+    def start(self):
+        """Start the delivery threads"""
+        for target in self.targets:
+            target.start()
+
+    def stop(self):
+        """Stop the delivery threads"""
+        for target in self.targets:
+            target.stop()
+
+    def submit(self, delta: ScanDelta):
+        """
+        Queue the events of a committed scan; never blocks on delivery
+
+        Args:
+            delta: Committed scan
+        """
+        if not delta.connected and not delta.disconnected:
+            return
+        events = delta_events(delta)
+        for target in self.targets:
+            target.submit(events)
+
+    def get_stats(self) -> Dict[str, dict]:
+        """
+        Get queue depth per target
+
+        Returns:
+            Target name -> pending events and spill files
+        """
+        return {
+            target.name: {"pending": target.pending, "spill_files": len(target._spill_files())}
+            for target in self.targets
+        }
+
+
+def build_dispatcher(config: NotifyConfig) -> Optional[EventDispatcher]:
+    """
+    Build the dispatcher for the configured webhooks
+
+    Args:
+        config: Notification configuration
+
+    Returns:
+        Dispatcher, or None if no webhook is configured
+    """
+    if not config.webhook_urls:
+        return None
+    targets = [
+        WebhookTarget(
+            name=f"webhook{index}",
+            url=url,
+            token=config.token,
+            queue_size=config.queue_size,
+            overflow=config.overflow,
+            spill_dir=config.spill_dir,
+            batch_size=config.batch_size,
+            flush_interval=config.flush_interval,
+            max_retries=config.max_retries,
+            backoff=config.backoff,
+            backoff_max=config.backoff_max,
+            timeout=config.timeout,
+        )
+        for index, url in enumerate(config.webhook_urls, start=1)
+    ]
+    return EventDispatcher(targets)
@@ -0,0 +1,276 @@
+"""
+MAC vendor lookup from the IEEE OUI registries
+
+The IEEE publishes MA-L (24-bit), MA-M (28-bit) and MA-S (36-bit) assignments
+as text and CSV files. ``compile_index`` turns any mix of them into a compact
+binary index; ``OuiIndex`` memory-maps that index and answers lookups by
+binary search, longest prefix first, without loading it into memory.
+
+Index layout (little-endian):
+    header   magic 'OUIX', version u16, reserved u16,
+             entry counts u32 x3 (36-, 28-, 24-bit), strings offset u32
+    entries  per prefix length, sorted: prefix u64, string offset u32
+    strings  u16 length + UTF-8 vendor name, deduplicated
+
+Usage:
+    python -m network_monitor.oui compile oui.csv mam.csv oui36.csv -o oui.idx
+    python -m network_monitor.oui lookup oui.idx 00:00:0C:12:34:56
+    python -m network_monitor.oui backfill oui.idx
+"""
+import argparse
+import csv
+import logging
+import mmap
+import os
+import re
+import struct
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"OUIX"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIIII")
+ENTRY = struct.Struct("<QI")
+STRING_LENGTH = struct.Struct("<H")
+PREFIX_BITS = (36, 28, 24)
+
+_HEX_LINE = re.compile(r"^\s*([0-9A-Fa-f]{2})-([0-9A-Fa-f]{2})-([0-9A-Fa-f]{2})\s+\(hex\)\s+(.*)$")
+_BASE16_LINE = re.compile(r"^\s*([0-9A-Fa-f]{6})(?:-([0-9A-Fa-f]{6}))?\s+\(base 16\)\s+(.*)$")
+
+
+def mac_to_int(mac_address: str) -> Optional[int]:
+    """
+    Convert a MAC address in any common notation to a 48-bit integer
+
+    Args:
+        mac_address: MAC address ('AA:BB:CC:DD:EE:FF', 'aa-bb-...', 'aabb.ccdd.eeff')
+
+    Returns:
+        Integer value, or None if the address is malformed
+    """
+    digits = re.sub(r"[^0-9A-Fa-f]", "", mac_address)
+    if len(digits) != 12:
+        return None
+    return int(digits, 16)
+
+
+def parse_registry(path: str) -> Iterable[Tuple[int, int, str]]:
+    """
+    Parse an IEEE registry file (CSV or text)
+
+    Args:
+        path: Path to oui.csv/mam.csv/oui36.csv or oui.txt/mam.txt/oui36.txt
+
+    Yields:
+        (prefix bits, prefix value, vendor name)
+    """
+    with open(path, "r", encoding="utf-8", errors="replace") as fh:
+        first_line = fh.readline()
+        fh.seek(0)
+
+        if first_line.startswith("Registry"):
+            for row in csv.DictReader(fh):
+                assignment = row.get("Assignment", "").strip()
+                vendor = row.get("Organization Name", "").strip()
+                if assignment and vendor:
+                    yield len(assignment) * 4, int(assignment, 16), vendor
+            return
+
+        oui = None
+        for line in fh:
+            match = _HEX_LINE.match(line)
+            if match:
+                oui = int("".join(match.group(1, 2, 3)), 16)
+                continue
+            match = _BASE16_LINE.match(line)
+            if not match:
+                continue
+            vendor = match.group(3).strip()
+            if match.group(2) is None:
+                yield 24, int(match.group(1), 16), vendor
+            elif oui is not None:
+                start, end = int(match.group(1), 16), int(match.group(2), 16)
+                free_bits = (end - start + 1).bit_length() - 1
+                bits = 48 - free_bits
+                yield bits, (oui << (24 - free_bits)) | (start >> free_bits), vendor
+
+
+def compile_index(sources: List[str], output: str) -> int:
+    """
+    Compile registry files into a binary index
+
+    Args:
+        sources: Registry files to read
+        output: Index file to write
+
+    Returns:
+        Number of prefixes written
+    """
+    prefixes: Dict[int, Dict[int, str]] = {bits: {} for bits in PREFIX_BITS}
+    for path in sources:
+        for bits, prefix, vendor in parse_registry(path):
+            if bits in prefixes:
+                prefixes[bits][prefix] = vendor
+
+    strings = bytearray()
+    string_offsets: Dict[str, int] = {}
+    entries = bytearray()
+    for bits in PREFIX_BITS:
+        for prefix in sorted(prefixes[bits]):
+            vendor = prefixes[bits][prefix]
+            offset = string_offsets.get(vendor)
+            if offset is None:
+                encoded = vendor.encode("utf-8")[:0xFFFF]
+                offset = string_offsets[vendor] = len(strings)
+                strings += STRING_LENGTH.pack(len(encoded)) + encoded
+            entries += ENTRY.pack(prefix, offset)
+
+    counts = [len(prefixes[bits]) for bits in PREFIX_BITS]
+    strings_offset = HEADER.size + len(entries)
+    tmp_path = output + ".tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(HEADER.pack(MAGIC, VERSION, 0, *counts, strings_offset))
+        fh.write(entries)
+        fh.write(strings)
+    os.replace(tmp_path, output)
+
+    total = sum(counts)
+    logger.info(f"Compiled {total} OUI prefixes into {output}")
+    return total
+
+
+class OuiIndex:
+    """Memory-mapped vendor index"""
+
+    def __init__(self, path: str):
+        """
+        Open a compiled index
+
+        Args:
+            path: Index file written by compile_index()
+        """
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, *counts, self._strings = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} OUI index")
+
+        # (prefix bits, first entry offset, entry count), longest prefix first
+        self._sections = []
+        offset = HEADER.size
+        for bits, count in zip(PREFIX_BITS, counts):
+            self._sections.append((bits, offset, count))
+            offset += count * ENTRY.size
+
+    def __len__(self) -> int:
+        return sum(count for _, _, count in self._sections)
+
+    def close(self):
+        """Release the mapping"""
+        self._map.close()
+        self._file.close()
+
+    def lookup(self, mac_address: str) -> Optional[str]:
+        """
+        Find the vendor registered for a MAC address
+
+        Args:
+            mac_address: MAC address
+
+        Returns:
+            Vendor name, or None if unassigned, locally administered or malformed
+        """
+        value = mac_to_int(mac_address)
+        if value is None or value & (0x02 << 40):
+            return None
+
+        for bits, base, count in self._sections:
+            offset = self._search(base, count, value >> (48 - bits))
+            if offset is not None:
+                (length,) = STRING_LENGTH.unpack_from(self._map, self._strings + offset)
+                start = self._strings + offset + STRING_LENGTH.size
+                return self._map[start:start + length].decode("utf-8")
+        return None
+
+    def _search(self, base: int, count: int, key: int) -> Optional[int]:
+        """Binary search one section for a prefix, returning its string offset"""
+        low, high = 0, count
+        while low < high:
+            mid = (low + high) // 2
+            prefix, offset = ENTRY.unpack_from(self._map, base + mid * ENTRY.size)
+            if prefix < key:
+                low = mid + 1
+            elif prefix > key:
+                high = mid
+            else:
+                return offset
+        return None
+
+
+def open_index(path: Optional[str]) -> Optional[OuiIndex]:
+    """
+    Open an index if one is configured and present
+
+    Args:
+        path: Index path, or None
+
+    Returns:
+        The index, or None if it is not available
+    """
+    if not path:
+        return None
+    if not os.path.exists(path):
+        logger.warning(f"OUI index {path} not found; vendor lookup disabled")
+        return None
+    try:
+        index = OuiIndex(path)
+    except (OSError, ValueError) as e:
+        logger.error(f"Could not open OUI index {path}: {e}")
+        return None
+    logger.info(f"Loaded OUI index with {len(index)} prefixes")
+    return index
+
+
+def main():
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Build and query the MAC vendor index")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compile_cmd = commands.add_parser("compile", help="compile IEEE registry files")
+    compile_cmd.add_argument("sources", nargs="+")
+    compile_cmd.add_argument("-o", "--output", default="oui.idx")
+
+    lookup_cmd = commands.add_parser("lookup", help="look up MAC addresses")
+    lookup_cmd.add_argument("index")
+    lookup_cmd.add_argument("macs", nargs="+")
+
+    backfill_cmd = commands.add_parser("backfill", help="fill Vendor for existing devices")
+    backfill_cmd.add_argument("index")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "compile":
+        compile_index(args.sources, args.output)
+    elif args.command == "lookup":
+        index = OuiIndex(args.index)
+        for mac in args.macs:
+            print(f"{mac}  {index.lookup(mac) or '-'}")
+    else:
+        from .config import Config
+        from .database import DatabaseManager
+        index = OuiIndex(args.index)
+        database = DatabaseManager(Config.load().database)
+        try:
+            updated = database.backfill_vendors(index.lookup)
+            print(f"Vendor set for {updated} device(s)")
+        finally:
+            database.close()
+
+
+if __name__ == "__main__":
+    main()
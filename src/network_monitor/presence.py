@@ -0,0 +1,414 @@
+"""
+Per-device presence bitmaps
+
+Time is divided into slots of ``slot_seconds`` (the scan interval by
+default). Every committed scan sets the bit of its slot for each device that
+answered, and for the scan itself, so "no scan" and "not present" stay
+distinguishable. Bitmaps are run-length encoded: a device that stays online
+for a day is one run, however many scans that took.
+
+Bitmaps are kept per calendar day and written as one gzip'd JSON segment
+per day (``YYYYMMDD.json.gz``, runs delta-encoded) every ``flush_scans``
+scans and on shutdown. Readers in other processes pick up rewritten
+segments by modification time.
+
+Queries ("which devices were online between X and Y", hourly heatmaps) are
+range operations on the runs and never touch the database. They only visit
+days that have a segment, and cover at most ``MAX_RANGE_DAYS``.
+"""
+import gzip
+import json
+import logging
+import math
+import os
+import threading
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+
+# Longest range a query may cover
+MAX_RANGE_DAYS = 366
+
+
+class RunBitmap:
+    """Set of non-negative integers stored as sorted, disjoint [start, end) runs"""
+
+    __slots__ = ("starts", "ends")
+
+    def __init__(self, runs: Iterable[Tuple[int, int]] = ()):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        for start, end in runs:
+            self.add_range(start, end)
+
+    @classmethod
+    def from_range(cls, start: int, end: int) -> "RunBitmap":
+        bitmap = cls()
+        if end > start:
+            bitmap.starts.append(start)
+            bitmap.ends.append(end)
+        return bitmap
+
+    def add(self, value: int):
+        """Set one bit; appending at or after the last run is O(1)"""
+        if not self.starts or value > self.ends[-1]:
+            self.starts.append(value)
+            self.ends.append(value + 1)
+        elif value == self.ends[-1]:
+            self.ends[-1] += 1
+        elif not self.intersects(value, value + 1):
+            self.add_range(value, value + 1)
+
+    def add_range(self, start: int, end: int):
+        """Set every bit in [start, end)"""
+        if end <= start:
+            return
+        if not self.starts or start > self.ends[-1]:
+            self.starts.append(start)
+            self.ends.append(end)
+            return
+        merged = self | RunBitmap.from_range(start, end)
+        self.starts, self.ends = merged.starts, merged.ends
+
+    def runs(self) -> Iterator[Tuple[int, int]]:
+        return zip(self.starts, self.ends)
+
+    def __or__(self, other: "RunBitmap") -> "RunBitmap":
+        result = RunBitmap()
+        for start, end in sorted(list(self.runs()) + list(other.runs())):
+            if result.starts and start <= result.ends[-1]:
+                result.ends[-1] = max(result.ends[-1], end)
+            else:
+                result.starts.append(start)
+                result.ends.append(end)
+        return result
+
+    def __and__(self, other: "RunBitmap") -> "RunBitmap":
+        result = RunBitmap()
+        i = j = 0
+        while i < len(self.starts) and j < len(other.starts):
+            start = max(self.starts[i], other.starts[j])
+            end = min(self.ends[i], other.ends[j])
+            if start < end:
+                result.starts.append(start)
+                result.ends.append(end)
+            if self.ends[i] < other.ends[j]:
+                i += 1
+            else:
+                j += 1
+        return result
+
+    def count_range(self, start: int, end: int) -> int:
+        """Number of set bits in [start, end)"""
+        total = 0
+        i = bisect_right(self.ends, start)
+        while i < len(self.starts) and self.starts[i] < end:
+            total += min(self.ends[i], end) - max(self.starts[i], start)
+            i += 1
+        return total
+
+    def histogram(self, edges: List[int]) -> List[int]:
+        """
+        Set bits per bucket, in one pass over the runs
+
+        Args:
+            edges: Sorted bucket boundaries; bucket i is [edges[i], edges[i + 1])
+        """
+        counts = [0] * (len(edges) - 1)
+        i = bisect_right(self.ends, edges[0])
+        while i < len(self.starts) and self.starts[i] < edges[-1]:
+            start, end = max(self.starts[i], edges[0]), min(self.ends[i], edges[-1])
+            bucket = bisect_right(edges, start) - 1
+            while start < end:
+                stop = min(end, edges[bucket + 1])
+                counts[bucket] += stop - start
+                start = stop
+                bucket += 1
+            i += 1
+        return counts
+
+    def intersects(self, start: int, end: int) -> bool:
+        """True if any bit in [start, end) is set"""
+        i = bisect_right(self.ends, start)
+        return i < len(self.starts) and self.starts[i] < end
+
+    def __len__(self) -> int:
+        return sum(end - start for start, end in self.runs())
+
+    def __bool__(self) -> bool:
+        return bool(self.starts)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, RunBitmap) and self.starts == other.starts \
+            and self.ends == other.ends
+
+    def __repr__(self) -> str:
+        return f"RunBitmap({list(self.runs())})"
+
+    def encode(self) -> List[int]:
+        """Runs as [start, length, gap, length, ...]"""
+        values, previous_end = [], 0
+        for start, end in self.runs():
+            values.extend((start - previous_end, end - start))
+            previous_end = end
+        return values
+
+    @classmethod
+    def decode(cls, values: List[int]) -> "RunBitmap":
+        bitmap, position = cls(), 0
+        for index in range(0, len(values), 2):
+            start = position + values[index]
+            position = start + values[index + 1]
+            bitmap.starts.append(start)
+            bitmap.ends.append(position)
+        return bitmap
+
+
+class PresenceSegment:
+    """One day of presence bitmaps"""
+
+    def __init__(self, day: date, slot_seconds: int):
+        self.day = day
+        self.slot_seconds = slot_seconds
+        self.scans = RunBitmap()
+        self.devices: Dict[str, RunBitmap] = {}
+        self.mtime = 0.0
+
+    def slot(self, moment: datetime) -> int:
+        """First slot starting at or after ``moment``"""
+        return math.ceil((moment - EPOCH).total_seconds() / self.slot_seconds)
+
+    def slots(self, since: datetime, until: datetime) -> Tuple[int, int]:
+        """Slots [first, last) starting within the time range"""
+        return self.slot(since), self.slot(until)
+
+    def to_dict(self) -> dict:
+        return {
+            "day": self.day.isoformat(),
+            "slot_seconds": self.slot_seconds,
+            "scans": self.scans.encode(),
+            "devices": {mac: bitmap.encode() for mac, bitmap in self.devices.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PresenceSegment":
+        segment = cls(date.fromisoformat(data["day"]), int(data["slot_seconds"]))
+        segment.scans = RunBitmap.decode(data["scans"])
+        segment.devices = {mac: RunBitmap.decode(values)
+                           for mac, values in data["devices"].items()}
+        return segment
+
+
+class PresenceStore:
+    """Records scans into daily presence segments and answers range queries"""
+
+    def __init__(self, directory: str, slot_seconds: int = 60, flush_scans: int = 10,
+                 retention_days: int = 0):
+        """
+        Initialize presence store
+
+        Args:
+            directory: Directory of the daily segment files
+            slot_seconds: Bitmap resolution, normally the scan interval
+            flush_scans: Scans between segment writes
+            retention_days: Segments older than this are deleted (0 keeps all)
+        """
+        self.directory = directory
+        self.slot_seconds = max(1, int(slot_seconds))
+        self.flush_scans = max(1, flush_scans)
+        self.retention_days = retention_days
+        self._segments: Dict[date, PresenceSegment] = {}
+        self._dirty: set = set()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _path(self, day: date) -> str:
+        return os.path.join(self.directory, f"{day:%Y%m%d}.json.gz")
+
+    def record(self, timestamp: datetime, macs: Iterable[str]):
+        """
+        Mark one scan and the devices that answered it
+
+        Args:
+            timestamp: Scan time
+            macs: MAC addresses present in the scan
+        """
+        with self._lock:
+            segment = self._segment(timestamp.date(), create=True)
+            # The slot the scan started in
+            slot = math.floor((timestamp - EPOCH).total_seconds() / segment.slot_seconds)
+            segment.scans.add(slot)
+            for mac in macs:
+                bitmap = segment.devices.get(mac)
+                if bitmap is None:
+                    bitmap = segment.devices[mac] = RunBitmap()
+                bitmap.add(slot)
+            self._dirty.add(segment.day)
+            self._pending += 1
+            flush = self._pending >= self.flush_scans
+        if flush:
+            self.flush()
+
+    def on_scan(self, delta):
+        """``DatabaseManager.scan_listeners`` callback"""
+        self.record(delta.timestamp, delta.devices.keys())
+
+    def flush(self):
+        """Write changed segments to disk"""
+        with self._lock:
+            dirty = [self._segments[day] for day in sorted(self._dirty)]
+            payloads = [(segment, segment.to_dict()) for segment in dirty]
+            self._dirty.clear()
+            self._pending = 0
+        if not payloads:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            for segment, payload in payloads:
+                path = self._path(segment.day)
+                tmp_path = path + ".tmp"
+                with gzip.open(tmp_path, "wt", encoding="utf-8") as fh:
+                    json.dump(payload, fh, separators=(",", ":"))
+                os.replace(tmp_path, path)
+                segment.mtime = os.path.getmtime(path)
+            self._prune()
+        except OSError as e:
+            logger.warning(f"Could not write presence segments to {self.directory}: {e}")
+            with self._lock:
+                self._dirty.update(segment.day for segment, _ in payloads)
+
+    def _prune(self):
+        if not self.retention_days:
+            return
+        cutoff = f"{date.today() - timedelta(days=self.retention_days):%Y%m%d}"
+        for name in os.listdir(self.directory):
+            if name.endswith(".json.gz") and name[:8] < cutoff:
+                os.remove(os.path.join(self.directory, name))
+                with self._lock:
+                    self._segments.pop(datetime.strptime(name[:8], "%Y%m%d").date(), None)
+
+    def _segment(self, day: date, create: bool = False) -> Optional[PresenceSegment]:
+        """Segment for a day, (re)loaded from disk if the file changed; caller holds the lock"""
+        segment = self._segments.get(day)
+        if day in self._dirty:
+            return segment
+        path = self._path(day)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = None
+        if mtime is not None and (segment is None or mtime > segment.mtime):
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as fh:
+                    segment = PresenceSegment.from_dict(json.load(fh))
+                segment.mtime = mtime
+                self._segments[day] = segment
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Could not read presence segment {path}: {e}")
+        if segment is None and create:
+            segment = self._segments[day] = PresenceSegment(day, self.slot_seconds)
+        return segment
+
+    def _stored_days(self, since: datetime, until: datetime) -> List[date]:
+        """Days in a range with a segment on disk, from one directory listing"""
+        if until - since > timedelta(days=MAX_RANGE_DAYS):
+            raise ValueError(f"Range is longer than {MAX_RANGE_DAYS} days")
+        first, last = f"{since:%Y%m%d}", f"{until:%Y%m%d}"
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return [datetime.strptime(name[:8], "%Y%m%d").date() for name in names
+                if name.endswith(".json.gz") and len(name) == 16 and first <= name[:8] <= last]
+
+    def _windows(self, since: datetime, until: datetime,
+                 stored: List[date]) -> List[Tuple[PresenceSegment, int, int]]:
+        """Segments overlapping a time range, each with its slot range; caller holds the lock"""
+        # Segments not written yet count as well
+        days = set(stored)
+        days.update(day for day in self._segments if since.date() <= day <= until.date())
+        windows = []
+        for day in sorted(days):
+            segment = self._segment(day)
+            if segment is not None:
+                windows.append((segment, *segment.slots(since, until)))
+        return windows
+
+    def online(self, since: datetime, until: datetime, mode: str = "any") -> Tuple[List[str], int]:
+        """
+        Devices online in a time range
+
+        Args:
+            since: Range start
+            until: Range end
+            mode: "any" for devices seen in at least one scan, "all" for
+                devices seen in every scan of the range
+
+        Returns:
+            Sorted MAC addresses and the number of scans in the range
+
+        Raises:
+            ValueError: The range is longer than ``MAX_RANGE_DAYS``
+        """
+        stored = self._stored_days(since, until)
+        scans = 0
+        seen: Dict[str, int] = {}
+        with self._lock:
+            for segment, first, last in self._windows(since, until, stored):
+                scans += segment.scans.count_range(first, last)
+                for mac, bitmap in segment.devices.items():
+                    if mode == "all":
+                        seen[mac] = seen.get(mac, 0) + bitmap.count_range(first, last)
+                    elif bitmap.intersects(first, last):
+                        seen[mac] = 1
+        if mode == "all":
+            return sorted(mac for mac, count in seen.items() if scans and count == scans), scans
+        return sorted(seen), scans
+
+    def heatmap(self, since: datetime, until: datetime, bucket_seconds: int,
+                macs: Optional[Iterable[str]] = None) -> Tuple[List[datetime], Dict[str, list]]:
+        """
+        Fraction of scans each device answered, per time bucket
+
+        Args:
+            since: Range start
+            until: Range end
+            bucket_seconds: Bucket width
+            macs: Only these devices (default: every device seen in the range)
+
+        Returns:
+            Bucket start times and MAC -> fraction per bucket (None for a
+            bucket without scans)
+
+        Raises:
+            ValueError: The range is longer than ``MAX_RANGE_DAYS``
+        """
+        stored = self._stored_days(since, until)
+        starts = []
+        while since + timedelta(seconds=bucket_seconds * len(starts)) < until:
+            starts.append(since + timedelta(seconds=bucket_seconds * len(starts)))
+        wanted = {mac.upper() for mac in macs} if macs is not None else None
+
+        scans = [0] * len(starts)
+        counts: Dict[str, List[int]] = {}
+        with self._lock:
+            for segment, first, last in self._windows(since, until, stored):
+                edges = [segment.slot(start) for start in starts] + [last]
+                scans = [a + b for a, b in zip(scans, segment.scans.histogram(edges))]
+                for mac, bitmap in segment.devices.items():
+                    if wanted is not None and mac not in wanted \
+                            or not bitmap.intersects(first, last):
+                        continue
+                    histogram = bitmap.histogram(edges)
+                    row = counts.get(mac)
+                    counts[mac] = histogram if row is None else \
+                        [a + b for a, b in zip(row, histogram)]
+
+        return starts, {
+            mac: [round(count / total, 4) if total else None for count, total in zip(row, scans)]
+            for mac, row in sorted(counts.items())
+        }
@@ -0,0 +1,298 @@
+"""
+Liveness probes for hosts that do not answer ARP
+
+Hosts on routed subnets never see the scanner's ARP requests, and some
+firewalled hosts ignore them. For configured target ranges the scanner
+falls back to ICMP echo and TCP connect probes, run from asyncio with a
+bounded number of probes in flight and a cap on probes started per second.
+
+A TCP probe counts the host alive if the connection is accepted or refused
+(a RST also proves the host is up). ICMP uses an unprivileged datagram
+socket where the OS allows it (Linux: net.ipv4.ping_group_range) and a raw
+socket otherwise, which needs root/CAP_NET_RAW; without either, only TCP is
+probed.
+
+Probed hosts have no MAC address, so they are reported under a stable,
+locally administered MAC derived from the IP (see synthetic_mac), which
+cannot collide with a vendor-assigned one.
+"""
+import asyncio
+import ipaddress
+import itertools
+import logging
+import socket
+import struct
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Set
+from .config import ProbeConfig
+
+logger = logging.getLogger(__name__)
+
+METHODS = ("icmp", "tcp")
+_ECHO_REQUEST = 8
+_ECHO_REPLY = 0
+_PAYLOAD = b"network-monitor"
+_RECEIVE_BUFFER = 1 << 20
+
+
+def synthetic_mac(ip_address: str) -> str:
+    """
+    Stable locally administered MAC standing in for a host probed by IP
+
+    Args:
+        ip_address: IPv4 address
+
+    Returns:
+        02:00 followed by the address octets, e.g. 02:00:0A:14:00:05
+    """
+    octets = ipaddress.IPv4Address(ip_address).packed
+    return "02:00:" + ":".join(f"{octet:02X}" for octet in octets)
+
+
+@dataclass
+class ProbeResult:
+    """A host that answered a probe"""
+    ip_address: str
+    method: str
+    port: Optional[int]
+    rtt: float
+
+
+def _checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def _echo_request(ident: int, seq: int) -> bytes:
+    header = struct.pack("!BBHHH", _ECHO_REQUEST, 0, 0, ident, seq)
+    checksum = _checksum(header + _PAYLOAD)
+    return struct.pack("!BBHHH", _ECHO_REQUEST, 0, checksum, ident, seq) + _PAYLOAD
+
+
+class _RateLimiter:
+    """Spaces probe starts at least 1/rate seconds apart"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+
+    async def wait(self):
+        if not self.interval:
+            return
+        now = asyncio.get_running_loop().time()
+        slot = max(now, self._next)
+        self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class _Pinger:
+    """ICMP echo over one shared socket; replies are matched by source and sequence"""
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self._ident = id(self) & 0xFFFF
+        self._seq = itertools.count()
+        self._waiting: Dict[tuple, asyncio.Future] = {}
+        self._loop = asyncio.get_running_loop()
+        self._loop.add_reader(sock.fileno(), self._on_readable)
+
+    @classmethod
+    def open(cls) -> Optional["_Pinger"]:
+        """Open an ICMP socket, or None if the OS does not allow one"""
+        for kind in (socket.SOCK_DGRAM, socket.SOCK_RAW):
+            try:
+                sock = socket.socket(socket.AF_INET, kind, socket.IPPROTO_ICMP)
+            except OSError:
+                continue
+            sock.setblocking(False)
+            try:
+                # Replies to a full window of probes can arrive in one burst
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, _RECEIVE_BUFFER)
+            except OSError:
+                pass
+            return cls(sock)
+        logger.warning("ICMP probes unavailable (need net.ipv4.ping_group_range or "
+                       "CAP_NET_RAW); probing TCP only")
+        return None
+
+    def close(self):
+        self._loop.remove_reader(self.sock.fileno())
+        self.sock.close()
+
+    def _on_readable(self):
+        while True:
+            try:
+                data, address = self.sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            if data and data[0] >> 4 == 4:
+                # Raw sockets (and datagram ones on some systems) include the IP header
+                data = data[(data[0] & 0x0F) * 4:]
+            if len(data) < 8 or data[0] != _ECHO_REPLY:
+                continue
+            seq = struct.unpack("!H", data[6:8])[0]
+            future = self._waiting.get((address[0], seq))
+            if future is not None and not future.done():
+                future.set_result(None)
+
+    async def ping(self, ip_address: str, timeout: float) -> Optional[float]:
+        """Round-trip time, or None without a reply"""
+        seq = next(self._seq) & 0xFFFF
+        key = (ip_address, seq)
+        future = self._loop.create_future()
+        self._waiting[key] = future
+        started = time.perf_counter()
+        try:
+            self.sock.sendto(_echo_request(self._ident, seq), (ip_address, 0))
+            await asyncio.wait_for(future, timeout)
+            return time.perf_counter() - started
+        except (OSError, asyncio.TimeoutError):
+            return None
+        finally:
+            self._waiting.pop(key, None)
+
+
+class LivenessProber:
+    """Concurrent ICMP/TCP liveness checks over target ranges"""
+
+    def __init__(self, targets: Sequence[str], methods: Sequence[str] = METHODS,
+                 ports: Sequence[int] = (22, 80, 443), concurrency: int = 256,
+                 rate: float = 1000.0, timeout: float = 1.0):
+        """
+        Initialize the prober
+
+        Args:
+            targets: IPv4 addresses and CIDR networks to probe
+            methods: "icmp" and/or "tcp", tried in this order per host
+            ports: TCP ports tried in order until one answers
+            concurrency: Most probes in flight at once
+            rate: Most probes started per second (0 for no cap)
+            timeout: Seconds to wait for each probe
+
+        Raises:
+            ValueError: On an unknown method or an invalid target
+        """
+        unknown = set(methods) - set(METHODS)
+        if unknown:
+            raise ValueError(f"Unknown probe methods: {', '.join(sorted(unknown))}")
+        self.networks = [ipaddress.IPv4Network(target, strict=False) for target in targets]
+        self.methods = list(methods)
+        self.ports = list(ports)
+        self.concurrency = max(1, concurrency)
+        self.rate = rate
+        self.timeout = timeout
+
+    def hosts(self, exclude: Iterable[str] = ()) -> Iterator[str]:
+        """Target addresses, each once, minus excluded ones"""
+        seen: Set[str] = set(exclude)
+        for network in self.networks:
+            addresses = network.hosts() if network.num_addresses > 2 else iter(network)
+            for address in addresses:
+                ip_address = str(address)
+                if ip_address not in seen:
+                    seen.add(ip_address)
+                    yield ip_address
+
+    def probe(self, exclude: Iterable[str] = ()) -> Dict[str, ProbeResult]:
+        """
+        Probe every target host
+
+        Runs its own event loop, so it can be called from the scan thread.
+
+        Args:
+            exclude: Addresses not to probe, e.g. those that answered ARP
+
+        Returns:
+            IP -> result for the hosts that answered
+        """
+        loop = asyncio.SelectorEventLoop()
+        try:
+            return loop.run_until_complete(self.probe_async(exclude))
+        finally:
+            loop.close()
+
+    async def probe_async(self, exclude: Iterable[str] = ()) -> Dict[str, ProbeResult]:
+        """Coroutine version of probe()"""
+        limiter = _RateLimiter(self.rate)
+        pinger = _Pinger.open() if "icmp" in self.methods else None
+        hosts = self.hosts(exclude)
+        found: Dict[str, ProbeResult] = {}
+
+        async def worker():
+            # Workers share one iterator; at most `concurrency` probes are in flight
+            for ip_address in hosts:
+                result = await self._probe_host(ip_address, pinger, limiter)
+                if result is not None:
+                    found[ip_address] = result
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        finally:
+            if pinger is not None:
+                pinger.close()
+        return found
+
+    async def _probe_host(self, ip_address: str, pinger: Optional[_Pinger],
+                          limiter: _RateLimiter) -> Optional[ProbeResult]:
+        for method in self.methods:
+            if method == "icmp" and pinger is not None:
+                await limiter.wait()
+                rtt = await pinger.ping(ip_address, self.timeout)
+                if rtt is not None:
+                    return ProbeResult(ip_address, "icmp", None, rtt)
+            elif method == "tcp":
+                for port in self.ports:
+                    await limiter.wait()
+                    rtt = await self._probe_tcp(ip_address, port)
+                    if rtt is not None:
+                        return ProbeResult(ip_address, "tcp", port, rtt)
+        return None
+
+    async def _probe_tcp(self, ip_address: str, port: int) -> Optional[float]:
+        """Round-trip time of a connect or refusal, or None"""
+        started = time.perf_counter()
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(ip_address, port), self.timeout
+            )
+        except ConnectionRefusedError:
+            return time.perf_counter() - started
+        except (OSError, asyncio.TimeoutError):
+            return None
+        rtt = time.perf_counter() - started
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return rtt
+
+
+def build_prober(config: ProbeConfig) -> Optional[LivenessProber]:
+    """
+    Build the prober for the configured targets
+
+    Args:
+        config: Probe configuration
+
+    Returns:
+        Prober, or None if no targets are configured
+    """
+    if not config.targets:
+        return None
+    return LivenessProber(
+        config.targets,
+        methods=config.methods,
+        ports=config.ports,
+        concurrency=config.concurrency,
+        rate=config.rate,
+        timeout=config.timeout,
+    )
@@ -3,8 +3,16 @@ Network scanning functionality using ARP protocol
 """
 import logging
 import socket
-from typing import Dict, Optional
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 from scapy.all import ARP, Ether, srp
+from .ndp import NeighborDiscovery, Neighbors, preferred_address
+from .probe import LivenessProber, synthetic_mac
+from .tracing import span
+from .metrics import (
+    SCAN_PHASE_SECONDS, SCAN_REPLIES, SCAN_RETRY_RECOVERED, DNS_LOOKUP_SECONDS,
+    CACHE_HITS_TOTAL, CACHE_MISSES_TOTAL, ERRORS_TOTAL,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -12,10 +20,19 @@ logger = logging.getLogger(__name__)
 class Device:
     """Represents a network device"""
     
-    def __init__(self, mac_address: str, ip_address: str, hostname: Optional[str] = None):
+    def __init__(self, mac_address: str, ip_address: str, hostname: Optional[str] = None,
+                 vendor: Optional[str] = None, ipv6_addresses: Iterable[str] = ()):
         self.mac_address = mac_address.upper()
+        # IPv4 address, or the preferred IPv6 one for an IPv6-only device
         self.ip_address = ip_address
         self.hostname = hostname
+        self.vendor = vendor
+        self.ipv6_addresses: Set[str] = set(ipv6_addresses)
+
+    @property
+    def addresses(self) -> Set[str]:
+        """Every address the device answered from"""
+        return self.ipv6_addresses | ({self.ip_address} if self.ip_address else set())
 
     def __repr__(self) -> str:
         return f"Device(mac={self.mac_address}, ip={self.ip_address}, hostname={self.hostname})"
@@ -32,16 +49,42 @@ class Device:
 class NetworkScanner:
     """Handles network scanning operations"""
 
-    def __init__(self, subnet: str, timeout: int = 3):
+    def __init__(self, subnet: str, timeout: int = 3, hostname_cache_ttl: int = 0,
+                 resolve_hostnames: bool = True, retries: int = 1,
+                 retry_timeout: float = 0.5, retry_window: int = 1,
+                 prober: Optional[LivenessProber] = None,
+                 ipv6: Optional[NeighborDiscovery] = None):
         """
         Initialize network scanner
         
         Args:
             subnet: Network subnet to scan (e.g., '192.168.1.0/24')
             timeout: Timeout in seconds for ARP requests
+            hostname_cache_ttl: Seconds to reuse a reverse DNS result (0: resolve
+                every scan)
+            resolve_hostnames: Resolve hostnames during the scan; disable when
+                they are resolved by the enrichment pipeline instead
+            retries: Unicast ARP rounds for known devices the sweep missed (0 disables)
+            retry_timeout: Timeout in seconds for each retry round
+            retry_window: Scans a device is retried for after its last reply,
+                i.e. while it may still count as connected
+            prober: ICMP/TCP prober for target hosts that do not answer ARP
+            ipv6: IPv6 neighbor discovery; its addresses are added to the
+                devices, and IPv6-only devices are reported under their
+                preferred address
         """
         self.subnet = subnet
         self.timeout = timeout
+        self.hostname_cache_ttl = hostname_cache_ttl
+        self.resolve_hostnames = resolve_hostnames
+        self.retries = retries
+        self.retry_timeout = retry_timeout
+        self.retry_window = max(1, retry_window)
+        self.prober = prober
+        self.ipv6 = ipv6
+        self._hostname_cache: Dict[str, Tuple[Optional[str], float]] = {}
+        # MAC -> (last IP, scans since its last reply)
+        self._known: Dict[str, Tuple[str, int]] = {}
         logger.info(f"NetworkScanner initialized for subnet: {subnet}")
 
     def scan(self) -> Dict[str, Device]:
@@ -60,16 +103,42 @@ class NetworkScanner:
             packet = ether / arp
             
             # Send packet and get response
-            result = srp(packet, timeout=self.timeout, verbose=0)[0]
+            with span("scan.arp", SCAN_PHASE_SECONDS.labels(phase="arp"), subnet=self.subnet) as attrs:
+                result = srp(packet, timeout=self.timeout, verbose=0)[0]
+                replies = [(received.hwsrc.upper(), received.psrc) for sent, received in result]
+                attrs["replies"] = len(replies)
+            SCAN_REPLIES.observe(len(replies))
+            
+            # Read before _remember() ages out the devices that missed this scan
+            known = dict(self._known)
+            replies.extend(self._retry_missing({mac for mac, ip in replies}))
+            neighbors = self._discover_ipv6() if self.ipv6 is not None else Neighbors()
+            # Devices known from ARP that answer only over IPv6 keep their IPv4 address
+            answered = {mac for mac, ip in replies}
+            replies.extend((mac, known[mac][0]) for mac in neighbors.live
+                           if mac in known and mac not in answered)
+            self._remember(replies)
+            if self.prober is not None:
+                # Devices known from ARP that missed this scan keep their own MAC
+                excluded = {ip for ip, age in known.values()} | {ip for mac, ip in replies}
+                replies.extend(self._probe(excluded))
+            # Only live neighbors are present; stale ones just add addresses below
+            answered = {mac for mac, ip in replies}
+            replies.extend((mac, preferred_address(addresses))
+                           for mac, addresses in neighbors.live.items() if mac not in answered)
             
-            devices = {}
-            for sent, received in result:
-                mac_address = received.hwsrc.upper()
-                ip_address = received.psrc
-                hostname = self._resolve_hostname(ip_address)
-                
-                device = Device(mac_address, ip_address, hostname)
-                devices[mac_address] = device
+            if not self.resolve_hostnames:
+                devices = {mac: Device(mac, ip) for mac, ip in replies}
+            else:
+                devices = {}
+                with span("scan.resolve", SCAN_PHASE_SECONDS.labels(phase="resolve"), hosts=len(replies)):
+                    for mac_address, ip_address in replies:
+                        hostname = self.resolve_hostname(ip_address)
+                        
+                        device = Device(mac_address, ip_address, hostname)
+                        devices[mac_address] = device
+            for mac, device in devices.items():
+                device.ipv6_addresses |= neighbors.addresses(mac)
             
             logger.info(f"Found {len(devices)} devices on network")
             return devices
@@ -78,9 +147,151 @@ class NetworkScanner:
             logger.error("Permission denied. Network scanning requires administrator/root privileges.")
             raise
         except Exception as e:
+            ERRORS_TOTAL.labels(component="scanner").inc()
             logger.error(f"Error scanning network: {e}", exc_info=True)
             return {}
 
+    def _retry_missing(self, answered: Set[str]) -> List[Tuple[str, str]]:
+        """
+        Second chance for known devices the sweep missed
+        
+        A reply lost under load would otherwise count as a disconnect. Each
+        round sends one ARP request straight to each missing device's MAC
+        and last IP, with a short timeout, so it costs a fraction of a
+        longer sweep timeout or a second sweep.
+        
+        Args:
+            answered: MACs that replied to the sweep
+            
+        Returns:
+            (MAC, IP) of the devices that replied to a retry, up to a
+            failed round
+        """
+        pending = {mac: ip for mac, (ip, age) in self._known.items()
+                   if mac not in answered and age < self.retry_window}
+        if not pending or self.retries <= 0:
+            return []
+        
+        recovered = []
+        with span("scan.retry", SCAN_PHASE_SECONDS.labels(phase="retry"),
+                  devices=len(pending)) as attrs:
+            for _ in range(self.retries):
+                packets = [Ether(dst=mac) / ARP(pdst=ip, hwdst=mac) for mac, ip in pending.items()]
+                try:
+                    result = srp(packets, timeout=self.retry_timeout, verbose=0)[0]
+                except Exception as e:
+                    # The sweep's replies still count; keep what earlier rounds recovered
+                    ERRORS_TOTAL.labels(component="scanner").inc()
+                    logger.warning(f"ARP retry failed: {e}")
+                    break
+                for sent, received in result:
+                    mac = received.hwsrc.upper()
+                    if pending.pop(mac, None) is not None:
+                        recovered.append((mac, received.psrc))
+                if not pending:
+                    break
+            attrs["recovered"] = len(recovered)
+        SCAN_RETRY_RECOVERED.inc(len(recovered))
+        if recovered:
+            logger.info(f"Retries recovered {len(recovered)} devices missed by the sweep")
+        return recovered
+
+    def _remember(self, replies: List[Tuple[str, str]]):
+        """Age the known devices and reset the ones that replied"""
+        known = {mac: (ip, age + 1) for mac, (ip, age) in self._known.items()
+                 if age + 1 < self.retry_window}
+        for mac, ip in replies:
+            known[mac] = (ip, 0)
+        self._known = known
+
+    def _probe(self, answered: Set[str]) -> List[Tuple[str, str]]:
+        """
+        Probe the target hosts that did not answer ARP
+        
+        Args:
+            answered: IPs that answered ARP or belong to devices known from
+                recent ARP scans
+            
+        Returns:
+            (synthetic MAC, IP) of the hosts that answered a probe
+        """
+        with span("scan.probe", SCAN_PHASE_SECONDS.labels(phase="probe")) as attrs:
+            alive = self.prober.probe(exclude=answered)
+            attrs["alive"] = len(alive)
+        logger.info(f"Liveness probes found {len(alive)} hosts")
+        return [(synthetic_mac(ip), ip) for ip in alive]
+
+    def _discover_ipv6(self) -> Neighbors:
+        """
+        Collect IPv6 neighbors
+        
+        Returns:
+            Live and stale neighbors; empty if discovery fails, so the IPv4
+            results still count
+        """
+        with span("scan.ipv6", SCAN_PHASE_SECONDS.labels(phase="ipv6")) as attrs:
+            try:
+                neighbors = self.ipv6.discover()
+            except Exception as e:
+                ERRORS_TOTAL.labels(component="scanner").inc()
+                logger.warning(f"IPv6 neighbor discovery failed: {e}")
+                return Neighbors()
+            attrs["neighbors"] = len(neighbors.live)
+            attrs["stale"] = len(neighbors.stale)
+        logger.info(f"IPv6 discovery found {len(neighbors.live)} live devices "
+                    f"and {len(neighbors.stale)} stale table entries")
+        return neighbors
+
+    def expect(self, devices: Dict[str, str]):
+        """
+        Treat devices as having replied to the last scan, e.g. the connected
+        devices in the database when starting, so the first scan retries them
+        
+        Args:
+            devices: MAC -> last known IP
+        """
+        for mac, ip in devices.items():
+            if ip:
+                self._known[mac.upper()] = (ip, 0)
+
+    def export_hostname_cache(self) -> Dict[str, Tuple[Optional[str], float]]:
+        """Unexpired hostname cache entries with wall-clock (time.time) expiry"""
+        offset = time.time() - time.monotonic()
+        now = time.monotonic()
+        return {ip: (hostname, expires + offset)
+                for ip, (hostname, expires) in list(self._hostname_cache.items()) if expires > now}
+
+    def restore_hostname_cache(self, entries: Dict[str, Tuple[Optional[str], float]]):
+        """Load entries produced by export_hostname_cache(), dropping expired ones"""
+        offset = time.monotonic() - time.time()
+        now = time.monotonic()
+        for ip, (hostname, expires) in entries.items():
+            if expires + offset > now:
+                self._hostname_cache[ip] = (hostname, expires + offset)
+
+    def resolve_hostname(self, ip_address: str) -> Optional[str]:
+        """
+        Resolve a hostname, reusing recent results for the same IP
+        
+        Args:
+            ip_address: IP address to resolve
+            
+        Returns:
+            Hostname if resolved, None otherwise
+        """
+        now = time.monotonic()
+        cached = self._hostname_cache.get(ip_address)
+        if cached is not None and cached[1] > now:
+            CACHE_HITS_TOTAL.labels(cache="hostname").inc()
+            return cached[0]
+        
+        CACHE_MISSES_TOTAL.labels(cache="hostname").inc()
+        with DNS_LOOKUP_SECONDS.time():
+            hostname = self._resolve_hostname(ip_address)
+        if self.hostname_cache_ttl > 0:
+            self._hostname_cache[ip_address] = (hostname, now + self.hostname_cache_ttl)
+        return hostname
+
     @staticmethod
     def _resolve_hostname(ip_address: str) -> Optional[str]:
         """
@@ -0,0 +1,189 @@
+"""
+Drift-free scan scheduling
+"""
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+OVERRUN_POLICIES = ("skip", "defer")
+
+
+class ScanScheduler:
+    """
+    Runs a scan callback on a fixed cadence.
+
+    Scan starts are aligned to ``origin + n * interval`` so the period does not
+    stretch by the scan duration. The wait between scans is interruptible by
+    ``stop()`` and ``trigger()``, and a scan never overlaps another one started
+    through the same scheduler.
+    """
+
+    def __init__(self, interval: float, jitter: float = 0.0,
+                 overrun_policy: str = "skip", history_size: int = 100,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize scan scheduler
+
+        Args:
+            interval: Seconds between scheduled scan starts
+            jitter: Maximum random delay in seconds added to each start
+            overrun_policy: 'skip' drops slots missed by a long scan,
+                'defer' runs one late scan immediately and then realigns
+            history_size: Number of lateness samples to keep
+            clock: Monotonic clock function (injectable for tests)
+        """
+        if interval <= 0:
+            raise ValueError("Scan interval must be positive")
+        if overrun_policy not in OVERRUN_POLICIES:
+            raise ValueError(f"Unknown overrun policy: {overrun_policy}")
+
+        self.interval = float(interval)
+        self.jitter = max(0.0, min(float(jitter), self.interval))
+        self.overrun_policy = overrun_policy
+        self._clock = clock
+
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._scan_lock = threading.Lock()
+        self._running = False
+
+        self.lag_history = deque(maxlen=history_size)
+        self.last_lag: Optional[float] = None
+        self.runs = 0
+        self.skipped = 0
+        self.triggered = 0
+
+    @property
+    def running(self) -> bool:
+        """True while ``run()`` is looping"""
+        return self._running
+
+    def stop(self):
+        """Stop the loop, waking it immediately if it is waiting"""
+        self._stop_event.set()
+        self._wake_event.set()
+
+    def trigger(self):
+        """Request an immediate scan from the running loop"""
+        self._wake_event.set()
+
+    def run_now(self, scan: Callable[[], object]) -> bool:
+        """
+        Run a scan outside the cadence unless one is already in progress
+
+        Args:
+            scan: Scan callback
+
+        Returns:
+            True if the scan ran, False if another scan was in progress
+        """
+        if not self._scan_lock.acquire(blocking=False):
+            logger.warning("Scan already in progress, not starting another")
+            return False
+        try:
+            scan()
+            return True
+        finally:
+            self._scan_lock.release()
+
+    def run(self, scan: Callable[[], object]):
+        """
+        Run scans on the cadence until ``stop()`` is called
+
+        A ``stop()`` issued before the loop starts is honoured; the stop is
+        consumed when the loop exits, so the scheduler can be run again.
+
+        Args:
+            scan: Scan callback
+        """
+        self._wake_event.clear()
+        self._running = True
+        origin = self._clock()
+        slot = 0
+
+        try:
+            while not self._stop_event.is_set():
+                scheduled = origin + slot * self.interval
+                start_at = scheduled + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+                triggered = self._wait_until(start_at)
+                if self._stop_event.is_set():
+                    break
+
+                if triggered:
+                    self.triggered += 1
+                else:
+                    self._record_lag(self._clock() - start_at)
+                    slot += 1
+
+                if self.run_now(scan):
+                    self.runs += 1
+                elif not triggered:
+                    self.skipped += 1
+
+                slot = self._next_slot(origin, slot)
+        finally:
+            self._stop_event.clear()
+            self._running = False
+
+    def _wait_until(self, deadline: float) -> bool:
+        """
+        Sleep until the deadline or a wake-up event
+
+        Returns:
+            True if woken by ``trigger()``, False if the deadline was reached
+        """
+        remaining = deadline - self._clock()
+        if remaining > 0 and self._wake_event.wait(remaining):
+            self._wake_event.clear()
+            return not self._stop_event.is_set()
+        return False
+
+    def _next_slot(self, origin: float, slot: int) -> int:
+        """Apply the overrun policy after a scan and return the next slot"""
+        now = self._clock()
+        due = int((now - origin) // self.interval)
+        if due < slot:
+            return slot
+
+        if self.overrun_policy == "defer":
+            # Run the overdue slot right away, dropping any older ones
+            missed, next_slot = due - slot, due
+        else:
+            missed, next_slot = due - slot + 1, due + 1
+
+        if missed > 0:
+            self.skipped += missed
+            logger.warning(
+                f"Scan overran its interval, {missed} scheduled start(s) skipped"
+            )
+        return next_slot
+
+    def _record_lag(self, lag: float):
+        """Record how late a scheduled scan started"""
+        lag = max(0.0, lag)
+        self.last_lag = lag
+        self.lag_history.append(lag)
+        logger.debug(f"Scan started {lag:.3f}s after its scheduled time")
+
+    def get_stats(self) -> dict:
+        """
+        Get scheduler statistics
+
+        Returns:
+            Dictionary with run, skip and lateness figures
+        """
+        return {
+            "running": self._running,
+            "interval": self.interval,
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "triggered": self.triggered,
+            "last_lag": self.last_lag,
+            "max_lag": max(self.lag_history) if self.lag_history else None,
+        }
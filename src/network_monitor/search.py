@@ -0,0 +1,321 @@
+"""
+Device search index
+
+Serves /api/devices/search from memory. The index follows the device state
+(DeviceStateStore): on each new snapshot only records whose searchable
+fields changed are re-indexed, so a scan that merely refreshes LastSeen
+costs one identity or tuple comparison per device.
+
+Lookups:
+    - MAC prefix: bisect in the sorted, separator-free MAC addresses
+    - IP and CIDR containment: bisect range in the sorted numeric addresses
+    - hostname/device name substring: trigram postings intersected, then
+      verified (queries shorter than three characters scan the names)
+    - connected, vendor and type filters: sets per value
+"""
+import bisect
+import ipaddress
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .state import DeviceRecord, DeviceStateStore, StateSnapshot
+
+logger = logging.getLogger(__name__)
+
+_MAC_QUERY = re.compile(r"^[0-9A-Fa-f:.\-]+$")
+_PARTIAL_IPV4 = re.compile(r"^\d{1,3}(\.\d{1,3}){0,2}\.?$")
+# Above this share of all devices, results are taken in order from the
+# snapshot's sorted device list instead of sorting the matches
+_SCAN_ORDERED_FRACTION = 0.125
+
+
+def _mac_key(mac_address: str) -> str:
+    """Separator-free upper-case MAC, so any notation matches as a prefix"""
+    return re.sub(r"[:.\-]", "", mac_address).upper()
+
+
+def _ip_key(ip_address: Optional[str]) -> Optional[Tuple[int, int]]:
+    try:
+        address = ipaddress.ip_address(ip_address)
+    except ValueError:
+        return None
+    return address.version, int(address)
+
+
+def _query_network(text: str):
+    """
+    The network a free-text query denotes, if any
+
+    Besides addresses and CIDRs, leading whole octets ("192.168.1") stand
+    for the network they start.
+    """
+    if _PARTIAL_IPV4.match(text):
+        octets = text.rstrip(".").split(".")
+        text = ".".join(octets + ["0"] * (4 - len(octets))) + f"/{8 * len(octets)}"
+    try:
+        return ipaddress.ip_network(text, strict=False)
+    except ValueError:
+        return None
+
+
+def _names(record: DeviceRecord) -> str:
+    return "\n".join(name.lower() for name in (record.hostname, record.device_name) if name)
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _fields(record: DeviceRecord) -> tuple:
+    """The fields the index depends on"""
+    return (record.ip_address, record.hostname, record.device_name, record.vendor,
+            record.device_type, record.is_connected)
+
+
+def _lower(value: Optional[str]) -> str:
+    return (value or "").lower()
+
+
+@dataclass
+class SearchResult:
+    """One page of matching devices"""
+    total: int
+    devices: List[DeviceRecord]
+    version: int
+
+
+class DeviceIndex:
+    """Incrementally maintained search index over the device state"""
+
+    def __init__(self, store: Optional[DeviceStateStore] = None):
+        """
+        Initialize the index
+
+        Args:
+            store: Device state to follow; the index updates on every new
+                snapshot. Without one, call update() (search() catches up
+                with the snapshot it is given)
+        """
+        self._lock = threading.Lock()
+        self._snapshot = StateSnapshot({}, -1)
+        self._records: Dict[str, DeviceRecord] = {}
+        self._mac_keys: List[Tuple[str, str]] = []
+        self._ip_keys: List[Tuple[int, int, str]] = []
+        self._names: Dict[str, str] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._connected: Set[str] = set()
+        self._by_vendor: Dict[str, Set[str]] = {}
+        self._by_type: Dict[str, Set[str]] = {}
+        if store is not None:
+            self.update(store.snapshot())
+            store.subscribe(self.update)
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
+    def update(self, snapshot: StateSnapshot):
+        """
+        Bring the index up to a snapshot
+
+        Args:
+            snapshot: Device state to index
+        """
+        with self._lock:
+            if snapshot.version == self._snapshot.version:
+                return
+            devices = snapshot.devices
+            changed = 0
+            # Sorted keys of added records are merged once at the end
+            new_macs: List[Tuple[str, str]] = []
+            new_ips: List[Tuple[int, int, str]] = []
+            for mac, record in devices.items():
+                old = self._records.get(mac)
+                if old is record:
+                    continue
+                if old is None:
+                    self._add(record, new_macs, new_ips)
+                    changed += 1
+                elif _fields(old) != _fields(record):
+                    self._remove(old)
+                    self._add(record, new_macs, new_ips)
+                    changed += 1
+                else:
+                    self._records[mac] = record
+            if len(self._records) != len(devices):
+                for mac in [mac for mac in self._records if mac not in devices]:
+                    self._remove(self._records[mac])
+                    changed += 1
+            self._merge_sorted(self._mac_keys, new_macs)
+            self._merge_sorted(self._ip_keys, new_ips)
+            self._snapshot = snapshot
+        logger.debug(f"Search index at version {snapshot.version}: {changed} devices re-indexed")
+
+    def _add(self, record: DeviceRecord, new_macs: list, new_ips: list):
+        mac = record.mac_address
+        self._records[mac] = record
+        new_macs.append((_mac_key(mac), mac))
+        ip_key = _ip_key(record.ip_address)
+        if ip_key is not None:
+            new_ips.append(ip_key + (mac,))
+        names = _names(record)
+        if names:
+            self._names[mac] = names
+            for trigram in _trigrams(names):
+                self._postings.setdefault(trigram, set()).add(mac)
+        if record.is_connected:
+            self._connected.add(mac)
+        self._by_vendor.setdefault(_lower(record.vendor), set()).add(mac)
+        self._by_type.setdefault(_lower(record.device_type), set()).add(mac)
+
+    def _remove(self, record: DeviceRecord):
+        mac = record.mac_address
+        del self._records[mac]
+        self._discard_sorted(self._mac_keys, (_mac_key(mac), mac))
+        ip_key = _ip_key(record.ip_address)
+        if ip_key is not None:
+            self._discard_sorted(self._ip_keys, ip_key + (mac,))
+        names = self._names.pop(mac, None)
+        if names:
+            for trigram in _trigrams(names):
+                postings = self._postings.get(trigram)
+                if postings is not None:
+                    postings.discard(mac)
+                    if not postings:
+                        del self._postings[trigram]
+        self._connected.discard(mac)
+        for values, key in ((self._by_vendor, _lower(record.vendor)),
+                            (self._by_type, _lower(record.device_type))):
+            members = values.get(key)
+            if members is not None:
+                members.discard(mac)
+                if not members:
+                    del values[key]
+
+    @staticmethod
+    def _merge_sorted(keys: list, new_keys: list):
+        if len(new_keys) < 64:
+            for key in new_keys:
+                bisect.insort(keys, key)
+        else:
+            keys.extend(new_keys)
+            keys.sort()
+
+    @staticmethod
+    def _discard_sorted(keys: list, key: tuple):
+        i = bisect.bisect_left(keys, key)
+        if i < len(keys) and keys[i] == key:
+            del keys[i]
+
+    def _match_mac(self, prefix: str) -> Set[str]:
+        prefix = _mac_key(prefix)
+        matches = set()
+        i = bisect.bisect_left(self._mac_keys, (prefix, ""))
+        while i < len(self._mac_keys) and self._mac_keys[i][0].startswith(prefix):
+            matches.add(self._mac_keys[i][1])
+            i += 1
+        return matches
+
+    def _match_network(self, network) -> Set[str]:
+        version = network.version
+        low = bisect.bisect_left(self._ip_keys, (version, int(network.network_address), ""))
+        high = bisect.bisect_right(self._ip_keys, (version, int(network.broadcast_address), "\uffff"))
+        return {key[2] for key in self._ip_keys[low:high]}
+
+    def _match_name(self, text: str) -> Set[str]:
+        text = text.lower()
+        if len(text) < 3:
+            return {mac for mac, names in self._names.items() if text in names}
+        postings = sorted((self._postings.get(trigram, set()) for trigram in _trigrams(text)),
+                          key=len)
+        candidates = set.intersection(*postings) if postings[0] else set()
+        return {mac for mac in candidates if text in self._names[mac]}
+
+    def _match_values(self, index: Dict[str, Set[str]], values: Iterable[str]) -> Set[str]:
+        matches = set()
+        for value in values:
+            matches |= index.get(value.lower(), set())
+        return matches
+
+    def search(self, snapshot: Optional[StateSnapshot] = None, q: Optional[str] = None,
+               mac: Optional[str] = None, ip: Optional[str] = None,
+               name: Optional[str] = None, connected: Optional[bool] = None,
+               vendors: Iterable[str] = (), device_types: Iterable[str] = (),
+               offset: int = 0, limit: Optional[int] = 50) -> SearchResult:
+        """
+        Find devices, connected first, most recently seen first
+
+        Args:
+            snapshot: Device state to search; the index catches up with it
+                first if it is newer (default: the last indexed snapshot)
+            q: Free text: a MAC prefix, an IP, CIDR or leading octets
+                containing the device's IP, or a hostname/device name
+                substring
+            mac: MAC address prefix, any notation
+            ip: IP address or CIDR network
+            name: Hostname or device name substring
+            connected: Only connected (True) or disconnected (False) devices
+            vendors: Only these vendors (case-insensitive)
+            device_types: Only these device types (case-insensitive)
+            offset: Matches to skip
+            limit: Most devices returned (None for all)
+
+        Returns:
+            Total matches and the requested page
+
+        Raises:
+            ValueError: If ip is not an address or network
+        """
+        network = ipaddress.ip_network(ip, strict=False) if ip else None
+        vendors, device_types = list(vendors), list(device_types)
+        if snapshot is not None and snapshot.version != self.version:
+            self.update(snapshot)
+
+        with self._lock:
+            snapshot = self._snapshot
+            criteria: List[Set[str]] = []
+            if q:
+                matches = self._match_name(q)
+                if _MAC_QUERY.match(q):
+                    matches |= self._match_mac(q)
+                network_query = _query_network(q)
+                if network_query is not None:
+                    matches |= self._match_network(network_query)
+                criteria.append(matches)
+            if mac:
+                criteria.append(self._match_mac(mac))
+            if network is not None:
+                criteria.append(self._match_network(network))
+            if name:
+                criteria.append(self._match_name(name))
+            if vendors:
+                criteria.append(self._match_values(self._by_vendor, vendors))
+            if device_types:
+                criteria.append(self._match_values(self._by_type, device_types))
+
+            if criteria:
+                criteria.sort(key=len)
+                matches = criteria[0].intersection(*criteria[1:])
+                if connected is not None:
+                    matches = matches & self._connected if connected else \
+                        matches - self._connected
+            elif connected is not None:
+                matches = set(self._connected) if connected else \
+                    set(self._records) - self._connected
+            else:
+                matches = None
+
+        if matches is None:
+            ordered = snapshot.ordered()
+        elif len(matches) > len(snapshot.devices) * _SCAN_ORDERED_FRACTION:
+            ordered = [record for record in snapshot.ordered() if record.mac_address in matches]
+        else:
+            ordered = [snapshot.devices[mac] for mac in matches]
+            ordered.sort(key=lambda d: (d.is_connected, d.last_seen or datetime.min), reverse=True)
+        end = None if limit is None else offset + limit
+        return SearchResult(len(ordered), ordered[offset:end], snapshot.version)
+
@@ -0,0 +1,164 @@
+"""
+Device sessions
+
+A session is one stretch of connectivity: it starts with a CONNECTED event
+and ends with the matching DISCONNECTED event (EndTime is NULL while the
+device is still connected). The database writer opens and closes sessions
+as it logs events, so history and uptime are range reads on
+DeviceSessions(MACAddress, StartTime) instead of pairing ConnectionLog rows
+at query time.
+
+Existing history is converted once with:
+
+    python -m network_monitor.sessions backfill
+"""
+import argparse
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DeviceSession:
+    """One connected period of a device"""
+    mac_address: str
+    ip_address: Optional[str]
+    start_time: datetime
+    end_time: Optional[datetime] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.end_time is None
+
+    def duration(self, now: Optional[datetime] = None) -> float:
+        """Seconds connected, up to ``now`` for an open session"""
+        end = self.end_time or now or datetime.now()
+        return max(0.0, (end - self.start_time).total_seconds())
+
+    def to_dict(self, now: Optional[datetime] = None) -> dict:
+        """Serialize in the shape returned by the web API"""
+        return {
+            'ip_address': self.ip_address,
+            'start_time': self.start_time.isoformat(),
+            'end_time': self.end_time.isoformat() if self.end_time else None,
+            'duration_seconds': round(self.duration(now), 3),
+        }
+
+
+def pair_events(events: Iterable[Tuple[str, Optional[str], str, datetime]],
+                devices: Dict[str, Tuple[bool, datetime]]) -> Iterator[DeviceSession]:
+    """
+    Rebuild sessions from logged events
+
+    Args:
+        events: (MAC, IP, event type, event time) ordered by MAC, then time
+        devices: MAC -> (is connected, last seen) from DeviceConnections
+
+    Yields:
+        Sessions, per device in start order
+    """
+    def settle(session: DeviceSession) -> DeviceSession:
+        # A session the log leaves open is only still open if the device is
+        is_connected, last_seen = devices.get(session.mac_address, (False, session.start_time))
+        if not is_connected:
+            session.end_time = max(last_seen, session.start_time)
+        return session
+
+    current_mac = None
+    open_session: Optional[DeviceSession] = None
+    for mac, ip_address, event_type, event_time in events:
+        if mac != current_mac:
+            if open_session is not None:
+                yield settle(open_session)
+            current_mac, open_session = mac, None
+
+        if event_type == "CONNECTED":
+            if open_session is not None:
+                # Missing DISCONNECTED (e.g. the log was trimmed); end it here
+                open_session.end_time = event_time
+                yield open_session
+            open_session = DeviceSession(mac, ip_address, event_time)
+        elif event_type == "DISCONNECTED" and open_session is not None:
+            open_session.end_time = event_time
+            yield open_session
+            open_session = None
+
+    if open_session is not None:
+        yield settle(open_session)
+
+
+def uptime_seconds(sessions: Iterable[DeviceSession], since: datetime,
+                   until: Optional[datetime] = None) -> float:
+    """
+    Connected time within a window
+
+    Args:
+        sessions: Sessions overlapping the window
+        since: Window start
+        until: Window end (now if None)
+
+    Returns:
+        Seconds connected between ``since`` and ``until``
+    """
+    until = until or datetime.now()
+    total = 0.0
+    for session in sessions:
+        start = max(session.start_time, since)
+        end = min(session.end_time or until, until)
+        if end > start:
+            total += (end - start).total_seconds()
+    return total
+
+
+def session_history(sessions: List[DeviceSession]) -> List[dict]:
+    """
+    Connection events implied by sessions, newest first
+
+    Args:
+        sessions: Sessions, newest first
+
+    Returns:
+        Events in the shape of the ConnectionLog history
+    """
+    history = []
+    for session in sessions:
+        if session.end_time is not None:
+            history.append({
+                'event_type': 'DISCONNECTED',
+                'event_time': session.end_time.isoformat(),
+                'ip_address': None,
+            })
+        history.append({
+            'event_type': 'CONNECTED',
+            'event_time': session.start_time.isoformat(),
+            'ip_address': session.ip_address,
+        })
+    return history
+
+
+def main():
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(description="Maintain the DeviceSessions table")
+    commands = parser.add_subparsers(dest="command", required=True)
+    backfill_cmd = commands.add_parser(
+        "backfill", help="rebuild DeviceSessions from ConnectionLog"
+    )
+    backfill_cmd.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    from .config import Config
+    from .database import DatabaseManager
+    database = DatabaseManager(Config.load().database)
+    try:
+        written = database.backfill_sessions(batch_size=args.batch_size)
+        print(f"{written} session(s) written")
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+In-memory device state shared between the monitor and the web API
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, List, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DeviceRecord:
+    """Current state of one device, mirroring a DeviceConnections row"""
+    mac_address: str
+    ip_address: Optional[str]
+    hostname: Optional[str]
+    first_seen: Optional[datetime]
+    last_seen: Optional[datetime]
+    is_connected: bool
+    device_name: Optional[str] = None
+    device_type: Optional[str] = None
+    vendor: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DeviceRecord":
+        """Deserialize a record produced by to_dict()"""
+        return cls(
+            mac_address=data['mac_address'],
+            ip_address=data.get('ip_address'),
+            hostname=data.get('hostname'),
+            first_seen=_parse_time(data.get('first_seen')),
+            last_seen=_parse_time(data.get('last_seen')),
+            is_connected=bool(data.get('is_connected')),
+            device_name=data.get('device_name'),
+            device_type=data.get('device_type'),
+            vendor=data.get('vendor'),
+        )
+
+    def to_dict(self) -> dict:
+        """Serialize in the shape returned by the web API"""
+        return {
+            'mac_address': self.mac_address,
+            'ip_address': self.ip_address,
+            'hostname': self.hostname,
+            'device_name': self.device_name,
+            'device_type': self.device_type,
+            'vendor': self.vendor,
+            'first_seen': self.first_seen.isoformat() if self.first_seen else None,
+            'last_seen': self.last_seen.isoformat() if self.last_seen else None,
+            'is_connected': self.is_connected,
+        }
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+class StateSnapshot:
+    """Immutable view of the device set at one version"""
+
+    def __init__(self, devices: Dict[str, DeviceRecord], version: int,
+                 updated_at: Optional[datetime] = None):
+        self.devices: Mapping[str, DeviceRecord] = MappingProxyType(devices)
+        self.version = version
+        self.updated_at = updated_at
+        self.created = time.monotonic()
+        self.connected_count = sum(1 for d in devices.values() if d.is_connected)
+        self._ordered: Optional[List[DeviceRecord]] = None
+
+    @property
+    def total_count(self) -> int:
+        return len(self.devices)
+
+    def get(self, mac_address: str) -> Optional[DeviceRecord]:
+        """Look up a device by MAC address"""
+        return self.devices.get(mac_address.upper())
+
+    def ordered(self) -> List[DeviceRecord]:
+        """All devices, connected first, most recently seen first"""
+        if self._ordered is None:
+            self._ordered = sorted(
+                self.devices.values(),
+                key=lambda d: (d.is_connected, d.last_seen or datetime.min),
+                reverse=True
+            )
+        return self._ordered
+
+    def connected(self) -> List[DeviceRecord]:
+        """Connected devices, most recently seen first"""
+        return [d for d in self.ordered() if d.is_connected]
+
+
+class DeviceStateStore:
+    """
+    Thread-safe, versioned device state
+
+    Writers build a new device map and swap it in under a lock; readers take
+    the current snapshot without locking and never observe a partial update.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = StateSnapshot({}, 0)
+        self._listeners: List[Callable[[StateSnapshot], None]] = []
+
+    def snapshot(self) -> StateSnapshot:
+        """Get the current snapshot"""
+        return self._snapshot
+
+    def load(self, records: Iterable[DeviceRecord], updated_at: Optional[datetime] = None):
+        """
+        Replace the state with records loaded from the database
+
+        Args:
+            records: Device records
+            updated_at: Time the records reflect (defaults to now)
+        """
+        with self._lock:
+            devices = {record.mac_address: record for record in records}
+            self._swap(devices, updated_at or datetime.now())
+        logger.info(f"Device state loaded: {len(devices)} devices")
+
+    def publish(self, delta) -> StateSnapshot:
+        """
+        Apply a committed scan
+
+        Args:
+            delta: ScanDelta returned by DatabaseManager.update_device_status
+
+        Returns:
+            The new snapshot
+        """
+        with self._lock:
+            devices = dict(self._snapshot.devices)
+            timestamp = delta.timestamp
+
+            for mac in delta.disconnected:
+                record = devices.get(mac)
+                if record is not None:
+                    devices[mac] = replace(record, is_connected=False)
+
+            for mac, device in delta.devices.items():
+                record = devices.get(mac)
+                if record is None:
+                    devices[mac] = DeviceRecord(
+                        mac_address=mac,
+                        ip_address=device.ip_address,
+                        hostname=device.hostname,
+                        first_seen=timestamp,
+                        last_seen=timestamp,
+                        is_connected=True,
+                        vendor=device.vendor,
+                    )
+                else:
+                    devices[mac] = replace(
+                        record,
+                        ip_address=device.ip_address,
+                        hostname=device.hostname or record.hostname,
+                        last_seen=timestamp,
+                        is_connected=True,
+                        vendor=record.vendor or device.vendor,
+                    )
+
+            return self._swap(devices, timestamp)
+
+    def apply_enrichment(self, results) -> StateSnapshot:
+        """
+        Apply enrichment results to known devices
+
+        Args:
+            results: EnrichmentJob objects written by the enrichment pipeline
+
+        Returns:
+            The new snapshot
+        """
+        with self._lock:
+            devices = dict(self._snapshot.devices)
+            for job in results:
+                record = devices.get(job.mac_address)
+                if record is None:
+                    continue
+                devices[job.mac_address] = replace(
+                    record,
+                    hostname=job.hostname or record.hostname,
+                    vendor=job.vendor or record.vendor,
+                    device_type=record.device_type or job.device_type,
+                )
+            return self._swap(devices, self._snapshot.updated_at)
+
+    def merge(self, records: Iterable[DeviceRecord], removed: Iterable[str] = (),
+              updated_at: Optional[datetime] = None) -> StateSnapshot:
+        """
+        Replace individual records, e.g. with changes received from another process
+
+        Args:
+            records: New or changed device records
+            removed: MAC addresses to drop
+            updated_at: Time the changes reflect
+
+        Returns:
+            The new snapshot
+        """
+        with self._lock:
+            devices = dict(self._snapshot.devices)
+            for mac in removed:
+                devices.pop(mac, None)
+            for record in records:
+                devices[record.mac_address] = record
+            return self._swap(devices, updated_at or self._snapshot.updated_at)
+
+    def subscribe(self, listener: Callable[[StateSnapshot], None]):
+        """
+        Register a callback invoked with each new snapshot
+
+        Args:
+            listener: Callback taking the new snapshot
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[StateSnapshot], None]):
+        """Remove a callback registered with subscribe()"""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _swap(self, devices: Dict[str, DeviceRecord], updated_at: datetime) -> StateSnapshot:
+        snapshot = StateSnapshot(devices, self._snapshot.version + 1, updated_at)
+        self._snapshot = snapshot
+        for listener in self._listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logger.error(f"State listener failed: {e}", exc_info=True)
+        return snapshot
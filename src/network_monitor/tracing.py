@@ -0,0 +1,230 @@
+"""
+Scan tracing and on-demand profiling
+
+Spans time each phase of a scan and emit one structured log record per span
+on the ``network_monitor.trace`` logger. The sampling profiler captures the
+stacks of the scanning thread for the next N scans and writes them as
+collapsed stacks (one ``frame;frame;frame count`` line each), which standard
+flame graph tools read directly.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+trace_logger = logging.getLogger("network_monitor.trace")
+
+_state = threading.local()
+_enabled = False
+
+
+def set_enabled(enabled: bool):
+    """Turn span emission on or off"""
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    """True if spans are being emitted"""
+    return _enabled
+
+
+@contextmanager
+def span(name: str, histogram=None, **attributes):
+    """
+    Time a block as a named span
+
+    The duration is always observed on ``histogram`` when one is given; the
+    structured log record is only built and emitted while tracing is enabled.
+
+    Args:
+        name: Span name (e.g. 'scan.arp')
+        histogram: Optional histogram child to observe the duration on
+        attributes: Extra fields for the log record
+    """
+    stack = getattr(_state, "stack", None)
+    if stack is None:
+        stack = _state.stack = []
+    trace_id = stack[0][0] if stack else uuid.uuid4().hex[:16]
+    parent = stack[-1][1] if stack else None
+    stack.append((trace_id, name))
+
+    started = time.perf_counter()
+    try:
+        yield attributes
+    finally:
+        duration = time.perf_counter() - started
+        stack.pop()
+        if histogram is not None:
+            histogram.observe(duration)
+        if _enabled:
+            record = {
+                "trace_id": trace_id,
+                "span": name,
+                "parent": parent,
+                "duration_ms": round(duration * 1000, 3),
+            }
+            record.update(attributes)
+            trace_logger.info(json.dumps(record, default=str), extra={"trace": record})
+
+
+class TracedCursor:
+    """Cursor wrapper that emits a span per executed statement"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, sql: str, *params):
+        statement = " ".join(sql.split())[:80]
+        with span("db.statement", statement=statement):
+            return self._cursor.execute(sql, *params)
+
+    def executemany(self, sql: str, params):
+        statement = " ".join(sql.split())[:80]
+        with span("db.statement", statement=statement, batch=True):
+            return self._cursor.executemany(sql, params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+
+def traced_cursor(cursor):
+    """
+    Wrap a cursor for per-statement timing while tracing is enabled
+
+    Args:
+        cursor: DB-API cursor
+
+    Returns:
+        The cursor itself when tracing is off, a TracedCursor otherwise
+    """
+    return TracedCursor(cursor) if _enabled else cursor
+
+
+class SamplingProfiler:
+    """Periodically samples the stack of one thread"""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        """
+        Initialize sampling profiler
+
+        Args:
+            thread_id: Identifier of the thread to sample
+            interval: Seconds between samples
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start sampling in a background thread"""
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._sample_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+
+    def _sample_loop(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def write(self, path: str):
+        """Write samples as collapsed stacks"""
+        with open(path, "w", encoding="utf-8") as fh:
+            for stack, count in self.samples.most_common():
+                fh.write(f"{stack} {count}\n")
+
+
+class ScanProfiler:
+    """Profiles the next N scans on request"""
+
+    def __init__(self, output_dir: str = ".", interval: float = 0.005):
+        """
+        Initialize scan profiler
+
+        Args:
+            output_dir: Directory profile files are written to
+            interval: Seconds between stack samples
+        """
+        self.output_dir = output_dir
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._remaining = 0
+        self._profiler: Optional[SamplingProfiler] = None
+        self.last_output: Optional[str] = None
+
+    @property
+    def pending(self) -> int:
+        """Number of scans still to be profiled"""
+        return self._remaining
+
+    def request(self, scans: int):
+        """
+        Profile the next ``scans`` scans
+
+        Args:
+            scans: Number of scans to capture (0 cancels a pending request)
+        """
+        with self._lock:
+            self._remaining = max(0, int(scans))
+        logger.info(f"Profiling requested for the next {scans} scan(s)")
+
+    @contextmanager
+    def profile_scan(self):
+        """Sample the calling thread for the enclosed scan if one was requested"""
+        if not self._remaining:
+            yield
+            return
+
+        if self._profiler is None:
+            self._profiler = SamplingProfiler(threading.get_ident(), self.interval)
+        self._profiler.thread_id = threading.get_ident()
+        self._profiler.start()
+        try:
+            yield
+        finally:
+            self._profiler.stop()
+            with self._lock:
+                self._remaining = max(0, self._remaining - 1)
+                finished = self._remaining == 0
+            if finished:
+                self._write()
+
+    def _write(self):
+        profiler, self._profiler = self._profiler, None
+        path = os.path.join(
+            self.output_dir,
+            f"scan_profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
+        )
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            profiler.write(path)
+            self.last_output = path
+            logger.info(f"Scan profile written to {path}")
+        except OSError as e:
+            logger.error(f"Could not write scan profile: {e}")
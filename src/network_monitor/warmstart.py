@@ -0,0 +1,151 @@
+"""
+Warm start
+
+After every committed scan the monitor writes a small snapshot: scan
+generation and time, the devices connected in the database, the ones among
+them missing from the last scan, disconnect miss counters and unexpired
+hostname lookups. On startup the snapshot is checked against the database;
+if nothing else has written to it since, the monitor resumes exactly where
+it stopped (counters, caches, generation). Otherwise it starts from the
+database alone.
+
+Either way, if the last scan is older than ``downtime_after`` seconds the
+gap is treated as monitor downtime: the first scan disconnects devices that
+left during it at the time of the last scan before it, without debouncing,
+and records the gap in MonitorDowntime, instead of reporting the departures
+as churn at restart time.
+"""
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+# DATETIME columns round to 1/300 s, so LastSeen may be a little past scanned_at
+CLOCK_TOLERANCE = timedelta(seconds=1)
+
+
+@dataclass
+class MonitorSnapshot:
+    """Monitor state after a committed scan"""
+    generation: int
+    scanned_at: datetime
+    connected: List[str]
+    # Connected devices that did not answer the last scan (debounce pending)
+    missing: List[str] = field(default_factory=list)
+    misses: dict = field(default_factory=dict)
+    # IP -> (hostname, wall-clock expiry)
+    hostnames: Dict[str, Tuple[Optional[str], float]] = field(default_factory=dict)
+
+    @property
+    def present(self) -> Set[str]:
+        """Devices that answered the last scan"""
+        return set(self.connected) - set(self.missing)
+
+    def to_dict(self) -> dict:
+        return {
+            "version": SNAPSHOT_VERSION,
+            "generation": self.generation,
+            "scanned_at": self.scanned_at.isoformat(),
+            "connected": self.connected,
+            "missing": self.missing,
+            "misses": self.misses,
+            "hostnames": {ip: list(entry) for ip, entry in self.hostnames.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "MonitorSnapshot":
+        if data.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"unsupported snapshot version {data.get('version')}")
+        return cls(
+            generation=int(data["generation"]),
+            scanned_at=datetime.fromisoformat(data["scanned_at"]),
+            connected=list(data["connected"]),
+            missing=list(data.get("missing", [])),
+            misses=dict(data.get("misses", {})),
+            hostnames={ip: (hostname, float(expires))
+                       for ip, (hostname, expires) in data.get("hostnames", {}).items()},
+        )
+
+
+class SnapshotFile:
+    """Atomically replaced JSON file holding the latest snapshot"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Optional[MonitorSnapshot]:
+        """Read the snapshot, or None if there is no usable one"""
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                return MonitorSnapshot.from_dict(json.load(fh))
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring monitor snapshot {self.path}: {e}")
+            return None
+
+    def save(self, snapshot: MonitorSnapshot):
+        """Replace the snapshot"""
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                json.dump(snapshot.to_dict(), fh, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save monitor snapshot to {self.path}: {e}")
+
+
+@dataclass
+class ResumePlan:
+    """How the monitor resumes after a restart"""
+    # The snapshot, if it still matches the database
+    snapshot: Optional[MonitorSnapshot]
+    # Last committed scan, from the snapshot or the database
+    last_scan: Optional[datetime]
+    # Set when the gap since the last scan counts as downtime
+    downtime_since: Optional[datetime]
+
+
+def plan_resume(snapshot: Optional[MonitorSnapshot], connected: Set[str],
+                last_seen: Optional[datetime], now: datetime,
+                downtime_after: float) -> ResumePlan:
+    """
+    Validate a snapshot against the database and decide how to resume
+
+    Args:
+        snapshot: Snapshot from the last run, if any
+        connected: Devices the database marks connected
+        last_seen: Latest LastSeen in the database
+        now: Current time
+        downtime_after: Seconds without a scan that count as downtime
+
+    Returns:
+        Resume plan
+    """
+    valid = snapshot
+    if snapshot is not None:
+        problem = None
+        if snapshot.scanned_at > now:
+            problem = "it is dated in the future"
+        elif set(snapshot.connected) != connected:
+            problem = "the connected devices differ"
+        elif last_seen is not None and last_seen > snapshot.scanned_at + CLOCK_TOLERANCE:
+            problem = "the database has newer scans"
+        if problem:
+            logger.warning(f"Monitor snapshot does not match the database ({problem}); "
+                           f"resuming from the database")
+            valid = None
+
+    last_scan = valid.scanned_at if valid is not None else last_seen
+    downtime_since = None
+    if last_scan is not None and (now - last_scan).total_seconds() > downtime_after:
+        downtime_since = last_scan
+    return ResumePlan(valid, last_scan, downtime_since)
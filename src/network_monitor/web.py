@@ -1,16 +1,26 @@
 """
 Web dashboard for Network Monitor
 """
+import ipaddress
 import logging
 import threading
 import time
 from datetime import datetime, timedelta
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, Response, g, render_template, jsonify, request
 from flask_cors import CORS
 from typing import Optional
 from .config import Config
 from .database import DatabaseManager
 from .monitor import NetworkMonitor
+from .state import DeviceStateStore, StateSnapshot
+from .ipc import IpcError, StatePublisher, StateSubscriber, send_command
+from .leader import FileLease, LeaderElection
+from .export import FORMATS, ExportError, export, parse_time
+from .sessions import session_history, uptime_seconds
+from .presence import MAX_RANGE_DAYS, PresenceStore
+from .search import DeviceIndex
+from . import analytics
+from .metrics import REGISTRY, CONTENT_TYPE, HTTP_REQUEST_SECONDS
 
 logger = logging.getLogger(__name__)
 
@@ -22,43 +32,188 @@ CORS(app)
 # Global variables
 config: Optional[Config] = None
 db_manager: Optional[DatabaseManager] = None
+device_state = DeviceStateStore()
+device_index = DeviceIndex(device_state)
 monitor: Optional[NetworkMonitor] = None
 monitor_thread: Optional[threading.Thread] = None
 monitoring_active = False
+# Set while following another process's scans (SCANNER_MODE=process, or a
+# follower under SCANNER_MODE=leader)
+scanner_link: Optional[StateSubscriber] = None
+# Set under SCANNER_MODE=leader
+election: Optional[LeaderElection] = None
+# Reads the presence segments written by whichever process scans
+presence_reader: Optional[PresenceStore] = None
+publisher: Optional[StatePublisher] = None
 
 
-def init_app(app_config: Config):
+def init_app(app_config: Config, database: Optional[DatabaseManager] = None):
     """Initialize the web application with configuration"""
-    global config, db_manager
+    global config, db_manager, scanner_link, presence_reader
     config = app_config
-    db_manager = DatabaseManager(config.database)
+    db_manager = database or DatabaseManager(config.database)
+    if config.presence.enabled:
+        presence_reader = PresenceStore(config.presence.directory,
+                                        slot_seconds=config.presence.slot_seconds)
+    device_state.load(db_manager.get_device_records())
+    if config.process.scanner_mode in ("process", "leader"):
+        scanner_link = StateSubscriber(
+            config.process.ipc_address, device_state, heartbeat=config.process.heartbeat
+        )
+        scanner_link.start()
     logger.info("Web application initialized")
 
 
+def start_scanning(auto_start: bool = True):
+    """
+    Start scanning as configured by SCANNER_MODE
+    
+    Args:
+        auto_start: Start the monitor loop in the process that scans
+    """
+    global election
+    mode = config.process.scanner_mode
+    if mode == "leader":
+        election = LeaderElection(
+            FileLease(config.process.leader_lock),
+            on_elected=lambda: _become_leader(auto_start),
+            retry_interval=config.process.heartbeat
+        )
+        election.start()
+    elif mode == "process":
+        logger.info(f"Following the scanner process at {config.process.ipc_address}")
+    elif auto_start:
+        start_monitoring()
+
+
+def _become_leader(auto_start: bool):
+    """Take over scanning and publish state to the other workers"""
+    global scanner_link, publisher
+    if scanner_link is not None:
+        scanner_link.stop()
+        scanner_link = None
+    
+    # The previous leader may have committed scans this worker never received
+    device_state.load(db_manager.get_device_records())
+    publisher = StatePublisher(
+        device_state,
+        config.process.ipc_address,
+        commands={
+            name: (lambda args, name=name: _run_local_command(name, args))
+            for name in ('start', 'stop', 'status', 'scan', 'profile')
+        },
+        status=local_status,
+        heartbeat=config.process.heartbeat
+    )
+    publisher.start()
+    if auto_start:
+        try:
+            start_monitoring()
+        except Exception:
+            # Stay leader; monitoring can be started later through the API
+            pass
+
+
+def local_status() -> dict:
+    """Monitor status of this process"""
+    status = monitor.runtime_status() if monitor else {'scheduler': None, 'profile': None}
+    status['monitoring_active'] = monitoring_active
+    return status
+
+
+def is_monitoring() -> bool:
+    """True if scans are running, in this process or the one being followed"""
+    if scanner_link is not None:
+        return scanner_link.connected and scanner_link.status.get('monitoring_active', False)
+    return monitoring_active
+
+
+def run_command(command: str, **args):
+    """
+    Run a control command on the monitor, wherever it runs
+    
+    Args:
+        command: start, stop, status, or a NetworkMonitor.control_commands name
+        **args: Command arguments
+        
+    Returns:
+        The command's result, or None if monitoring is not initialized
+        
+    Raises:
+        IpcError: If the scanning process is unreachable or rejected the command
+    """
+    if scanner_link is not None:
+        return send_command(config.process.ipc_address, command, **args)
+    return _run_local_command(command, args)
+
+
+def _run_local_command(command: str, args: dict):
+    if command == 'start':
+        start_monitoring()
+        return local_status()
+    if command == 'stop':
+        stop_monitoring()
+        return local_status()
+    if command == 'status':
+        return local_status()
+    if not monitor:
+        return None
+    return monitor.control_commands()[command](args)
+
+
+def current_state() -> StateSnapshot:
+    """
+    Get the device state served by the API
+    
+    While the monitor runs in this process, or a scanner process is publishing
+    to it, every committed scan lands in the state, so reads never touch the
+    database. Otherwise the state is reloaded from the database at most once
+    per scan interval.
+    """
+    snapshot = device_state.snapshot()
+    live = monitoring_active or (scanner_link is not None and scanner_link.connected)
+    if not live and time.monotonic() - snapshot.created >= config.network.scan_interval:
+        device_state.load(db_manager.get_device_records())
+        snapshot = device_state.snapshot()
+    return snapshot
+
+
+def presence_store() -> Optional[PresenceStore]:
+    """The local monitor's presence store (includes unflushed scans), else the reader"""
+    if monitor is not None and monitor.presence is not None:
+        return monitor.presence
+    return presence_reader
+
+
 def start_monitoring():
     """Start the network monitoring in a background thread"""
     global monitor, monitor_thread, monitoring_active
     
+    if scanner_link is not None:
+        logger.info("Scanning runs in another process")
+        return
+    
     if monitoring_active:
         logger.warning("Monitoring is already active")
         return
     
     try:
-        monitor = NetworkMonitor(config)
+        monitor = NetworkMonitor(config, state=device_state)
         monitoring_active = True
         
-        def monitoring_loop():
+        def monitoring_loop(running: NetworkMonitor):
             global monitoring_active
             logger.info("Background monitoring started")
             try:
-                while monitoring_active:
-                    monitor.scan_once()
-                    time.sleep(config.network.scan_interval)
+                running.scheduler.run(running.scan_once)
             except Exception as e:
                 logger.error(f"Error in monitoring loop: {e}", exc_info=True)
+            finally:
                 monitoring_active = False
+                # After the last scan, so its events and enrichment are delivered
+                running.cleanup()
         
-        monitor_thread = threading.Thread(target=monitoring_loop, daemon=True)
+        monitor_thread = threading.Thread(target=monitoring_loop, args=(monitor,), daemon=True)
         monitor_thread.start()
         logger.info("Monitoring thread started")
         
@@ -72,9 +227,32 @@ def stop_monitoring():
     """Stop the network monitoring"""
     global monitoring_active
     monitoring_active = False
+    if monitor:
+        monitor.stop()
+    if monitor_thread and monitor_thread.is_alive() \
+            and monitor_thread is not threading.current_thread():
+        # The scheduler wakes immediately; only an in-flight scan delays this
+        monitor_thread.join(timeout=config.network.timeout + 5)
     logger.info("Monitoring stopped")
 
 
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def _observe_request_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None and request.url_rule is not None:
+        HTTP_REQUEST_SECONDS.labels(
+            endpoint=request.url_rule.rule,
+            method=request.method,
+            status=response.status_code
+        ).observe(time.perf_counter() - started)
+    return response
+
+
 # Routes
 @app.route('/')
 def index():
@@ -82,18 +260,35 @@ def index():
     return render_template('index.html')
 
 
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics in the text exposition format"""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
 @app.route('/api/status')
 def get_status():
     """Get current monitoring status"""
     try:
-        device_counts = db_manager.get_device_count()
+        snapshot = current_state()
+        active = is_monitoring()
+        if scanner_link is not None:
+            scheduler = scanner_link.status.get('scheduler')
+        else:
+            scheduler = monitor.scheduler.get_stats() if monitor else None
         return jsonify({
-            'status': 'running' if monitoring_active else 'stopped',
-            'monitoring_active': monitoring_active,
+            'status': 'running' if active else 'stopped',
+            'monitoring_active': active,
+            'scanner_mode': config.process.scanner_mode,
+            'scanner_connected': scanner_link.connected if scanner_link is not None else None,
+            'leader': election.is_leader if election is not None else None,
             'network': config.network.subnet,
             'scan_interval': config.network.scan_interval,
-            'connected_devices': device_counts['connected'],
-            'total_devices': device_counts['total'],
+            'scheduler': scheduler,
+            'connected_devices': snapshot.connected_count,
+            'total_devices': snapshot.total_count,
+            'state_version': snapshot.version,
+            'last_update': snapshot.updated_at.isoformat() if snapshot.updated_at else None,
             'timestamp': datetime.now().isoformat()
         })
     except Exception as e:
@@ -105,76 +300,62 @@ def get_status():
 def get_devices():
     """Get all devices with their current status"""
     try:
-        cursor = db_manager.connection.cursor()
-        cursor.execute("""
-            SELECT 
-                MACAddress,
-                IPAddress,
-                Hostname,
-                DeviceName,
-                DeviceType,
-                Vendor,
-                FirstSeen,
-                LastSeen,
-                IsConnected
-            FROM DeviceConnections
-            ORDER BY IsConnected DESC, LastSeen DESC
-        """)
-        
-        devices = []
-        for row in cursor.fetchall():
-            devices.append({
-                'mac_address': row.MACAddress,
-                'ip_address': row.IPAddress,
-                'hostname': row.Hostname,
-                'device_name': row.DeviceName,
-                'device_type': row.DeviceType,
-                'vendor': row.Vendor,
-                'first_seen': row.FirstSeen.isoformat() if row.FirstSeen else None,
-                'last_seen': row.LastSeen.isoformat() if row.LastSeen else None,
-                'is_connected': bool(row.IsConnected)
-            })
-        
+        devices = [device.to_dict() for device in current_state().ordered()]
         return jsonify({'devices': devices})
     except Exception as e:
         logger.error(f"Error getting devices: {e}", exc_info=True)
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/devices/search')
+def search_devices():
+    """
+    Search the device inventory, connected first, most recently seen first
+    
+    Query parameters: q (MAC prefix, IP/CIDR or name substring), mac, ip,
+    name, connected (true/false), vendor and type (repeatable), offset and
+    limit (default 50, at most 1000).
+    """
+    connected = request.args.get('connected')
+    if connected is not None and connected.lower() not in _BOOLEANS:
+        return jsonify({'error': 'connected must be true or false'}), 400
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', 50, type=int), 0), 1000)
+    try:
+        result = device_index.search(
+            current_state(),
+            q=request.args.get('q', '').strip() or None,
+            mac=request.args.get('mac'),
+            ip=request.args.get('ip'),
+            name=request.args.get('name'),
+            connected=None if connected is None else _BOOLEANS[connected.lower()],
+            vendors=request.args.getlist('vendor'),
+            device_types=request.args.getlist('type'),
+            offset=offset,
+            limit=limit,
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error searching devices: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+    return jsonify({
+        'total': result.total,
+        'offset': offset,
+        'limit': limit,
+        'version': result.version,
+        'devices': [device.to_dict() for device in result.devices],
+    })
+
+
+_BOOLEANS = {'true': True, '1': True, 'yes': True, 'false': False, '0': False, 'no': False}
+
+
 @app.route('/api/devices/connected')
 def get_connected_devices():
     """Get only currently connected devices"""
     try:
-        cursor = db_manager.connection.cursor()
-        cursor.execute("""
-            SELECT 
-                MACAddress,
-                IPAddress,
-                Hostname,
-                DeviceName,
-                DeviceType,
-                Vendor,
-                FirstSeen,
-                LastSeen
-            FROM DeviceConnections
-            WHERE IsConnected = 1
-            ORDER BY LastSeen DESC
-        """)
-        
-        devices = []
-        for row in cursor.fetchall():
-            devices.append({
-                'mac_address': row.MACAddress,
-                'ip_address': row.IPAddress,
-                'hostname': row.Hostname,
-                'device_name': row.DeviceName,
-                'device_type': row.DeviceType,
-                'vendor': row.Vendor,
-                'first_seen': row.FirstSeen.isoformat() if row.FirstSeen else None,
-                'last_seen': row.LastSeen.isoformat() if row.LastSeen else None,
-                'is_connected': True
-            })
-        
+        devices = [device.to_dict() for device in current_state().connected()]
         return jsonify({'devices': devices})
     except Exception as e:
         logger.error(f"Error getting connected devices: {e}", exc_info=True)
@@ -223,6 +404,35 @@ def get_events():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/export/<kind>')
+def export_table(kind):
+    """
+    Stream a full export of ConnectionLog (events) or DeviceConnections (devices)
+    
+    Query parameters: format (ndjson, csv, parquet), since, until (ISO date/time)
+    and mac.
+    """
+    fmt = request.args.get('format', 'ndjson').lower()
+    try:
+        since = parse_time(request.args.get('since'))
+        until = parse_time(request.args.get('until'))
+        chunks = export(db_manager.open_connection, kind, fmt, since, until,
+                        request.args.get('mac'))
+        # Opens the connection, so failures still get an error response
+        next(chunks)
+    except (ExportError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error starting export: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+    
+    filename = f"{kind}-{datetime.now():%Y%m%d-%H%M%S}.{fmt}"
+    return Response(chunks, content_type=FORMATS[fmt], headers={
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'X-Accel-Buffering': 'no',
+    })
+
+
 @app.route('/api/statistics')
 def get_statistics():
     """Get network statistics"""
@@ -230,7 +440,7 @@ def get_statistics():
         cursor = db_manager.connection.cursor()
         
         # Get device counts
-        device_counts = db_manager.get_device_count()
+        snapshot = current_state()
         
         # Get events in last 24 hours
         cursor.execute("""
@@ -265,8 +475,8 @@ def get_statistics():
             })
         
         return jsonify({
-            'connected_devices': device_counts['connected'],
-            'total_devices': device_counts['total'],
+            'connected_devices': snapshot.connected_count,
+            'total_devices': snapshot.total_count,
             'connections_24h': connections_24h,
             'disconnections_24h': disconnections_24h,
             'hourly_activity': hourly_activity
@@ -280,39 +490,29 @@ def get_statistics():
 def get_device_details(mac_address):
     """Get detailed information about a specific device"""
     try:
-        cursor = db_manager.connection.cursor()
+        record = current_state().get(mac_address)
+        if not record:
+            return jsonify({'error': 'Device not found'}), 404
         
-        # Get device info
-        cursor.execute("""
-            SELECT 
-                MACAddress,
-                IPAddress,
-                Hostname,
-                DeviceName,
-                DeviceType,
-                Vendor,
-                FirstSeen,
-                LastSeen,
-                IsConnected
-            FROM DeviceConnections
-            WHERE MACAddress = ?
-        """, mac_address)
+        device = record.to_dict()
+        if db_manager.track_addresses:
+            device['addresses'] = db_manager.get_device_addresses(record.mac_address)
         
-        row = cursor.fetchone()
-        if not row:
-            return jsonify({'error': 'Device not found'}), 404
+        if db_manager.track_sessions:
+            # One indexed range read instead of pairing raw events
+            now = datetime.now()
+            sessions = db_manager.get_device_sessions(record.mac_address, limit=50)
+            current = sessions[0] if sessions and sessions[0].is_open else None
+            week = db_manager.get_device_sessions(
+                record.mac_address, since=now - timedelta(days=7), limit=None
+            )
+            device['history'] = session_history(sessions)
+            device['sessions'] = [session.to_dict(now) for session in sessions]
+            device['current_session_seconds'] = current.duration(now) if current else None
+            device['uptime_seconds_7d'] = uptime_seconds(week, now - timedelta(days=7), now)
+            return jsonify({'device': device})
         
-        device = {
-            'mac_address': row.MACAddress,
-            'ip_address': row.IPAddress,
-            'hostname': row.Hostname,
-            'device_name': row.DeviceName,
-            'device_type': row.DeviceType,
-            'vendor': row.Vendor,
-            'first_seen': row.FirstSeen.isoformat() if row.FirstSeen else None,
-            'last_seen': row.LastSeen.isoformat() if row.LastSeen else None,
-            'is_connected': bool(row.IsConnected)
-        }
+        cursor = db_manager.connection.cursor()
         
         # Get connection history
         cursor.execute("""
@@ -323,7 +523,7 @@ def get_device_details(mac_address):
             FROM ConnectionLog
             WHERE MACAddress = ?
             ORDER BY EventTime DESC
-        """, mac_address)
+        """, record.mac_address)
         
         history = []
         for row in cursor.fetchall():
@@ -341,15 +541,289 @@ def get_device_details(mac_address):
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/device/<mac_address>/sessions')
+def get_device_sessions(mac_address):
+    """
+    Get a device's connected periods and uptime in a time range
+    
+    Query parameters: since, until (ISO date/time; default: the last 7 days)
+    and limit.
+    """
+    if not db_manager.track_sessions:
+        return jsonify({'error': 'DeviceSessions table not set up'}), 501
+    try:
+        until = parse_time(request.args.get('until')) or datetime.now()
+        since = parse_time(request.args.get('since')) or until - timedelta(days=7)
+        limit = request.args.get('limit', type=int)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        sessions = db_manager.get_device_sessions(mac_address, since, until, limit=None)
+        return jsonify({
+            'mac_address': mac_address.upper(),
+            'since': since.isoformat(),
+            'until': until.isoformat(),
+            'uptime_seconds': uptime_seconds(sessions, since, until),
+            'sessions': [session.to_dict(until) for session in sessions[:limit]],
+        })
+    except Exception as e:
+        logger.error(f"Error getting device sessions: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/monitor/downtime')
+def get_monitor_downtime():
+    """
+    Periods the monitor was not scanning, newest first
+    
+    Query parameters: since, until (ISO date/time; default: the last 30 days).
+    """
+    if not db_manager.track_downtime:
+        return jsonify({'error': 'MonitorDowntime table not set up'}), 501
+    try:
+        until = parse_time(request.args.get('until')) or datetime.now()
+        since = parse_time(request.args.get('since')) or until - timedelta(days=30)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        return jsonify({
+            'since': since.isoformat(),
+            'until': until.isoformat(),
+            'downtime': db_manager.get_downtime(since, until),
+        })
+    except Exception as e:
+        logger.error(f"Error getting monitor downtime: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/ip/<ip_address>')
+def get_ip_holder(ip_address):
+    """
+    Which device held an IP at a point in time
+    
+    Query parameters: at (ISO date/time; default: now) and site.
+    """
+    if not db_manager.track_ip_leases:
+        return jsonify({'error': 'IPLeases table not set up'}), 501
+    try:
+        ip_address = str(ipaddress.ip_address(ip_address))
+        at = parse_time(request.args.get('at')) or datetime.now()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        lease = db_manager.get_ip_holder(ip_address, at, request.args.get('site'))
+        if lease is None:
+            return jsonify({'error': f'No device held {ip_address} at {at.isoformat()}'}), 404
+        record = current_state().get(lease['mac_address'])
+        return jsonify({
+            'ip_address': ip_address,
+            'at': at.isoformat(),
+            'lease': lease,
+            'device': record.to_dict() if record else None,
+        })
+    except Exception as e:
+        logger.error(f"Error looking up IP holder: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+
+def _analytics_window():
+    """since, until and flap_seconds from the query string"""
+    until = parse_time(request.args.get('until')) or datetime.now()
+    since = parse_time(request.args.get('since')) or until - timedelta(days=7)
+    if since >= until:
+        raise ValueError("since must be before until")
+    return since, until, request.args.get('flap_seconds', 300.0, type=float)
+
+
+def _window_dict(since: datetime, until: datetime, flap_seconds: float) -> dict:
+    return {'since': since.isoformat(), 'until': until.isoformat(),
+            'flap_seconds': flap_seconds}
+
+
+@app.route('/api/analytics/devices')
+def get_device_analytics():
+    """
+    Availability, mean session length and flaps for every device in a window
+    
+    Query parameters: since, until (ISO date/time; default: the last 7 days),
+    flap_seconds (reconnect gap counted as a flap, default 300), sort
+    (availability, flaps, sessions or mean_session_seconds) and limit.
+    Sorting by availability lists the least available devices first.
+    """
+    if not db_manager.track_sessions:
+        return jsonify({'error': 'DeviceSessions table not set up'}), 501
+    try:
+        since, until, flap_seconds = _analytics_window()
+        sort = request.args.get('sort', 'availability')
+        if sort not in ('availability', 'flaps', 'sessions', 'mean_session_seconds'):
+            raise ValueError(f"Unknown sort: {sort}")
+        limit = request.args.get('limit', type=int)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        intervals = analytics.load_intervals(db_manager.open_connection, since, until)
+        metrics = analytics.device_metrics(intervals, since, until, flap_seconds)
+        rows = analytics.device_rows(intervals, metrics)
+        rows.sort(key=lambda row: row[sort], reverse=sort != 'availability')
+        return jsonify({**_window_dict(since, until, flap_seconds),
+                        'fleet': analytics.fleet_summary(metrics), 'devices': rows[:limit]})
+    except analytics.AnalyticsError as e:
+        return jsonify({'error': str(e)}), 501
+    except Exception as e:
+        logger.error(f"Error computing device analytics: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/analytics/devices/<mac_address>')
+def get_single_device_analytics(mac_address):
+    """
+    Availability metrics for one device
+    
+    Query parameters: since, until and flap_seconds, as for /api/analytics/devices.
+    """
+    if not db_manager.track_sessions:
+        return jsonify({'error': 'DeviceSessions table not set up'}), 501
+    try:
+        since, until, flap_seconds = _analytics_window()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        intervals = analytics.load_intervals(db_manager.open_connection, since, until,
+                                             mac_address=mac_address)
+        if not len(intervals):
+            return jsonify({'error': 'No sessions in this window'}), 404
+        metrics = analytics.device_metrics(intervals, since, until, flap_seconds)
+        return jsonify({**_window_dict(since, until, flap_seconds),
+                        **analytics.device_rows(intervals, metrics)[0]})
+    except analytics.AnalyticsError as e:
+        return jsonify({'error': str(e)}), 501
+    except Exception as e:
+        logger.error(f"Error computing device analytics: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/analytics/fleet')
+def get_fleet_analytics():
+    """
+    Fleet-wide availability and mean connected devices per time bucket
+    
+    Query parameters: since, until and flap_seconds, as for
+    /api/analytics/devices, and bucket (seconds, default 3600).
+    """
+    if not db_manager.track_sessions:
+        return jsonify({'error': 'DeviceSessions table not set up'}), 501
+    try:
+        since, until, flap_seconds = _analytics_window()
+        bucket = request.args.get('bucket', 3600.0, type=float)
+        if bucket <= 0 or (until - since).total_seconds() / bucket > 10000:
+            raise ValueError("bucket must split the window into at most 10000 buckets")
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        intervals = analytics.load_intervals(db_manager.open_connection, since, until)
+        metrics = analytics.device_metrics(intervals, since, until, flap_seconds)
+        timeline = analytics.connected_timeline(intervals, since, until, bucket)
+        return jsonify({**_window_dict(since, until, flap_seconds), 'bucket': bucket,
+                        **analytics.fleet_summary(metrics, timeline)})
+    except analytics.AnalyticsError as e:
+        return jsonify({'error': str(e)}), 501
+    except Exception as e:
+        logger.error(f"Error computing fleet analytics: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+
+def _presence_window():
+    """since and until from the query string (default: the last 24 hours)"""
+    until = parse_time(request.args.get('until')) or datetime.now()
+    since = parse_time(request.args.get('since')) or until - timedelta(hours=24)
+    if since >= until:
+        raise ValueError("since must be before until")
+    if until - since > timedelta(days=MAX_RANGE_DAYS):
+        raise ValueError(f"The range may cover at most {MAX_RANGE_DAYS} days")
+    return since, until
+
+
+@app.route('/api/presence/online')
+def get_presence_online():
+    """
+    Devices online in a time range, from the presence bitmaps
+    
+    Query parameters: since, until (ISO date/time; default: the last 24 hours)
+    and mode (any: answered at least one scan, all: answered every scan).
+    """
+    store = presence_store()
+    if store is None:
+        return jsonify({'error': 'Presence recording is disabled'}), 501
+    try:
+        since, until = _presence_window()
+        mode = request.args.get('mode', 'any')
+        if mode not in ('any', 'all'):
+            raise ValueError(f"Unknown mode: {mode}")
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        devices, scans = store.online(since, until, mode)
+        return jsonify({
+            'since': since.isoformat(),
+            'until': until.isoformat(),
+            'mode': mode,
+            'scans': scans,
+            'devices': devices,
+        })
+    except Exception as e:
+        logger.error(f"Error reading presence: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/presence/heatmap')
+def get_presence_heatmap():
+    """
+    Fraction of scans each device answered per time bucket
+    
+    Query parameters: since, until (ISO date/time; default: the last 24 hours),
+    bucket (seconds, default 3600) and mac (repeatable; default: every device
+    seen in the range). Buckets without scans are null.
+    """
+    store = presence_store()
+    if store is None:
+        return jsonify({'error': 'Presence recording is disabled'}), 501
+    try:
+        since, until = _presence_window()
+        bucket = request.args.get('bucket', 3600, type=int)
+        if bucket <= 0 or (until - since).total_seconds() / bucket > 10000:
+            raise ValueError("bucket must split the range into at most 10000 buckets")
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        starts, devices = store.heatmap(since, until, bucket,
+                                        request.args.getlist('mac') or None)
+        return jsonify({
+            'since': since.isoformat(),
+            'until': until.isoformat(),
+            'bucket': bucket,
+            'buckets': [start.isoformat() for start in starts],
+            'devices': [{'mac_address': mac, 'presence': row} for mac, row in devices.items()],
+        })
+    except Exception as e:
+        logger.error(f"Error reading presence: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/control/start', methods=['POST'])
 def start_monitoring_endpoint():
     """Start network monitoring"""
     try:
-        if monitoring_active:
+        if config.process.scanner_mode == 'process':
+            return jsonify({'error': 'Scanning is managed by the scanner process'}), 409
+        
+        if is_monitoring():
             return jsonify({'message': 'Monitoring is already active'}), 200
         
-        start_monitoring()
+        run_command('start')
         return jsonify({'message': 'Monitoring started successfully'}), 200
+    except IpcError as e:
+        logger.error(f"Error starting monitoring: {e}")
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         logger.error(f"Error starting monitoring: {e}", exc_info=True)
         return jsonify({'error': str(e)}), 500
@@ -359,8 +833,14 @@ def start_monitoring_endpoint():
 def stop_monitoring_endpoint():
     """Stop network monitoring"""
     try:
-        stop_monitoring()
+        if config.process.scanner_mode == 'process':
+            return jsonify({'error': 'Scanning is managed by the scanner process'}), 409
+        
+        run_command('stop')
         return jsonify({'message': 'Monitoring stopped successfully'}), 200
+    except IpcError as e:
+        logger.error(f"Error stopping monitoring: {e}")
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         logger.error(f"Error stopping monitoring: {e}", exc_info=True)
         return jsonify({'error': str(e)}), 500
@@ -370,16 +850,45 @@ def stop_monitoring_endpoint():
 def trigger_scan():
     """Trigger an immediate network scan"""
     try:
-        if not monitor:
+        result = run_command('scan')
+        if result is None:
             return jsonify({'error': 'Monitoring is not initialized'}), 400
         
-        monitor.scan_once()
+        if not result['completed']:
+            return jsonify({'error': 'A scan is already in progress'}), 409
         return jsonify({'message': 'Scan completed successfully'}), 200
+    except IpcError as e:
+        logger.error(f"Error triggering scan: {e}")
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         logger.error(f"Error triggering scan: {e}", exc_info=True)
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/control/profile', methods=['GET', 'POST'])
+def profile_scans():
+    """Request a sampling profile of the next N scans, or report its state"""
+    try:
+        args = {}
+        if request.method == 'POST':
+            payload = request.get_json(silent=True) or {}
+            scans = payload.get('scans', request.args.get('scans', 1, type=int))
+            if not isinstance(scans, int) or scans < 0:
+                return jsonify({'error': 'scans must be a non-negative integer'}), 400
+            args['scans'] = scans
+        
+        result = run_command('profile', **args)
+        if result is None:
+            return jsonify({'error': 'Monitoring is not initialized'}), 400
+        return jsonify(result), 200
+    except IpcError as e:
+        logger.error(f"Error requesting profile: {e}")
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        logger.error(f"Error requesting profile: {e}", exc_info=True)
+        return jsonify({'error': str(e)}), 500
+
+
 def run_server(host='0.0.0.0', port=5000, debug=False, auto_start_monitoring=True):
     """
     Run the web server
@@ -390,8 +899,7 @@ def run_server(host='0.0.0.0', port=5000, debug=False, auto_start_monitoring=Tru
         debug: Enable debug mode
         auto_start_monitoring: Automatically start monitoring on server start
     """
-    if auto_start_monitoring:
-        start_monitoring()
+    start_scanning(auto_start_monitoring)
     
     logger.info(f"Starting web server on {host}:{port}")
     app.run(host=host, port=port, debug=debug, threaded=True)
@@ -40,6 +40,12 @@ def main():
         setup_logging(config)
         logger = logging.getLogger(__name__)
         
+        if os.getenv('WEB_SERVER', 'flask').lower() == 'asgi':
+            # Same routes on an asyncio server, plus event streams
+            from .asgi import main as asgi_main
+            asgi_main()
+            return
+        
         # Initialize web application
         init_app(config)
         
@@ -59,7 +65,9 @@ def main():
         print("=" * 60)
         print()
         
-        if auto_start:
+        if config.process.scanner_mode == "process":
+            print(f"✓ Following the scanner process at {config.process.ipc_address}")
+        elif auto_start:
             print("✓ Network monitoring will start automatically")
         else:
             print("ℹ Network monitoring is disabled. Start it from the web interface.")
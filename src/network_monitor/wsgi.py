@@ -0,0 +1,29 @@
+"""
+WSGI entry point for multi-worker deployments
+
+    gunicorn -w 4 -b 0.0.0.0:5000 network_monitor.wsgi:app
+
+Every worker serves the API. One worker, elected through a lock file in
+STATE_DIR, scans and publishes its state; the others follow it over IPC and
+forward control requests to it. If the scanning worker exits, another takes
+over. Do not preload the app (gunicorn --preload): each worker must run its
+own election after it is forked.
+"""
+import logging
+import os
+from .config import Config
+from .web import app, init_app, start_scanning
+from .web_main import setup_logging
+
+config = Config.load()
+setup_logging(config)
+
+if config.process.scanner_mode == "thread":
+    # One scanning thread per worker would scan the network several times over
+    logging.getLogger(__name__).info("Multi-worker deployment: using SCANNER_MODE=leader")
+    config.process.scanner_mode = "leader"
+
+init_app(config)
+start_scanning(auto_start=os.getenv('AUTO_START_MONITORING', 'yes').lower() == 'yes')
+
+__all__ = ["app"]
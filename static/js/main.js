@@ -2,8 +2,11 @@
 
 // Configuration
 const REFRESH_INTERVAL = 5000; // 5 seconds
+const DEVICE_PAGE_SIZE = 200;
+const SEARCH_DELAY = 250; // ms after the last keystroke
 let refreshIntervalId = null;
-let allDevices = [];
+let searchTimeoutId = null;
+let deviceRequest = 0;
 
 // Initialize dashboard
 document.addEventListener('DOMContentLoaded', function() {
@@ -97,19 +100,32 @@ async function loadStatistics() {
     }
 }
 
-// Load devices
+// Load devices matching the current filter (searched server-side)
 async function loadDevices() {
+    const request = ++deviceRequest;
+    const params = new URLSearchParams({limit: DEVICE_PAGE_SIZE});
+    const filterValue = document.getElementById('deviceFilter').value;
+    const searchValue = document.getElementById('searchBox').value.trim();
+    if (filterValue !== 'all') {
+        params.set('connected', filterValue === 'connected' ? 'true' : 'false');
+    }
+    if (searchValue) {
+        params.set('q', searchValue);
+    }
+    
     try {
-        const response = await fetch('/api/devices');
+        const response = await fetch('/api/devices/search?' + params);
         const data = await response.json();
         
+        if (request !== deviceRequest) {
+            return; // a newer search is in flight
+        }
         if (data.error) {
             showToast('Error loading devices: ' + data.error, 'error');
             return;
         }
         
-        allDevices = data.devices || [];
-        renderDevices(allDevices);
+        renderDevices(data.devices || [], data.total || 0);
         
     } catch (error) {
         console.error('Error loading devices:', error);
@@ -118,7 +134,7 @@ async function loadDevices() {
 }
 
 // Render devices table
-function renderDevices(devices) {
+function renderDevices(devices, total) {
     const tbody = document.getElementById('deviceTableBody');
     
     if (devices.length === 0) {
@@ -126,6 +142,10 @@ function renderDevices(devices) {
         return;
     }
     
+    const more = total > devices.length
+        ? `<tr><td colspan="7" class="loading">Showing ${devices.length} of ${total} devices; refine the search to see others</td></tr>`
+        : '';
+    
     tbody.innerHTML = devices.map(device => {
         const statusBadge = device.is_connected 
             ? '<span class="status-badge connected">Connected</span>'
@@ -152,38 +172,13 @@ function renderDevices(devices) {
                 </td>
             </tr>
         `;
-    }).join('');
+    }).join('') + more;
 }
 
-// Filter devices
+// Filter devices (debounced while typing)
 function filterDevices() {
-    const filterValue = document.getElementById('deviceFilter').value;
-    const searchValue = document.getElementById('searchBox').value.toLowerCase();
-    
-    let filtered = allDevices;
-    
-    // Apply status filter
-    if (filterValue === 'connected') {
-        filtered = filtered.filter(d => d.is_connected);
-    } else if (filterValue === 'disconnected') {
-        filtered = filtered.filter(d => !d.is_connected);
-    }
-    
-    // Apply search filter
-    if (searchValue) {
-        filtered = filtered.filter(d => {
-            const searchString = [
-                d.device_name,
-                d.hostname,
-                d.ip_address,
-                d.mac_address
-            ].filter(Boolean).join(' ').toLowerCase();
-            
-            return searchString.includes(searchValue);
-        });
-    }
-    
-    renderDevices(filtered);
+    clearTimeout(searchTimeoutId);
+    searchTimeoutId = setTimeout(loadDevices, SEARCH_DELAY);
 }
 
 // Load recent events
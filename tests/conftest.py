@@ -1,10 +1,75 @@
 """
-Pytest configuration and fixtures
+Pytest configuration, fixtures and shared test helpers
 """
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
 import pytest
 from unittest.mock import MagicMock
 from network_monitor.config import Config, NetworkConfig, DatabaseConfig, LoggingConfig
 
+# Tests drive DatabaseManager against the SQLite stand-in used by the benchmarks
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "benchmarks"))
+
+T0 = datetime(2026, 1, 1, 12, 0)
+
+
+def at(minutes):
+    """T0 plus a number of minutes"""
+    return T0 + timedelta(minutes=minutes)
+
+
+def wait_for(condition, timeout=5.0):
+    """Poll until condition() is true, failing after timeout seconds"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+class FakeCursor:
+    """Serves FakeConnection rows; a TOP n query is answered as a keyset page"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.pending = []
+
+    def execute(self, sql, *params):
+        rows = self.connection.rows
+        top = re.search(r"TOP (\d+)", sql)
+        if top:
+            # The first parameter is the last key read; rows are keyed by their first column
+            last_key, *params = params
+            rows = [row for row in rows if row[0] > last_key][:int(top.group(1))]
+        self.connection.queries.append((sql, tuple(params)))
+        self.pending = list(rows)
+
+    def fetchmany(self, size):
+        rows, self.pending = self.pending[:size], self.pending[size:]
+        self.connection.fetches += 1
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """DB-API connection that records queries and answers them from fixed rows"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+        self.fetches = 0
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def close(self):
+        self.closed = True
+
 
 @pytest.fixture
 def mock_config():
@@ -0,0 +1,208 @@
+"""
+Tests for remote scan agents and the collector, run together on localhost
+"""
+import os
+import threading
+from datetime import datetime, timedelta
+import pytest
+from werkzeug.serving import make_server
+from network_monitor.agent import ScanAgent, scan_entry
+from network_monitor.collector import Collector, ResyncRequired, check_exposure, create_app
+from network_monitor.config import AgentConfig, Config, NetworkConfig
+from network_monitor.scanner import Device
+
+START = datetime(2026, 1, 1, 12, 0)
+
+
+class RecordingDatabase:
+    """Records the scans the collector writes"""
+
+    def __init__(self):
+        self.scans = []
+
+    def update_device_status(self, devices, debouncer=None, timestamp=None, site_id=None):
+        self.scans.append((site_id, timestamp, sorted(
+            (d.mac_address, d.ip_address, d.hostname) for d in devices.values()
+        )))
+
+
+class StubScanner:
+    def __init__(self):
+        self.devices = {}
+
+    def scan(self):
+        return dict(self.devices)
+
+
+class CollectorServer:
+    """Collector app served on an ephemeral localhost port"""
+
+    def __init__(self, token=None):
+        self.database = RecordingDatabase()
+        self.collector = Collector(self.database)
+        self.server = make_server("127.0.0.1", 0, create_app(self.collector, token=token))
+        self.url = f"http://127.0.0.1:{self.server.server_port}/api/ingest"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_agent(tmp_path, url, token=None, full_sync_scans=60):
+    config = Config()
+    config.network = NetworkConfig(subnet="10.0.0.0/24", scan_interval=60)
+    config.agent = AgentConfig(
+        site_id="branch-1", collector_url=url, token=token,
+        spool_dir=str(tmp_path / "spool"), batch_scans=2, full_sync_scans=full_sync_scans,
+        push_timeout=2
+    )
+    return ScanAgent(config, scanner=StubScanner())
+
+
+def devices(*pairs):
+    return {mac: Device(mac, ip, f"host-{ip}") for mac, ip in pairs}
+
+
+@pytest.fixture
+def collector():
+    server = CollectorServer()
+    yield server
+    server.stop()
+
+
+class TestScanAgent:
+    """Test cases for ScanAgent and its wire format"""
+
+    def test_scan_entry_delta(self):
+        """Test that a delta lists only new or changed devices and removals"""
+        before = devices(("AA:00:00:00:00:01", "10.0.0.1"), ("AA:00:00:00:00:02", "10.0.0.2"))
+        after = devices(("AA:00:00:00:00:01", "10.0.0.1"), ("AA:00:00:00:00:03", "10.0.0.3"))
+        entry = scan_entry("s", 2, START, after, before)
+        assert entry["full"] is False
+        assert [row[0] for row in entry["devices"]] == ["AA:00:00:00:00:03"]
+        assert entry["removed"] == ["AA:00:00:00:00:02"]
+
+    def test_agent_pushes_to_collector(self, tmp_path, collector):
+        """Test that scans reach the collector as full site scans, tagged and timestamped"""
+        agent = make_agent(tmp_path, collector.url)
+        agent.record_scan(devices(("AA:00:00:00:00:01", "10.0.0.1")), START)
+        agent.record_scan(devices(("AA:00:00:00:00:01", "10.0.0.1"), ("AA:00:00:00:00:02", "10.0.0.2")),
+                          START + timedelta(minutes=1))
+        agent.record_scan(devices(("AA:00:00:00:00:02", "10.0.0.9")), START + timedelta(minutes=2))
+
+        assert agent.flush()
+        assert agent.pending == 0
+        assert collector.database.scans == [
+            ("branch-1", START, [("AA:00:00:00:00:01", "10.0.0.1", "host-10.0.0.1")]),
+            ("branch-1", START + timedelta(minutes=1), [
+                ("AA:00:00:00:00:01", "10.0.0.1", "host-10.0.0.1"),
+                ("AA:00:00:00:00:02", "10.0.0.2", "host-10.0.0.2"),
+            ]),
+            ("branch-1", START + timedelta(minutes=2), [("AA:00:00:00:00:02", "10.0.0.9", "host-10.0.0.9")]),
+        ]
+        assert collector.collector.get_sites()["branch-1"]["seq"] == 3
+
+    def test_agent_spools_until_collector_returns(self, tmp_path):
+        """Test that scans are kept on disk while the collector is down, then delivered in order"""
+        down = CollectorServer()
+        url = down.url
+        down.stop()
+
+        agent = make_agent(tmp_path, url)
+        agent.record_scan(devices(("AA:00:00:00:00:01", "10.0.0.1")), START)
+        agent.record_scan(devices(("AA:00:00:00:00:02", "10.0.0.2")), START + timedelta(minutes=1))
+        assert not agent.flush()
+        assert len(os.listdir(tmp_path / "spool")) == 2
+
+        # A restarted agent picks up the spool; its own first scan is a full one
+        agent = make_agent(tmp_path, url)
+        agent.record_scan(devices(("AA:00:00:00:00:03", "10.0.0.3")), START + timedelta(minutes=2))
+        server = CollectorServer()
+        try:
+            agent.client.url = server.url
+            assert agent.flush()
+            assert [scan[1] for scan in server.database.scans] == [
+                START, START + timedelta(minutes=1), START + timedelta(minutes=2)
+            ]
+            assert os.listdir(tmp_path / "spool") == []
+        finally:
+            server.stop()
+
+    def test_collector_restart_triggers_resync(self, tmp_path, collector):
+        """Test that a delta the collector cannot apply is replaced by a full scan"""
+        agent = make_agent(tmp_path, collector.url)
+        agent.record_scan(devices(("AA:00:00:00:00:01", "10.0.0.1")), START)
+        assert agent.flush()
+
+        restarted = CollectorServer()
+        try:
+            agent.client.url = restarted.url
+            agent.record_scan(devices(("AA:00:00:00:00:01", "10.0.0.1"), ("AA:00:00:00:00:02", "10.0.0.2")),
+                              START + timedelta(minutes=1))
+            assert agent.flush()
+            assert restarted.database.scans == [("branch-1", START + timedelta(minutes=1), [
+                ("AA:00:00:00:00:01", "10.0.0.1", "host-10.0.0.1"),
+                ("AA:00:00:00:00:02", "10.0.0.2", "host-10.0.0.2"),
+            ])]
+        finally:
+            restarted.stop()
+
+
+class TestCollector:
+    """Test cases for Collector and its HTTP API"""
+
+    def test_collector_requires_token(self, tmp_path):
+        """Test that pushes without the shared token are refused and kept"""
+        server = CollectorServer(token="secret")
+        try:
+            agent = make_agent(tmp_path, server.url, token="wrong")
+            agent.record_scan(devices(("AA:00:00:00:00:01", "10.0.0.1")), START)
+            assert not agent.flush()
+            assert agent.pending == 1
+
+            agent.client.token = "secret"
+            assert agent.flush()
+            assert len(server.database.scans) == 1
+        finally:
+            server.stop()
+
+    def test_unauthenticated_collector_stays_local(self):
+        """Test that the collector needs a token to listen beyond loopback"""
+        check_exposure("127.0.0.1", None)
+        check_exposure("localhost", None)
+        check_exposure("0.0.0.0", "secret")
+        for host in ("0.0.0.0", "10.0.0.5", "collector.lan"):
+            with pytest.raises(ValueError, match="COLLECTOR_TOKEN"):
+                check_exposure(host, None)
+
+    def test_ipv6_addresses_round_trip(self):
+        """Test that IPv6 addresses reach the collector and only extend the row when present"""
+        database = RecordingDatabase()
+        collector = Collector(database)
+        dual = Device("AA:00:00:00:00:01", "10.0.0.1", ipv6_addresses={"fe80::1", "2001:db8::1"})
+        entry = scan_entry("s1", 1, START, {dual.mac_address: dual,
+                                            **devices(("AA:00:00:00:00:02", "10.0.0.2"))})
+        assert [len(row) for row in entry["devices"]] == [5, 4]
+
+        collector.ingest("site", [entry])
+        received = collector.site("site").devices["AA:00:00:00:00:01"]
+        assert received.ipv6_addresses == {"fe80::1", "2001:db8::1"}
+
+    def test_collector_skips_duplicates_and_rejects_gaps(self):
+        """Test sequence handling without HTTP"""
+        database = RecordingDatabase()
+        collector = Collector(database)
+        first = devices(("AA:00:00:00:00:01", "10.0.0.1"))
+        full = scan_entry("s1", 1, START, first)
+
+        assert collector.ingest("site", [full]) == 1
+        assert collector.ingest("site", [full]) == 1
+        assert len(database.scans) == 1
+
+        gap = scan_entry("s1", 3, START, first, first)
+        with pytest.raises(ResyncRequired):
+            collector.ingest("site", [gap])
+        with pytest.raises(ValueError):
+            collector.ingest("../site", [full])
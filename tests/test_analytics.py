@@ -0,0 +1,96 @@
+"""
+Unit tests for availability analytics
+"""
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from network_monitor.analytics import (  # noqa: E402
+    Intervals, connected_timeline, device_metrics, fleet_summary, load_intervals
+)
+from .conftest import FakeConnection, at  # noqa: E402
+
+A = "AA:00:00:00:00:01"
+B = "AA:00:00:00:00:02"
+
+
+ROWS = [
+    (A, at(-30), at(10)),       # starts before the window
+    (A, at(12), at(30)),        # 2 minute gap: a flap
+    (A, at(50), None),          # still connected
+    (B, at(20), at(40)),
+]
+
+
+def metrics_for(rows, **kwargs):
+    intervals = Intervals.from_rows(rows)
+    metrics = device_metrics(intervals, at(0), at(60), **kwargs)
+    return {mac: {name: values[code] for name, values in metrics.items()}
+            for code, mac in enumerate(intervals.macs)}
+
+
+class TestDeviceMetrics:
+    """Test cases for per-device availability metrics"""
+
+    def test_device_metrics(self):
+        """Test availability, session length, disconnects and flaps per device"""
+        result = metrics_for(ROWS)
+
+        assert result[A]["uptime_seconds"] == (10 + 18 + 10) * 60
+        assert result[A]["availability"] == pytest.approx(38 / 60)
+        assert result[A]["sessions"] == 3
+        # Whole sessions, open ones counted up to the window end
+        assert result[A]["mean_session_seconds"] == pytest.approx((40 + 18 + 10) * 60 / 3)
+        assert result[A]["disconnects"] == 2
+        assert result[A]["flaps"] == 1
+        assert result[B]["availability"] == pytest.approx(20 / 60)
+        assert result[B]["flaps"] == 0
+
+    def test_unsorted_input_and_threshold(self):
+        """Test that row order does not matter and flap_seconds is respected"""
+        assert metrics_for(ROWS[::-1])[A]["flaps"] == 1
+        assert metrics_for(ROWS, flap_seconds=60)[A]["flaps"] == 0
+
+    def test_connected_timeline_matches_brute_force(self):
+        """Test mean connected devices per bucket, including a short last bucket"""
+        intervals = Intervals.from_rows(ROWS)
+        starts, connected = connected_timeline(intervals, at(0), at(50), 15 * 60)
+
+        assert len(starts) == 4
+        minutes = [sum(1 for mac, start, end in ROWS if start <= at(m) < (end or at(50)))
+                   for m in range(50)]
+        expected = [np.mean(minutes[i:i + 15]) for i in range(0, 50, 15)]
+        assert connected == pytest.approx(expected)
+
+    def test_fleet_summary(self):
+        """Test fleet-wide aggregates and an empty window"""
+        intervals = Intervals.from_rows(ROWS)
+        summary = fleet_summary(device_metrics(intervals, at(0), at(60)))
+        assert summary["devices"] == 2
+        assert summary["availability"] == pytest.approx((38 / 60 + 20 / 60) / 2)
+        assert summary["sessions"] == 4
+        assert summary["flaps"] == 1
+
+        empty = Intervals.from_rows([])
+        summary = fleet_summary(device_metrics(empty, at(0), at(60)),
+                                connected_timeline(empty, at(0), at(60), 600))
+        assert summary["devices"] == 0 and summary["availability"] is None
+        assert [bucket["mean_connected"] for bucket in summary["timeline"]] == [0.0] * 6
+
+
+class TestLoadIntervals:
+    """Test cases for loading intervals from the database"""
+
+    def test_load_intervals_in_batches(self):
+        """Test that batches share device codes and the connection is closed"""
+        connection = FakeConnection(ROWS)
+        intervals = load_intervals(lambda: connection, at(0), at(60), mac_address="aa:00:00:00:00:01",
+                                   fetch_size=2)
+
+        assert list(intervals.macs) == [A, B]
+        assert list(intervals.codes) == [0, 0, 0, 1]
+        assert np.isnan(intervals.end[2])
+        sql, params = connection.queries[0]
+        assert "MACAddress = ?" in sql
+        assert params == (at(60), at(0), A)
+        assert connection.closed
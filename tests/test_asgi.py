@@ -0,0 +1,220 @@
+"""
+Unit tests for the ASGI server mode
+"""
+import asyncio
+import json
+import threading
+from datetime import datetime
+from network_monitor.asgi import AsgiApp, StateStreams, connection_events
+from network_monitor.database import ScanDelta
+from network_monitor.scanner import Device
+from network_monitor.state import DeviceRecord, DeviceStateStore
+
+SEEN = datetime(2026, 1, 1, 12, 0)
+
+
+def echo_app(environ, start_response):
+    body = environ["wsgi.input"].read()
+    payload = {
+        "method": environ["REQUEST_METHOD"],
+        "path": environ["PATH_INFO"],
+        "query": environ["QUERY_STRING"],
+        "body": body.decode(),
+        "agent": environ.get("HTTP_USER_AGENT"),
+    }
+    start_response("201 Created", [("Content-Type", "application/json")])
+    return [json.dumps(payload).encode()]
+
+
+def make_store():
+    store = DeviceStateStore()
+    store.load([DeviceRecord("AA:00:00:00:00:01", "10.0.0.1", None, SEEN, SEEN, True)])
+    return store
+
+
+def http_scope(path, method="GET", query=b""):
+    return {
+        "type": "http", "method": method, "path": path, "query_string": query,
+        "headers": [(b"user-agent", b"pytest")], "server": ("testserver", 80),
+    }
+
+
+class TestAsgiApp:
+    """Test cases for AsgiApp"""
+
+    def test_wsgi_routes_are_bridged(self):
+        """Test that regular routes are served by the WSGI app"""
+        app = AsgiApp(echo_app, make_store(), max_workers=2)
+        sent = []
+
+        async def run():
+            messages = [{"type": "http.request", "body": b"hello", "more_body": False}]
+
+            async def receive():
+                if messages:
+                    return messages.pop(0)
+                await asyncio.Event().wait()
+
+            async def send(message):
+                sent.append(message)
+
+            await app(http_scope("/api/devices", "POST", b"limit=5"), receive, send)
+
+        asyncio.run(run())
+        assert sent[0]["status"] == 201
+        assert (b"content-type", b"application/json") in sent[0]["headers"]
+        assert json.loads(sent[1]["body"]) == {
+            "method": "POST", "path": "/api/devices", "query": "limit=5",
+            "body": "hello", "agent": "pytest",
+        }
+        assert sent[-1] == {"type": "http.response.body", "body": b"", "more_body": False}
+
+    def test_wsgi_body_is_streamed(self):
+        """Test that each chunk is sent before the next one is produced"""
+        sent_first = threading.Event()
+        closed = []
+
+        class Body:
+            def __iter__(self):
+                yield b"first"
+                # Only reached once the first chunk has gone out
+                assert sent_first.wait(5)
+                yield b"second"
+
+            def close(self):
+                closed.append(True)
+
+        def streaming_app(environ, start_response):
+            start_response("200 OK", [("Content-Type", "text/plain")])
+            return Body()
+
+        app = AsgiApp(streaming_app, make_store(), max_workers=2)
+        sent = []
+
+        async def run():
+            messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+            async def receive():
+                if messages:
+                    return messages.pop(0)
+                await asyncio.Event().wait()
+
+            async def send(message):
+                sent.append(message)
+                if message.get("body") == b"first":
+                    sent_first.set()
+
+            await asyncio.wait_for(app(http_scope("/api/export/events"), receive, send), 5)
+
+        asyncio.run(run())
+        assert [m.get("body") for m in sent[1:]] == [b"first", b"second", b""]
+        assert [m.get("more_body") for m in sent[1:]] == [True, True, False]
+        assert closed == [True]
+
+    def test_disconnect_stops_wsgi_body(self):
+        """Test that a client going away stops and closes a streamed response"""
+        produced = []
+        closed = []
+
+        class Body:
+            def __iter__(self):
+                for i in range(1000):
+                    produced.append(i)
+                    yield b"x" * 100
+
+            def close(self):
+                closed.append(True)
+
+        def streaming_app(environ, start_response):
+            start_response("200 OK", [("Content-Type", "text/plain")])
+            return Body()
+
+        app = AsgiApp(streaming_app, make_store(), max_workers=2)
+
+        async def run():
+            messages = [{"type": "http.request", "body": b"", "more_body": False}]
+            gone = asyncio.Event()
+
+            async def receive():
+                if messages:
+                    return messages.pop(0)
+                await gone.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                if message.get("body"):
+                    gone.set()
+                    await asyncio.sleep(0.01)
+
+            await asyncio.wait_for(app(http_scope("/api/export/events"), receive, send), 5)
+
+        asyncio.run(run())
+        assert len(produced) < 1000
+        assert closed == [True]
+
+    def test_status_stream_pushes_changes(self):
+        """Test that a status stream sends the current state, then each change"""
+        store = make_store()
+        app = AsgiApp(echo_app, store, keepalive=5)
+        chunks = []
+
+        async def run():
+            disconnect = asyncio.Event()
+
+            async def receive():
+                await disconnect.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                chunks.append(message)
+                if len(chunks) == 2:
+                    # Publish from another thread, as the monitor does
+                    await asyncio.get_running_loop().run_in_executor(None, store.publish, ScanDelta(
+                        datetime.now(), {"AA:00:00:00:00:02": Device("AA:00:00:00:00:02", "10.0.0.2")}
+                    ))
+                if len(chunks) == 3:
+                    disconnect.set()
+
+            await asyncio.wait_for(app(http_scope("/api/stream/status"), receive, send), 5)
+
+        asyncio.run(run())
+        assert (b"content-type", b"text/event-stream") in chunks[0]["headers"]
+        first = json.loads(chunks[1]["body"].decode().split("data: ")[1])
+        second = json.loads(chunks[2]["body"].decode().split("data: ")[1])
+        assert first["connected_devices"] == 1
+        assert second["connected_devices"] == 2
+        assert app.streams.client_count == 0
+
+
+class TestStateStreams:
+    """Test cases for StateStreams and connection events"""
+
+    def test_connection_events(self):
+        """Test that only connect/disconnect transitions become events"""
+        store = make_store()
+        before = store.snapshot()
+        store.publish(ScanDelta(SEEN, {
+            "AA:00:00:00:00:02": Device("AA:00:00:00:00:02", "10.0.0.2"),
+        }, disconnected={"AA:00:00:00:00:01"}))
+
+        events = connection_events(before, store.snapshot())
+        assert {(e["mac_address"], e["event_type"]) for e in events} == {
+            ("AA:00:00:00:00:01", "DISCONNECTED"),
+            ("AA:00:00:00:00:02", "CONNECTED"),
+        }
+
+    def test_slow_client_is_dropped(self):
+        """Test that a client that stops reading is disconnected, not buffered forever"""
+        store = make_store()
+        streams = StateStreams(store, max_pending=2)
+
+        async def run():
+            streams.attach(asyncio.get_running_loop())
+            client = streams.open("status")
+            for _ in range(3):
+                streams._dispatch(store.snapshot())
+            return client
+
+        client = asyncio.run(run())
+        assert streams.client_count == 0
+        assert client.get_nowait() is None
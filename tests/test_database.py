@@ -0,0 +1,176 @@
+"""
+Unit tests for the IP lease and address history
+"""
+import pyodbc
+import pytest
+from network_monitor import web
+from network_monitor.config import Config
+from network_monitor.database import DatabaseManager
+from network_monitor.debounce import DisconnectDebouncer
+from network_monitor.scanner import Device
+from localdb import LocalConnection, tsql_to_sqlite
+from .conftest import at
+
+A = "AA:00:00:00:00:01"
+B = "AA:00:00:00:00:02"
+C = "AA:00:00:00:00:03"
+
+
+def scan(db, minutes, devices, **kwargs):
+    return db.update_device_status({mac: Device(mac, ip) for mac, ip in devices.items()},
+                                   timestamp=at(minutes), **kwargs)
+
+
+def dual_stack(mac, ip_address):
+    return Device(mac, ip_address, ipv6_addresses=[f"fe80::{mac[-2:]}"])
+
+
+def leases(db):
+    return [(row.MACAddress, row.IPAddress, row.StartTime, row.EndTime)
+            for row in db.connection._conn.execute(
+                "SELECT * FROM IPLeases ORDER BY StartTime, MACAddress")]
+
+
+class FlakyConnection(LocalConnection):
+    """LocalConnection whose next commit can be made to fail"""
+
+    fail_commit = False
+
+    def commit(self):
+        if self.fail_commit:
+            self.fail_commit = False
+            raise pyodbc.Error("commit failed")
+        super().commit()
+
+
+@pytest.fixture
+def db():
+    return DatabaseManager(None, connection=FlakyConnection())
+
+
+class TestIpLeases:
+    """Test cases for recording IP leases"""
+
+    def test_lease_opens_and_moves_with_the_device(self, db):
+        """Test that a new IP ends the device's lease and unchanged scans write nothing"""
+        scan(db, 0, {A: "10.0.0.1"})
+        scan(db, 1, {A: "10.0.0.1"})
+        scan(db, 2, {A: "10.0.0.3"})
+
+        assert leases(db) == [(A, "10.0.0.1", at(0), at(2)), (A, "10.0.0.3", at(2), None)]
+
+    def test_lease_ends_when_another_device_takes_the_ip(self, db):
+        """Test that a device seen with a held IP ends the holder's lease"""
+        debouncer = DisconnectDebouncer(miss_threshold=3)
+        scan(db, 0, {A: "10.0.0.1", B: "10.0.0.2"}, debouncer=debouncer)
+        # B is missing but not disconnected yet when C shows up with its IP
+        scan(db, 1, {A: "10.0.0.1", C: "10.0.0.2"}, debouncer=debouncer)
+
+        assert leases(db) == [(A, "10.0.0.1", at(0), None), (B, "10.0.0.2", at(0), at(1)),
+                              (C, "10.0.0.2", at(1), None)]
+
+    def test_lease_ends_at_disconnect(self, db):
+        """Test that a disconnect ends the lease and a reconnect starts a new one"""
+        scan(db, 0, {A: "10.0.0.1", B: "10.0.0.2"})
+        scan(db, 1, {A: "10.0.0.1"})
+        scan(db, 5, {A: "10.0.0.1", B: "10.0.0.2"})
+
+        assert leases(db) == [(A, "10.0.0.1", at(0), None), (B, "10.0.0.2", at(0), at(1)),
+                              (B, "10.0.0.2", at(5), None)]
+
+    def test_rollback_resets_the_lease_cache(self, db):
+        """Test that leases from a rolled back scan are written again by the next one"""
+        scan(db, 0, {A: "10.0.0.1"})
+        db.connection.fail_commit = True
+        with pytest.raises(pyodbc.Error):
+            scan(db, 1, {A: "10.0.0.2"})
+        scan(db, 2, {A: "10.0.0.2"})
+
+        assert leases(db) == [(A, "10.0.0.1", at(0), at(2)), (A, "10.0.0.2", at(2), None)]
+
+    def test_ip_holder_at_a_point_in_time(self, db):
+        """Test lookups before, during and after a lease"""
+        scan(db, 0, {A: "10.0.0.1"})
+        scan(db, 10, {B: "10.0.0.1"})
+
+        assert db.get_ip_holder("10.0.0.1", at(-1)) is None
+        assert db.get_ip_holder("10.0.0.1", at(0))["mac_address"] == A
+        assert db.get_ip_holder("10.0.0.1", at(9))["end_time"] == at(10).isoformat()
+        assert db.get_ip_holder("10.0.0.1", at(10))["mac_address"] == B
+        assert db.get_ip_holder("10.0.0.2", at(10)) is None
+
+        scan(db, 20, {})
+        assert db.get_ip_holder("10.0.0.1", at(19))["mac_address"] == B
+        assert db.get_ip_holder("10.0.0.1", at(20)) is None
+
+
+class TestIpHolderRoute:
+    """Test cases for /api/ip/<ip>"""
+
+    @pytest.fixture
+    def client(self, db, monkeypatch):
+        monkeypatch.setattr(web, "config", Config())
+        monkeypatch.setattr(web, "db_manager", db)
+        scan(db, 0, {A: "10.0.0.1"})
+        return web.app.test_client()
+
+    def test_ip_holder_route(self, client):
+        """Test a found lease, an unheld IP and invalid input"""
+        response = client.get(f"/api/ip/10.0.0.1?at={at(5).isoformat()}")
+        assert response.status_code == 200
+        assert response.json["lease"]["mac_address"] == A
+        assert response.json["at"] == at(5).isoformat()
+
+        assert client.get(f"/api/ip/10.0.0.1?at={at(-5).isoformat()}").status_code == 404
+        assert client.get("/api/ip/10.0.0.300").status_code == 400
+        assert client.get("/api/ip/10.0.0.1?at=yesterday").status_code == 400
+
+    def test_without_lease_table(self, client, db, monkeypatch):
+        """Test that the route reports a missing IPLeases table"""
+        monkeypatch.setattr(db, "track_ip_leases", False)
+        assert client.get("/api/ip/10.0.0.1").status_code == 501
+
+
+class TestDeviceAddresses:
+    """Test cases for recording device addresses"""
+
+    @pytest.fixture
+    def statements(self):
+        return []
+
+    @pytest.fixture
+    def db(self, statements):
+        def translate(sql):
+            if "DeviceAddresses" in sql:
+                statements.append(sql.split()[0])
+            return tsql_to_sqlite(sql)
+        db = DatabaseManager(None, connection=LocalConnection(translate=translate))
+        statements.clear()
+        return db
+
+    def test_writes_only_new_and_stale_addresses(self, db, statements):
+        """Test that unchanged scans neither read nor write and LastSeen is refreshed late"""
+        devices = {A: dual_stack(A, "10.0.0.1")}
+        db.update_device_status(devices, timestamp=at(0))
+        assert statements == ["SELECT", "INSERT"]
+        assert {row["address"] for row in db.get_device_addresses(A)} == {"10.0.0.1", "fe80::01"}
+
+        statements.clear()
+        db.update_device_status(devices, timestamp=at(1))
+        assert statements == []
+
+        db.update_device_status(devices, timestamp=at(6))
+        assert statements == ["SELECT", "UPDATE"]
+
+    def test_cache_keeps_only_recent_addresses(self, db, statements):
+        """Test that absent devices are evicted and a restart reads only scanned devices"""
+        db.update_device_status({A: dual_stack(A, "10.0.0.1"), B: dual_stack(B, "10.0.0.2")},
+                                timestamp=at(0))
+        db.update_device_status({A: dual_stack(A, "10.0.0.1")}, timestamp=at(6))
+        assert {mac for mac, address in db._address_seen} == {A}
+
+        restarted = DatabaseManager(None, connection=db.connection)
+        statements.clear()
+        restarted.update_device_status({B: dual_stack(B, "10.0.0.2")}, timestamp=at(7))
+        assert statements == ["SELECT", "UPDATE"]
+        assert {mac for mac, address in restarted._address_seen} == {B}
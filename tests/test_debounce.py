@@ -0,0 +1,70 @@
+"""
+Unit tests for disconnect debouncing
+"""
+from datetime import datetime, timedelta
+from network_monitor.debounce import DisconnectDebouncer
+
+MAC = "AA:BB:CC:DD:EE:FF"
+START = datetime(2026, 1, 1, 12, 0)
+
+
+def scan_time(minutes):
+    return START + timedelta(minutes=minutes)
+
+
+class TestDisconnectDebouncer:
+    """Test cases for DisconnectDebouncer"""
+
+    def test_disabled_confirms_immediately(self):
+        """Test default behaviour: one miss is a disconnect"""
+        debouncer = DisconnectDebouncer()
+        assert debouncer.confirm({MAC}, START) == {MAC: START}
+        assert debouncer.misses == {}
+
+    def test_miss_threshold(self):
+        """Test that N consecutive misses are required"""
+        debouncer = DisconnectDebouncer(miss_threshold=3)
+        assert debouncer.confirm({MAC}, scan_time(0)) == {}
+        assert debouncer.confirm({MAC}, scan_time(1)) == {}
+        assert debouncer.confirm({MAC}, scan_time(2)) == {MAC: scan_time(0)}
+        assert debouncer.misses == {}
+
+    def test_reappearing_resets_counter(self):
+        """Test that answering a scan clears the miss count"""
+        debouncer = DisconnectDebouncer(miss_threshold=2)
+        assert debouncer.confirm({MAC}, scan_time(0)) == {}
+        assert debouncer.confirm(set(), scan_time(1)) == {}
+        assert debouncer.confirm({MAC}, scan_time(2)) == {}
+
+    def test_grace_seconds(self):
+        """Test that a device must be missing for T seconds"""
+        debouncer = DisconnectDebouncer(grace_seconds=150)
+        assert debouncer.confirm({MAC}, scan_time(0)) == {}
+        assert debouncer.confirm({MAC}, scan_time(2)) == {}
+        assert debouncer.confirm({MAC}, scan_time(3)) == {MAC: scan_time(0)}
+
+    def test_whichever_limit_comes_first(self):
+        """Test that either the scan or the time limit confirms a disconnect"""
+        by_scans = DisconnectDebouncer(miss_threshold=2, grace_seconds=600)
+        assert by_scans.confirm({MAC}, scan_time(0)) == {}
+        assert by_scans.confirm({MAC}, scan_time(1)) == {MAC: scan_time(0)}
+
+        by_time = DisconnectDebouncer(miss_threshold=10, grace_seconds=150)
+        assert by_time.confirm({MAC}, scan_time(0)) == {}
+        assert by_time.confirm({MAC}, scan_time(3)) == {MAC: scan_time(0)}
+
+    def test_one_miss_threshold_is_immediate(self):
+        """Test that N = 1 disconnects at the first miss whatever T is"""
+        debouncer = DisconnectDebouncer(miss_threshold=1, grace_seconds=600)
+        assert debouncer.confirm({MAC}, START) == {MAC: START}
+
+    def test_counters_survive_restart(self, tmp_path):
+        """Test that pending misses are persisted and restored"""
+        state_file = str(tmp_path / "debounce.json")
+        debouncer = DisconnectDebouncer(miss_threshold=2, state_file=state_file)
+        debouncer.confirm({MAC}, scan_time(0))
+        debouncer.save()
+
+        restarted = DisconnectDebouncer(miss_threshold=2, state_file=state_file)
+        restarted.load()
+        assert restarted.confirm({MAC}, scan_time(1)) == {MAC: scan_time(0)}
@@ -0,0 +1,153 @@
+"""
+Unit tests for the device enrichment pipeline
+"""
+import threading
+import time
+from network_monitor.enrichment import (
+    EnrichmentJob, EnrichmentPipeline, ReverseDnsStage, VendorStage, DeviceTypeStage,
+)
+from network_monitor.scanner import Device
+from .conftest import wait_for
+
+
+class TestStages:
+    """Test cases for individual enrichment stages"""
+
+    def test_reverse_dns_is_cached_per_ip(self):
+        """Test that a repeated IP is resolved once"""
+        calls = []
+        stage = ReverseDnsStage(resolver=lambda ip: calls.append(ip) or f"host-{ip}")
+
+        for _ in range(3):
+            job = EnrichmentJob("AA:BB:CC:DD:EE:FF", "10.0.0.5")
+            stage.run(job)
+            assert job.hostname == "host-10.0.0.5"
+        assert calls == ["10.0.0.5"]
+
+    def test_reverse_dns_concurrency_limit(self):
+        """Test that at most N lookups run at once"""
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def resolver(ip):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return None
+
+        stage = ReverseDnsStage(concurrency=2, resolver=resolver)
+        threads = [
+            threading.Thread(target=stage.run, args=(EnrichmentJob("AA", f"10.0.0.{i}"),))
+            for i in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert peak[0] <= 2
+
+    def test_vendor_stage_keeps_known_vendor(self):
+        """Test that a vendor set at insert time is not looked up again"""
+        stage = VendorStage(lambda mac: "Acme")
+        job = EnrichmentJob("00:11:22:33:44:55", "10.0.0.1", vendor="Known")
+        stage.run(job)
+        assert job.vendor == "Known"
+
+        job = EnrichmentJob("00:11:22:33:44:55", "10.0.0.1")
+        stage.run(job)
+        assert job.vendor == "Acme"
+
+    def test_device_type_heuristics(self):
+        """Test that hostname rules win over vendor rules"""
+        stage = DeviceTypeStage()
+        cases = [
+            ("Janes-iPhone.lan", "Apple, Inc.", "Phone"),
+            ("office-laserjet", None, "Printer"),
+            (None, "Raspberry Pi Trading Ltd", "IoT"),
+            ("unknown-host", "Nobody", None),
+        ]
+        for hostname, vendor, expected in cases:
+            job = EnrichmentJob("AA", "10.0.0.1", hostname=hostname, vendor=vendor)
+            stage.run(job)
+            assert job.device_type == expected, hostname
+
+
+class TestEnrichmentPipeline:
+    """Test cases for EnrichmentPipeline"""
+
+    def make_pipeline(self, written, **kwargs):
+        stages = [ReverseDnsStage(resolver=lambda ip: f"host-{ip.split('.')[-1]}"),
+                  DeviceTypeStage()]
+        return EnrichmentPipeline(stages, writer=written.append, workers=2, **kwargs)
+
+    def test_results_are_batched(self):
+        """Test that queued devices reach the writer in batches"""
+        written = []
+        pipeline = self.make_pipeline(written, batch_size=10, flush_interval=0.05)
+        pipeline.start()
+        try:
+            devices = [Device(f"AA:BB:CC:DD:EE:{i:02X}", f"10.0.0.{i}") for i in range(25)]
+            assert pipeline.submit_scan(devices) == 25
+            wait_for(lambda: sum(len(batch) for batch in written) == 25)
+        finally:
+            pipeline.stop()
+
+        assert all(len(batch) <= 10 for batch in written)
+        hostnames = {job.mac_address: job.hostname for batch in written for job in batch}
+        assert hostnames["AA:BB:CC:DD:EE:03"] == "host-3"
+
+    def test_only_new_or_changed_devices_are_queued(self):
+        """Test that unchanged devices are skipped on later scans"""
+        pipeline = self.make_pipeline([])
+        device = Device("AA:BB:CC:DD:EE:01", "10.0.0.1")
+
+        assert pipeline.submit_scan([device]) == 1
+        assert pipeline.submit_scan([device]) == 0
+        assert pipeline.submit_scan([Device("AA:BB:CC:DD:EE:01", "10.0.0.2")]) == 1
+
+    def test_full_queue_drops_until_next_scan(self):
+        """Test that dropped devices are queued again later"""
+        pipeline = self.make_pipeline([], queue_size=1)
+        devices = [Device("AA:BB:CC:DD:EE:01", "10.0.0.1"), Device("AA:BB:CC:DD:EE:02", "10.0.0.2")]
+
+        assert pipeline.submit_scan(devices) == 1
+        pipeline._jobs.get_nowait()
+        assert pipeline.submit_scan(devices) == 1
+
+    def test_on_results_receives_written_batches(self):
+        """Test that results are handed on after they are written"""
+        written, applied = [], []
+        pipeline = self.make_pipeline(written, flush_interval=0.05, on_results=applied.extend)
+        pipeline.start()
+        try:
+            pipeline.submit_scan([Device("AA:BB:CC:DD:EE:01", "10.0.0.1")])
+            wait_for(lambda: applied)
+        finally:
+            pipeline.stop()
+        assert applied[0].hostname == "host-1"
+
+    def test_stop_writes_results_in_progress(self):
+        """Test that stopping waits for running jobs and writes their results"""
+        written = []
+        started = threading.Semaphore(0)
+
+        def slow_resolver(ip):
+            started.release()
+            time.sleep(0.2)
+            return f"host-{ip.split('.')[-1]}"
+
+        pipeline = EnrichmentPipeline([ReverseDnsStage(resolver=slow_resolver)],
+                                      writer=written.append, workers=2, flush_interval=10)
+        pipeline.start()
+        pipeline.submit_scan([Device(f"AA:BB:CC:DD:EE:{i:02X}", f"10.0.0.{i}") for i in range(4)])
+        assert started.acquire(timeout=5) and started.acquire(timeout=5)
+        pipeline.stop()
+
+        done = {job.mac_address for batch in written for job in batch}
+        assert {"AA:BB:CC:DD:EE:00", "AA:BB:CC:DD:EE:01"} <= done
+        # Devices no worker had started are queued again by the next scan
+        pending = [Device(f"AA:BB:CC:DD:EE:{i:02X}", f"10.0.0.{i}") for i in range(4)]
+        assert pipeline.submit_scan(pending) == 4 - len(done)
@@ -0,0 +1,76 @@
+"""
+Unit tests for streaming exports
+"""
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+import pytest
+from network_monitor.export import ExportError, export
+from .conftest import FakeConnection
+
+START = datetime(2026, 1, 1, 12, 0)
+
+
+def log_rows(count):
+    """ConnectionLog rows keyed by LogID"""
+    return [(i, f"AA:00:00:00:00:{i:02X}", f"10.0.0.{i}", "CONNECTED", START + timedelta(minutes=i))
+            for i in range(1, count + 1)]
+
+
+class TestExport:
+    """Test cases for streaming exports"""
+
+    def test_ndjson_pages_through_table(self):
+        """Test that every row is exported once, in key order, across pages"""
+        connection = FakeConnection(log_rows(7))
+        chunks = list(export(lambda: connection, "events", "ndjson", page_size=3, chunk_size=2))
+        lines = b"".join(chunks).decode().splitlines()
+
+        assert [json.loads(line)["log_id"] for line in lines] == list(range(1, 8))
+        assert json.loads(lines[0])["event_time"] == (START + timedelta(minutes=1)).isoformat()
+        # Three pages of at most three rows, each read two rows at a time
+        assert len(connection.queries) == 3
+        assert connection.closed
+
+    def test_csv_has_header_and_filters(self):
+        """Test CSV output and that filters become query parameters"""
+        connection = FakeConnection(log_rows(2))
+        body = b"".join(export(lambda: connection, "events", "csv", since=START,
+                               mac_address="aa:00:00:00:00:01")).decode()
+        rows = list(csv.reader(io.StringIO(body)))
+
+        assert rows[0] == ["log_id", "mac_address", "ip_address", "event_type", "event_time"]
+        assert len(rows) == 3
+        sql, params = connection.queries[0]
+        assert "EventTime >= ?" in sql and "MACAddress = ?" in sql
+        assert params == (START, "AA:00:00:00:00:01")
+
+    def test_abandoned_stream_closes_connection(self):
+        """Test that a client going away releases the export connection"""
+        connection = FakeConnection(log_rows(50))
+        chunks = export(lambda: connection, "events", "ndjson", chunk_size=5)
+        next(chunks)
+        next(chunks)
+        chunks.close()
+        assert connection.closed
+        assert connection.fetches == 1
+
+    def test_parquet_roundtrip(self):
+        """Test that Parquet output is written one row group per chunk"""
+        pq = pytest.importorskip("pyarrow.parquet")
+        connection = FakeConnection(log_rows(5))
+        data = b"".join(export(lambda: connection, "events", "parquet", chunk_size=2))
+
+        parquet = pq.ParquetFile(io.BytesIO(data))
+        assert parquet.metadata.num_row_groups == 3
+        table = parquet.read()
+        assert table.column("log_id").to_pylist() == [1, 2, 3, 4, 5]
+        assert table.column("event_time").to_pylist()[0] == START + timedelta(minutes=1)
+
+    def test_unknown_export(self):
+        """Test that unknown tables and formats are rejected before connecting"""
+        with pytest.raises(ExportError):
+            export(lambda: None, "users")
+        with pytest.raises(ExportError):
+            export(lambda: None, "events", "xml")
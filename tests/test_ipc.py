@@ -0,0 +1,108 @@
+"""
+Unit tests for the IPC state channel
+"""
+import os
+import socket
+from datetime import datetime
+import pytest
+from network_monitor.database import ScanDelta
+from network_monitor.ipc import IpcError, StatePublisher, StateSubscriber, parse_address, send_command
+from network_monitor.scanner import Device
+from network_monitor.state import DeviceRecord, DeviceStateStore
+from .conftest import wait_for
+
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix sockets")
+
+
+@pytest.fixture
+def address(tmp_path):
+    return str(tmp_path / "monitor.sock")
+
+
+@pytest.fixture
+def publisher(address):
+    store = DeviceStateStore()
+    seen = datetime(2026, 1, 1, 12, 0)
+    store.load([DeviceRecord("AA:00:00:00:00:01", "10.0.0.1", "nas.lan", seen, seen, True)])
+    publisher = StatePublisher(
+        store, address,
+        commands={"echo": lambda args: args, "fail": lambda args: 1 / 0},
+        status=lambda: {"monitoring_active": True},
+        heartbeat=0.1
+    )
+    publisher.start()
+    yield publisher
+    publisher.stop()
+
+
+class TestStateIpc:
+    """Test cases for StatePublisher, StateSubscriber and IPC commands"""
+
+    def test_parse_address(self):
+        """Test Unix and TCP address forms"""
+        assert parse_address("tcp://127.0.0.1:5056")[1] == ("127.0.0.1", 5056)
+        assert parse_address("tcp://:5056")[1] == ("127.0.0.1", 5056)
+        assert parse_address("tcp://localhost:5056")[1] == ("localhost", 5056)
+
+    def test_remote_tcp_address_is_refused(self):
+        """Test that unauthenticated commands cannot be exposed beyond the host"""
+        for address in ("tcp://0.0.0.0:5056", "tcp://192.0.2.10:5056", "tcp://scanner:5056"):
+            with pytest.raises(ValueError, match="loopback"):
+                parse_address(address)
+
+    def test_unix_socket_is_private(self, publisher, address):
+        """Test that only the owner can connect to the Unix socket"""
+        assert os.stat(address).st_mode & 0o777 == 0o600
+
+    def test_subscriber_follows_publisher(self, publisher, address):
+        """Test that a subscriber gets the snapshot and later deltas"""
+        local = DeviceStateStore()
+        subscriber = StateSubscriber(address, local, heartbeat=0.1, retry_interval=0.05)
+        subscriber.start()
+        try:
+            assert subscriber.wait_connected(5)
+            assert local.snapshot().get("AA:00:00:00:00:01").hostname == "nas.lan"
+            assert subscriber.status == {"monitoring_active": True}
+
+            now = datetime.now()
+            publisher.store.publish(ScanDelta(now, {
+                "AA:00:00:00:00:02": Device("AA:00:00:00:00:02", "10.0.0.2"),
+            }, connected={"AA:00:00:00:00:02"}, disconnected={"AA:00:00:00:00:01"}))
+
+            wait_for(lambda: local.snapshot().get("AA:00:00:00:00:02") is not None)
+            snapshot = local.snapshot()
+            assert snapshot.get("AA:00:00:00:00:01").is_connected is False
+            assert snapshot.get("AA:00:00:00:00:02").first_seen == now
+            assert snapshot.updated_at == now
+        finally:
+            subscriber.stop()
+
+    def test_subscriber_reconnects(self, publisher, address):
+        """Test that a subscriber resynchronizes after the publisher restarts"""
+        local = DeviceStateStore()
+        subscriber = StateSubscriber(address, local, heartbeat=0.1, retry_interval=0.05)
+        subscriber.start()
+        try:
+            assert subscriber.wait_connected(5)
+            publisher.stop()
+            wait_for(lambda: not subscriber.connected)
+
+            publisher.store.merge([], removed=["AA:00:00:00:00:01"])
+            publisher.start()
+            wait_for(lambda: subscriber.connected and local.snapshot().total_count == 0)
+        finally:
+            subscriber.stop()
+
+    def test_commands(self, publisher, address):
+        """Test command replies and errors"""
+        assert send_command(address, "echo", value=3) == {"value": 3}
+        with pytest.raises(IpcError, match="division"):
+            send_command(address, "fail")
+        with pytest.raises(IpcError, match="Unsupported"):
+            send_command(address, "missing")
+
+    def test_command_without_publisher(self, tmp_path):
+        """Test that an unreachable publisher raises IpcError"""
+        with pytest.raises(IpcError):
+            send_command(str(tmp_path / "absent.sock"), "scan", timeout=1)
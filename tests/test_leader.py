@@ -0,0 +1,51 @@
+"""
+Unit tests for leader election
+"""
+import threading
+from network_monitor.leader import FileLease, LeaderElection
+
+
+class TestFileLease:
+    """Test cases for FileLease"""
+
+    def test_exclusive(self, tmp_path):
+        """Test that only one holder at a time gets the lease"""
+        path = str(tmp_path / "state" / "scanner.lock")
+        first, second = FileLease(path), FileLease(path)
+
+        assert first.try_acquire()
+        assert first.try_acquire()
+        assert not second.try_acquire()
+        assert second.holder() is not None
+
+        first.release()
+        assert second.try_acquire()
+        assert not first.held
+        second.release()
+
+
+class TestLeaderElection:
+    """Test cases for LeaderElection"""
+
+    def test_follower_takes_over(self, tmp_path):
+        """Test that a waiting candidate is elected when the leader steps down"""
+        path = str(tmp_path / "scanner.lock")
+        elected = []
+        events = [threading.Event(), threading.Event()]
+
+        def on_elected(index):
+            elected.append(index)
+            events[index].set()
+
+        leader = LeaderElection(FileLease(path), lambda: on_elected(0), retry_interval=0.05)
+        follower = LeaderElection(FileLease(path), lambda: on_elected(1), retry_interval=0.05)
+        leader.start()
+        assert events[0].wait(5)
+        follower.start()
+        assert not events[1].wait(0.2)
+        assert leader.is_leader and not follower.is_leader
+
+        leader.stop()
+        assert events[1].wait(5)
+        assert elected == [0, 1]
+        follower.stop()
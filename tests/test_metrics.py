@@ -0,0 +1,59 @@
+"""
+Unit tests for the metrics registry
+"""
+import pytest
+from network_monitor.metrics import MetricsRegistry, Counter, Gauge, Histogram
+
+
+class TestMetricsRegistry:
+    """Test cases for metric rendering"""
+
+    def test_counter_with_labels(self):
+        """Test counter rendering in exposition format"""
+        registry = MetricsRegistry()
+        counter = registry.register(Counter("test_events_total", "Events", ("type",)))
+        counter.labels(type="CONNECTED").inc()
+        counter.labels(type="CONNECTED").inc(2)
+
+        output = registry.render()
+        assert "# TYPE test_events_total counter" in output
+        assert 'test_events_total{type="CONNECTED"} 3' in output
+
+    def test_gauge(self):
+        """Test unlabelled gauge"""
+        registry = MetricsRegistry()
+        gauge = registry.register(Gauge("test_devices", "Devices"))
+        gauge.set(12)
+
+        assert "test_devices 12" in registry.render()
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test histogram bucket, sum and count lines"""
+        registry = MetricsRegistry()
+        histogram = registry.register(
+            Histogram("test_seconds", "Durations", ("phase",), buckets=(0.1, 1.0))
+        )
+        child = histogram.labels(phase="arp")
+        child.observe(0.05)
+        child.observe(0.5)
+        child.observe(5)
+
+        output = registry.render()
+        assert 'test_seconds_bucket{phase="arp",le="0.1"} 1' in output
+        assert 'test_seconds_bucket{phase="arp",le="1"} 2' in output
+        assert 'test_seconds_bucket{phase="arp",le="+Inf"} 3' in output
+        assert 'test_seconds_count{phase="arp"} 3' in output
+        assert 'test_seconds_sum{phase="arp"} 5.55' in output
+
+    def test_duplicate_registration(self):
+        """Test that metric names are unique"""
+        registry = MetricsRegistry()
+        registry.register(Counter("test_total", "Test"))
+        with pytest.raises(ValueError):
+            registry.register(Counter("test_total", "Test"))
+
+    def test_label_mismatch(self):
+        """Test that label count is validated"""
+        counter = Counter("test_total", "Test", ("a", "b"))
+        with pytest.raises(ValueError):
+            counter.labels("only-one")
@@ -0,0 +1,129 @@
+"""
+Unit tests for IPv6 neighbor discovery
+"""
+from unittest.mock import MagicMock, patch
+from scapy.all import Ether, IPv6, ICMPv6EchoReply, ICMPv6ND_NA, ICMPv6ND_NS
+from network_monitor.ndp import (
+    NeighborDiscovery, Neighbors, harvest_packet, parse_ip_neigh, parse_netsh_neighbors,
+    preferred_address,
+)
+from network_monitor.scanner import NetworkScanner
+
+IP_NEIGH = """\
+fe80::1 dev eth0 lladdr 00:11:22:33:44:55 router REACHABLE
+2001:db8::1 dev eth0 lladdr 00:11:22:33:44:55 router STALE
+2001:db8::a dev eth0 lladdr aa:bb:cc:dd:ee:ff DELAY
+fe80::9 dev eth0 INCOMPLETE
+fe80::8 dev eth0 lladdr aa:bb:cc:dd:ee:08 FAILED
+ff02::fb dev eth0 lladdr 33:33:00:00:00:fb NOARP
+"""
+
+NETSH = """\
+Interface 12: Ethernet
+
+
+Internet Address                              Physical Address   Type
+--------------------------------------------  -----------------  -----------
+fe80::1%12                                    00-11-22-33-44-55  Reachable (Router)
+2001:db8::a                                   aa-bb-cc-dd-ee-ff  Stale
+fe80::9                                                          Unreachable
+ff02::1                                       33-33-00-00-00-01  Permanent
+"""
+
+
+class TestNeighborParsing:
+    """Test cases for IPv6 neighbor sources"""
+
+    def test_parse_ip_neigh(self):
+        """Test that usable entries are grouped by MAC and state and the rest skipped"""
+        assert parse_ip_neigh(IP_NEIGH) == Neighbors(
+            live={"00:11:22:33:44:55": {"fe80::1"}, "AA:BB:CC:DD:EE:FF": {"2001:db8::a"}},
+            stale={"00:11:22:33:44:55": {"2001:db8::1"}},
+        )
+
+    def test_parse_netsh_neighbors(self):
+        """Test the Windows neighbor table, including zone suffixes"""
+        assert parse_netsh_neighbors(NETSH) == Neighbors(
+            live={"00:11:22:33:44:55": {"fe80::1"}},
+            stale={"AA:BB:CC:DD:EE:FF": {"2001:db8::a"}},
+        )
+
+    def test_harvest_packet(self):
+        """Test addresses taken from echo replies and Neighbor Discovery"""
+        found = {}
+        harvest_packet(Ether(src="aa:00:00:00:00:01") / IPv6(src="fe80::a1", dst="fe80::1") /
+                       ICMPv6EchoReply(), found)
+        harvest_packet(Ether(src="aa:00:00:00:00:02") / IPv6(src="fe80::a2", dst="ff02::1") /
+                       ICMPv6ND_NA(tgt="2001:db8::a2"), found)
+        # Duplicate address detection comes from "::"
+        harvest_packet(Ether(src="aa:00:00:00:00:03") / IPv6(src="::", dst="ff02::1:ff00:a3") /
+                       ICMPv6ND_NS(tgt="2001:db8::a3"), found)
+        # The scanner's own solicitation
+        harvest_packet(Ether(src="aa:00:00:00:00:09") / IPv6(src="fe80::9", dst="ff02::1:ff00:1") /
+                       ICMPv6ND_NS(tgt="fe80::1"), found, own_mac="AA:00:00:00:00:09")
+
+        assert found == {
+            "AA:00:00:00:00:01": {"fe80::a1"},
+            "AA:00:00:00:00:02": {"fe80::a2", "2001:db8::a2"},
+        }
+
+    def test_preferred_address(self):
+        """Test that a global address is preferred over a link-local one"""
+        assert preferred_address({"fe80::1", "2001:db8::5", "2001:db8::2"}) == "2001:db8::2"
+        assert preferred_address({"fe80::1"}) == "fe80::1"
+
+
+class TestScannerIpv6:
+    """Test cases for IPv6 neighbors in scans"""
+
+    @patch('network_monitor.scanner.srp')
+    def test_scanner_merges_ipv6_neighbors(self, mock_srp):
+        """Test that dual-stack devices gain addresses and IPv6-only ones are added"""
+        received = MagicMock()
+        received.hwsrc = "aa:aa:aa:aa:aa:01"
+        received.psrc = "10.20.0.1"
+        mock_srp.return_value = ([(None, received)], [])
+        discovery = MagicMock()
+        discovery.discover.return_value = Neighbors(
+            live={"AA:AA:AA:AA:AA:01": {"fe80::1"}, "AA:AA:AA:AA:AA:02": {"fe80::2", "2001:db8::2"}},
+            stale={"AA:AA:AA:AA:AA:01": {"2001:db8::1"}},
+        )
+
+        scanner = NetworkScanner("10.20.0.0/24", resolve_hostnames=False, ipv6=discovery)
+        devices = scanner.scan()
+
+        assert devices["AA:AA:AA:AA:AA:01"].ip_address == "10.20.0.1"
+        assert devices["AA:AA:AA:AA:AA:01"].addresses == {"10.20.0.1", "fe80::1", "2001:db8::1"}
+        assert devices["AA:AA:AA:AA:AA:02"].ip_address == "2001:db8::2"
+
+        discovery.discover.side_effect = OSError("no such interface")
+        assert set(scanner.scan()) == {"AA:AA:AA:AA:AA:01"}
+
+    @patch('network_monitor.ndp.read_neighbor_table')
+    @patch('network_monitor.scanner.srp')
+    def test_stale_entries_are_not_presence(self, mock_srp, mock_table):
+        """Test that a device only in the table as STALE is not reported"""
+        mock_srp.return_value = ([], [])
+        mock_table.return_value = parse_ip_neigh(
+            "2001:db8::5 dev eth0 lladdr aa:aa:aa:aa:aa:01 STALE\n")
+
+        scanner = NetworkScanner("10.20.0.0/24", resolve_hostnames=False,
+                                 ipv6=NeighborDiscovery(active=False))
+
+        assert scanner.scan() == {}
+
+    @patch('network_monitor.scanner.srp')
+    def test_known_device_keeps_its_ipv4_address(self, mock_srp):
+        """Test that a known device answering only over IPv6 stays on its IPv4 address"""
+        mock_srp.return_value = ([], [])
+        discovery = MagicMock()
+        discovery.discover.return_value = Neighbors(live={"AA:AA:AA:AA:AA:01": {"2001:db8::1"}})
+
+        scanner = NetworkScanner("10.20.0.0/24", resolve_hostnames=False, retries=0,
+                                 ipv6=discovery)
+        scanner.expect({"aa:aa:aa:aa:aa:01": "10.20.0.1"})
+
+        for _ in range(2):
+            device = scanner.scan()["AA:AA:AA:AA:AA:01"]
+            assert device.ip_address == "10.20.0.1"
+            assert device.ipv6_addresses == {"2001:db8::1"}
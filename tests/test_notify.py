@@ -0,0 +1,187 @@
+"""
+Tests for webhook notifications, against a local HTTP stub
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+import pytest
+from network_monitor.config import Config
+from network_monitor.database import DatabaseManager, ScanDelta
+from network_monitor.monitor import NetworkMonitor
+from network_monitor.notify import EventDispatcher, WebhookTarget, delta_events
+from network_monitor.scanner import Device
+from localdb import LocalConnection
+from .conftest import wait_for
+
+
+class WebhookStub:
+    """HTTP receiver that records batches and can fail or stall on demand"""
+
+    def __init__(self):
+        self.batches = []
+        self.fail_with = []     # status codes returned before succeeding
+        self.delay = 0.0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                time.sleep(stub.delay)
+                status = stub.fail_with.pop(0) if stub.fail_with else 200
+                if status == 200:
+                    stub.batches.append(json.loads(body)["events"])
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/hook"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def events(self):
+        return [event for batch in self.batches for event in batch]
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    stub = WebhookStub()
+    yield stub
+    stub.stop()
+
+
+def make_target(url, **kwargs):
+    options = dict(batch_size=10, flush_interval=0.05, backoff=0.01, backoff_max=0.05, timeout=2)
+    options.update(kwargs)
+    return WebhookTarget("test", url, **options)
+
+
+def events(count, start=0):
+    return [{"event_type": "CONNECTED", "mac_address": f"AA:00:00:00:{i // 256:02X}:{i % 256:02X}"}
+            for i in range(start, start + count)]
+
+
+class TestDeltaEvents:
+    """Test cases for delta_events"""
+
+    def test_delta_events(self):
+        """Test that a committed scan becomes one event per connect/disconnect"""
+        delta = ScanDelta(
+            datetime(2026, 1, 1, 12, 0),
+            {"AA:00:00:00:00:01": Device("AA:00:00:00:00:01", "10.0.0.1", "nas.lan")},
+            connected={"AA:00:00:00:00:01"}, disconnected={"AA:00:00:00:00:02"}, site_id="hq"
+        )
+        result = delta_events(delta)
+        assert [(e["event_type"], e["ip_address"], e["site_id"]) for e in result] == [
+            ("CONNECTED", "10.0.0.1", "hq"), ("DISCONNECTED", None, "hq"),
+        ]
+
+
+class TestWebhookTarget:
+    """Test cases for WebhookTarget delivery"""
+
+    def test_events_are_batched(self, stub):
+        """Test that events queued together are posted together"""
+        target = make_target(stub.url)
+        dispatcher = EventDispatcher([target])
+        dispatcher.start()
+        try:
+            target.submit(events(25))
+            wait_for(lambda: len(stub.events) == 25)
+            assert [len(batch) for batch in stub.batches] == [10, 10, 5]
+        finally:
+            dispatcher.stop()
+
+    def test_failed_posts_are_retried(self, stub):
+        """Test retry with backoff on server errors, and no retry on client errors"""
+        stub.fail_with = [503, 503]
+        target = make_target(stub.url, max_retries=3)
+        target.start()
+        try:
+            target.submit(events(3))
+            wait_for(lambda: len(stub.events) == 3)
+            assert stub.fail_with == []
+
+            stub.fail_with = [400]
+            target.submit(events(2, start=3))
+            wait_for(lambda: not stub.fail_with)
+            time.sleep(0.2)
+            assert len(stub.events) == 3
+        finally:
+            target.stop()
+
+    def test_slow_receiver_does_not_block_submit(self, stub):
+        """Test that a stalled receiver only fills its own bounded queue"""
+        stub.delay = 0.5
+        target = make_target(stub.url, queue_size=20)
+        target.start()
+        try:
+            started = time.perf_counter()
+            for i in range(100):
+                target.submit(events(10, start=i * 10))
+            assert time.perf_counter() - started < 0.5
+            assert target.pending <= 20
+        finally:
+            stub.delay = 0
+            target.stop(timeout=2)
+
+    def test_spilled_events_are_delivered_later(self, tmp_path, stub):
+        """Test that undeliverable events are spilled to disk and replayed"""
+        stub.fail_with = [503] * 2
+        target = make_target(stub.url, overflow="spill", spill_dir=str(tmp_path), max_retries=1)
+        target.start()
+        try:
+            target.submit(events(4))
+            wait_for(lambda: len(stub.events) == 4)
+            assert os.listdir(tmp_path) == []
+        finally:
+            target.stop()
+
+    def test_drop_newest_keeps_queued_events(self):
+        """Test the overflow policy without a delivery thread"""
+        target = WebhookTarget("test", "http://127.0.0.1:9/", queue_size=3, overflow="drop_newest")
+        target.submit(events(5))
+        assert [e["mac_address"] for e in target._queue] == [e["mac_address"] for e in events(3)]
+
+        target = WebhookTarget("test", "http://127.0.0.1:9/", queue_size=3)
+        target.submit(events(5))
+        assert [e["mac_address"] for e in target._queue] == [e["mac_address"] for e in events(3, start=2)]
+
+
+class TestMonitorShutdown:
+    """Test cases for webhook delivery when the monitor stops"""
+
+    def test_scan_in_progress_is_delivered(self, stub, tmp_path):
+        """Test that stop() during a scan still delivers that scan's events"""
+        config = Config()
+        config.notify.webhook_urls = [stub.url]
+        config.notify.flush_interval = 0.05
+        config.enrichment.asynchronous = False
+        config.presence.enabled = False
+        config.state.directory = str(tmp_path)
+        config.state.warm_start = False
+        scanner = MagicMock()
+        monitor = NetworkMonitor(config, scanner=scanner,
+                                 database=DatabaseManager(None, connection=LocalConnection()))
+
+        def scan():
+            monitor.stop()
+            return {"AA:00:00:00:00:01": Device("AA:00:00:00:00:01", "10.0.0.1")}
+
+        scanner.scan.side_effect = scan
+        thread = threading.Thread(target=monitor.run)
+        thread.start()
+        thread.join(timeout=10)
+
+        assert [event["event_type"] for event in stub.events] == ["CONNECTED"]
@@ -0,0 +1,79 @@
+"""
+Unit tests for the OUI vendor index
+"""
+import pytest
+from network_monitor.oui import OuiIndex, compile_index, mac_to_int, parse_registry
+
+OUI_TXT = """OUI/MA-L                                                    Organization
+company_id                                                  Organization
+                                                            Address
+
+00-00-0C   (hex)\t\tCisco Systems, Inc
+00000C     (base 16)\t\tCisco Systems, Inc
+\t\t\t\t170 WEST TASMAN DRIVE
+\t\t\t\tSAN JOSE CA 95134-1706
+\t\t\t\tUS
+
+8C-1F-64   (hex)\t\tIEEE Registration Authority
+8C1F64     (base 16)\t\tIEEE Registration Authority
+"""
+
+MAM_TXT = """8C-1F-64   (hex)\t\tExample Sensors GmbH
+D00000-DFFFFF     (base 16)\t\tExample Sensors GmbH
+"""
+
+OUI36_CSV = """Registry,Assignment,Organization Name,Organization Address
+MA-S,8C1F645A0,Tiny Devices Ltd,Somewhere
+"""
+
+
+@pytest.fixture
+def index(tmp_path):
+    sources = []
+    for name, content in (("oui.txt", OUI_TXT), ("mam.txt", MAM_TXT), ("oui36.csv", OUI36_CSV)):
+        path = tmp_path / name
+        path.write_text(content)
+        sources.append(str(path))
+    output = str(tmp_path / "oui.idx")
+    assert compile_index(sources, output) == 4
+    oui_index = OuiIndex(output)
+    yield oui_index
+    oui_index.close()
+
+
+class TestOuiIndex:
+    """Test cases for OUI parsing and lookup"""
+
+    def test_mac_to_int(self):
+        """Test MAC notations"""
+        assert mac_to_int("00:00:0c:00:00:01") == 0x00000C000001
+        assert mac_to_int("0000.0c00.0001") == 0x00000C000001
+        assert mac_to_int("not-a-mac") is None
+
+    def test_parse_ma_m_range(self, tmp_path):
+        """Test that MA-M ranges become 28-bit prefixes"""
+        path = tmp_path / "mam.txt"
+        path.write_text(MAM_TXT)
+        assert list(parse_registry(str(path))) == [(28, 0x8C1F64D, "Example Sensors GmbH")]
+
+    def test_lookup_24_bit(self, index):
+        """Test MA-L lookup"""
+        assert index.lookup("00:00:0C:12:34:56") == "Cisco Systems, Inc"
+
+    def test_longest_prefix_wins(self, index):
+        """Test that MA-S and MA-M blocks override the parent MA-L"""
+        assert index.lookup("8C:1F:64:5A:01:23") == "Tiny Devices Ltd"
+        assert index.lookup("8C:1F:64:D1:23:45") == "Example Sensors GmbH"
+        assert index.lookup("8C:1F:64:11:22:33") == "IEEE Registration Authority"
+
+    def test_unknown_and_local(self, index):
+        """Test unassigned and locally administered addresses"""
+        assert index.lookup("00:11:22:33:44:55") is None
+        assert index.lookup("02:00:0C:12:34:56") is None
+
+    def test_rejects_other_files(self, tmp_path):
+        """Test that a non-index file is refused"""
+        path = tmp_path / "bogus.idx"
+        path.write_bytes(b"x" * 64)
+        with pytest.raises(ValueError):
+            OuiIndex(str(path))
@@ -0,0 +1,123 @@
+"""
+Unit tests for presence bitmaps
+"""
+import os
+from datetime import datetime, timedelta
+import pytest
+from network_monitor.presence import MAX_RANGE_DAYS, PresenceStore, RunBitmap
+from .conftest import at
+
+A = "AA:00:00:00:00:01"
+B = "AA:00:00:00:00:02"
+
+
+class TestRunBitmap:
+    """Test cases for run-length encoded bitmaps"""
+
+    def test_run_bitmap_operations(self):
+        """Test appends, set operations, counting and encoding"""
+        bitmap = RunBitmap()
+        for value in (1, 2, 3, 7, 8, 2, 5):
+            bitmap.add(value)
+        assert list(bitmap.runs()) == [(1, 4), (5, 6), (7, 9)]
+        assert len(bitmap) == 6
+
+        other = RunBitmap([(3, 6)])
+        assert list((bitmap & other).runs()) == [(3, 4), (5, 6)]
+        assert list((bitmap | other).runs()) == [(1, 6), (7, 9)]
+        assert bitmap.count_range(2, 8) == 4
+        assert bitmap.histogram([0, 4, 10]) == [3, 3]
+        assert bitmap.intersects(4, 5) is False
+        assert RunBitmap.decode(bitmap.encode()) == bitmap
+
+
+def record_hour(store):
+    """One scan a minute; A answers throughout, B only for the first 10 minutes"""
+    for minute in range(60):
+        store.record(at(minute), [A, B] if minute < 10 else [A])
+
+
+class TestPresenceStore:
+    """Test cases for the presence store"""
+
+    def test_online_any_and_all(self, tmp_path):
+        """Test which devices were online in a range"""
+        store = PresenceStore(str(tmp_path), slot_seconds=60)
+        record_hour(store)
+
+        assert store.online(at(0), at(60)) == ([A, B], 60)
+        assert store.online(at(0), at(60), mode="all") == ([A], 60)
+        assert store.online(at(20), at(30)) == ([A], 10)
+        # No scans in the range: nobody was seen, and "all" is not vacuously true
+        assert store.online(at(90), at(100), mode="all") == ([], 0)
+
+    def test_heatmap(self, tmp_path):
+        """Test presence fractions per bucket, with null for unscanned buckets"""
+        store = PresenceStore(str(tmp_path), slot_seconds=60)
+        record_hour(store)
+
+        starts, devices = store.heatmap(at(0), at(90), bucket_seconds=1800)
+        assert starts == [at(0), at(30), at(60)]
+        assert devices == {A: [1.0, 1.0, None], B: [round(10 / 30, 4), 0.0, None]}
+        assert list(store.heatmap(at(0), at(60), 1800, macs=[B.lower()])[1]) == [B]
+
+    def test_segments_are_shared_through_disk(self, tmp_path):
+        """Test that flushed segments are read by another store and survive restarts"""
+        writer = PresenceStore(str(tmp_path), slot_seconds=60, flush_scans=40)
+        reader = PresenceStore(str(tmp_path), slot_seconds=60)
+        record_hour(writer)
+        assert reader.online(at(0), at(60)) == ([A, B], 40)
+
+        writer.flush()
+        assert reader.online(at(0), at(60)) == ([A, B], 60)
+        assert os.listdir(tmp_path) == ["20260101.json.gz"]
+
+        restarted = PresenceStore(str(tmp_path), slot_seconds=60)
+        restarted.record(at(60), [B])
+        assert restarted.online(at(0), at(61), mode="all") == ([], 61)
+        assert restarted.heatmap(at(60), at(61), 60)[1] == {B: [1.0]}
+
+    def test_days_are_separate_segments(self, tmp_path):
+        """Test a range spanning midnight"""
+        store = PresenceStore(str(tmp_path), slot_seconds=60)
+        midnight = datetime(2026, 1, 2)
+        store.record(midnight - timedelta(minutes=1), [A])
+        store.record(midnight, [A])
+        store.flush()
+
+        assert sorted(os.listdir(tmp_path)) == ["20260101.json.gz", "20260102.json.gz"]
+        assert store.online(midnight - timedelta(minutes=1), midnight + timedelta(minutes=1),
+                            mode="all") == ([A], 2)
+
+    def test_retention(self, tmp_path):
+        """Test that segments older than the retention period are deleted on flush"""
+        store = PresenceStore(str(tmp_path), slot_seconds=60, retention_days=7)
+        now = datetime.now()
+        store.record(now - timedelta(days=10), [A])
+        store.record(now, [A])
+        store.flush()
+
+        assert os.listdir(tmp_path) == [f"{now:%Y%m%d}.json.gz"]
+        assert store.online(now - timedelta(days=11), now + timedelta(minutes=1)) == ([A], 1)
+
+    def test_ranges_visit_only_stored_days(self, tmp_path, monkeypatch):
+        """Test that a long range reads only days with segments and too long a range is refused"""
+        store = PresenceStore(str(tmp_path), slot_seconds=60)
+        record_hour(store)
+        store.flush()
+        store.record(at(60 * 24 * 30), [B])
+
+        reader = PresenceStore(str(tmp_path), slot_seconds=60)
+        opened = []
+        monkeypatch.setattr(os.path, "getmtime",
+                            lambda path, getmtime=os.path.getmtime: opened.append(path) or getmtime(path))
+        since = at(0) - timedelta(days=MAX_RANGE_DAYS - 1)
+        assert reader.online(since, at(60)) == ([A, B], 60)
+        assert len(opened) == 1
+        # Unflushed days of the writing store are included
+        assert store.online(at(0), at(60 * 24 * 31)) == ([A, B], 61)
+
+        with pytest.raises(ValueError):
+            reader.online(datetime(1, 1, 1), at(60))
+        with pytest.raises(ValueError):
+            reader.heatmap(datetime(1, 1, 1), at(60), 3600)
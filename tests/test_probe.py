@@ -0,0 +1,149 @@
+"""
+Unit tests for ICMP/TCP liveness probes
+"""
+import asyncio
+import socket
+import time
+import pytest
+from unittest.mock import MagicMock, patch
+from network_monitor.probe import LivenessProber, ProbeResult, _Pinger, synthetic_mac
+from network_monitor.scanner import NetworkScanner
+
+
+@pytest.fixture
+def listener():
+    """A TCP listener on loopback"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.listen(16)
+    yield sock.getsockname()[1]
+    sock.close()
+
+
+def closed_port():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class SlowProber(LivenessProber):
+    """Hosts answer on even last octets after a delay; tracks probes in flight"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, methods=["tcp"], ports=[1, 2], **kwargs)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.started = []
+
+    async def _probe_tcp(self, ip_address, port):
+        self.started.append((ip_address, port))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if int(ip_address.rsplit(".", 1)[1]) % 2 == 0 and port == 2:
+            return 0.01
+        return None
+
+
+class TestLivenessProber:
+    """Test cases for ICMP/TCP liveness probes"""
+
+    def test_tcp_probe_finds_listener(self, listener):
+        """Test that an accepted connection marks the host alive on that port"""
+        prober = LivenessProber(["127.0.0.1"], methods=["tcp"], ports=[listener], timeout=1)
+        result = prober.probe()
+        assert list(result) == ["127.0.0.1"]
+        assert result["127.0.0.1"].method == "tcp"
+        assert result["127.0.0.1"].port == listener
+
+    def test_refused_connection_counts_as_alive(self):
+        """Test that a RST proves the host is up"""
+        port = closed_port()
+        result = LivenessProber(["127.0.0.1"], methods=["tcp"], ports=[port], timeout=1).probe()
+        assert result["127.0.0.1"].port == port
+
+    def test_icmp_probe_on_loopback(self):
+        """Test an echo reply from loopback, where the OS allows ICMP sockets"""
+        async def can_ping():
+            pinger = _Pinger.open()
+            if pinger is None:
+                return False
+            pinger.close()
+            return True
+
+        if not asyncio.run(can_ping()):
+            pytest.skip("ICMP sockets not permitted")
+        result = LivenessProber(["127.0.0.1/31"], methods=["icmp"], timeout=1).probe()
+        assert set(result) == {"127.0.0.0", "127.0.0.1"}
+        assert all(r.method == "icmp" for r in result.values())
+
+    def test_hosts_and_exclusions(self):
+        """Test target expansion without network/broadcast, duplicates or excluded hosts"""
+        prober = LivenessProber(["10.0.0.0/29", "10.0.0.3", "10.0.1.9/32"])
+        assert list(prober.hosts(exclude=["10.0.0.2"])) == [
+            "10.0.0.1", "10.0.0.3", "10.0.0.4", "10.0.0.5", "10.0.0.6", "10.0.1.9"]
+        with pytest.raises(ValueError):
+            LivenessProber(["10.0.0.0/29"], methods=["udp"])
+
+    def test_concurrency_is_bounded(self):
+        """Test that no more than `concurrency` probes are in flight and ports are tried in order"""
+        prober = SlowProber(["10.0.0.0/27"], concurrency=4, rate=0)
+        result = prober.probe()
+        assert prober.max_in_flight == 4
+        assert len(prober.started) == 30 * 2
+        assert sorted(result) == sorted(f"10.0.0.{i}" for i in range(2, 31, 2))
+        assert all(r == ProbeResult(r.ip_address, "tcp", 2, 0.01) for r in result.values())
+
+    def test_rate_cap(self):
+        """Test that probe starts are spaced by the rate"""
+        prober = SlowProber(["10.0.0.0/29"], concurrency=64, rate=100)
+        started = time.perf_counter()
+        prober.probe()
+        # 6 hosts x 2 ports, at most 100 per second
+        assert time.perf_counter() - started >= 11 / 100
+
+
+class TestScannerProbes:
+    """Test cases for probed hosts in scans"""
+
+    def test_synthetic_mac(self):
+        """Test the locally administered stand-in MAC"""
+        assert synthetic_mac("10.20.0.5") == "02:00:0A:14:00:05"
+        assert int(synthetic_mac("10.20.0.5")[:2], 16) & 0x02
+
+    @patch('network_monitor.scanner.srp')
+    def test_scanner_merges_probed_hosts(self, mock_srp):
+        """Test that hosts found by probes join the scan result under synthetic MACs"""
+        received = MagicMock()
+        received.hwsrc = "aa:aa:aa:aa:aa:01"
+        received.psrc = "10.20.0.1"
+        mock_srp.return_value = ([(None, received)], [])
+        prober = MagicMock()
+        prober.probe.return_value = {"10.20.0.5": ProbeResult("10.20.0.5", "icmp", None, 0.001)}
+
+        scanner = NetworkScanner("10.20.0.0/24", resolve_hostnames=False, prober=prober)
+        devices = scanner.scan()
+
+        assert set(devices) == {"AA:AA:AA:AA:AA:01", "02:00:0A:14:00:05"}
+        assert devices["02:00:0A:14:00:05"].ip_address == "10.20.0.5"
+        assert prober.probe.call_args[1]["exclude"] == {"10.20.0.1"}
+
+    @patch('network_monitor.scanner.srp')
+    def test_known_devices_are_not_probed(self, mock_srp):
+        """Test that a device known from ARP that missed the sweep keeps its MAC"""
+        mock_srp.return_value = ([], [])
+        prober = MagicMock()
+        prober.probe.return_value = {}
+
+        scanner = NetworkScanner("10.20.0.0/24", resolve_hostnames=False, prober=prober,
+                                 retries=0)
+        scanner.expect({"aa:aa:aa:aa:aa:01": "10.20.0.1"})
+        scanner.scan()
+        assert prober.probe.call_args[1]["exclude"] == {"10.20.0.1"}
+
+        # Outside the retry window the device is no longer known
+        scanner.scan()
+        assert prober.probe.call_args[1]["exclude"] == set()
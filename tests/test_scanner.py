@@ -4,6 +4,7 @@ Unit tests for NetworkScanner
 import pytest
 from unittest.mock import patch, MagicMock
 from network_monitor.scanner import NetworkScanner, Device
+from network_monitor.metrics import ERRORS_TOTAL
 
 
 class TestDevice:
@@ -82,3 +83,80 @@ class TestNetworkScanner:
         
         with pytest.raises(PermissionError):
             scanner.scan()
+
+
+def arp_reply(mac, ip):
+    """A (sent, received) pair as returned by srp"""
+    received = MagicMock()
+    received.hwsrc = mac
+    received.psrc = ip
+    return (None, received)
+
+
+class TestRetryPass:
+    """Test cases for unicast retries of known devices"""
+    
+    @patch('network_monitor.scanner.srp')
+    def test_missed_device_is_retried(self, mock_srp):
+        """Test that a known device missing from the sweep is asked directly"""
+        scanner = NetworkScanner("192.168.1.0/24", resolve_hostnames=False, retry_timeout=0.2)
+        mock_srp.return_value = ([arp_reply("aa:aa:aa:aa:aa:01", "192.168.1.10"),
+                                  arp_reply("aa:aa:aa:aa:aa:02", "192.168.1.20")], [])
+        scanner.scan()
+        
+        mock_srp.reset_mock()
+        mock_srp.side_effect = [
+            ([arp_reply("aa:aa:aa:aa:aa:01", "192.168.1.10")], []),
+            ([arp_reply("aa:aa:aa:aa:aa:02", "192.168.1.20")], []),
+        ]
+        devices = scanner.scan()
+        
+        assert set(devices) == {"AA:AA:AA:AA:AA:01", "AA:AA:AA:AA:AA:02"}
+        packets = mock_srp.call_args_list[1][0][0]
+        assert len(packets) == 1
+        assert packets[0].dst == "AA:AA:AA:AA:AA:02"
+        assert packets[0].pdst == "192.168.1.20"
+        assert mock_srp.call_args_list[1][1]["timeout"] == 0.2
+    
+    @patch('network_monitor.scanner.srp')
+    def test_retry_rounds_and_window(self, mock_srp):
+        """Test that unanswered retries are repeated, then given up after the window"""
+        scanner = NetworkScanner("192.168.1.0/24", resolve_hostnames=False, retries=2)
+        scanner.expect({"aa:aa:aa:aa:aa:02": "192.168.1.20"})
+        mock_srp.return_value = ([], [])
+        
+        assert scanner.scan() == {}
+        # Sweep plus two retry rounds
+        assert mock_srp.call_count == 3
+        
+        mock_srp.reset_mock()
+        scanner.scan()
+        # Missed the last scan too: no longer retried
+        assert mock_srp.call_count == 1
+    
+    @patch('network_monitor.scanner.srp')
+    def test_retries_disabled(self, mock_srp):
+        """Test that retries=0 sends only the sweep"""
+        scanner = NetworkScanner("192.168.1.0/24", resolve_hostnames=False, retries=0)
+        scanner.expect({"aa:aa:aa:aa:aa:02": "192.168.1.20"})
+        mock_srp.return_value = ([], [])
+        scanner.scan()
+        assert mock_srp.call_count == 1
+    
+    @patch('network_monitor.scanner.srp')
+    def test_failed_retry_keeps_the_sweep(self, mock_srp):
+        """Test that an error in a retry round keeps the sweep and earlier recoveries"""
+        scanner = NetworkScanner("192.168.1.0/24", resolve_hostnames=False, retries=2)
+        scanner.expect({"aa:aa:aa:aa:aa:02": "192.168.1.20",
+                        "aa:aa:aa:aa:aa:03": "192.168.1.30"})
+        mock_srp.side_effect = [
+            ([arp_reply("aa:aa:aa:aa:aa:01", "192.168.1.10")], []),
+            ([arp_reply("aa:aa:aa:aa:aa:02", "192.168.1.20")], []),
+            OSError("Network is down"),
+        ]
+        errors = ERRORS_TOTAL.labels(component="scanner").value
+        
+        devices = scanner.scan()
+        
+        assert set(devices) == {"AA:AA:AA:AA:AA:01", "AA:AA:AA:AA:AA:02"}
+        assert ERRORS_TOTAL.labels(component="scanner").value == errors + 1
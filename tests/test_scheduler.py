@@ -0,0 +1,120 @@
+"""
+Unit tests for ScanScheduler
+"""
+import threading
+import time
+import pytest
+from network_monitor.scheduler import ScanScheduler
+
+
+def run_in_thread(scheduler, scan):
+    """Start the scheduler loop in a background thread"""
+    thread = threading.Thread(target=scheduler.run, args=(scan,), daemon=True)
+    thread.start()
+    return thread
+
+
+class TestScanScheduler:
+    """Test cases for ScanScheduler"""
+
+    def test_invalid_arguments(self):
+        """Test validation of interval and overrun policy"""
+        with pytest.raises(ValueError):
+            ScanScheduler(interval=0)
+        with pytest.raises(ValueError):
+            ScanScheduler(interval=1, overrun_policy="queue")
+
+    def test_starts_do_not_drift(self):
+        """Test that scan duration does not stretch the period"""
+        starts = []
+        scheduler = ScanScheduler(interval=0.1)
+
+        def scan():
+            starts.append(time.monotonic())
+            time.sleep(0.04)
+            if len(starts) == 5:
+                scheduler.stop()
+
+        run_in_thread(scheduler, scan).join(timeout=2)
+
+        assert len(starts) == 5
+        # Sleep-after-scan would take 4 * 0.14s; the cadence keeps it at 4 * 0.1s
+        assert starts[-1] - starts[0] < 0.5
+        assert scheduler.last_lag is not None
+
+    def test_stop_wakes_immediately(self):
+        """Test that stop() does not wait for the next interval"""
+        scheduler = ScanScheduler(interval=30)
+        thread = run_in_thread(scheduler, lambda: None)
+        time.sleep(0.05)
+
+        started = time.monotonic()
+        scheduler.stop()
+        thread.join(timeout=2)
+
+        assert not thread.is_alive()
+        assert time.monotonic() - started < 1
+
+    def test_stop_before_run_is_kept(self):
+        """Test that a stop() issued before the loop starts ends it, and is consumed"""
+        scans = []
+        scheduler = ScanScheduler(interval=30)
+        scheduler.stop()
+        run_in_thread(scheduler, lambda: scans.append(1)).join(timeout=2)
+        assert scans == []
+
+        thread = run_in_thread(scheduler, lambda: scans.append(1))
+        time.sleep(0.05)
+        assert scheduler.running
+        scheduler.stop()
+        thread.join(timeout=2)
+        assert scans == [1]
+
+    def test_trigger_runs_scan_early(self):
+        """Test that trigger() wakes the loop for an immediate scan"""
+        scans = []
+        scheduler = ScanScheduler(interval=30)
+        thread = run_in_thread(scheduler, lambda: scans.append(1))
+        time.sleep(0.05)
+
+        scheduler.trigger()
+        time.sleep(0.1)
+        scheduler.stop()
+        thread.join(timeout=2)
+
+        assert len(scans) == 2
+        assert scheduler.triggered == 1
+
+    def test_overrun_skips_missed_slots(self):
+        """Test that a long scan skips starts instead of bunching them"""
+        starts = []
+        scheduler = ScanScheduler(interval=0.05, overrun_policy="skip")
+
+        def scan():
+            starts.append(time.monotonic())
+            if len(starts) == 1:
+                time.sleep(0.13)
+            elif len(starts) == 2:
+                scheduler.stop()
+
+        run_in_thread(scheduler, scan).join(timeout=2)
+
+        assert scheduler.skipped >= 2
+        # The second scan waits for the next aligned slot (0.15s)
+        assert starts[1] - starts[0] >= 0.14
+
+    def test_run_now_refuses_overlap(self):
+        """Test that a manual scan is refused while another is running"""
+        scheduler = ScanScheduler(interval=30)
+        release = threading.Event()
+        thread = threading.Thread(
+            target=scheduler.run_now, args=(release.wait,), daemon=True
+        )
+        thread.start()
+        time.sleep(0.05)
+
+        assert scheduler.run_now(lambda: None) is False
+
+        release.set()
+        thread.join(timeout=2)
+        assert scheduler.run_now(lambda: None) is True
@@ -0,0 +1,93 @@
+"""
+Unit tests for the device search index
+"""
+from dataclasses import replace
+from datetime import datetime, timedelta
+import pytest
+from network_monitor.scanner import Device
+from network_monitor.database import ScanDelta
+from network_monitor.search import DeviceIndex
+from network_monitor.state import DeviceRecord, DeviceStateStore
+
+T0 = datetime(2026, 1, 1)
+
+
+def record(mac, ip, hostname=None, connected=True, minutes=0, **kwargs):
+    return DeviceRecord(mac, ip, hostname, T0, T0 + timedelta(minutes=minutes), connected, **kwargs)
+
+
+@pytest.fixture
+def store():
+    store = DeviceStateStore()
+    store.load([
+        record("AA:BB:CC:00:00:01", "192.168.1.10", "laptop-anna", minutes=3, vendor="Dell Inc."),
+        record("AA:BB:CC:00:00:02", "192.168.1.20", "printer", minutes=2, device_type="Printer"),
+        record("AA:BB:DD:00:00:03", "192.168.2.5", "nas", connected=False, device_name="Backup NAS"),
+        record("11:22:33:44:55:66", "10.0.0.7", None, minutes=1, vendor="Dell Inc."),
+    ])
+    return store
+
+
+def macs(result):
+    return [device.mac_address for device in result.devices]
+
+
+class TestDeviceIndex:
+    """Test cases for the device search index"""
+
+    def test_search_by_mac_ip_and_name(self, store):
+        """Test MAC prefixes in any notation, CIDR containment and name substrings"""
+        index = DeviceIndex(store)
+        assert macs(index.search(mac="aa-bb-cc")) == ["AA:BB:CC:00:00:01", "AA:BB:CC:00:00:02"]
+        assert macs(index.search(ip="192.168.2.0/24")) == ["AA:BB:DD:00:00:03"]
+        assert macs(index.search(ip="10.0.0.7")) == ["11:22:33:44:55:66"]
+        assert macs(index.search(name="BACKUP")) == ["AA:BB:DD:00:00:03"]
+        assert macs(index.search(name="an")) == ["AA:BB:CC:00:00:01"]
+        with pytest.raises(ValueError):
+            index.search(ip="not-an-ip")
+
+    def test_free_text_and_filters(self, store):
+        """Test q across fields, leading octets, filters and ordering"""
+        index = DeviceIndex(store)
+        # Connected first, most recently seen first
+        assert macs(index.search(q="192.168")) == [
+            "AA:BB:CC:00:00:01", "AA:BB:CC:00:00:02", "AA:BB:DD:00:00:03"]
+        assert macs(index.search(q="192.168.1")) == ["AA:BB:CC:00:00:01", "AA:BB:CC:00:00:02"]
+        assert macs(index.search(q="aabbdd")) == ["AA:BB:DD:00:00:03"]
+        assert macs(index.search(q="print")) == ["AA:BB:CC:00:00:02"]
+        assert macs(index.search(connected=False)) == ["AA:BB:DD:00:00:03"]
+        assert macs(index.search(vendors=["dell inc."], connected=True)) == [
+            "AA:BB:CC:00:00:01", "11:22:33:44:55:66"]
+        assert macs(index.search(device_types=["printer"], q="aa")) == ["AA:BB:CC:00:00:02"]
+
+    def test_pagination(self, store):
+        """Test that total counts all matches and a page holds only its rows"""
+        index = DeviceIndex(store)
+        result = index.search(offset=1, limit=2)
+        assert result.total == 4
+        assert macs(result) == ["AA:BB:CC:00:00:02", "11:22:33:44:55:66"]
+
+    def test_index_follows_scans(self, store):
+        """Test that changed devices are re-indexed and new ones added"""
+        index = DeviceIndex(store)
+        store.publish(ScanDelta(
+            T0 + timedelta(minutes=10),
+            {"AA:BB:CC:00:00:02": Device("AA:BB:CC:00:00:02", "192.168.2.99"),
+             "CC:CC:CC:00:00:09": Device("CC:CC:CC:00:00:09", "192.168.2.7", "camera")},
+            connected={"CC:CC:CC:00:00:09"},
+            disconnected={"AA:BB:CC:00:00:01"},
+        ))
+        assert index.version == store.snapshot().version
+        assert macs(index.search(ip="192.168.1.0/24")) == ["AA:BB:CC:00:00:01"]
+        assert set(macs(index.search(ip="192.168.2.0/24"))) == {
+            "AA:BB:CC:00:00:02", "CC:CC:CC:00:00:09", "AA:BB:DD:00:00:03"}
+        assert macs(index.search(q="camera")) == ["CC:CC:CC:00:00:09"]
+        assert macs(index.search(connected=False)) == ["AA:BB:CC:00:00:01", "AA:BB:DD:00:00:03"]
+
+        store.merge([], removed=["CC:CC:CC:00:00:09"])
+        assert index.search(q="camera").total == 0
+
+        renamed = replace(store.snapshot().get("AA:BB:DD:00:00:03"), device_name="Archive")
+        store.merge([renamed])
+        assert index.search(name="backup").total == 0
+        assert macs(index.search(name="archive")) == ["AA:BB:DD:00:00:03"]
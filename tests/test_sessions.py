@@ -0,0 +1,53 @@
+"""
+Unit tests for device sessions
+"""
+from network_monitor.sessions import DeviceSession, pair_events, session_history, uptime_seconds
+from .conftest import at
+
+A = "AA:00:00:00:00:01"
+B = "AA:00:00:00:00:02"
+
+
+class TestSessions:
+    """Test cases for session pairing and uptime"""
+
+    def test_pair_events(self):
+        """Test that events pair into sessions per device"""
+        events = [
+            (A, "10.0.0.1", "CONNECTED", at(0)),
+            (A, None, "DISCONNECTED", at(10)),
+            (A, "10.0.0.5", "CONNECTED", at(20)),
+            (B, "10.0.0.2", "DISCONNECTED", at(1)),     # no session open: ignored
+            (B, "10.0.0.2", "CONNECTED", at(5)),
+        ]
+        devices = {A: (True, at(30)), B: (False, at(8))}
+        sessions = list(pair_events(events, devices))
+
+        assert [(s.mac_address, s.ip_address, s.start_time, s.end_time) for s in sessions] == [
+            (A, "10.0.0.1", at(0), at(10)),
+            (A, "10.0.0.5", at(20), None),
+            # B is no longer connected, so its open session ends when it was last seen
+            (B, "10.0.0.2", at(5), at(8)),
+        ]
+
+    def test_repeated_connect_closes_previous_session(self):
+        """Test that a CONNECTED without a DISCONNECTED ends the earlier session"""
+        events = [(A, "10.0.0.1", "CONNECTED", at(0)), (A, "10.0.0.1", "CONNECTED", at(5))]
+        sessions = list(pair_events(events, {A: (True, at(6))}))
+        assert [(s.start_time, s.end_time) for s in sessions] == [(at(0), at(5)), (at(5), None)]
+
+    def test_uptime_is_clipped_to_window(self):
+        """Test uptime for sessions overlapping either edge of the window"""
+        sessions = [
+            DeviceSession(A, None, at(-30), at(10)),
+            DeviceSession(A, None, at(20), at(30)),
+            DeviceSession(A, None, at(50), None),
+        ]
+        assert uptime_seconds(sessions, since=at(0), until=at(60)) == (10 + 10 + 10) * 60
+
+    def test_session_history(self):
+        """Test that sessions expand to events newest first"""
+        sessions = [DeviceSession(A, "10.0.0.5", at(20)), DeviceSession(A, "10.0.0.1", at(0), at(10))]
+        assert [(e["event_type"], e["ip_address"]) for e in session_history(sessions)] == [
+            ("CONNECTED", "10.0.0.5"), ("DISCONNECTED", None), ("CONNECTED", "10.0.0.1"),
+        ]
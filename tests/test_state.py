@@ -0,0 +1,93 @@
+"""
+Unit tests for the shared device state store
+"""
+from dataclasses import replace
+from datetime import datetime, timedelta
+from network_monitor.database import ScanDelta
+from network_monitor.enrichment import EnrichmentJob
+from network_monitor.scanner import Device
+from network_monitor.state import DeviceRecord, DeviceStateStore
+
+
+def make_record(mac, connected=True, minutes_ago=0):
+    seen = datetime(2026, 1, 1, 12, 0) - timedelta(minutes=minutes_ago)
+    return DeviceRecord(mac, "192.168.1.10", None, seen, seen, connected, device_name="NAS")
+
+
+class TestDeviceStateStore:
+    """Test cases for DeviceStateStore"""
+
+    def test_load_and_order(self):
+        """Test that connected devices sort first, newest first"""
+        store = DeviceStateStore()
+        store.load([
+            make_record("AA:00:00:00:00:01", connected=False),
+            make_record("AA:00:00:00:00:02", minutes_ago=5),
+            make_record("AA:00:00:00:00:03"),
+        ])
+
+        snapshot = store.snapshot()
+        assert [d.mac_address[-2:] for d in snapshot.ordered()] == ["03", "02", "01"]
+        assert snapshot.connected_count == 2
+        assert snapshot.total_count == 3
+
+    def test_publish_applies_delta(self):
+        """Test connections, disconnections and manual fields after a scan"""
+        store = DeviceStateStore()
+        store.load([make_record("AA:00:00:00:00:01"), make_record("AA:00:00:00:00:02")])
+        now = datetime(2026, 1, 1, 13, 0)
+
+        store.publish(ScanDelta(
+            timestamp=now,
+            devices={
+                "AA:00:00:00:00:01": Device("AA:00:00:00:00:01", "192.168.1.20", "nas"),
+                "AA:00:00:00:00:03": Device("AA:00:00:00:00:03", "192.168.1.30"),
+            },
+            connected={"AA:00:00:00:00:03"},
+            disconnected={"AA:00:00:00:00:02"},
+        ))
+
+        snapshot = store.snapshot()
+        kept = snapshot.get("aa:00:00:00:00:01")
+        assert kept.ip_address == "192.168.1.20"
+        assert kept.last_seen == now
+        assert kept.device_name == "NAS"
+        assert snapshot.get("AA:00:00:00:00:02").is_connected is False
+        assert snapshot.get("AA:00:00:00:00:03").first_seen == now
+        assert snapshot.connected_count == 2
+
+    def test_snapshots_are_isolated(self):
+        """Test that an old snapshot is unaffected by later publishes"""
+        store = DeviceStateStore()
+        store.load([make_record("AA:00:00:00:00:01")])
+        before = store.snapshot()
+        seen = []
+        store.subscribe(seen.append)
+
+        store.publish(ScanDelta(datetime.now(), {}, set(), {"AA:00:00:00:00:01"}))
+
+        assert before.get("AA:00:00:00:00:01").is_connected is True
+        assert store.snapshot().version == before.version + 1
+        assert seen == [store.snapshot()]
+
+    def test_apply_enrichment(self):
+        """Test that enrichment fills gaps without overriding manual types"""
+        store = DeviceStateStore()
+        store.load([replace(make_record("AA:00:00:00:00:01"), hostname="old.lan")])
+        store.publish(ScanDelta(datetime.now(), {
+            "AA:00:00:00:00:01": Device("AA:00:00:00:00:01", "192.168.1.20"),
+        }))
+        # Scans without inline resolution keep the stored hostname
+        assert store.snapshot().get("AA:00:00:00:00:01").hostname == "old.lan"
+
+        store.apply_enrichment([
+            EnrichmentJob("AA:00:00:00:00:01", "192.168.1.20", hostname="nas.lan",
+                          vendor="Synology", device_type="Storage"),
+            EnrichmentJob("AA:00:00:00:00:09", "192.168.1.99", hostname="gone.lan"),
+        ])
+
+        record = store.snapshot().get("AA:00:00:00:00:01")
+        assert record.hostname == "nas.lan"
+        assert record.vendor == "Synology"
+        assert record.device_type == "Storage"
+        assert store.snapshot().get("AA:00:00:00:00:09") is None
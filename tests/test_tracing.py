@@ -0,0 +1,54 @@
+"""
+Unit tests for scan tracing and profiling
+"""
+import json
+import logging
+import time
+from network_monitor import tracing
+
+
+class TestSpan:
+    """Test cases for span records"""
+
+    def test_nested_spans_share_trace(self, caplog):
+        """Test that child spans carry the parent's trace id"""
+        tracing.set_enabled(True)
+        try:
+            with caplog.at_level(logging.INFO, logger="network_monitor.trace"):
+                with tracing.span("scan"):
+                    with tracing.span("scan.arp", replies=3):
+                        pass
+        finally:
+            tracing.set_enabled(False)
+
+        child, parent = [json.loads(r.getMessage()) for r in caplog.records]
+        assert child["span"] == "scan.arp"
+        assert child["parent"] == "scan"
+        assert child["replies"] == 3
+        assert child["trace_id"] == parent["trace_id"]
+
+    def test_disabled_span_emits_nothing(self, caplog):
+        """Test that spans are silent while tracing is off"""
+        with caplog.at_level(logging.INFO, logger="network_monitor.trace"):
+            with tracing.span("scan"):
+                pass
+        assert not caplog.records
+
+
+class TestScanProfiler:
+    """Test cases for ScanProfiler"""
+
+    def test_profiles_requested_scans(self, tmp_path):
+        """Test that a profile file is written after N scans"""
+        profiler = tracing.ScanProfiler(output_dir=str(tmp_path), interval=0.001)
+        profiler.request(2)
+
+        for _ in range(2):
+            with profiler.profile_scan():
+                time.sleep(0.03)
+
+        assert profiler.pending == 0
+        with open(profiler.last_output) as fh:
+            lines = fh.read().splitlines()
+        assert lines
+        assert any("test_profiles_requested_scans" in line for line in lines)
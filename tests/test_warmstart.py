@@ -0,0 +1,83 @@
+"""
+Unit tests for warm start
+"""
+import time
+from datetime import datetime, timedelta
+from network_monitor.enrichment import ReverseDnsStage
+from network_monitor.warmstart import MonitorSnapshot, SnapshotFile, plan_resume
+
+NOW = datetime(2026, 1, 1, 12, 0)
+A = "AA:00:00:00:00:01"
+B = "AA:00:00:00:00:02"
+
+
+def snapshot(scanned_at=NOW - timedelta(seconds=30), connected=(A, B)):
+    return MonitorSnapshot(
+        generation=42,
+        scanned_at=scanned_at,
+        connected=sorted(connected),
+        missing=[B],
+        misses={B: [1, 1767268770.0]},
+        hostnames={"10.0.0.1": ("a.lan", time.time() + 60)},
+    )
+
+
+class TestWarmStart:
+    """Test cases for warm start snapshots"""
+
+    def test_snapshot_file_roundtrip(self, tmp_path):
+        """Test that a saved snapshot loads back and a corrupt one is ignored"""
+        path = tmp_path / "monitor_snapshot.json"
+        store = SnapshotFile(str(path))
+        assert store.load() is None
+
+        store.save(snapshot())
+        loaded = store.load()
+        assert loaded.generation == 42
+        assert loaded.scanned_at == NOW - timedelta(seconds=30)
+        assert loaded.misses == {B: [1, 1767268770.0]}
+        assert loaded.present == {A}
+        assert loaded.hostnames["10.0.0.1"][0] == "a.lan"
+
+        path.write_text("{not json")
+        assert store.load() is None
+
+    def test_resume_from_matching_snapshot(self):
+        """Test that a snapshot matching the database is used and a short gap is not downtime"""
+        plan = plan_resume(snapshot(), {A, B}, NOW - timedelta(seconds=30), NOW, downtime_after=180)
+        assert plan.snapshot is not None and plan.snapshot.generation == 42
+        assert plan.last_scan == NOW - timedelta(seconds=30)
+        assert plan.downtime_since is None
+
+    def test_stale_snapshot_falls_back_to_database(self):
+        """Test that a snapshot the database has moved past is discarded"""
+        # Another writer changed the connected devices
+        plan = plan_resume(snapshot(), {A}, NOW - timedelta(seconds=30), NOW, downtime_after=180)
+        assert plan.snapshot is None
+        # ...or scanned after the snapshot was taken
+        plan = plan_resume(snapshot(), {A, B}, NOW - timedelta(seconds=5), NOW, downtime_after=180)
+        assert plan.snapshot is None
+        assert plan.last_scan == NOW - timedelta(seconds=5)
+
+    def test_long_gap_is_downtime(self):
+        """Test that a gap longer than downtime_after starts at the last scan"""
+        last_scan = NOW - timedelta(hours=2)
+        plan = plan_resume(snapshot(last_scan), {A, B}, last_scan, NOW, downtime_after=180)
+        assert plan.snapshot is not None
+        assert plan.downtime_since == last_scan
+
+        # Without a snapshot the database's latest LastSeen is used
+        plan = plan_resume(None, {A}, last_scan, NOW, downtime_after=180)
+        assert plan.downtime_since == last_scan
+        # An empty database has nothing to resume
+        assert plan_resume(None, set(), None, NOW, downtime_after=180).downtime_since is None
+
+    def test_hostname_cache_survives_export(self):
+        """Test that cached lookups carry over with their remaining lifetime"""
+        stage = ReverseDnsStage(cache_ttl=60, resolver=lambda ip: "a.lan")
+        stage._cache["10.0.0.1"] = ("a.lan", time.monotonic() + 60)
+        stage._cache["10.0.0.2"] = ("b.lan", time.monotonic() - 1)
+
+        restored = ReverseDnsStage(cache_ttl=60, resolver=lambda ip: None)
+        restored.restore_cache(stage.export_cache())
+        assert restored.cached_items() == {"10.0.0.1": "a.lan"}